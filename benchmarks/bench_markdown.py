@@ -0,0 +1,100 @@
+"""Compare full re-renders with the incremental block renderer while streaming.
+
+Streams a ~50 KB assistant response (prose, lists, tables and fenced code)
+in small chunks and renders it after every ``--render-every`` characters,
+once with ``render_markdown`` over the whole text and once with
+``IncrementalMarkdownRenderer``. Both final outputs must be identical.
+
+Run with: python -m benchmarks.bench_markdown
+"""
+import argparse
+import time
+
+from nanogpt_chat.utils.markdown_renderer import IncrementalMarkdownRenderer, render_markdown
+
+SECTION = """## Step {i}
+
+Here is some explanation for step {i}, with **bold**, *italic* and `inline code`.
+It spans a couple of lines so nl2br has work to do.
+
+- first point about step {i}
+- second point with a [link](https://example.com/{i})
+
+```python
+def step_{i}(values):
+    total = 0
+    for value in values:
+        total += value * {i}
+
+    return total
+```
+
+| input | output |
+|-------|--------|
+| {i}   | {i}0   |
+
+"""
+
+
+def build_response(size):
+    parts = []
+    length = 0
+    i = 0
+    while length < size:
+        section = SECTION.format(i=i)
+        parts.append(section)
+        length += len(section)
+        i += 1
+    return "".join(parts)[:size]
+
+
+def run_full(text, chunk_size, render_every):
+    renders = 0
+    since_render = 0
+    start = time.perf_counter()
+    for pos in range(0, len(text), chunk_size):
+        since_render += chunk_size
+        if since_render >= render_every:
+            render_markdown(text[:pos + chunk_size])
+            renders += 1
+            since_render = 0
+    html = render_markdown(text)
+    return time.perf_counter() - start, renders + 1, html
+
+
+def run_incremental(text, chunk_size, render_every):
+    renderer = IncrementalMarkdownRenderer()
+    renders = 0
+    since_render = 0
+    start = time.perf_counter()
+    for pos in range(0, len(text), chunk_size):
+        renderer.append(text[pos:pos + chunk_size])
+        since_render += chunk_size
+        if since_render >= render_every:
+            renderer.html()
+            renders += 1
+            since_render = 0
+    html = renderer.html()
+    return time.perf_counter() - start, renders + 1, html
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50 * 1024)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--render-every", type=int, default=256)
+    args = parser.parse_args()
+
+    text = build_response(args.size)
+    full_time, renders, full_html = run_full(text, args.chunk_size, args.render_every)
+    inc_time, _, inc_html = run_incremental(text, args.chunk_size, args.render_every)
+
+    assert inc_html == full_html, "incremental output differs from a full render"
+    print(f"response: {len(text):,} chars, {renders} renders")
+    print(f"full re-render: {full_time * 1000:9.1f} ms ({full_time / renders * 1000:.2f} ms/render)")
+    print(f"incremental:    {inc_time * 1000:9.1f} ms ({inc_time / renders * 1000:.2f} ms/render)")
+    print(f"speedup:        {full_time / inc_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
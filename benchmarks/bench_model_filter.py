@@ -0,0 +1,101 @@
+"""Measure model picker filtering time per keystroke against catalog size.
+
+Types a few queries one character at a time into a catalog of ``n``
+synthetic models and times each keystroke's filtering through the
+prebuilt index, and through the picker's proxy model when PyQt6 is
+available. A linear scan of every model's text, as a contains-filter
+does, is timed alongside. The one-off cost of building the index is
+reported too.
+
+Run with: python -m benchmarks.bench_model_filter
+"""
+import argparse
+import os
+import random
+import time
+
+from nanogpt_chat.utils.model_catalog import ModelCatalog
+
+CATALOG_SIZES = (500, 2000, 10000)
+QUERIES = ("claude sonnet", "gpt-4o", "llama 70b instruct", "qwen")
+VENDORS = ("openai", "anthropic", "meta-llama", "google", "mistralai", "qwen", "deepseek", "x-ai")
+FAMILIES = ("gpt-4o", "claude-3-5-sonnet", "llama-3.1-70b-instruct", "gemini-2.0-flash",
+            "mistral-large", "qwen-2.5-coder", "deepseek-r1", "grok-2")
+
+
+def build_entries(n_models, seed=1):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(n_models):
+        vendor = rng.choice(VENDORS)
+        family = rng.choice(FAMILIES)
+        entries.append({"id": f"{vendor}/{family}-{i:05d}", "name": f"{family.title()} build {i}",
+                        "owned_by": vendor, "capabilities": {"vision": rng.random() < 0.3}})
+    return entries
+
+
+def keystrokes():
+    for query in QUERIES:
+        for end in range(1, len(query) + 1):
+            yield query[:end]
+
+
+def linear_scan(catalog, query):
+    terms = query.lower().split()
+    return [row for row, model in enumerate(catalog.models)
+            if all(term in model.search_key for term in terms)]
+
+
+def time_keystrokes(fn):
+    times = []
+    for text in keystrokes():
+        start = time.perf_counter()
+        fn(text)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2], times[-1]
+
+
+def proxy_for(catalog):
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtWidgets import QApplication
+        from nanogpt_chat.ui.model_picker import ModelFilterProxy, ModelListModel
+    except ImportError:
+        return None
+    global _app
+    _app = QApplication.instance() or QApplication([])
+    source = ModelListModel()
+    source.set_catalog(catalog)
+    proxy = ModelFilterProxy()
+    proxy.setSourceModel(source)
+    return proxy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=CATALOG_SIZES)
+    args = parser.parse_args()
+
+    print(f"{'models':>7} {'index build ms':>15} {'index µs p50/max':>18} "
+          f"{'proxy µs p50/max':>18} {'linear µs p50/max':>18}")
+    for n_models in args.sizes:
+        entries = build_entries(n_models)
+        start = time.perf_counter()
+        catalog = ModelCatalog(entries)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        for text in keystrokes():
+            assert list(catalog.search(text)) == linear_scan(catalog, text), text
+        index = time_keystrokes(catalog.search)
+        linear = time_keystrokes(lambda text: linear_scan(catalog, text))
+        proxy = proxy_for(catalog)
+        filtered = time_keystrokes(proxy.set_query) if proxy is not None else None
+
+        def fmt(pair):
+            return f"{pair[0] * 1e6:>8.0f}/{pair[1] * 1e6:<9.0f}" if pair else f"{'n/a':>18}"
+        print(f"{n_models:>7,} {build_ms:>15.1f} {fmt(index)} {fmt(filtered)} {fmt(linear)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare per-message commits with batched commits when saving messages.
+
+Writes ``--messages`` messages to a fresh database through
+``nanogpt_core.PyDatabase``: once with ``create_message`` per message (an
+INSERT and a session UPDATE, each in its own autocommit transaction), and
+once with ``create_messages_batch`` in batches of ``--batch-size``, as
+``MessagePersistenceQueue`` does.
+
+Run with: python -m benchmarks.bench_persistence
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from nanogpt_core import PyDatabase
+
+CONTENT = "A typical chat message of a sentence or two, long enough to be realistic. " * 3
+
+
+def run_per_message(db, session_id, n_messages):
+    start = time.perf_counter()
+    for i in range(n_messages):
+        db.create_message(session_id, "user" if i % 2 == 0 else "assistant", CONTENT, None)
+    return time.perf_counter() - start
+
+
+def run_batched(db, session_id, n_messages, batch_size):
+    start = time.perf_counter()
+    batch = []
+    for i in range(n_messages):
+        batch.append((session_id, "user" if i % 2 == 0 else "assistant", CONTENT, None))
+        if len(batch) == batch_size:
+            db.create_messages_batch(batch)
+            batch = []
+    if batch:
+        db.create_messages_batch(batch)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PyDatabase(os.path.join(tmp, "bench.db"))
+        per_message = run_per_message(db, db.create_session("Per message", "gpt-4o", "", 0.7).id,
+                                      args.messages)
+        batched = run_batched(db, db.create_session("Batched", "gpt-4o", "", 0.7).id,
+                              args.messages, args.batch_size)
+
+    print(f"messages: {args.messages:,}, batch size {args.batch_size}")
+    print(f"per-message commits: {per_message * 1000:9.1f} ms ({args.messages / per_message:9.0f} msg/s)")
+    print(f"batched commits:     {batched * 1000:9.1f} ms ({args.messages / batched:9.0f} msg/s)")
+    print(f"speedup:             {per_message / batched:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
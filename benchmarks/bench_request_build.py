@@ -0,0 +1,77 @@
+"""Measure the time to build a chat request body against history length.
+
+A conversation of ``n`` messages, mostly text with an occasional image
+attached as base64, is sent one more turn. The body is built both by
+encoding the whole history again, as every turn did before, and by joining
+the cached JSON segments of each message and splicing them into the body.
+Both produce the same bytes for the server.
+
+Run with: python -m benchmarks.bench_request_build
+"""
+import argparse
+import base64
+import json
+import os
+import time
+
+from nanogpt_chat.utils.async_client import _chat_body
+from nanogpt_chat.utils.segments import MessageSegments
+
+HISTORY_LENGTHS = (10, 100, 1000, 5000)
+# Every n-th user message carries an image
+IMAGE_EVERY = 50
+IMAGE_BYTES = 64 * 1024
+
+
+def build_history(n_messages):
+    image = "data:image/jpeg;base64," + base64.b64encode(os.urandom(IMAGE_BYTES)).decode()
+    history = []
+    for i in range(n_messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        text = f"Message {i}: " + "Some ordinary prose about the café, with a ☕ or two. " * 8
+        if role == "user" and i % IMAGE_EVERY == 0:
+            content = [{"type": "text", "text": text},
+                       {"type": "image_url", "image_url": {"url": image}}]
+        else:
+            content = text
+        history.append((role, content))
+    return history
+
+
+def time_per_turn(build, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'messages':>9} {'body KiB':>10} {'re-encode ms':>13} {'segments ms':>12} {'speedup':>8}")
+    for n_messages in HISTORY_LENGTHS:
+        history = build_history(n_messages)
+        segments = MessageSegments()
+        # Earlier turns already encoded everything but the newest message
+        segments.join(history[:-1])
+
+        def reencode():
+            return json.dumps(_chat_body("gpt-4o", history, 0.7, 1024, stream=True))
+
+        def from_segments():
+            return _chat_body("gpt-4o", segments.join(history), 0.7, 1024, stream=True)
+
+        assert json.loads(reencode()) == json.loads(from_segments())
+        full = time_per_turn(reencode, args.repeat)
+        cached = time_per_turn(from_segments, args.repeat)
+        size = len(from_segments()) / 1024
+        print(f"{n_messages:>9,} {size:>10,.0f} {full * 1000:>13.2f} {cached * 1000:>12.2f} "
+              f"{full / cached:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compare the FTS5 search index with the old LIKE scan on a large history.
+
+Builds a database of ``--messages`` synthetic messages (1M by default) spread
+over ``--sessions`` sessions through ``nanogpt_core.PyDatabase``, then times
+``PyDatabase.search`` against the ``LIKE '%q%'`` join that ``search_sessions``
+used to run, for a rare word, a common word and a prefix typed mid-word.
+
+The database is kept between runs; pass ``--rebuild`` to start over.
+
+Run with: python -m benchmarks.bench_search
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from nanogpt_core import PyDatabase
+
+LIKE_QUERY = """
+    SELECT DISTINCT s.id FROM chat_sessions s
+    LEFT JOIN chat_messages m ON s.id = m.session_id
+    WHERE s.title LIKE ? OR m.content LIKE ?
+    ORDER BY s.updated_at DESC
+"""
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa", "do", "gu"]
+
+
+def build_vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def populate(db, rng, n_messages, n_sessions, words_per_message, batch_size):
+    vocabulary = build_vocabulary(rng, 20000)
+    # Zipf-like weights: a few words are everywhere, most are rare
+    weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    session_ids = [
+        db.create_session(f"Chat {i} {rng.choice(vocabulary)}", "gpt-4o", "", 0.7).id
+        for i in range(n_sessions)
+    ]
+
+    batch = []
+    for i in range(n_messages):
+        content = " ".join(rng.choices(vocabulary, cum_weights=weights, k=words_per_message))
+        role = "user" if i % 2 == 0 else "assistant"
+        batch.append((session_ids[i % n_sessions], role, content, None))
+        if len(batch) == batch_size:
+            db.create_messages_batch(batch)
+            batch = []
+    if batch:
+        db.create_messages_batch(batch)
+    return vocabulary
+
+
+def time_call(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--words-per-message", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "nanogpt_bench_search.db"))
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(args.db):
+        os.remove(args.db)
+    fresh = not os.path.exists(args.db)
+    rng = random.Random(42)
+
+    start = time.perf_counter()
+    db = PyDatabase(args.db)
+    if fresh:
+        vocabulary = populate(db, rng, args.messages, args.sessions, args.words_per_message, 5000)
+        print(f"populated {args.messages:,} messages in {time.perf_counter() - start:.1f} s")
+    else:
+        vocabulary = build_vocabulary(rng, 20000)
+        print(f"reusing {args.db}")
+
+    queries = {
+        "common word": vocabulary[0],
+        "rare word": vocabulary[-1],
+        "prefix": vocabulary[len(vocabulary) // 2][:3],
+    }
+
+    scan = sqlite3.connect(args.db)
+    for label, query in queries.items():
+        pattern = f"%{query}%"
+        like_time, like_rows = time_call(
+            lambda: scan.execute(LIKE_QUERY, (pattern, pattern)).fetchall(), args.repeat)
+        fts_time, hits = time_call(lambda: db.search(query, args.limit), args.repeat)
+        print(f"{label:12} {query!r:10} LIKE scan: {like_time * 1000:9.1f} ms ({len(like_rows)} sessions)"
+              f"   FTS5: {fts_time * 1000:7.1f} ms (top {len(hits)})"
+              f"   speedup: {like_time / fts_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
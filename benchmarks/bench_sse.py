@@ -0,0 +1,85 @@
+"""Measure SSE decoding throughput in events per second.
+
+Builds a body of ``--events`` completion chunks like the recorded stream in
+``tests/fixtures/chat_stream.sse`` and feeds it to ``SSEDecoder`` in reads
+of several sizes. The per-read line split the streaming loop used before
+is timed alongside for comparison, and the events it lost because they
+straddled two reads are counted. Both parse each event's JSON, as the
+streaming loop does.
+
+Run with: python -m benchmarks.bench_sse
+"""
+import argparse
+import json
+import time
+
+from nanogpt_chat.utils.sse import SSEDecoder
+
+READ_SIZES = (64, 512, 1460, 16384)
+TOKENS = ("Voilà", " the", " café", " in", " 東京", " serves", " ☕", " and", " 🥐", ".")
+
+
+def build_body(n_events):
+    parts = []
+    for i in range(n_events):
+        chunk = {"id": "chatcmpl-7f3a", "object": "chat.completion.chunk", "model": "gpt-4o",
+                 "choices": [{"index": 0, "delta": {"content": TOKENS[i % len(TOKENS)]},
+                              "finish_reason": None}]}
+        parts.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+    parts.append("data: [DONE]\n\n")
+    return "".join(parts).encode()
+
+
+def split_reads(body, read_size):
+    return [body[i:i + read_size] for i in range(0, len(body), read_size)]
+
+
+def run_decoder(reads):
+    start = time.perf_counter()
+    decoder = SSEDecoder()
+    count = 0
+    for data in [*reads, None]:
+        events = decoder.feed(data) if data is not None else decoder.finish()
+        for event in events:
+            if event.data != "[DONE]":
+                json.loads(event.data)
+            count += 1
+    return count, time.perf_counter() - start
+
+
+def run_per_read_split(reads):
+    """Each read decoded and split on its own, as the old streaming loop did."""
+    start = time.perf_counter()
+    count = 0
+    for data in reads:
+        for line in data.decode("utf-8", "replace").splitlines():
+            if line.startswith("data: "):
+                try:
+                    if line[6:] != "[DONE]":
+                        json.loads(line[6:])
+                except ValueError:
+                    continue
+                count += 1
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=50_000)
+    args = parser.parse_args()
+
+    body = build_body(args.events)
+    expected = args.events + 1
+    print(f"events: {expected:,}, body: {len(body) / 1024:,.0f} KiB")
+    print(f"{'read size':>10} {'decoder ev/s':>14} {'per-read ev/s':>14} {'per-read lost':>14}")
+    for read_size in READ_SIZES:
+        reads = split_reads(body, read_size)
+        decoded, decoder_time = run_decoder(reads)
+        assert decoded == expected, (decoded, expected)
+        naive, naive_time = run_per_read_split(reads)
+        print(f"{read_size:>10} {decoded / decoder_time:>14,.0f} {naive / naive_time:>14,.0f} "
+              f"{expected - naive:>14,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Measure time to first byte of streamed completions against a local server.
+
+Starts a stand-in for the chat completions endpoint that answers every
+request with a short server-sent event stream, then sends ``--requests``
+streaming requests through ``nanogpt_core.PyNanoGPTClient``: once with a
+single client whose pooled connection is reused, and once with a new client
+(and so a new connection) per request. Each request reports ``ttfb_ms``,
+the time from sending it to the first byte of the event stream.
+
+The stand-in speaks plain HTTP on localhost, so the cold numbers leave out
+DNS and TLS; against the real API those come on top.
+
+Run with: python -m benchmarks.bench_stream_ttfb
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from nanogpt_core import PyNanoGPTClient
+
+
+class SSEHandler(BaseHTTPRequestHandler):
+    """Answers POST /chat/completions with a chunked event stream, keeping the connection open."""
+
+    protocol_version = "HTTP/1.1"
+    chunks = 20
+    chunk_delay = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(self.chunks):
+            event = {"choices": [{"index": 0, "delta": {"content": f"token{i} "}, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n")
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SSEHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def stream_once(client):
+    start = time.perf_counter()
+    stream = client.chat_completion_stream(
+        "stand-in", [("user", "hello")], 0.7, None, None, None, None)
+    chunks = sum(1 for _ in stream)
+    return stream.ttfb_ms, (time.perf_counter() - start) * 1000, chunks
+
+
+def summarize(label, results):
+    ttfb = [r[0] for r in results]
+    total = [r[1] for r in results]
+    print(f"{label:22} ttfb median {statistics.median(ttfb):7.2f} ms  p95 {percentile(ttfb, 95):7.2f} ms"
+          f"   full stream median {statistics.median(total):7.2f} ms")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=20)
+    args = parser.parse_args()
+    SSEHandler.chunks = args.chunks
+
+    server, base_url = start_server()
+    try:
+        pooled = PyNanoGPTClient("sk-bench", base_url)
+        stream_once(pooled)  # open the connection
+        warm = [stream_once(pooled) for _ in range(args.requests)]
+        cold = [stream_once(PyNanoGPTClient("sk-bench", base_url)) for _ in range(args.requests)]
+    finally:
+        server.shutdown()
+
+    print(f"requests: {args.requests}, chunks per response: {args.chunks}")
+    summarize("reused connection", warm)
+    summarize("new connection each", cold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare cumulative vs. delta streaming between ChatWorker and the GUI.
+
+Simulates a response arriving one token at a time and measures, for each
+protocol, the bytes marshalled across the worker->GUI signal and the time
+spent in the GUI-side handler.
+
+Run with: python -m benchmarks.bench_streaming
+"""
+import time
+
+from nanogpt_chat.utils.streaming import DeltaCoalescer
+
+TOKEN = "token "
+TOKENS_PER_SECOND = 200
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_cumulative(n_tokens):
+    """The old protocol: the full response is emitted on every token."""
+    state = {"text": "", "payload": 0, "gui_time": 0.0}
+
+    def on_chunk_received(full):
+        start = time.perf_counter()
+        state["text"] = full
+        state["gui_time"] += time.perf_counter() - start
+
+    full_response = ""
+    for _ in range(n_tokens):
+        full_response += TOKEN
+        state["payload"] += len(full_response)
+        on_chunk_received(full_response)
+    return state["payload"], state["gui_time"]
+
+
+def run_delta(n_tokens):
+    """The delta protocol: coalesced deltas appended to a GUI-side buffer."""
+    clock = SimulatedClock()
+    buffer = []
+    state = {"gui_time": 0.0}
+
+    def on_delta_received(delta):
+        start = time.perf_counter()
+        buffer.append(delta)
+        state["gui_time"] += time.perf_counter() - start
+
+    coalescer = DeltaCoalescer(on_delta_received, clock=clock)
+    for _ in range(n_tokens):
+        clock.now += 1.0 / TOKENS_PER_SECOND
+        coalescer.push(TOKEN)
+    coalescer.flush()
+
+    start = time.perf_counter()
+    "".join(buffer)
+    state["gui_time"] += time.perf_counter() - start
+    return coalescer.emitted_chars, state["gui_time"]
+
+
+def main():
+    print(f"{'tokens':>8} | {'cumulative bytes':>16} {'gui ms':>8} | "
+          f"{'delta bytes':>12} {'gui ms':>8} {'bytes/token':>11}")
+    for n_tokens in (1000, 5000, 10000, 20000):
+        cum_bytes, cum_time = run_cumulative(n_tokens)
+        delta_bytes, delta_time = run_delta(n_tokens)
+        print(f"{n_tokens:>8} | {cum_bytes:>16,} {cum_time * 1000:>8.2f} | "
+              f"{delta_bytes:>12,} {delta_time * 1000:>8.2f} {delta_bytes / n_tokens:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
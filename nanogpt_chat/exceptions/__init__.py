@@ -3,8 +3,18 @@ class NanoGPTError(Exception):
     pass
 
 class APIError(NanoGPTError):
-    """Raised when an API request fails."""
-    pass
+    """Raised when an API request fails.
+
+    ``status`` is the HTTP status if a response arrived, ``retry_after``
+    the seconds its ``Retry-After`` header asked to wait, and ``transient``
+    is true when the connection failed and sending again may succeed.
+    """
+
+    def __init__(self, message="", status=None, retry_after=None, transient=False):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.transient = transient
 
 class DatabaseError(NanoGPTError):
     """Raised when a database operation fails."""
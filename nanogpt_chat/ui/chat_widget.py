@@ -1,12 +1,24 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QSizePolicy, 
-    QApplication, QPushButton, QMenu, QTextEdit, QDialog, 
-    QDialogButtonBox, QGraphicsOpacityEffect, QGraphicsDropShadowEffect
+    QApplication, QMenu, QDialog, QListView, QStyledItemDelegate, QStyle,
+    QAbstractItemView
+)
+from PyQt6.QtCore import (
+    Qt, QSize, QDateTime, QTimer, pyqtSignal, QAbstractListModel, QModelIndex,
+    QRect, QRectF, QPoint, QPointF, QEvent, QUrl
+)
+from PyQt6.QtGui import (
+    QFont, QColor, QAction, QTextDocument, QPainter, QDesktopServices,
+    QAbstractTextDocumentLayout, QPalette
+)
+from collections import OrderedDict
+import itertools
+import math
+
+from nanogpt_chat.utils.markdown_renderer import IncrementalMarkdownRenderer
+from nanogpt_chat.utils.render_service import (
+    get_render_service, placeholder_message_html, style_message_html
 )
-from PyQt6.QtCore import Qt, QSize, QDateTime, QTimer, pyqtSignal, QPropertyAnimation, QEasingCurve
-from PyQt6.QtGui import QFont, QPalette, QColor, QAction, QClipboard
-import textwrap
-import re
 
 class TypingIndicator(QWidget):
     def __init__(self, parent=None):
@@ -61,289 +73,582 @@ class TypingIndicator(QWidget):
             opacity = random.choice([0.3, 0.6, 1.0])
             dot.setStyleSheet(f"color: rgba(170, 170, 170, {opacity}); font-size: 24px; font-weight: bold; background: transparent;")
 
-class ChatMessageWidget(QWidget):
-    edit_requested = pyqtSignal(str, str)
-    regenerate_requested = pyqtSignal(str, str)
-    delete_requested = pyqtSignal(str, str)
-    
-    def __init__(self, role: str, content: str, timestamp: str = "", parent=None):
-        super().__init__(parent)
+_message_keys = itertools.count()
+
+
+class TranscriptMessage:
+    """One row of the chat transcript.
+
+    ``html`` is the styled HTML that is painted: a plain-text placeholder
+    while ``needs_render`` is set, until the render service delivers the
+    real render. ``revision`` bumps on every content or HTML change and
+    invalidates cached layouts. ``interrupted`` marks a reply whose stream
+    was cut off before it finished; it is painted with a continue button.
+    """
+
+    __slots__ = ("key", "role", "content", "timestamp", "html", "needs_render", "revision", "seq",
+                 "interrupted")
+
+    def __init__(self, role, content, timestamp="", interrupted=False):
+        self.key = next(_message_keys)
         self.role = role
         self.content = content
         self.timestamp = timestamp if timestamp else QDateTime.currentDateTime().toString("h:mm AP")
-        self._pending_content = None
-        self._render_timer = None
-        
-        self.setup_ui()
-        self.update_content()
-        # Removed animation to improve performance and fix crashes
+        self.html = ""
+        self.needs_render = False
+        self.revision = 0
+        self.seq = 0
+        self.interrupted = interrupted
 
-    def setup_ui(self):
-        main_layout = QHBoxLayout(self)
-        main_layout.setContentsMargins(20, 4, 20, 4)
-        main_layout.setSpacing(0)
-        
-        self.bubble = QFrame()
-        self.bubble.setObjectName("bubble")
-        bubble_layout = QVBoxLayout(self.bubble)
-        bubble_layout.setContentsMargins(16, 10, 16, 10)
-        bubble_layout.setSpacing(0)
-        
-        if self.role == "user":
-            bubble_color = "#007acc"
-            bubble_style = "border-bottom-right-radius: 4px;"
-            max_w = 600
-        else:
-            bubble_color = "#2f2f2f"
-            bubble_style = "border-bottom-left-radius: 4px;"
-            max_w = 700
-        
-        self.bubble.setStyleSheet(f"""
-            #bubble {{
-                background-color: {bubble_color};
-                border-radius: 20px;
-                {bubble_style}
-                border: 1px solid rgba(255, 255, 255, 0.05);
-            }}
-        """)
-        
-        # Removed shadow effect to fix QPainter errors and improve performance
-        
-        meta_layout = QHBoxLayout()
-        meta_layout.setContentsMargins(0, 0, 0, 8)
-        meta_layout.setSpacing(8)
-        
-        self.timestamp_label = QLabel(self.timestamp)
-        self.timestamp_label.setStyleSheet("color: #aaaaaa; font-size: 11px; background: transparent;")
-        meta_layout.addWidget(self.timestamp_label)
-        
-        meta_layout.addStretch()
-        
-        self.menu_button = QPushButton("⋮")
-        self.menu_button.setFixedSize(24, 24)
-        self.menu_button.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                color: #aaaaaa;
-                border: none;
-                border-radius: 4px;
-                font-size: 14px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: rgba(255, 255, 255, 0.1);
-            }
-        """)
-        self.menu_button.clicked.connect(self.show_context_menu)
-        meta_layout.addWidget(self.menu_button)
-        bubble_layout.addLayout(meta_layout)
-        
-        self.content_label = QLabel()
-        self.content_label.setWordWrap(True)
-        self.content_label.setTextFormat(Qt.TextFormat.RichText)
-        self.content_label.setFont(QFont("", 12))
-        self.content_label.setStyleSheet("border: none; background: transparent;")
-        self.content_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.LinksAccessibleByMouse)
-        self.content_label.setOpenExternalLinks(True)
-        self.content_label.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Preferred)
-        self.bubble.setMaximumWidth(max_w)
-        
-        bubble_layout.addWidget(self.content_label)
-        
-        if self.role == "user":
-            main_layout.addStretch()
-            main_layout.addWidget(self.bubble)
-        else:
-            main_layout.addWidget(self.bubble)
-            main_layout.addStretch()
-        
-        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+    @property
+    def text_color(self):
+        return "#ffffff" if self.role == "user" else "#ececec"
 
-    def update_content(self):
-        if self.role == "user":
-            text_color = "#ffffff"
-        else:
-            text_color = "#ececec"
-            
-        html_content = self.content.replace("\n", "<br>")
-        try:
-            import markdown
-            html_content = markdown.markdown(
-                self.content,
-                extensions=['fenced_code', 'codehilite', 'tables', 'nl2br']
-            )
-        except Exception:
-            pass
-        
-        styled_html = f"""
-        <style>
-            * {{ color: {text_color}; font-size: 13px; line-height: 1.5; }}
-            code {{ background-color: rgba(0,0,0,0.2); padding: 2px 4px; border-radius: 3px; font-family: 'Cascadia Code', 'Consolas', monospace; }}
-            pre {{ background-color: rgba(0,0,0,0.3); padding: 10px; border-radius: 6px; position: relative; }}
-            pre code {{ background-color: transparent; padding: 0; }}
-            a {{ color: #4fc3f7; }}
-            p {{ margin: 0; padding: 0; }}
-            ul, ol {{ margin-left: 20px; }}
-            table {{ border-collapse: collapse; width: 100%; margin: 10px 0; border: 1px solid #444; }}
-            th, td {{ border: 1px solid #444; padding: 8px; text-align: left; }}
-            th {{ background-color: rgba(255,255,255,0.1); font-weight: bold; }}
-        </style>
-        {html_content}
-        """
-        self.content_label.setText(styled_html)
 
-    def update_content_throttled(self, content):
-        self.content = content
-        self._pending_content = content
-        if self._render_timer is None or not self._render_timer.isActive():
-            self.update_content()
-            self._render_timer = QTimer.singleShot(200, self._clear_pending_update)
-    
-    def _clear_pending_update(self):
-        if self._pending_content is not None:
-            self.content = self._pending_content
-            self.update_content()
-            self._pending_content = None
-            self._render_timer = None
-
-    def show_context_menu(self):
-        menu = QMenu(self)
-        copy_action = QAction("Copy", self)
-        copy_action.triggered.connect(self.copy_message)
-        menu.addAction(copy_action)
-        
-        if self.role == "user":
-            edit_action = QAction("Edit", self)
-            edit_action.triggered.connect(self.edit_message)
-            menu.addAction(edit_action)
+class ChatTranscriptModel(QAbstractListModel):
+    MessageRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._messages = []
+        # Rows are numbered by a sequence that grows at the bottom and shrinks
+        # at the top, so a message's row is seq - first_seq with no search
+        self._first_seq = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._messages)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._messages):
+            return None
+        message = self._messages[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return message.content
+        if role == self.MessageRole:
+            return message
+        return None
+
+    def message_at(self, row):
+        return self._messages[row]
+
+    def messages(self):
+        return list(self._messages)
+
+    def row_of(self, message):
+        row = message.seq - self._first_seq
+        if 0 <= row < len(self._messages) and self._messages[row] is message:
+            return row
+        return -1
+
+    def append_message(self, message):
+        row = len(self._messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        message.seq = self._first_seq + row
+        self._messages.append(message)
+        self.endInsertRows()
+
+    def prepend_messages(self, messages):
+        if not messages:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(messages) - 1)
+        self._first_seq -= len(messages)
+        for offset, message in enumerate(messages):
+            message.seq = self._first_seq + offset
+        self._messages[:0] = messages
+        self.endInsertRows()
+
+    def message_changed(self, message):
+        row = self.row_of(message)
+        if row < 0:
+            return
+        message.revision += 1
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def clear(self):
+        self.beginResetModel()
+        self._messages = []
+        self._first_seq = 0
+        self.endResetModel()
+
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    """Paints message bubbles and lays them out with cached text documents.
+
+    Row heights are cached per viewport width. Rows that have never been
+    painted at the current width report an estimate; the exact height is
+    measured when the row is first painted, and a relayout is scheduled if
+    the estimate was off. Painting a row that still shows its placeholder
+    emits ``render_requested``, so only rows that are scrolled into view
+    get rendered.
+    """
+
+    menu_requested = pyqtSignal(QModelIndex, QPoint)
+    render_requested = pyqtSignal(object)
+    continue_requested = pyqtSignal(object)
+
+    OUTER_MARGIN_H = 20
+    OUTER_MARGIN_V = 4
+    PADDING_H = 16
+    PADDING_V = 10
+    HEADER_HEIGHT = 24
+    HEADER_SPACING = 8
+    MIN_BUBBLE_WIDTH = 140
+    MIN_INTERRUPTED_BUBBLE_WIDTH = 300
+    CONTINUE_BUTTON_WIDTH = 76
+    INTERRUPTED_COLOR = "#e0a030"
+    MAX_BUBBLE_WIDTH = {"user": 600}
+    DEFAULT_MAX_BUBBLE_WIDTH = 700
+    BUBBLE_COLORS = {"user": "#007acc"}
+    DEFAULT_BUBBLE_COLOR = "#2f2f2f"
+    MAX_CACHED_DOCUMENTS = 64
+    MAX_CACHED_WIDTHS = 3
+
+    def __init__(self, view):
+        super().__init__(view)
+        self._view = view
+        self._font = QFont("", 12)
+        self._timestamp_font = QFont()
+        self._timestamp_font.setPixelSize(11)
+        self._menu_font = QFont()
+        self._menu_font.setPixelSize(14)
+        self._menu_font.setBold(True)
+        self._documents = OrderedDict()
+        self._heights = OrderedDict()   # width -> {key: (revision, height)}
+        self._relayout_pending = False
+
+    def sizeHint(self, option, index):
+        message = index.data(ChatTranscriptModel.MessageRole)
+        width = self._view.viewport().width()
+        if message is None:
+            return QSize(width, 0)
+        cached = self._heights_for(width).get(message.key)
+        if cached is not None and cached[0] == message.revision:
+            return QSize(width, cached[1])
+        return QSize(width, self._estimate_height(message, width))
+
+    def paint(self, painter, option, index):
+        message = index.data(ChatTranscriptModel.MessageRole)
+        if message is None:
+            return
+        if message.needs_render:
+            self.render_requested.emit(message)
+        bubble, menu_rect, text_origin, document = self._layout(option.rect, message)
+        self._record_height(index, message, option.rect.width(),
+                            bubble.height() + 2 * self.OUTER_MARGIN_V)
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(self.BUBBLE_COLORS.get(message.role, self.DEFAULT_BUBBLE_COLOR)))
+        painter.drawRoundedRect(QRectF(bubble), 20, 20)
+        # The corner nearest the speaker is nearly square
+        corner = QRectF(bubble.right() - 19 if message.role == "user" else bubble.left(),
+                        bubble.bottom() - 19, 20, 20)
+        painter.drawRoundedRect(corner, 4, 4)
+
+        header = QRect(bubble.left() + self.PADDING_H, bubble.top() + self.PADDING_V,
+                       bubble.width() - 2 * self.PADDING_H, self.HEADER_HEIGHT)
+        painter.setFont(self._timestamp_font)
+        painter.setPen(QColor("#aaaaaa"))
+        painter.drawText(header, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         message.timestamp)
+        if message.interrupted:
+            stamp_width = painter.fontMetrics().horizontalAdvance(message.timestamp + "  ")
+            painter.setPen(QColor(self.INTERRUPTED_COLOR))
+            painter.drawText(header.adjusted(stamp_width, 0, 0, 0),
+                             Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, "Interrupted")
+            button = self._continue_rect(menu_rect)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawRoundedRect(QRectF(button).adjusted(0.5, 0.5, -0.5, -0.5), 4, 4)
+            painter.drawText(button, Qt.AlignmentFlag.AlignCenter, "Continue")
+
+        if option.state & QStyle.StateFlag.State_MouseOver:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(255, 255, 255, 25))
+            painter.drawRoundedRect(QRectF(menu_rect), 4, 4)
+        painter.setFont(self._menu_font)
+        painter.setPen(QColor("#aaaaaa"))
+        painter.drawText(menu_rect, Qt.AlignmentFlag.AlignCenter, "⋮")
+
+        painter.translate(QPointF(text_origin))
+        context = QAbstractTextDocumentLayout.PaintContext()
+        context.palette.setColor(QPalette.ColorRole.Text, QColor(message.text_color))
+        document.documentLayout().draw(painter, context)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QEvent.Type.MouseButtonRelease or event.button() != Qt.MouseButton.LeftButton:
+            return False
+        message = index.data(ChatTranscriptModel.MessageRole)
+        if message is None:
+            return False
+        _, menu_rect, text_origin, document = self._layout(option.rect, message)
+        pos = event.position().toPoint()
+        if menu_rect.contains(pos):
+            self.menu_requested.emit(index, self._view.viewport().mapToGlobal(menu_rect.bottomLeft()))
+            return True
+        if message.interrupted and self._continue_rect(menu_rect).contains(pos):
+            self.continue_requested.emit(message)
+            return True
+        anchor = document.documentLayout().anchorAt(QPointF(pos - text_origin))
+        if anchor:
+            QDesktopServices.openUrl(QUrl(anchor))
+            return True
+        return False
+
+    def message_at(self, index, pos):
+        """Return True if ``pos`` (viewport coordinates) falls inside the bubble."""
+        message = index.data(ChatTranscriptModel.MessageRole)
+        if message is None:
+            return False
+        bubble, _, _, _ = self._layout(self._view.visualRect(index), message)
+        return bubble.contains(pos)
+
+    def _max_bubble_width(self, role, row_width):
+        limit = self.MAX_BUBBLE_WIDTH.get(role, self.DEFAULT_MAX_BUBBLE_WIDTH)
+        return max(self.MIN_BUBBLE_WIDTH, min(limit, row_width - 2 * self.OUTER_MARGIN_H))
+
+    def _layout(self, rect, message):
+        max_width = self._max_bubble_width(message.role, rect.width())
+        document = self._document(message, max_width - 2 * self.PADDING_H)
+        text_width = min(math.ceil(document.idealWidth()), max_width - 2 * self.PADDING_H)
+        min_width = self.MIN_INTERRUPTED_BUBBLE_WIDTH if message.interrupted else self.MIN_BUBBLE_WIDTH
+        bubble_width = max(min(min_width, max_width), text_width + 2 * self.PADDING_H)
+        bubble_height = (2 * self.PADDING_V + self.HEADER_HEIGHT + self.HEADER_SPACING
+                         + math.ceil(document.size().height()))
+
+        if message.role == "user":
+            left = rect.right() - self.OUTER_MARGIN_H - bubble_width + 1
         else:
-            regenerate_action = QAction("Regenerate", self)
-            regenerate_action.triggered.connect(self.regenerate_message)
-            menu.addAction(regenerate_action)
-        
-        delete_action = QAction("Delete", self)
-        delete_action.triggered.connect(self.delete_message)
-        menu.addAction(delete_action)
-        menu.exec(self.menu_button.mapToGlobal(self.menu_button.rect().bottomLeft()))
+            left = rect.left() + self.OUTER_MARGIN_H
+        bubble = QRect(left, rect.top() + self.OUTER_MARGIN_V, bubble_width, bubble_height)
+        menu_rect = QRect(bubble.right() - self.PADDING_H - self.HEADER_HEIGHT + 1,
+                          bubble.top() + self.PADDING_V, self.HEADER_HEIGHT, self.HEADER_HEIGHT)
+        text_origin = QPoint(bubble.left() + self.PADDING_H,
+                             bubble.top() + self.PADDING_V + self.HEADER_HEIGHT + self.HEADER_SPACING)
+        return bubble, menu_rect, text_origin, document
+
+    def _continue_rect(self, menu_rect):
+        return QRect(menu_rect.left() - 8 - self.CONTINUE_BUTTON_WIDTH, menu_rect.top(),
+                     self.CONTINUE_BUTTON_WIDTH, menu_rect.height())
+
+    def _document(self, message, text_width):
+        cache_key = (message.key, message.revision, text_width)
+        document = self._documents.get(cache_key)
+        if document is not None:
+            self._documents.move_to_end(cache_key)
+            return document
+        document = QTextDocument()
+        document.setDocumentMargin(0)
+        document.setDefaultFont(self._font)
+        document.setHtml(message.html)
+        document.setTextWidth(text_width)
+        self._documents[cache_key] = document
+        while len(self._documents) > self.MAX_CACHED_DOCUMENTS:
+            self._documents.popitem(last=False)
+        return document
+
+    def _heights_for(self, width):
+        heights = self._heights.get(width)
+        if heights is None:
+            heights = self._heights[width] = {}
+            while len(self._heights) > self.MAX_CACHED_WIDTHS:
+                self._heights.popitem(last=False)
+        return heights
+
+    def _estimate_height(self, message, width):
+        text_width = self._max_bubble_width(message.role, width) - 2 * self.PADDING_H
+        chars_per_line = max(1, text_width // 8)
+        lines = sum(1 + len(line) // chars_per_line for line in message.content.split("\n"))
+        return (2 * self.OUTER_MARGIN_V + 2 * self.PADDING_V + self.HEADER_HEIGHT
+                + self.HEADER_SPACING + lines * 20)
+
+    def _record_height(self, index, message, width, height):
+        heights = self._heights_for(width)
+        reported = self.sizeHint(None, index).height()
+        heights[message.key] = (message.revision, height)
+        if reported != height and not self._relayout_pending:
+            # The view laid this row out with an estimate; relayout once painting is done
+            self._relayout_pending = True
+            QTimer.singleShot(0, lambda: self._relayout(index))
+
+    def _relayout(self, index):
+        self._relayout_pending = False
+        if index.isValid():
+            self.sizeHintChanged.emit(index)
+
+    def invalidate(self, index):
+        """Forget cached layouts for a row whose content or HTML changed."""
+        self.sizeHintChanged.emit(index)
 
-    def copy_message(self):
-        clipboard = QApplication.clipboard()
-        clipboard.setText(self.content)
-    
-    def edit_message(self):
-        from nanogpt_chat.ui.main_window import MessageEditDialog
-        dialog = MessageEditDialog(self.content, self)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            new_content = dialog.get_content()
-            if new_content != self.content:
-                self.content = new_content
-                self.update_content()
-                self.edit_requested.emit(self.role, new_content)
-    
-    def regenerate_message(self):
-        self.regenerate_requested.emit(self.role, self.content)
-    
-    def delete_message(self):
-        self.delete_requested.emit(self.role, self.content)
 
 class ChatWidget(QWidget):
     edit_requested = pyqtSignal(str, str)
     regenerate_requested = pyqtSignal(str, str)
     delete_requested = pyqtSignal(str, str)
+    continue_requested = pyqtSignal(object)    # TranscriptMessage
+    
+    STREAM_RENDER_INTERVAL_MS = 200
     
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.messages_layout = QVBoxLayout(self)
-        self.messages_layout.setContentsMargins(0, 0, 0, 0)
-        self.messages_layout.setSpacing(0)
-        self.messages_layout.addStretch()
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
         
         try:
             from nanogpt_chat.ui.themes import get_chat_widget_stylesheet
             self.setStyleSheet(get_chat_widget_stylesheet())
         except ImportError:
             self.setStyleSheet("background-color: #171717;")
-            
-        self.typing_indicator = None
+        
+        # Only rows inside the viewport are laid out and painted
+        self.model = ChatTranscriptModel(self)
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.delegate = ChatMessageDelegate(self.list_view)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.list_view.verticalScrollBar().setSingleStep(20)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.list_view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.list_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.list_view.setBatchSize(200)
+        self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.list_view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.list_view.setMouseTracking(True)
+        self.list_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.list_view.customContextMenuRequested.connect(self._on_context_menu_requested)
+        self.delegate.menu_requested.connect(self.show_context_menu)
+        self.delegate.render_requested.connect(self._request_render)
+        self.delegate.continue_requested.connect(self.continue_requested)
+        self.model.dataChanged.connect(lambda top_left, _: self.delegate.invalidate(top_left))
+        self._stick_to_bottom = True
+        self.list_view.verticalScrollBar().valueChanged.connect(self._on_scroll_value_changed)
+        self.list_view.verticalScrollBar().rangeChanged.connect(self._on_scroll_range_changed)
+        layout.addWidget(self.list_view)
+        
+        self.typing_indicator = TypingIndicator()
+        layout.addWidget(self.typing_indicator)
+        
+        # Streaming state for the assistant message currently being received
+        self._stream_message = None
+        self._stream_renderer = None
+        self._stream_timer = QTimer(self)
+        self._stream_timer.setSingleShot(True)
+        self._stream_timer.timeout.connect(self._flush_stream_render)
+        self._stream_render_pending = False
+        
+        # Static messages are rendered off the GUI thread once they are first
+        # painted; until then they show a plain-text placeholder
+        self._render_service = get_render_service()
+        self._render_service.rendered.connect(self._on_message_rendered)
+        self._render_service.job_dropped.connect(self._on_render_dropped)
+        self._pending_renders = {}
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
     
+    def verticalScrollBar(self):
+        return self.list_view.verticalScrollBar()
+    
+    def message_count(self):
+        return self.model.rowCount()
+    
     def show_typing_indicator(self):
-        try:
-            # Check if indicator is None or its underlying C++ object was deleted
-            if self.typing_indicator is None or RuntimeError:
-                # We need a proper way to check if a QObject is deleted
-                # In PyQt, checking if it still exists can be tricky, 
-                # but resetting it in clear() is the primary fix.
-                pass
-            
-            if self.typing_indicator is None:
-                self.typing_indicator = TypingIndicator()
-                self.messages_layout.insertWidget(self.messages_layout.count() - 1, self.typing_indicator)
-            
-            self.typing_indicator.show()
-            self.typing_indicator.start_animation()
-            self._scroll_to_bottom()
-        except RuntimeError:
-            # Fallback if the object was somehow deleted without setting to None
-            self.typing_indicator = TypingIndicator()
-            self.messages_layout.insertWidget(self.messages_layout.count() - 1, self.typing_indicator)
-            self.typing_indicator.show()
-            self.typing_indicator.start_animation()
-            self._scroll_to_bottom()
+        self.typing_indicator.show()
+        self.typing_indicator.start_animation()
+        self._scroll_to_bottom()
     
     def hide_typing_indicator(self):
-        if self.typing_indicator:
-            self.typing_indicator.stop_animation()
-            self.typing_indicator.hide()
+        self.typing_indicator.stop_animation()
+        self.typing_indicator.hide()
 
     def _scroll_to_bottom(self):
-        scroll_area = self.parent().parent()
-        if hasattr(scroll_area, 'verticalScrollBar'):
-            scroll_area.verticalScrollBar().setValue(scroll_area.verticalScrollBar().maximum())
-
-    def add_message(self, role: str, content: str, is_stream: bool = False, timestamp: str = ""):
-        if is_stream and self.messages_layout.count() > 1:
-            # Look for the last ChatMessageWidget instead of just taking the last index
-            for i in range(self.messages_layout.count() - 2, -1, -1):
-                last_widget = self.messages_layout.itemAt(i).widget()
-                if isinstance(last_widget, ChatMessageWidget) and last_widget.role == "assistant":
-                    if hasattr(last_widget, 'content_label'):
-                        last_widget.update_content_throttled(content)
-                        last_widget.content_label.adjustSize()
-                        last_widget.bubble.adjustSize()
-                        last_widget.adjustSize()
-                    return
-                # Stop if we hit a non-message widget that isn't the typing indicator
-                if last_widget and not isinstance(last_widget, (ChatMessageWidget, TypingIndicator)):
-                    break
-         
-        message_widget = ChatMessageWidget(role, content, timestamp)
-        message_widget.edit_requested.connect(self.edit_requested.emit)
-        message_widget.regenerate_requested.connect(self.regenerate_requested.emit)
-        message_widget.delete_requested.connect(self.delete_requested.emit)
+        self._stick_to_bottom = True
+        scrollbar = self.list_view.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
+    def _on_scroll_value_changed(self, value):
+        self._stick_to_bottom = value >= self.list_view.verticalScrollBar().maximum() - 4
+
+    def _on_scroll_range_changed(self, minimum, maximum):
+        # Items are laid out in batches and rows grow while streaming; keep
+        # following the bottom until the user scrolls away from it
+        if self._stick_to_bottom:
+            self.list_view.verticalScrollBar().setValue(maximum)
+
+    def add_message(self, role: str, content: str, is_stream: bool = False, timestamp: str = "",
+                    interrupted: bool = False):
+        if is_stream and self._stream_message is not None:
+            self._stream_renderer.reset(content)
+            self._request_stream_render()
+            return self._stream_message
         
-        self.messages_layout.insertWidget(self.messages_layout.count() - 1, message_widget)
+        message = TranscriptMessage(role, content, timestamp, interrupted)
+        if is_stream:
+            self._stream_message = message
+            self._stream_renderer = IncrementalMarkdownRenderer(content)
+            message.html = style_message_html(self._stream_renderer.html(), message.text_color)
+        else:
+            self._prepare_render(message)
+        self.model.append_message(message)
         self._scroll_to_bottom()
+        return message
+    
+    def add_message_at_top(self, role: str, content: str, timestamp: str = "",
+                           interrupted: bool = False):
+        message = TranscriptMessage(role, content, timestamp, interrupted)
+        self._prepare_render(message)
+        self.model.prepend_messages([message])
+        return message
+    
+    def append_stream_delta(self, delta: str):
+        """Append a delta to the assistant message currently being streamed."""
+        if self._stream_message is None:
+            self.add_message("assistant", delta, is_stream=True)
+        else:
+            self._stream_renderer.append(delta)
+            self._request_stream_render()
+    
+    def resume_stream(self, message):
+        """Stream further deltas into ``message``, e.g. to continue an interrupted reply."""
+        self.finish_stream()
+        key = (id(self), message.key)
+        if self._pending_renders.pop(key, None) is not None:
+            self._render_service.cancel(key)
+        message.interrupted = False
+        message.needs_render = False
+        self._stream_message = message
+        self._stream_renderer = IncrementalMarkdownRenderer(message.content)
+        self._stream_render_pending = True
+        self._flush_stream_render()
+    
+    def last_message(self):
+        count = self.model.rowCount()
+        return self.model.message_at(count - 1) if count else None
+    
+    def finish_stream(self):
+        """Render the streamed message's final content and stop tracking it.
+
+        Returns the message that was streaming, or None.
+        """
+        message = self._stream_message
+        if message is not None:
+            self._stream_timer.stop()
+            self._stream_render_pending = True
+            self._flush_stream_render()
+            self._stream_message = None
+            self._stream_renderer = None
+        return message
+    
+    def _request_stream_render(self):
+        # Render at most once per STREAM_RENDER_INTERVAL_MS while content is arriving
+        if self._stream_timer.isActive():
+            self._stream_render_pending = True
+            return
+        self._stream_render_pending = True
+        self._flush_stream_render()
+        self._stream_timer.start(self.STREAM_RENDER_INTERVAL_MS)
+    
+    def _flush_stream_render(self):
+        message = self._stream_message
+        if not self._stream_render_pending or message is None:
+            return
+        self._stream_render_pending = False
+        message.content = self._stream_renderer.source
+        message.html = style_message_html(self._stream_renderer.html(), message.text_color)
+        self.model.message_changed(message)
+    
+    def _prepare_render(self, message):
+        from nanogpt_chat.ui.themes import get_current_theme
+        theme = get_current_theme().name
+        key = (id(self), message.key)
+        if self._pending_renders.pop(key, None) is not None:
+            # The render in flight is for outdated content
+            self._render_service.cancel(key)
+        cached = self._render_service.lookup(message.content, message.text_color, theme)
+        if cached is not None:
+            message.html = cached
+            message.needs_render = False
+            return
+        
+        message.html = placeholder_message_html(message.content, message.text_color)
+        message.needs_render = True
+    
+    def _request_render(self, message):
+        from nanogpt_chat.ui.themes import get_current_theme
+        key = (id(self), message.key)
+        self._pending_renders[key] = message
+        message.needs_render = False
+        self._render_service.submit(key, message.content, message.text_color,
+                                    get_current_theme().name)
+    
+    def _on_message_rendered(self, key, html):
+        message = self._pending_renders.pop(key, None)
+        if message is not None:
+            message.html = html
+            self.model.message_changed(message)
+    
+    def _on_render_dropped(self, key):
+        # Keep the placeholder and try again the next time the row is painted
+        message = self._pending_renders.pop(key, None)
+        if message is not None:
+            message.needs_render = True
     
     def clear(self):
-        while self.messages_layout.count() > 1:
-            item = self.messages_layout.takeAt(0)
-            if item.widget():
-                if item.widget() == self.typing_indicator:
-                    self.typing_indicator = None
-                item.widget().deleteLater()
-        self.typing_indicator = None # Ensure it's reset
+        for key in self._pending_renders:
+            self._render_service.cancel(key)
+        self._pending_renders.clear()
+        self._stream_timer.stop()
+        self._stream_message = None
+        self._stream_renderer = None
+        self.hide_typing_indicator()
+        self.model.clear()
+    
+    def _on_context_menu_requested(self, pos):
+        index = self.list_view.indexAt(pos)
+        if index.isValid() and self.delegate.message_at(index, pos):
+            self.show_context_menu(index, self.list_view.viewport().mapToGlobal(pos))
     
-    def add_message_at_top(self, role: str, content: str, timestamp: str = ""):
-        message_widget = ChatMessageWidget(role, content, timestamp)
-        message_widget.edit_requested.connect(self.edit_requested.emit)
-        message_widget.regenerate_requested.connect(self.regenerate_requested.emit)
-        message_widget.delete_requested.connect(self.delete_requested.emit)
+    def show_context_menu(self, index, global_pos):
+        message = index.data(ChatTranscriptModel.MessageRole)
+        if message is None:
+            return
+        menu = QMenu(self)
+        copy_action = QAction("Copy", self)
+        copy_action.triggered.connect(lambda: self.copy_message(message))
+        menu.addAction(copy_action)
+        
+        if message.role == "user":
+            edit_action = QAction("Edit", self)
+            edit_action.triggered.connect(lambda: self.edit_message(message))
+            menu.addAction(edit_action)
+        else:
+            regenerate_action = QAction("Regenerate", self)
+            regenerate_action.triggered.connect(
+                lambda: self.regenerate_requested.emit(message.role, message.content))
+            menu.addAction(regenerate_action)
         
-        insert_index = 0
-        if self.messages_layout.count() > 1:
-            # Check if first is stretch
-            first_item = self.messages_layout.itemAt(0)
-            if not first_item.widget():
-                insert_index = 1
-        self.messages_layout.insertWidget(insert_index, message_widget)
+        if message.interrupted:
+            continue_action = QAction("Continue", self)
+            continue_action.triggered.connect(lambda: self.continue_requested.emit(message))
+            menu.addAction(continue_action)
+        
+        delete_action = QAction("Delete", self)
+        delete_action.triggered.connect(lambda: self.delete_requested.emit(message.role, message.content))
+        menu.addAction(delete_action)
+        menu.exec(global_pos)
+    
+    def copy_message(self, message):
+        QApplication.clipboard().setText(message.content)
+    
+    def edit_message(self, message):
+        from nanogpt_chat.ui.main_window import MessageEditDialog
+        dialog = MessageEditDialog(message.content, self)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            new_content = dialog.get_content()
+            if new_content != message.content:
+                message.content = new_content
+                self._prepare_render(message)
+                self.model.message_changed(message)
+                self.edit_requested.emit(message.role, new_content)
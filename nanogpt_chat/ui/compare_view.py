@@ -0,0 +1,240 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QSplitter, QFrame, QLabel,
+    QPushButton, QToolButton, QComboBox, QTextEdit
+)
+from PyQt6.QtCore import Qt, pyqtSignal
+
+from nanogpt_chat.ui.chat_widget import ChatWidget
+from nanogpt_chat.ui.model_picker import ModelPicker
+
+
+class CompareColumn(QFrame):
+    """One model's side of a comparison: its streamed reply and timings."""
+
+    keep_requested = pyqtSignal(str)     # model id
+    remove_requested = pyqtSignal(str)   # model id
+
+    def __init__(self, model_id, parent=None):
+        super().__init__(parent)
+        self.model_id = model_id
+        self.worker = None
+        self.content = None
+        self._awaiting_first_delta = False
+        self.setFrameShape(QFrame.Shape.StyledPanel)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        header = QHBoxLayout()
+        title = QLabel(model_id)
+        title.setStyleSheet("font-weight: bold; color: #ddd;")
+        header.addWidget(title, 1)
+        self.remove_button = QToolButton()
+        self.remove_button.setText("×")
+        self.remove_button.setToolTip("Remove this model from the comparison")
+        self.remove_button.clicked.connect(lambda: self.remove_requested.emit(self.model_id))
+        header.addWidget(self.remove_button)
+        layout.addLayout(header)
+
+        self.metrics = QLabel()
+        self.metrics.setStyleSheet("color: #888;")
+        layout.addWidget(self.metrics)
+
+        self.transcript = ChatWidget()
+        layout.addWidget(self.transcript, 1)
+
+        self.keep_button = QPushButton("Keep this answer")
+        self.keep_button.setEnabled(False)
+        self.keep_button.clicked.connect(lambda: self.keep_requested.emit(self.model_id))
+        layout.addWidget(self.keep_button)
+
+    @property
+    def running(self):
+        return self.worker is not None and self.worker.isRunning() and not self.worker.cancel_token.cancelled
+
+    def begin(self, prompt, worker):
+        """Show ``prompt`` and stream ``worker``'s reply into the column."""
+        self._disconnect_worker()
+        self.worker = worker
+        self.content = None
+        self._awaiting_first_delta = True
+        self.keep_button.setEnabled(False)
+        self.metrics.setStyleSheet("color: #888;")
+        self.metrics.setText("Waiting for the first token…")
+        self.transcript.clear()
+        self.transcript.add_message("user", prompt)
+        self.transcript.show_typing_indicator()
+        worker.delta_received.connect(self.on_delta_received)
+        worker.finished.connect(self.on_finished)
+        worker.error.connect(self.on_error)
+
+    def on_delta_received(self, delta):
+        if self._awaiting_first_delta:
+            self._awaiting_first_delta = False
+            self.transcript.hide_typing_indicator()
+            ttft_ms = self.worker.stats.ttft_ms
+            if ttft_ms is not None:
+                self.metrics.setText(f"TTFT {ttft_ms:,.0f} ms · streaming…")
+        self.transcript.append_stream_delta(delta)
+
+    def on_finished(self, content):
+        self.transcript.finish_stream()
+        self.content = content
+        stats = self.worker.stats
+        self.metrics.setText(stats.summary())
+        self.keep_button.setEnabled(True)
+        from nanogpt_chat.utils.logger import logger
+        logger.info(f"Compare {self.model_id}: {stats.summary()}, {stats.tokens} tokens")
+
+    def on_error(self, err):
+        self.transcript.hide_typing_indicator()
+        self.transcript.finish_stream()
+        self.metrics.setStyleSheet("color: #e06c75;")
+        self.metrics.setText(f"Failed: {err}")
+        self.metrics.setToolTip(str(err))
+
+    def cancel(self):
+        """Stop the reply being streamed; returns its worker if it was cancelled.
+
+        The worker is disconnected first, so nothing it was about to emit
+        reaches the column.
+        """
+        worker = self.worker
+        self.transcript.hide_typing_indicator()
+        self.transcript.finish_stream()
+        self._disconnect_worker()
+        if worker is None or not worker.isRunning() or worker.cancel_token.cancelled:
+            return None
+        worker.cancel()
+        return worker
+
+    def _disconnect_worker(self):
+        # Done whether or not the worker still runs: a finished one may have
+        # signals queued that must not reach the next run
+        worker = self.worker
+        if worker is None:
+            return
+        for signal, slot in ((worker.delta_received, self.on_delta_received),
+                             (worker.finished, self.on_finished),
+                             (worker.error, self.on_error)):
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                # Already disconnected by an earlier cancel
+                pass
+
+
+class CompareDialog(QDialog):
+    """Sends one prompt to several models at once and streams the replies side by side.
+
+    ``start_worker(model_id, prompt)`` returns a ``ChatWorker``, not yet
+    started, for one model; the workers run concurrently and share the
+    client's connections. Each column shows the time to first token, the
+    token rate and the total latency of its reply. Keeping an answer emits
+    ``answer_chosen`` and closes the dialog.
+    """
+
+    answer_chosen = pyqtSignal(str, str, str)  # prompt, model id, reply
+
+    def __init__(self, catalog, start_worker, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Compare models")
+        self.resize(1100, 700)
+        self._start_worker = start_worker
+        self.columns = {}
+        # The prompt the columns are answering
+        self.prompt = ""
+        # Cancelled workers, kept alive until their threads end
+        self.stopping_workers = []
+
+        layout = QVBoxLayout(self)
+
+        self.prompt_input = QTextEdit()
+        self.prompt_input.setPlaceholderText("Prompt to send to every model...")
+        self.prompt_input.setFixedHeight(80)
+        layout.addWidget(self.prompt_input)
+
+        controls = QHBoxLayout()
+        self.model_combo = QComboBox()
+        self.model_combo.setEditable(True)
+        self.model_combo.setMinimumWidth(300)
+        self.model_picker = ModelPicker(self.model_combo)
+        self.model_picker.set_catalog(catalog)
+        controls.addWidget(self.model_combo)
+        add_button = QPushButton("Add model")
+        add_button.clicked.connect(lambda: self.add_model(self.model_combo.currentText().strip()))
+        controls.addWidget(add_button)
+        controls.addStretch()
+        self.run_button = QPushButton("Send to all")
+        self.run_button.clicked.connect(self.run)
+        controls.addWidget(self.run_button)
+        layout.addLayout(controls)
+
+        self.splitter = QSplitter(Qt.Orientation.Horizontal)
+        layout.addWidget(self.splitter, 1)
+
+    def set_catalog(self, catalog):
+        self.model_picker.set_catalog(catalog)
+
+    def set_prompt(self, prompt):
+        self.prompt_input.setPlainText(prompt)
+
+    def add_model(self, model_id):
+        if not model_id or model_id in self.columns:
+            return None
+        column = CompareColumn(model_id)
+        column.keep_requested.connect(self.keep_answer)
+        column.remove_requested.connect(self.remove_model)
+        self.columns[model_id] = column
+        self.splitter.addWidget(column)
+        return column
+
+    def remove_model(self, model_id):
+        column = self.columns.pop(model_id, None)
+        if column is None:
+            return
+        self._stop(column)
+        column.hide()
+        column.setParent(None)
+        column.deleteLater()
+
+    def run(self):
+        """Send the prompt to every model; replies already streaming are cancelled."""
+        prompt = self.prompt_input.toPlainText().strip()
+        if not prompt or not self.columns:
+            return
+        self.prompt = prompt
+        for column in self.columns.values():
+            self._stop(column)
+            column.begin(prompt, self._start_worker(column.model_id, prompt))
+        # Started together, after every column is ready to receive
+        for column in self.columns.values():
+            column.worker.start()
+
+    @property
+    def running(self):
+        return any(column.running for column in self.columns.values())
+
+    def keep_answer(self, model_id):
+        column = self.columns.get(model_id)
+        if column is None or column.content is None:
+            return
+        prompt, content = self.prompt, column.content
+        self.cancel_all()
+        self.answer_chosen.emit(prompt, model_id, content)
+        self.accept()
+
+    def cancel_all(self):
+        for column in self.columns.values():
+            self._stop(column)
+
+    def done(self, result):
+        # Closing the dialog in any way stops the replies still streaming
+        self.cancel_all()
+        super().done(result)
+
+    def _stop(self, column):
+        worker = column.cancel()
+        self.stopping_workers = [w for w in self.stopping_workers if w.isRunning()]
+        if worker is not None:
+            self.stopping_workers.append(worker)
+
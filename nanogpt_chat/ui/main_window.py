@@ -3,97 +3,198 @@ from typing import Optional
 from datetime import datetime
 import base64
 import json
+from types import SimpleNamespace
 
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QSplitter,
     QListWidget, QListWidgetItem, QTextEdit, QPushButton,
-    QComboBox, QLabel, QLineEdit, QFrame, QScrollArea,
+    QComboBox, QLabel, QLineEdit, QFrame,
     QMessageBox, QDialog, QTabWidget, QSpinBox, QSlider,
     QGroupBox, QSizePolicy, QApplication, QDoubleSpinBox,
     QCompleter, QDialogButtonBox, QFileDialog, QGraphicsOpacityEffect,
-    QGraphicsDropShadowEffect
+    QGraphicsDropShadowEffect, QToolButton
 )
 from PyQt6.QtCore import Qt, QSize, pyqtSignal, QThread, pyqtSlot, QDateTime, QTimer
 from PyQt6.QtGui import QFont, QColor, QTextCursor, QAction, QIcon
 
 from nanogpt_chat.ui.chat_widget import ChatWidget
+from nanogpt_chat.ui.compare_view import CompareDialog
+from nanogpt_chat.ui.model_picker import ModelPicker
 from nanogpt_chat.ui.settings_dialog import SettingsDialog
 from nanogpt_chat.ui.sidebar import Sidebar
-from nanogpt_chat.utils import get_api_client, get_database
+from nanogpt_chat.utils import get_api_client
+from nanogpt_chat.utils.background_jobs import (
+    DEFAULT_MODEL as DEFAULT_BACKGROUND_MODEL, JOB_SUMMARY, JOB_TITLE, SUMMARY_MIN_MESSAGES,
+    BackgroundJobQueue
+)
+from nanogpt_chat.utils.cancellation import CancellationToken
+from nanogpt_chat.utils.context import ContextBuilder
+from nanogpt_chat.utils.model_cache import get_model_catalog
+from nanogpt_chat.utils.model_catalog import ModelCatalog
+from nanogpt_chat.utils.database_service import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, get_database_service
+)
+from nanogpt_chat.utils.persistence_queue import MessagePersistenceQueue
+from nanogpt_chat.utils.search_controller import SearchController
+from nanogpt_chat.utils.segments import MessageSegments
+from nanogpt_chat.utils.stream_checkpoint import StreamCheckpointer
+from nanogpt_chat.utils.streaming import FRAME_DUE, DeltaCoalescer, StreamStats, read_with_deadline
+
+# How long quitting waits for cancelled generations to wind down
+WORKER_STOP_TIMEOUT_MS = 2000
+
+# Sent, but not shown or saved, when the user continues an interrupted reply
+CONTINUE_PROMPT = "Your previous reply was cut off. Continue it exactly where it stopped, without repeating anything."
+
+def _record_usage(db, session_id, model, usage):
+    if not hasattr(db, "record_usage"):
+        return None
+    return db.record_usage(session_id, model, usage.get("prompt_tokens") or 0,
+                           usage.get("completion_tokens") or 0)
+
+
+def _session_usage(db, session_id):
+    if not hasattr(db, "get_session_usage"):
+        return None
+    return db.get_session_usage(session_id)
+
+
+def _session_summary(db, session_id):
+    if not hasattr(db, "get_session_summary"):
+        return None
+    summary = db.get_session_summary(session_id)
+    return summary[0] if summary is not None else None
+
 
 class ChatWorker(QThread):
-    chunk_received = pyqtSignal(str)
+    # Emits only the text that arrived since the previous emission; chunks are
+    # coalesced so the GUI thread sees at most one delta per display frame.
+    delta_received = pyqtSignal(str)
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
     usage_received = pyqtSignal(dict)
     
     def __init__(self, api_client, messages, model, temperature, max_tokens, 
-                 top_p=None, frequency_penalty=None, presence_penalty=None):
+                 top_p=None, frequency_penalty=None, presence_penalty=None, messages_json=None):
         super().__init__()
         self.api_client = api_client
         self.messages = messages
+        # The same messages pre-encoded as a JSON array, sent when the client accepts it
+        self.messages_json = messages_json
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.top_p = top_p
         self.frequency_penalty = frequency_penalty
         self.presence_penalty = presence_penalty
-        self._is_terminated = False
+        # Cancelling closes the stream, which aborts the HTTP request
+        self.cancel_token = CancellationToken()
+        # Milliseconds until the first byte of the response, when the client reports it
+        self.ttfb_ms = None
+        # Time to first token, rate and latency; complete once finished is emitted
+        self.stats = StreamStats()
     
-    def terminate(self):
-        self._is_terminated = True
-        super().terminate()
+    def cancel(self):
+        """Stop the generation from any thread; nothing is emitted afterwards.
+
+        Text still waiting in the coalescer was never shown and is dropped, so
+        the reply keeps exactly what the user saw.
+        """
+        self.cancel_token.cancel()
     
     def run(self):
         try:
-            full_response = ""
+            parts = []
+            coalescer = DeltaCoalescer(self.delta_received.emit)
+            self.stats.start()
             
-            # Fallback for binary version mismatch
-            try:
-                # Try new signature (7 arguments)
-                stream = self.api_client.chat_completion_stream(
-                    self.model, self.messages, self.temperature, self.max_tokens,
+            if self.messages_json is not None and hasattr(self.api_client, "chat_completion_stream_raw"):
+                # The history is already encoded; it goes into the body as is
+                stream = self.api_client.chat_completion_stream_raw(
+                    self.model, self.messages_json, self.temperature, self.max_tokens,
                     self.top_p, self.frequency_penalty, self.presence_penalty
                 )
-            except TypeError:
-                # Fallback to old signature (3 arguments)
-                stream = self.api_client.chat_completion_stream(
-                    self.model, self.messages, self.temperature
-                )
+            else:
+                # Fallback for binary version mismatch
+                try:
+                    # Try new signature (7 arguments)
+                    stream = self.api_client.chat_completion_stream(
+                        self.model, self.messages, self.temperature, self.max_tokens,
+                        self.top_p, self.frequency_penalty, self.presence_penalty
+                    )
+                except TypeError:
+                    # Fallback to old signature (3 arguments)
+                    stream = self.api_client.chat_completion_stream(
+                        self.model, self.messages, self.temperature
+                    )
+            # Older builds cannot abort a stream; they stop at the next chunk
+            if hasattr(stream, "close"):
+                self.cancel_token.add_callback(stream.close)
 
-            for chunk in stream:
-                if self._is_terminated:
+            # Text held back by the coalescer still reaches the screen within
+            # a frame when the server pauses between chunks
+            for chunk in read_with_deadline(stream, coalescer.due_in):
+                if self.cancel_token.cancelled:
                     return
-                full_response += chunk
-                self.chunk_received.emit(full_response)
+                if chunk is FRAME_DUE:
+                    coalescer.flush_due()
+                    continue
+                parts.append(chunk)
+                self.stats.chunk(chunk)
+                coalescer.push(chunk)
             
-            if self._is_terminated:
+            if self.cancel_token.cancelled:
                 return
+            coalescer.flush()
+            # Reported by the last chunk; older builds have no usage attribute
+            usage = getattr(stream, "usage", None)
+            self.stats.finish(usage)
+            if usage:
+                self.usage_received.emit(dict(usage))
+            self.ttfb_ms = getattr(stream, "ttfb_ms", None)
+            if self.ttfb_ms is not None:
+                from nanogpt_chat.utils.logger import logger
+                logger.debug(f"Stream from {self.model}: first byte after {self.ttfb_ms:.1f} ms")
                 
+            full_response = "".join(parts)
             if full_response:
                 self.finished.emit(full_response)
             else:
                 self.error.emit("Empty response from API")
                 
         except Exception as e:
-            if not self._is_terminated:
+            if not self.cancel_token.cancelled:
                 self.error.emit(str(e))
 
 class ModelFetchWorker(QThread):
-    models_fetched = pyqtSignal(list)
+    """Revalidates the model catalog cache in the background.
+
+    Without a cache the list is fetched outright. ``force`` revalidates a
+    catalog that is still fresh.
+    """
+    models_fetched = pyqtSignal(object)  # ModelCatalog
+    error = pyqtSignal(str)
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, cache=None, force=False):
         super().__init__()
         self.api_client = api_client
+        self.cache = cache
+        self.force = force
         
     def run(self):
         try:
-            models = self.api_client.list_models()
-            if models:
-                self.models_fetched.emit(models)
+            # The catalog's index is built here rather than on the GUI thread
+            if self.cache is not None:
+                self.cache.refresh(self.api_client, force=self.force)
+                catalog = self.cache.catalog()
+            else:
+                catalog = ModelCatalog(self.api_client.list_models())
+            if len(catalog):
+                self.models_fetched.emit(catalog)
         except Exception as e:
             from nanogpt_chat.utils.logger import logger
             logger.error(f"Background model fetch failed: {e}")
+            self.error.emit(str(e))
 
 class MessageEditDialog(QDialog):
     def __init__(self, content, parent=None):
@@ -186,9 +287,39 @@ class MainWindow(QMainWindow):
         
         self.current_session_id = None
         self.messages = []
-        self.available_models = [] # Initialize
+        self.message_page_size = 50
+        # Opaque position of older history not yet loaded, None at the start
+        self.older_messages_cursor = None
+        self.available_models = ModelCatalog() # Initialize
         self.api_client = None
-        self.db = None
+        # All SQLite access goes through the service's worker thread
+        self.db_service = None
+        # Both sides of the conversation are saved in batches
+        self.persistence = None
+        # The reply being streamed is saved as it arrives
+        self.checkpoint = None
+        # Titles and summaries written by a cheap model once nothing is streaming
+        self.background_jobs = None
+        # Session whose first reply, once saved, gets it a generated title
+        self._untitled_session_id = None
+        # The interrupted message being continued by the current stream
+        self._resumed_message = None
+        # Chooses the history sent with each request; caches token estimates
+        self.context_builder = ContextBuilder()
+        # Wire-ready JSON of each message, so a turn does not re-encode the history
+        self.message_segments = MessageSegments()
+        # Token usage reported by the reply being streamed
+        self._stream_usage = None
+        # Cancelled workers, kept alive until their threads end
+        self._stopping_workers = []
+        # Created on first use, then kept with its models between comparisons
+        self.compare_dialog = None
+        self._session_load_generation = 0
+        self._loading_sessions = False
+        # Generation of the new chat whose session is being created, and what
+        # the user sent meanwhile, run once the session id is known
+        self._creating_session = None
+        self._awaiting_session = []
         
         # Advanced settings
         self.top_p = 1.0
@@ -208,6 +339,7 @@ class MainWindow(QMainWindow):
         self.setup_ui()
         self.setup_menubar()
         self.load_data()
+        QApplication.instance().aboutToQuit.connect(self.on_about_to_quit)
     
     def setup_ui(self):
         central = QWidget()
@@ -222,7 +354,12 @@ class MainWindow(QMainWindow):
         self.sidebar.session_selected.connect(self.load_session)
         self.sidebar.session_deleted.connect(self.delete_session)
         self.sidebar.session_renamed.connect(self.rename_session)
-        self.sidebar.search_requested.connect(self.search_sessions)
+        self.search_controller = SearchController(self._search_database, parent=self)
+        self.search_controller.results_ready.connect(self.on_search_results)
+        self.search_controller.search_finished.connect(self.on_search_finished)
+        self.search_controller.search_failed.connect(self.on_search_failed)
+        self.search_controller.cleared.connect(self.refresh_sessions)
+        self.sidebar.search_requested.connect(self.search_controller.set_query)
         self.sidebar.load_more_requested.connect(self.load_more_sessions)
         self.sidebar.new_chat.connect(self.new_chat)
         self.sidebar.settings_requested.connect(self.show_settings)
@@ -249,10 +386,31 @@ class MainWindow(QMainWindow):
         self.model_combo.setEditable(True)
         self.model_combo.setMinimumWidth(300)
         self.model_combo.currentIndexChanged.connect(self.on_model_changed)
+        # Filters the models through the catalog's index as you type
+        self.model_picker = ModelPicker(self.model_combo)
         t_layout.addWidget(self.model_combo)
         
+        self.vision_filter = QToolButton()
+        self.vision_filter.setText("👁")
+        self.vision_filter.setCheckable(True)
+        self.vision_filter.setToolTip("Only list models that accept images")
+        self.vision_filter.toggled.connect(
+            lambda checked: self.model_picker.set_capability("vision", checked))
+        t_layout.addWidget(self.vision_filter)
+        
+        self.compare_button = QToolButton()
+        self.compare_button.setText("⇆")
+        self.compare_button.setToolTip("Send the message to several models and compare the replies")
+        self.compare_button.clicked.connect(self.open_compare)
+        t_layout.addWidget(self.compare_button)
+        
         t_layout.addStretch()
         
+        # Tokens used by the current session
+        self.usage_label = QLabel()
+        self.usage_label.setStyleSheet("color: #888;")
+        t_layout.addWidget(self.usage_label)
+        
         # Temp Label and Spinner
         temp_label = QLabel("Temp:")
         temp_label.setStyleSheet("font-weight: bold; color: #888;")
@@ -292,12 +450,10 @@ class MainWindow(QMainWindow):
         self.chat_widget.edit_requested.connect(self.edit_message_requested)
         self.chat_widget.regenerate_requested.connect(self.regenerate_message_requested)
         self.chat_widget.delete_requested.connect(self.delete_message_requested)
+        self.chat_widget.continue_requested.connect(self.continue_interrupted_message)
         
-        self.chat_scroll = QScrollArea()
-        self.chat_scroll.setWidgetResizable(True)
-        self.chat_scroll.setWidget(self.chat_widget)
-        self.chat_scroll.verticalScrollBar().valueChanged.connect(self.on_chat_scroll)
-        chat_layout.addWidget(self.chat_scroll)
+        self.chat_widget.verticalScrollBar().valueChanged.connect(self.on_chat_scroll)
+        chat_layout.addWidget(self.chat_widget)
         
         # Input area
         input_frame = QFrame()
@@ -407,7 +563,11 @@ class MainWindow(QMainWindow):
     def load_data(self):
         try:
             self.api_client = get_api_client()
-            self.db = get_database()
+            self.db_service = get_database_service()
+            if self.persistence is None:
+                self.persistence = MessagePersistenceQueue(self.db_service, parent=self)
+            if self.checkpoint is None:
+                self.checkpoint = StreamCheckpointer(self.db_service, parent=self)
             
             # Load default settings and apply to UI
             from nanogpt_chat.utils import get_settings
@@ -416,85 +576,152 @@ class MainWindow(QMainWindow):
             default_temp = settings.get("api", "temperature", 0.7)
             default_system = settings.get("api", "default_system_prompt", "You are a helpful assistant.")
             
+            background_model = settings.get("api", "background_model", DEFAULT_BACKGROUND_MODEL)
+            if self.background_jobs is None:
+                self.background_jobs = BackgroundJobQueue(self.db_service, self.api_client,
+                                                          background_model, parent=self)
+                self.background_jobs.job_done.connect(self.on_background_job_done)
+            else:
+                self.background_jobs.set_client(self.api_client, background_model)
+            
             self.model_combo.setCurrentText(default_model)
+            # Last launch's catalog fills the list at once; a stale one is refreshed below
+            self.model_catalog = get_model_catalog()
+            if self.model_catalog.lookup():
+                self.on_models_fetched(self.model_catalog.catalog())
             self.temp_spin.setValue(default_temp)
             self.current_system_prompt = default_system
             
             self.refresh_sessions()
             self.new_chat() # This will create a session with the defaults we just set
+            self.show_interrupted_replies()
             
-            if self.api_client:
-                self.model_worker = ModelFetchWorker(self.api_client)
+            if self.api_client and not self.model_catalog.is_fresh:
+                self.model_worker = ModelFetchWorker(self.api_client, self.model_catalog)
                 self.model_worker.models_fetched.connect(self.on_models_fetched)
                 self.model_worker.start()
         except Exception as e:
             from nanogpt_chat.utils.logger import logger
             logger.error(f"Load data error: {e}")
 
-    def on_models_fetched(self, models):
-        self.available_models = models # Store for settings dialog
-        
-        # Save current selection if any
-        current = self.model_combo.currentText()
-        
-        self.model_combo.blockSignals(True)
-        self.model_combo.clear()
-        self.model_combo.addItems(sorted(models))
+    def on_models_fetched(self, catalog):
+        if catalog == self.available_models:
+            # Revalidated without changes; the list is already shown
+            return
+        self.available_models = catalog # Store for settings dialog
+        # Lengths the API reports win over the table of known model prefixes
+        for model_id, tokens in catalog.context_lengths().items():
+            self.context_builder.set_context_length(model_id, tokens)
         
         # Priority: 1. Current selection, 2. Default from settings
         from nanogpt_chat.utils import get_settings
         settings = get_settings()
         default_model = settings.get("api", "default_model", "gpt-4o")
         
-        target = current if current else default_model
-        idx = self.model_combo.findText(target)
-        if idx >= 0:
-            self.model_combo.setCurrentIndex(idx)
-        else:
-            self.model_combo.setEditText(target)
-            
-        self.model_combo.blockSignals(False)
+        current = self.model_combo.currentText()
+        self.model_picker.set_catalog(catalog)
+        self.model_picker.select(current if current else default_model)
 
     def refresh_sessions(self):
-        if self.db:
-            try:
-                if hasattr(self.db, 'get_sessions_paginated'):
-                    sessions = self.db.get_sessions_paginated(50, 0)
-                else:
-                    sessions = self.db.get_all_sessions()
-                self.sidebar.update_sessions(sessions)
-            except Exception as e:
-                from nanogpt_chat.utils.logger import logger
-                logger.error(f"Refresh sessions error: {e}")
+        if not self.db_service: return
+        
+        def fetch(db, limit):
+            if hasattr(db, 'get_sessions_page'):
+                return db.get_sessions_page(limit)
+            return db.get_all_sessions(), None
+        
+        def show(result):
+            sessions, cursor = result
+            self.sidebar.update_sessions(sessions, cursor)
+        
+        def failed(e):
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Refresh sessions error: {e}")
+        
+        self.db_service.submit(fetch, self.sidebar.page_size, callback=show, errback=failed)
 
     def load_session(self, session_id):
-        if not self.db: return
-        try:
-            session = self.db.get_session(session_id)
-            if session:
-                self.current_session_id = session.id
-                if hasattr(self.db, 'get_messages_paginated'):
-                    raw = self.db.get_messages_paginated(session_id, 50, 0)
-                else:
-                    raw = self.db.get_messages(session_id)
-                
-                self.messages = [{"role": m.role, "content": m.content} for m in raw]
-                
-                # Store counts for pagination
-                all_msgs = self.db.get_messages(session_id)
-                self.total_message_count = len(all_msgs)
-                self.loaded_message_count = len(raw)
-                self.message_offset = len(raw)
-                
-                self.update_chat_display()
-        except Exception as e:
+        if not self.db_service: return
+        # Only the most recent request may replace the transcript
+        self._session_load_generation += 1
+        generation = self._session_load_generation
+        page_size = self.message_page_size
+        
+        def fetch(db):
+            session = db.get_session(session_id)
+            if session is None:
+                return None
+            usage = _session_usage(db, session_id)
+            summary = _session_summary(db, session_id)
+            if hasattr(db, 'get_messages_before'):
+                # Open on the newest window; older history is paged in on scroll
+                raw, cursor = db.get_messages_before(session_id, page_size)
+                return session, raw, cursor, db.count_messages(session_id), usage, summary
+            raw = db.get_messages(session_id)
+            return session, raw, None, len(raw), usage, summary
+        
+        def show(result):
+            if result is None or generation != self._session_load_generation:
+                return
+            session, raw, cursor, total, usage, summary = result
+            self.current_session_id = session.id
+            self.current_system_prompt = session.system_prompt
+            self.show_session_usage(usage)
+            if summary:
+                self.sidebar.update_session_summary(session.id, summary)
+            self.messages = [self._message_dict(m) for m in raw]
+            self.total_message_count = total
+            self.loaded_message_count = len(raw)
+            self.older_messages_cursor = cursor
+            self.update_chat_display()
+        
+        def failed(e):
             from nanogpt_chat.utils.logger import logger
             logger.error(f"Load session error: {e}")
+        
+        # Queued messages are written before the read, so it sees them
+        self.persistence.flush()
+        self.db_service.submit(fetch, callback=show, errback=failed)
+
+    def _message_dict(self, m):
+        msg = {"role": m.role, "content": m.content}
+        # A partial row is interrupted unless it is the reply streaming right now
+        streaming = self.checkpoint.active and m.id == self.checkpoint.message_id
+        if getattr(m, "partial", False) and not streaming:
+            msg["id"] = m.id
+            msg["interrupted"] = True
+        return msg
+
+    def show_interrupted_replies(self):
+        """Open the newest conversation whose reply was cut off when the app last stopped."""
+        if not self.db_service: return
+        
+        def fetch(db):
+            if hasattr(db, 'get_partial_messages'):
+                return db.get_partial_messages()
+            return []
+        
+        def show(partial):
+            if not partial:
+                return
+            from nanogpt_chat.utils.logger import logger
+            logger.info(f"Found {len(partial)} interrupted replies")
+            self.load_session(partial[0].session_id)
+            self.sidebar.select_session(partial[0].session_id)
+        
+        self.db_service.submit(fetch, callback=show)
 
     def update_chat_display(self):
         self.chat_widget.clear()
         for msg in self.messages:
-            self.chat_widget.add_message(msg["role"], msg["content"])
+            self.chat_widget.add_message(msg["role"], msg["content"],
+                                         interrupted=msg.get("interrupted", False))
+        
+        from nanogpt_chat.utils.render_service import get_render_service
+        cache = get_render_service().cache
+        if cache is not None:
+            from nanogpt_chat.utils.logger import logger
+            logger.debug(f"Render cache stats: {cache.stats()}")
 
     def send_message(self):
         content = self.message_input.toPlainText().strip()
@@ -513,36 +740,64 @@ class MainWindow(QMainWindow):
         except ImportError:
             pass
 
+        self.message_input.clear()
+        # A new chat's message waits for its session, so it is saved with it
+        self._when_session_ready(lambda: self._send_user_message(content))
+
+    def _send_user_message(self, content):
+        self._add_user_message(content)
+        
+        # Defer worker start to allow UI to update
+        QTimer.singleShot(10, lambda: self._start_chat_worker(self.messages))
+
+    def _when_session_ready(self, action):
+        """Run ``action`` now, or once the new chat's session has been created."""
+        if self._creating_session is not None and self._creating_session == self._session_load_generation:
+            self._awaiting_session.append(action)
+        else:
+            action()
+
+    def _session_ready(self):
+        self._creating_session = None
+        actions, self._awaiting_session = self._awaiting_session, []
+        for action in actions:
+            action()
+
+    def _add_user_message(self, content):
         # Auto-title
         if not self.messages and self.current_session_id:
             title = content[:50]
-            if hasattr(self.db, 'update_session_title'):
-                try:
-                    self.db.update_session_title(self.current_session_id, title)
-                    self.refresh_sessions()
-                except Exception as e:
-                    from nanogpt_chat.utils.logger import logger
-                    logger.error(f"Auto-title error: {e}")
+            self.sidebar.update_session_title(self.current_session_id, title)
+            self.db_service.submit("update_session_title", self.current_session_id, title,
+                                   priority=PRIORITY_BACKGROUND)
+            # Replaced by a generated title once the reply is in
+            self._untitled_session_id = self.current_session_id
             
         self.chat_widget.add_message("user", content)
         self.messages.append({"role": "user", "content": content})
-        self.message_input.clear()
-        
-        # Defer worker start to allow UI to update
-        QTimer.singleShot(10, lambda: self._start_chat_worker(self.messages))
+        self.message_segments.segment("user", content)
+        if self.current_session_id:
+            self.persistence.enqueue(self.current_session_id, "user", content)
 
-    def _start_chat_worker(self, messages):
+    def _start_chat_worker(self, messages, resume=None):
         model = self.model_combo.currentText()
-        temp = float(self.temp_spin.value())
         
-        # Pre-convert messages to avoid blocking UI
-        messages_to_send = [(m["role"], m["content"]) for m in messages]
+        # The reply is saved as it streams, after the messages queued before it
+        self._resumed_message = resume
+        if self.current_session_id:
+            self.persistence.flush()
+            if resume is not None:
+                self.checkpoint.start(self.current_session_id, message_id=resume["id"],
+                                      content=resume["content"])
+            else:
+                self.checkpoint.start(self.current_session_id)
             
-        self.worker = ChatWorker(
-            self.api_client, messages_to_send, model, temp, self.max_tokens_setting,
-            self.top_p, self.frequency_penalty, self.presence_penalty
-        )
-        self.worker.chunk_received.connect(self.on_chunk_received)
+        self.worker = self._chat_worker(model, messages)
+        self._stream_usage = None
+        session_id = self.current_session_id
+        self.worker.usage_received.connect(
+            lambda usage: self.on_usage_received(session_id, model, usage))
+        self.worker.delta_received.connect(self.on_delta_received)
         self.worker.finished.connect(self.on_response_finished)
         self.worker.error.connect(self.on_response_error)
         self.worker.start()
@@ -551,18 +806,101 @@ class MainWindow(QMainWindow):
         self.send_button.hide()
         self.stop_button.show()
 
-    def on_chunk_received(self, chunk):
+    def _chat_worker(self, model, messages):
+        """A worker to stream ``model``'s reply to ``messages``, not yet started."""
+        # The system prompt and as much recent history as the model's context fits
+        from nanogpt_chat.utils import get_settings
+        window = self.context_builder.build(
+            messages, model, self.current_system_prompt, self.max_tokens_setting,
+            get_settings().get("api", "context_length", 0))
+        if window.dropped:
+            from nanogpt_chat.utils.logger import logger
+            logger.info(f"Sending the newest {len(messages) - window.dropped} of {len(messages)} "
+                        f"messages (~{window.tokens:,} of {window.budget:,} tokens)")
+        messages_to_send = window.messages
+        return ChatWorker(
+            self.api_client, messages_to_send, model, float(self.temp_spin.value()),
+            self.max_tokens_setting, self.top_p, self.frequency_penalty, self.presence_penalty,
+            messages_json=self.message_segments.join(messages_to_send)
+        )
+
+    def on_delta_received(self, delta):
         self.chat_widget.hide_typing_indicator()
-        self.chat_widget.add_message("assistant", chunk, is_stream=True)
+        self.chat_widget.append_stream_delta(delta)
+        self.checkpoint.append(delta)
+
+    def on_usage_received(self, session_id, model, usage):
+        self._stream_usage = usage
+        self._record_session_usage(session_id, model, usage)
+
+    def _record_session_usage(self, session_id, model, usage):
+        if not session_id or not self.db_service:
+            return
+        
+        def recorded(totals):
+            if totals is not None and session_id == self.current_session_id:
+                self.show_session_usage(totals)
+        
+        def failed(e):
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Failed to record token usage: {e}")
+        
+        self.db_service.submit(_record_usage, session_id, model, usage,
+                               callback=recorded, errback=failed)
+
+    def show_session_usage(self, usage):
+        """Show a session's token totals in the toolbar; None or no usage clears it."""
+        if usage is None or not usage.requests:
+            self.usage_label.clear()
+            self.usage_label.setToolTip("")
+            return
+        total = usage.prompt_tokens + usage.completion_tokens
+        self.usage_label.setText(f"{total:,} tokens")
+        self.usage_label.setToolTip(f"Prompt: {usage.prompt_tokens:,}\n"
+                                    f"Completion: {usage.completion_tokens:,}\n"
+                                    f"Replies: {usage.requests:,}")
 
     def on_response_finished(self, content):
-        self.messages.append({"role": "assistant", "content": content})
-        if self.current_session_id:
-            self.db.create_message(self.current_session_id, "assistant", content, None)
+        self.chat_widget.finish_stream()
+        usage, self._stream_usage = self._stream_usage, None
+        self.checkpoint.finish(tokens=(usage or {}).get("completion_tokens"))
+        if self._resumed_message is not None:
+            self._resumed_message["content"] += content
+            self._resumed_message.pop("id", None)
+            self._resumed_message.pop("interrupted", None)
+            self._resumed_message = None
+        else:
+            self.messages.append({"role": "assistant", "content": content})
+            self.message_segments.segment("assistant", content)
+        self._queue_title_job()
+        if len(self.messages) >= SUMMARY_MIN_MESSAGES:
+            # The job skips sessions summarised recently enough
+            self._queue_background_job(JOB_SUMMARY)
         self.send_button.show()
         self.stop_button.hide()
 
+    def _queue_title_job(self):
+        # Queued after the first reply is submitted for saving, so the job reads both sides
+        if self._untitled_session_id is not None and self._untitled_session_id == self.current_session_id:
+            self.persistence.flush()
+            self._queue_background_job(JOB_TITLE)
+        self._untitled_session_id = None
+
+    def _queue_background_job(self, kind):
+        jobs = self.background_jobs
+        if jobs is not None and jobs.model and self.current_session_id:
+            jobs.enqueue(self.current_session_id, kind)
+
+    def on_background_job_done(self, kind, session_id, result):
+        from nanogpt_chat.utils.logger import logger
+        logger.info(f"Generated the {kind} of session {session_id}")
+        if kind == JOB_TITLE:
+            self.sidebar.update_session_title(session_id, result)
+        elif kind == JOB_SUMMARY:
+            self.sidebar.update_session_summary(session_id, result)
+
     def on_response_error(self, err):
+        self._end_stream_early(interrupted=True)
         from nanogpt_chat.utils.logger import logger
         logger.error(f"API Error: {err}")
         QMessageBox.critical(self, "Error", str(err))
@@ -570,10 +908,101 @@ class MainWindow(QMainWindow):
         self.stop_button.hide()
 
     def stop_generation(self):
-        if hasattr(self, 'worker'): self.worker.terminate()
+        self._cancel_worker()
+        # What the user chose to keep is saved as a finished reply
+        self._end_stream_early(interrupted=False)
         self.send_button.show()
         self.stop_button.hide()
 
+    def _cancel_worker(self):
+        """Abort the running generation without waiting for its thread.
+
+        The worker is disconnected first, so nothing it was about to emit
+        reaches the transcript, and kept referenced until its thread ends.
+        """
+        worker = getattr(self, 'worker', None)
+        if worker is None or not worker.isRunning() or worker.cancel_token.cancelled:
+            return
+        for signal in (worker.delta_received, worker.finished, worker.error, worker.usage_received):
+            signal.disconnect()
+        worker.cancel()
+        self._stopping_workers = [w for w in self._stopping_workers if w.isRunning()]
+        self._stopping_workers.append(worker)
+
+    def _end_stream_early(self, interrupted):
+        streamed = self.chat_widget.finish_stream()
+        resumed, self._resumed_message = self._resumed_message, None
+        if not self.checkpoint.has_content:
+            self.checkpoint.abandon()
+            return
+        msg = {"role": "assistant", "content": self.checkpoint.content}
+        if interrupted:
+            # Left partial, so it can be continued; the row of a reply stopped
+            # early may only be created after this returns
+            def saved(message_id):
+                msg.update(id=message_id, interrupted=True)
+                if streamed is not None:
+                    streamed.interrupted = True
+                    self.chat_widget.model.message_changed(streamed)
+            self.checkpoint.interrupt(on_saved=saved)
+        else:
+            self.checkpoint.finish()
+        if resumed is not None:
+            resumed.clear()
+            resumed.update(msg)
+        else:
+            self.messages.append(msg)
+
+    def continue_interrupted_message(self, message):
+        """Ask the model to pick up an interrupted reply where it stopped."""
+        if hasattr(self, 'worker') and self.worker.isRunning():
+            return
+        last = self.messages[-1] if self.messages else None
+        if (last is None or not last.get("interrupted")
+                or message is not self.chat_widget.last_message()):
+            QMessageBox.information(self, "Continue", "Only the last reply of a conversation can be continued.")
+            return
+        self.chat_widget.resume_stream(message)
+        self._start_chat_worker(self.messages + [{"role": "user", "content": CONTINUE_PROMPT}],
+                                resume=last)
+
+    def open_compare(self):
+        """Send the typed message to several models at once and keep one reply."""
+        if hasattr(self, 'worker') and self.worker.isRunning():
+            return
+        if self.compare_dialog is None:
+            self.compare_dialog = CompareDialog(self.available_models, self._compare_worker, self)
+            self.compare_dialog.answer_chosen.connect(self.on_compare_answer_chosen)
+        dialog = self.compare_dialog
+        dialog.set_catalog(self.available_models)
+        dialog.set_prompt(self.message_input.toPlainText().strip())
+        if not dialog.columns:
+            dialog.add_model(self.model_combo.currentText())
+        dialog.open()
+
+    def _compare_worker(self, model, prompt):
+        # Each model answers the prompt after the same history
+        worker = self._chat_worker(model, self.messages + [{"role": "user", "content": prompt}])
+        session_id = self.current_session_id
+        worker.usage_received.connect(
+            lambda usage: self._record_session_usage(session_id, model, usage))
+        return worker
+
+    def on_compare_answer_chosen(self, prompt, model, content):
+        self._when_session_ready(lambda: self._keep_compare_answer(prompt, model, content))
+
+    def _keep_compare_answer(self, prompt, model, content):
+        from nanogpt_chat.utils.logger import logger
+        logger.info(f"Keeping the reply of {model} from a comparison")
+        self._add_user_message(prompt)
+        self.message_input.clear()
+        self.chat_widget.add_message("assistant", content)
+        self.messages.append({"role": "assistant", "content": content})
+        self.message_segments.segment("assistant", content)
+        if self.current_session_id:
+            self.persistence.enqueue(self.current_session_id, "assistant", content)
+        self._queue_title_job()
+
     def set_theme(self, name):
         from nanogpt_chat.ui.themes import set_theme_mode, ThemeMode, get_app_stylesheet
         mode = {"light": ThemeMode.LIGHT, "dark": ThemeMode.DARK, "system": ThemeMode.SYSTEM}.get(name)
@@ -608,84 +1037,153 @@ class MainWindow(QMainWindow):
 
     def on_chat_scroll(self, val):
         if val < 50 and not getattr(self, '_loading_messages', False):
-            if hasattr(self, 'total_message_count') and self.loaded_message_count < self.total_message_count:
+            if getattr(self, 'older_messages_cursor', None) is not None:
                 self.load_more_messages()
 
     def load_more_messages(self):
-        if not self.db or not self.current_session_id: return
+        if not self.db_service or not self.current_session_id: return
         self._loading_messages = True
-        try:
-            raw = self.db.get_messages_paginated(self.current_session_id, 20, self.message_offset)
+        session_id = self.current_session_id
+        generation = self._session_load_generation
+        
+        def show(result):
+            self._loading_messages = False
+            if session_id != self.current_session_id or generation != self._session_load_generation:
+                return
+            raw, cursor = result
+            self.older_messages_cursor = cursor
             if raw:
-                older = [{"role": m.role, "content": m.content} for m in raw]
+                older = [self._message_dict(m) for m in raw]
                 self.messages = older + self.messages
                 self.loaded_message_count += len(raw)
-                self.message_offset += len(raw)
                 self.update_chat_display_preserve_position(older)
-        finally:
+        
+        def failed(e):
             self._loading_messages = False
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Load older messages error: {e}")
+        
+        self.db_service.submit("get_messages_before", session_id, self.message_page_size,
+                               self.older_messages_cursor, callback=show, errback=failed)
 
     def update_chat_display_preserve_position(self, new_msgs):
-        scrollbar = self.chat_scroll.verticalScrollBar()
+        scrollbar = self.chat_widget.verticalScrollBar()
         old_max = scrollbar.maximum()
+        old_value = scrollbar.value()
         for msg in reversed(new_msgs):
             self.chat_widget.add_message_at_top(msg["role"], msg["content"])
         
-        # Use a timer to restore scroll position after layout updates
+        # Restore the scroll position once the view has laid out the new rows
         def restore_scroll():
-            scrollbar.setValue(scrollbar.maximum() - old_max)
-        QTimer.singleShot(50, restore_scroll)
+            scrollbar.setValue(old_value + scrollbar.maximum() - old_max)
+        QTimer.singleShot(0, restore_scroll)
 
     def load_more_sessions(self):
-        if self.db and self.sidebar.has_more_sessions:
-            sessions = self.db.get_sessions_paginated(50, self.sidebar.current_offset)
-            self.sidebar.append_sessions(sessions)
+        if not self.db_service or not self.sidebar.has_more_sessions or self._loading_sessions:
+            return
+        self._loading_sessions = True
+        
+        def show(result):
+            self._loading_sessions = False
+            sessions, cursor = result
+            self.sidebar.append_sessions(sessions, cursor)
+        
+        def failed(e):
+            self._loading_sessions = False
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Load more sessions error: {e}")
+        
+        self.db_service.submit("get_sessions_page", self.sidebar.page_size, self.sidebar.next_cursor,
+                               callback=show, errback=failed)
 
     def rename_session(self, id, title):
-        if self.db and hasattr(self.db, 'update_session_title'):
-            try:
-                self.db.update_session_title(id, title)
-                self.refresh_sessions()
-            except Exception as e:
-                from nanogpt_chat.utils.logger import logger
-                logger.error(f"Rename session error: {e}")
+        if not self.db_service: return
+        if self.background_jobs is not None:
+            # The user's title is kept over a generated one
+            self.background_jobs.cancel(id, JOB_TITLE)
+        
+        def failed(e):
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Rename session error: {e}")
+            # The sidebar already shows the new title; reload the stored one
+            self.refresh_sessions()
+        
+        self.db_service.submit("update_session_title", id, title, errback=failed)
 
     def delete_session(self, id):
         if QMessageBox.question(self, "Delete", "Are you sure?") == QMessageBox.StandardButton.Yes:
-            if self.db:
-                self.db.delete_session(id)
-                self.refresh_sessions()
+            if self.db_service:
+                if self.background_jobs is not None:
+                    self.background_jobs.cancel(id)
+                self.db_service.submit("delete_session", id)
+                self.sidebar.remove_session(id)
 
-    def search_sessions(self, q):
-        if self.db:
-            res = self.db.search_sessions(q)
-            self.sidebar.has_more_sessions = False
-            self.sidebar.display_sessions(res)
+    def _search_database(self, query, limit):
+        # Runs on the search controller's worker thread, which waits for the database thread
+        if not self.db_service:
+            return []
+        
+        def search(db):
+            if hasattr(db, 'search'):
+                return db.search(query, limit)
+            return [SimpleNamespace(session=s, snippet="", rank=0.0)
+                    for s in db.search_sessions(query)[:limit]]
+        
+        return self.db_service.call(search, priority=PRIORITY_INTERACTIVE)
+
+    def on_search_results(self, hits, first):
+        self.sidebar.display_search_results(hits, append=not first)
+
+    def on_search_finished(self, query, count, latency_ms):
+        from nanogpt_chat.utils.logger import logger
+        logger.debug(f"Search {query!r}: {count} results in {latency_ms:.1f} ms")
+
+    def on_search_failed(self, query, err):
+        from nanogpt_chat.utils.logger import logger
+        logger.error(f"Search error for {query!r}: {err}")
 
     def new_chat(self):
-        if not self.db: return
-        try:
-            from nanogpt_chat.utils import get_settings
-            settings = get_settings()
-            model = settings.get("api", "default_model", "gpt-4o")
-            system_prompt = settings.get("api", "default_system_prompt", "You are a helpful assistant.")
-            temperature = settings.get("api", "temperature", 0.7)
-            
-            session = self.db.create_session("New Chat", model, system_prompt, temperature)
+        if not self.db_service: return
+        from nanogpt_chat.utils import get_settings
+        settings = get_settings()
+        model = settings.get("api", "default_model", "gpt-4o")
+        system_prompt = settings.get("api", "default_system_prompt", "You are a helpful assistant.")
+        temperature = settings.get("api", "temperature", 0.7)
+        
+        # The transcript and settings reset right away; the session id follows
+        self._session_load_generation += 1
+        self.current_session_id = None
+        self.messages = []
+        self.older_messages_cursor = None
+        self.chat_widget.clear()
+        self.show_session_usage(None)
+        
+        # Apply settings to UI
+        self.model_combo.setCurrentText(model)
+        self.temp_spin.setValue(temperature)
+        # Store system prompt for later use
+        self.current_system_prompt = system_prompt
+        generation = self._session_load_generation
+        # Messages sent before the session exists are held until it does
+        self._creating_session = generation
+        self._awaiting_session = []
+        
+        def created(session):
+            self.sidebar.upsert_session(session)
+            if generation != self._session_load_generation:
+                return
             self.current_session_id = session.id
-            self.messages = []
-            self.chat_widget.clear()
-            
-            # Apply settings to UI
-            self.model_combo.setCurrentText(model)
-            self.temp_spin.setValue(temperature)
-            # Store system prompt for later use
-            self.current_system_prompt = system_prompt
-            
-            self.refresh_sessions()
             self.sidebar.select_session(session.id)
-        except Exception as e:
+            self._session_ready()
+        
+        def failed(e):
             QMessageBox.critical(self, "Error", f"Failed to create new chat: {e}")
+            # What was sent still goes out, unsaved, as without a session
+            if generation == self._session_load_generation:
+                self._session_ready()
+        
+        self.db_service.submit("create_session", "New Chat", model, system_prompt, temperature,
+                               callback=created, errback=failed)
 
     def on_connectivity_changed(self, online):
         from nanogpt_chat.utils.logger import logger
@@ -697,12 +1195,17 @@ class MainWindow(QMainWindow):
             logger.warning("Connection lost.")
 
     def on_model_changed(self, i):
-        if self.current_session_id and self.db:
-            self.db.update_session_model(self.current_session_id, self.model_combo.currentText())
+        if self.current_session_id and self.db_service:
+            self.db_service.submit("update_session_model", self.current_session_id,
+                                   self.model_combo.currentText(), priority=PRIORITY_BACKGROUND,
+                                   key=("model", self.current_session_id))
 
     def on_params_changed(self):
-        if self.current_session_id and self.db:
-            self.db.update_session_params(self.current_session_id, "", float(self.temp_spin.value()))
+        if self.current_session_id and self.db_service:
+            # Spinbox ticks coalesce into one write of the last value
+            self.db_service.submit("update_session_params", self.current_session_id, "",
+                                   float(self.temp_spin.value()), priority=PRIORITY_BACKGROUND,
+                                   key=("params", self.current_session_id))
 
     def attach_image(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select Image", "", "Images (*.png *.jpg)")
@@ -725,3 +1228,31 @@ class MainWindow(QMainWindow):
                 return True
         return super().eventFilter(obj, event)
 
+    def closeEvent(self, event):
+        self._cancel_worker()
+        if self.persistence is not None:
+            self.persistence.flush(wait=True)
+        if self.checkpoint is not None:
+            # A reply still streaming stays partial and shows as interrupted next time
+            self.checkpoint.interrupt(wait=True)
+        super().closeEvent(event)
+
+    def on_about_to_quit(self):
+        # Also covers quitting without closing the window
+        self._cancel_worker()
+        stopping = list(self._stopping_workers)
+        if self.compare_dialog is not None:
+            self.compare_dialog.cancel_all()
+            stopping += self.compare_dialog.stopping_workers
+        for worker in stopping:
+            # Cancelled streams end promptly; a thread still running at exit would abort
+            worker.wait(WORKER_STOP_TIMEOUT_MS)
+        if self.persistence is not None:
+            self.persistence.flush(wait=True)
+        if self.checkpoint is not None:
+            self.checkpoint.interrupt(wait=True)
+        if self.background_jobs is not None:
+            # Jobs not yet run stay queued in the database for the next launch
+            self.background_jobs.shutdown(WORKER_STOP_TIMEOUT_MS / 1000)
+        if self.db_service is not None:
+            self.db_service.shutdown(wait=True)
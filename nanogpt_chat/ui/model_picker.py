@@ -0,0 +1,172 @@
+from PyQt6.QtWidgets import QCompleter
+from PyQt6.QtCore import Qt, QObject, QAbstractListModel, QAbstractProxyModel, QModelIndex
+
+from nanogpt_chat.utils.model_catalog import ModelCatalog
+
+
+class ModelListModel(QAbstractListModel):
+    """Every model of a ``ModelCatalog``, by id, with details in the tooltip."""
+
+    ModelRole = Qt.ItemDataRole.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.catalog = ModelCatalog()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.catalog)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.catalog):
+            return None
+        model = self.catalog.models[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return model.id
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return model.describe()
+        if role == self.ModelRole:
+            return model
+        return None
+
+    def set_catalog(self, catalog):
+        self.beginResetModel()
+        self.catalog = catalog
+        self.endResetModel()
+
+
+class ModelFilterProxy(QAbstractProxyModel):
+    """The models of a ``ModelListModel`` matching a query and capabilities.
+
+    Rows come from ``ModelCatalog.search``, which answers from its index, so
+    a keystroke costs one lookup and a reset rather than a Python
+    ``filterAcceptsRow`` call for every model.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = range(0)
+        self._proxy_rows = None
+        self.query = ""
+        self.capabilities = frozenset()
+
+    def setSourceModel(self, model):
+        previous = self.sourceModel()
+        if previous is not None:
+            previous.modelReset.disconnect(self._refilter)
+        super().setSourceModel(model)
+        model.modelReset.connect(self._refilter)
+        self._refilter()
+
+    def set_query(self, query):
+        if query != self.query:
+            self.query = query
+            self._refilter()
+
+    def set_capability(self, capability, required=True):
+        capabilities = self.capabilities | {capability} if required else self.capabilities - {capability}
+        if capabilities != self.capabilities:
+            self.capabilities = capabilities
+            self._refilter()
+
+    def _refilter(self):
+        source = self.sourceModel()
+        rows = source.catalog.search(self.query, sorted(self.capabilities)) if source else range(0)
+        self.beginResetModel()
+        self._rows = rows
+        self._proxy_rows = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or column != 0 or not 0 <= row < len(self._rows):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, child=None):
+        if child is None:
+            # QObject.parent(), which shares the name
+            return super().parent()
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        source = self.sourceModel()
+        if source is None or not proxy_index.isValid() or not 0 <= proxy_index.row() < len(self._rows):
+            return QModelIndex()
+        return source.index(self._rows[proxy_index.row()])
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._proxy_rows is None:
+            # Only needed for selection and data changes, so built on demand
+            self._proxy_rows = {source_row: row for row, source_row in enumerate(self._rows)}
+        row = self._proxy_rows.get(source_index.row())
+        return self.createIndex(row, 0) if row is not None else QModelIndex()
+
+
+class ModelPicker(QObject):
+    """Drives an editable combo box from a ``ModelCatalog``.
+
+    The drop-down lists the models with the required capabilities; typing
+    filters a completer popup through the catalog's index. Every term of
+    the text must appear in a model's id, name or owner.
+    """
+
+    def __init__(self, combo):
+        super().__init__(combo)
+        self.combo = combo
+        self.source = ModelListModel(self)
+        # What the drop-down lists, and what the completer offers while typing
+        self.choices = ModelFilterProxy(self)
+        self.choices.setSourceModel(self.source)
+        self.matches = ModelFilterProxy(self)
+        self.matches.setSourceModel(self.source)
+
+        combo.setModel(self.choices)
+        completer = QCompleter(self.matches, combo)
+        # The proxy has already filtered; the completer must not filter again
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        completer.setMaxVisibleItems(15)
+        combo.setCompleter(completer)
+        combo.lineEdit().textEdited.connect(self.matches.set_query)
+
+    @property
+    def catalog(self):
+        return self.source.catalog
+
+    def set_catalog(self, catalog):
+        """Show ``catalog`` and keep the text in the combo box as it was."""
+        self._keeping_text(lambda: self.source.set_catalog(catalog))
+
+    def set_capability(self, capability, required=True):
+        def apply():
+            self.choices.set_capability(capability, required)
+            self.matches.set_capability(capability, required)
+        self._keeping_text(apply)
+
+    def select(self, model_id):
+        """Select ``model_id`` in the list, or just show it when it is not listed."""
+        self._keeping_text(None, model_id)
+
+    def _keeping_text(self, change, text=None):
+        # Resetting the list moves the current index; nobody should hear about it
+        text = self.combo.currentText() if text is None else text
+        blocked = self.combo.blockSignals(True)
+        try:
+            if change is not None:
+                change()
+            row = self.catalog.row_of(text)
+            index = self.choices.mapFromSource(self.source.index(row)) if row >= 0 else QModelIndex()
+            if index.isValid():
+                self.combo.setCurrentIndex(index.row())
+            else:
+                self.combo.setCurrentIndex(-1)
+                self.combo.setEditText(text)
+        finally:
+            self.combo.blockSignals(blocked)
@@ -8,11 +8,17 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QSortFilterProxyModel
 from PyQt6.QtGui import QFont, QIcon, QStandardItemModel, QStandardItem
 
+from nanogpt_chat.ui.model_picker import ModelPicker
+from nanogpt_chat.utils.model_catalog import ModelCatalog
+
 
 class SettingsDialog(QDialog):
     def __init__(self, available_models=None, parent=None):
         super().__init__(parent)
-        self.available_models = available_models or []
+        # A ModelCatalog from the main window, or a list of model ids
+        if not isinstance(available_models, ModelCatalog):
+            available_models = ModelCatalog(available_models or ())
+        self.available_models = available_models
         self.setWindowTitle("Settings")
         self.setMinimumWidth(550) # Increased width
         self.setup_ui()
@@ -143,6 +149,14 @@ class SettingsDialog(QDialog):
         api_info.setStyleSheet("color: #777; font-size: 12px; margin-top: -10px;")
         api_layout.addRow("", api_info)
         
+        self.backend = QComboBox()
+        self.backend.addItem("Automatic", "auto")
+        self.backend.addItem("Native (nanogpt_core)", "native")
+        self.backend.addItem("Python (asyncio)", "python")
+        self.backend.setToolTip("The Python client works without the compiled nanogpt_core module.")
+        self.backend.setStyleSheet(input_style)
+        api_layout.addRow("Client", self.backend)
+        
         self.test_api_btn = QPushButton("Test Connection")
         self.test_api_btn.setFixedWidth(150)
         self.test_api_btn.setStyleSheet(button_secondary_style)
@@ -164,8 +178,7 @@ class SettingsDialog(QDialog):
         self.default_model = QComboBox()
         self.default_model.setEditable(True)
         self.default_model.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
-        self.default_model.completer().setFilterMode(Qt.MatchFlag.MatchContains)
-        self.default_model.completer().setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
+        self.model_picker = ModelPicker(self.default_model)
         self.default_model.setStyleSheet(input_style)
         model_layout.addRow("Default Model", self.default_model)
         
@@ -262,26 +275,32 @@ class SettingsDialog(QDialog):
         self.fetch_models_btn.setText("Fetching...")
         
         try:
-            from nanogpt_core import PyNanoGPTClient
-            client = PyNanoGPTClient(api_key)
-            models = client.list_models()
-            
-            current_model = self.default_model.currentText()
-            self.default_model.clear()
-            self.default_model.addItems(sorted(models))
-            
-            idx = self.default_model.findText(current_model)
-            if idx >= 0:
-                self.default_model.setCurrentIndex(idx)
-            else:
-                self.default_model.setEditText(current_model)
-            
-            QMessageBox.information(self, "Success", f"Fetched {len(models)} models.")
+            from nanogpt_chat.utils import create_api_client
+            from nanogpt_chat.utils.model_cache import get_model_catalog
+            from nanogpt_chat.ui.main_window import ModelFetchWorker
+            client = create_api_client(api_key, self.backend.currentData())
+            # Fetched off the GUI thread, revalidating the cached catalog even if fresh
+            self._fetch_worker = ModelFetchWorker(client, get_model_catalog(), force=True)
+            self._fetch_worker.models_fetched.connect(self.on_models_fetched)
+            self._fetch_worker.error.connect(self.on_fetch_failed)
+            self._fetch_worker.finished.connect(self.on_fetch_done)
+            self._fetch_worker.start()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to fetch models: {e}")
-        finally:
-            self.fetch_models_btn.setEnabled(True)
-            self.fetch_models_btn.setText("🔄 Fetch All Models")
+            self.on_fetch_done()
+
+    def on_models_fetched(self, catalog):
+        self.available_models = catalog
+        self.model_picker.set_catalog(catalog)
+        
+        QMessageBox.information(self, "Success", f"Fetched {len(catalog)} models.")
+
+    def on_fetch_failed(self, error):
+        QMessageBox.critical(self, "Error", f"Failed to fetch models: {error}")
+
+    def on_fetch_done(self):
+        self.fetch_models_btn.setEnabled(True)
+        self.fetch_models_btn.setText("🔄 Fetch All Models")
     
     def load_settings(self):
         try:
@@ -295,19 +314,16 @@ class SettingsDialog(QDialog):
             
             # Populate model dropdown if models are provided
             if self.available_models:
-                self.default_model.clear()
-                self.default_model.addItems(sorted(self.available_models))
+                self.model_picker.set_catalog(self.available_models)
             
             # Load model settings
-            idx = self.default_model.findText(settings.get("api", "default_model"))
-            if idx >= 0:
-                self.default_model.setCurrentIndex(idx)
-            else:
-                self.default_model.setEditText(settings.get("api", "default_model"))
+            self.model_picker.select(settings.get("api", "default_model"))
                 
             self.default_system_prompt.setPlainText(settings.get("api", "default_system_prompt"))
             self.temperature.setValue(settings.get("api", "temperature"))
             self.max_tokens.setValue(settings.get("api", "max_tokens"))
+            idx = self.backend.findData(settings.get("api", "backend", "auto"))
+            self.backend.setCurrentIndex(max(idx, 0))
             
             # Load UI settings
             self.dark_mode.setChecked(settings.get("ui", "dark_mode"))
@@ -323,8 +339,8 @@ class SettingsDialog(QDialog):
             return
         
         try:
-            from nanogpt_core import PyNanoGPTClient
-            client = PyNanoGPTClient(api_key)
+            from nanogpt_chat.utils import create_api_client
+            client = create_api_client(api_key, self.backend.currentData())
             # Use gpt-4o-mini for a cheap test
             client.chat_completion_sync("gpt-4o-mini", [("user", "hi")], 0.7, 10)
             QMessageBox.information(self, "Success", "API connection successful!")
@@ -352,6 +368,7 @@ class SettingsDialog(QDialog):
             settings.set("api", "default_system_prompt", self.default_system_prompt.toPlainText())
             settings.set("api", "temperature", self.temperature.value())
             settings.set("api", "max_tokens", self.max_tokens.value())
+            settings.set("api", "backend", self.backend.currentData())
             settings.set("ui", "dark_mode", self.dark_mode.isChecked())
             settings.set("ui", "font_size", self.font_size.value())
             
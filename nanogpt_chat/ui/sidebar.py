@@ -1,32 +1,258 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem, QPushButton, QLabel, QLineEdit, QMenu
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QFont, QIcon, QAction
-from datetime import datetime
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QListView, QPushButton, QLabel, QLineEdit, QMenu,
+    QStyledItemDelegate, QStyle, QAbstractItemView
+)
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QAbstractListModel, QModelIndex, QSize, QRect, QRectF, QEvent
+from PyQt6.QtGui import QFont, QFontMetrics, QAction, QColor, QPainter
 
 
-class SessionItemWidget(QWidget):
+class SessionEntry:
+    """The parts of a session the sidebar shows. Titles change in place on rename.
+
+    ``snippet`` is the matching excerpt when the entry is a search result;
+    ``summary`` is the session's generated summary, once one is known.
+    """
+
+    __slots__ = ("id", "title", "updated_at", "snippet", "summary")
+
+    def __init__(self, session_id, title, updated_at=0, snippet="", summary=""):
+        self.id = session_id
+        self.title = title
+        self.updated_at = updated_at
+        self.snippet = snippet
+        self.summary = summary
+
+    @classmethod
+    def from_session(cls, session):
+        return cls(session.id, session.title, getattr(session, "updated_at", 0))
+
+    @classmethod
+    def from_search_hit(cls, hit):
+        session = hit.session
+        return cls(session.id, session.title, getattr(session, "updated_at", 0), hit.snippet)
+
+
+class SessionListModel(QAbstractListModel):
+    SessionIdRole = Qt.ItemDataRole.UserRole
+    SessionRole = Qt.ItemDataRole.UserRole + 1
+
+    title_edited = pyqtSignal(str, str)  # session_id, new_title
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._sessions = []
+        self._entries = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._sessions)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._sessions):
+            return None
+        session = self._sessions[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return session.title
+        if role == Qt.ItemDataRole.ToolTipRole:
+            detail = session.snippet or session.summary
+            return f"{session.title}\n{detail}" if detail else session.title
+        if role == self.SessionIdRole:
+            return session.id
+        if role == self.SessionRole:
+            return session
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid():
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid():
+            return False
+        new_title = str(value).strip()
+        session = self._sessions[index.row()]
+        if not new_title or new_title == session.title:
+            return False
+        session.title = new_title
+        self.dataChanged.emit(index, index)
+        self.title_edited.emit(session.id, new_title)
+        return True
+
+    def row_of(self, session_id):
+        entry = self._entries.get(session_id)
+        # list.index compares by identity first, so this is a fast C-level scan
+        return self._sessions.index(entry) if entry is not None else -1
+
+    def session_ids(self):
+        return [session.id for session in self._sessions]
+
+    def set_sessions(self, sessions):
+        self.beginResetModel()
+        self._sessions = []
+        self._entries = {}
+        self._extend(sessions)
+        self.endResetModel()
+
+    def append_sessions(self, sessions):
+        entries = [s if isinstance(s, SessionEntry) else SessionEntry.from_session(s)
+                   for s in sessions if s.id not in self._entries]
+        if not entries:
+            return
+        first = len(self._sessions)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self._extend(entries)
+        self.endInsertRows()
+
+    def update_title(self, session_id, title):
+        row = self.row_of(session_id)
+        if row < 0:
+            return False
+        self._sessions[row].title = title
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def update_summary(self, session_id, summary):
+        row = self.row_of(session_id)
+        if row < 0:
+            return False
+        self._sessions[row].summary = summary
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def upsert_session(self, session):
+        """Insert a session at the top, moving it there if it is already listed.
+
+        Returns True if the session was not listed before.
+        """
+        entry = SessionEntry.from_session(session)
+        row = self.row_of(entry.id)
+        if row >= 0:
+            # Sessions read from the database carry no summary
+            entry.summary = self._sessions[row].summary
+        self._entries[entry.id] = entry
+        if row == 0:
+            self._sessions[0] = entry
+            self.dataChanged.emit(self.index(0), self.index(0))
+            return False
+        if row > 0:
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), 0)
+            del self._sessions[row]
+            self._sessions.insert(0, entry)
+            self.endMoveRows()
+            return False
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._sessions.insert(0, entry)
+        self.endInsertRows()
+        return True
+
+    def remove_session(self, session_id):
+        row = self.row_of(session_id)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._sessions[row]
+        del self._entries[session_id]
+        self.endRemoveRows()
+        return True
+
+    def clear(self):
+        self.set_sessions([])
+
+    def _extend(self, sessions):
+        for session in sessions:
+            entry = session if isinstance(session, SessionEntry) else SessionEntry.from_session(session)
+            if entry.id in self._entries:
+                continue
+            self._entries[entry.id] = entry
+            self._sessions.append(entry)
+
+
+class SessionItemDelegate(QStyledItemDelegate):
+    """Paints session rows: title, separator, and a delete button on hover.
+
+    Rows are never backed by widgets; the only widget ever created is the
+    QLineEdit opened for an inline rename.
+    """
+
     delete_requested = pyqtSignal(str)
-    rename_requested = pyqtSignal(str, str)  # session_id, new_title
-    
-    def __init__(self, session_id, title, parent=None):
+
+    ROW_HEIGHT = 37
+    PADDING_LEFT = 12
+    PADDING_RIGHT = 8
+    DELETE_SIZE = 20
+
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.session_id = session_id
-        self.title = title
-        self.is_editing = False
-        self.setup_ui()
-        
-    def setup_ui(self):
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(12, 8, 8, 8)
-        layout.setSpacing(8)
-        
-        self.title_label = QLabel(self.title)
-        self.title_label.setStyleSheet("color: #cccccc; background: transparent; border: none;")
-        self.title_label.mouseDoubleClickEvent = self.start_rename
-        layout.addWidget(self.title_label)
-        
-        self.title_edit = QLineEdit(self.title)
-        self.title_edit.setStyleSheet("""
+        self._font = QFont()
+        self._font.setPixelSize(13)
+        self._font_metrics = QFontMetrics(self._font)
+        self._delete_font = QFont()
+        self._delete_font.setPixelSize(10)
+        self._delete_font.setBold(True)
+        self._hover_pos = None
+        self.consumed_click = False
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def delete_rect(self, rect):
+        return QRect(rect.right() - self.PADDING_RIGHT - self.DELETE_SIZE + 1,
+                     rect.top() + (rect.height() - self.DELETE_SIZE) // 2,
+                     self.DELETE_SIZE, self.DELETE_SIZE)
+
+    def set_hover_pos(self, pos):
+        self._hover_pos = pos
+
+    def paint(self, painter, option, index):
+        rect = option.rect
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        painter.save()
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(rect, QColor("#37373d"))
+        elif hovered:
+            painter.fillRect(rect, QColor("#2a2d2e"))
+        painter.setPen(QColor("#333333"))
+        painter.drawLine(rect.left(), rect.bottom(), rect.right(), rect.bottom())
+
+        delete_rect = self.delete_rect(rect)
+        text_rect = QRect(rect.left() + self.PADDING_LEFT, rect.top(),
+                          delete_rect.left() - 8 - rect.left() - self.PADDING_LEFT, rect.height())
+        painter.setFont(self._font)
+        painter.setPen(QColor("#cccccc"))
+        title = self._font_metrics.elidedText(index.data(), Qt.TextElideMode.ElideRight,
+                                              text_rect.width()) if text_rect.width() > 0 else ""
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, title)
+
+        if hovered:
+            over_delete = self._hover_pos is not None and delete_rect.contains(self._hover_pos)
+            if over_delete:
+                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(QColor("#ff4d4d"))
+                painter.drawRoundedRect(QRectF(delete_rect), 4, 4)
+            painter.setFont(self._delete_font)
+            painter.setPen(QColor("white" if over_delete else "#666666"))
+            painter.drawText(delete_rect, Qt.AlignmentFlag.AlignCenter, "✕")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton
+                and self.delete_rect(option.rect).contains(event.position().toPoint())):
+            # The view still reports the release as a click; let it see this flag,
+            # and ask for confirmation only once the mouse event is done
+            self.consumed_click = True
+            session_id = index.data(SessionListModel.SessionIdRole)
+            QTimer.singleShot(0, lambda: self.delete_requested.emit(session_id))
+            return True
+        return False
+
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        editor.setStyleSheet("""
             QLineEdit {
                 background-color: #333333;
                 color: #cccccc;
@@ -35,76 +261,34 @@ class SessionItemWidget(QWidget):
                 padding: 2px 4px;
             }
         """)
-        self.title_edit.returnPressed.connect(self.finish_rename)
-        self.title_edit.editingFinished.connect(self.finish_rename)
-        self.title_edit.hide()
-        layout.addWidget(self.title_edit)
-        
-        layout.addStretch()
-        
-        self.delete_btn = QPushButton("✕")
-        self.delete_btn.setFixedSize(20, 20)
-        self.delete_btn.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.delete_btn.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                color: #666;
-                border: none;
-                border-radius: 4px;
-                font-size: 10px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #ff4d4d;
-                color: white;
-            }
-        """)
-        self.delete_btn.clicked.connect(lambda: self.delete_requested.emit(self.session_id))
-        self.delete_btn.hide() # Hidden by default, shown on hover
-        layout.addWidget(self.delete_btn)
-        
-    def start_rename(self, event):
-        self.is_editing = True
-        self.title_label.hide()
-        self.title_edit.setText(self.title)
-        self.title_edit.show()
-        self.title_edit.selectAll()
-        self.title_edit.setFocus()
-        event.accept()
-        
-    def finish_rename(self):
-        if not self.is_editing:
-            return
-            
-        self.is_editing = False
-        new_title = self.title_edit.text().strip()
-        if new_title and new_title != self.title:
-            self.rename_requested.emit(self.session_id, new_title)
-            self.title = new_title
-            self.title_label.setText(new_title)
-            
-        self.title_edit.hide()
-        self.title_label.show()
-        
-    def contextMenuEvent(self, event):
-        menu = QMenu(self)
-        
-        rename_action = QAction("Rename", self)
-        rename_action.triggered.connect(self.start_rename)
-        menu.addAction(rename_action)
-        
-        delete_action = QAction("Delete", self)
-        delete_action.triggered.connect(lambda: self.delete_requested.emit(self.session_id))
-        menu.addAction(delete_action)
-        
-        menu.exec(event.globalPos())
-        
-    def enterEvent(self, event):
-        self.delete_btn.show()
-        super().enterEvent(event)
-        
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.ItemDataRole.EditRole))
+        editor.selectAll()
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text(), Qt.ItemDataRole.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        rect = option.rect
+        editor.setGeometry(QRect(rect.left() + self.PADDING_LEFT - 4, rect.top() + 6,
+                                 rect.width() - self.PADDING_LEFT - self.PADDING_RIGHT - self.DELETE_SIZE - 4,
+                                 rect.height() - 12))
+
+
+class SessionListView(QListView):
+    """List view that tracks the cursor so the delegate can highlight the delete button."""
+
+    def mouseMoveEvent(self, event):
+        self.itemDelegate().set_hover_pos(event.position().toPoint())
+        index = self.indexAt(event.position().toPoint())
+        if index.isValid():
+            self.viewport().update(self.visualRect(index))
+        super().mouseMoveEvent(event)
+
     def leaveEvent(self, event):
-        self.delete_btn.hide()
+        self.itemDelegate().set_hover_pos(None)
         super().leaveEvent(event)
 
 
@@ -119,10 +303,9 @@ class Sidebar(QWidget):
     
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.all_sessions = []  # Store all sessions for filtering
-        self.displayed_sessions = []  # Sessions currently displayed
         self.page_size = 50
-        self.current_offset = 0
+        # Opaque position of the next page, as returned by the database
+        self.next_cursor = None
         self.has_more_sessions = True
         self.setup_ui()
     
@@ -166,26 +349,31 @@ class Sidebar(QWidget):
         self.search_input.textChanged.connect(self.filter_sessions)
         layout.addWidget(self.search_input)
         
-        self.session_list = QListWidget()
+        self.session_model = SessionListModel(self)
+        self.session_model.title_edited.connect(self.rename_session)
+        self.session_delegate = SessionItemDelegate(self)
+        self.session_delegate.delete_requested.connect(self.session_deleted.emit)
+        
+        # Rows share one height, so layout stays O(1) however many sessions are loaded
+        self.session_list = SessionListView()
+        self.session_list.setModel(self.session_model)
+        self.session_list.setItemDelegate(self.session_delegate)
+        self.session_list.setUniformItemSizes(True)
+        self.session_list.setMouseTracking(True)
+        self.session_list.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked
+                                          | QAbstractItemView.EditTrigger.EditKeyPressed)
+        self.session_list.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.session_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.session_list.customContextMenuRequested.connect(self.show_context_menu)
         self.session_list.setStyleSheet("""
-            QListWidget {
+            QListView {
                 border: none;
                 background-color: #252526;
                 color: #cccccc;
                 outline: none;
             }
-            QListWidget::item {
-                background-color: transparent;
-                border-bottom: 1px solid #333333;
-            }
-            QListWidget::item:hover {
-                background-color: #2a2d2e;
-            }
-            QListWidget::item:selected {
-                background-color: #37373d;
-            }
         """)
-        self.session_list.itemClicked.connect(self.on_session_clicked)
+        self.session_list.clicked.connect(self.on_session_clicked)
         self.session_list.verticalScrollBar().valueChanged.connect(self.on_scroll)
         layout.addWidget(self.session_list)
         
@@ -233,45 +421,73 @@ class Sidebar(QWidget):
         
         layout.addWidget(button_container)
     
-    def update_sessions(self, sessions):
-        # For initial load, store first batch and set up pagination
-        self.all_sessions = []  # Clear for search mode
-        self.displayed_sessions = sessions
-        self.current_offset = len(sessions)
-        self.has_more_sessions = len(sessions) == self.page_size
+    def update_sessions(self, sessions, next_cursor=None):
+        # For initial load, store first page and set up pagination
+        self.next_cursor = next_cursor
+        self.has_more_sessions = next_cursor is not None
         self.display_sessions(sessions)
     
-    def append_sessions(self, sessions):
-        """Append additional sessions for pagination"""
-        self.displayed_sessions.extend(sessions)
-        self.current_offset += len(sessions)
-        self.has_more_sessions = len(sessions) == self.page_size
+    def append_sessions(self, sessions, next_cursor=None):
+        """Append the next page of sessions"""
+        self.next_cursor = next_cursor
+        self.has_more_sessions = next_cursor is not None
         # Only append new sessions to the display
         self.display_sessions(sessions, append=True)
     
     def display_sessions(self, sessions, append=False):
-        if not append:
-            self.session_list.clear()
-            
-        for session in sessions:
-            item = QListWidgetItem(self.session_list)
-            item.setData(Qt.ItemDataRole.UserRole, session.id)
-            
-            widget = SessionItemWidget(session.id, session.title)
-            widget.delete_requested.connect(self.session_deleted.emit)
-            widget.rename_requested.connect(self.rename_session)
-            
-            item.setSizeHint(widget.sizeHint())
-            self.session_list.addItem(item)
-            self.session_list.setItemWidget(item, widget)
+        if append:
+            self.session_model.append_sessions(sessions)
+        else:
+            self.session_model.set_sessions(sessions)
+    
+    def display_search_results(self, hits, append=False):
+        """Show ranked search hits in place of the paginated list."""
+        self.has_more_sessions = False
+        entries = [SessionEntry.from_search_hit(hit) for hit in hits]
+        if append:
+            self.session_model.append_sessions(entries)
+        else:
+            self.session_model.set_sessions(entries)
+    
+    def upsert_session(self, session):
+        """Show a new or just-updated session at the top of the list."""
+        self.session_model.upsert_session(session)
+    
+    def update_session_title(self, session_id, title):
+        self.session_model.update_title(session_id, title)
+    
+    def update_session_summary(self, session_id, summary):
+        self.session_model.update_summary(session_id, summary)
+    
+    def remove_session(self, session_id):
+        self.session_model.remove_session(session_id)
+    
+    def show_context_menu(self, pos):
+        index = self.session_list.indexAt(pos)
+        if not index.isValid():
+            return
+        menu = QMenu(self)
+        
+        rename_action = QAction("Rename", self)
+        rename_action.triggered.connect(lambda: self.session_list.edit(index))
+        menu.addAction(rename_action)
+        
+        delete_action = QAction("Delete", self)
+        delete_action.triggered.connect(
+            lambda: self.session_deleted.emit(index.data(SessionListModel.SessionIdRole)))
+        menu.addAction(delete_action)
+        
+        menu.exec(self.session_list.viewport().mapToGlobal(pos))
     
     def filter_sessions(self, text):
         # Emit signal to let main window handle searching (including DB content)
         self.search_requested.emit(text)
     
-    def on_session_clicked(self, item):
-        session_id = item.data(Qt.ItemDataRole.UserRole)
-        self.session_selected.emit(session_id)
+    def on_session_clicked(self, index):
+        if self.session_delegate.consumed_click:
+            self.session_delegate.consumed_click = False
+            return
+        self.session_selected.emit(index.data(SessionListModel.SessionIdRole))
     
     def on_scroll(self, value):
         # Check if we're near the bottom and have more sessions to load
@@ -280,15 +496,13 @@ class Sidebar(QWidget):
             self.load_more_requested.emit()
     
     def select_session(self, session_id):
-        for i in range(self.session_list.count()):
-            item = self.session_list.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == session_id:
-                self.session_list.setCurrentItem(item)
-                break
+        row = self.session_model.row_of(session_id)
+        if row >= 0:
+            self.session_list.setCurrentIndex(self.session_model.index(row))
     
     def rename_session(self, session_id, new_title):
         # Emit a signal to let the main window handle the database update
         self.session_renamed.emit(session_id, new_title)
     
     def clear(self):
-        self.session_list.clear()
+        self.session_model.clear()
@@ -179,8 +179,9 @@ def get_chat_widget_stylesheet(theme: Theme = None) -> str:
         theme = get_current_theme()
     
     return f"""
-        ChatWidget {{
+        ChatWidget, ChatWidget QListView {{
             background-color: {theme.get_color('background')};
+            border: none;
         }}
     """
 
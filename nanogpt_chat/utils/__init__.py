@@ -26,14 +26,40 @@ def get_settings():
         _settings = SettingsManager()
     return _settings
 
+# "auto" prefers the compiled client and falls back to the Python one
+API_BACKENDS = ("auto", "native", "python")
+
+def create_api_client(api_key, backend="auto"):
+    """Create an API client on the given backend.
+
+    The native backend is ``nanogpt_core.PyNanoGPTClient``; the Python one
+    is ``AsyncNanoGPTClient``, which needs nothing compiled. Both offer
+    ``chat_completion_stream``, ``chat_completion_sync`` and ``list_models``.
+    Either is wrapped in a ``ScheduledClient``, so its requests are queued,
+    rate limited and retried by the shared request scheduler.
+    """
+    from nanogpt_chat.utils.request_scheduler import ScheduledClient, get_request_scheduler
+    return ScheduledClient(_create_backend_client(api_key, backend), get_request_scheduler())
+
+def _create_backend_client(api_key, backend):
+    if backend != "python":
+        try:
+            from nanogpt_core import PyNanoGPTClient
+            return PyNanoGPTClient(api_key)
+        except ImportError:
+            if backend == "native":
+                from nanogpt_chat.utils.logger import logger
+                logger.warning("nanogpt_core is not available; using the Python API client")
+    from nanogpt_chat.utils.async_client import AsyncNanoGPTClient
+    return AsyncNanoGPTClient(api_key)
+
 def get_api_client():
     try:
         from nanogpt_chat.utils.credentials import SecureCredentialManager
         api_key = SecureCredentialManager.get_api_key()
         if not api_key:
             return None
-        from nanogpt_core import PyNanoGPTClient
-        return PyNanoGPTClient(api_key)
+        return create_api_client(api_key, get_settings().get("api", "backend", "auto"))
     except ImportError:
         return None
 
@@ -0,0 +1,503 @@
+import asyncio
+import json
+import queue
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+from nanogpt_chat.exceptions import APIError
+from nanogpt_chat.utils.request_scheduler import parse_retry_after
+from nanogpt_chat.utils.sse import SSEDecoder
+
+DEFAULT_BASE_URL = "https://nano-gpt.com/api/v1"
+DEFAULT_MAX_CONNECTIONS = 8
+# Idle connections are kept this long, so consecutive prompts reuse them
+POOL_IDLE_TIMEOUT = 90.0
+CONNECT_TIMEOUT = 15.0
+READ_TIMEOUT = 120.0
+USER_AGENT = "nanogpt-chat"
+
+_END = object()
+
+
+class _EventLoopThread:
+    """One asyncio loop on a daemon thread, shared by every Python client."""
+
+    _lock = threading.Lock()
+    _instance = None
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="api-loop", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @classmethod
+    def get(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance.loop
+
+
+class _Connection:
+    __slots__ = ("reader", "writer", "idle_since", "reused")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = 0.0
+        self.reused = False
+
+    def usable(self):
+        return (not self.writer.is_closing() and not self.reader.at_eof()
+                and time.monotonic() - self.idle_since < POOL_IDLE_TIMEOUT)
+
+    def close(self):
+        self.writer.close()
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections, reused per host.
+
+    At most ``max_connections`` are in use at once; further requests wait
+    for one to be released. Must only be used from its event loop.
+    """
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self._idle = {}
+        self._slots = None
+        self.opened = 0
+
+    async def acquire(self, host, port, use_ssl):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        await self._slots.acquire()
+        try:
+            idle = self._idle.get((host, port, use_ssl), [])
+            while idle:
+                connection = idle.pop()
+                if connection.usable():
+                    connection.reused = True
+                    return connection
+                connection.close()
+            return await self._open(host, port, use_ssl)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _open(self, host, port, use_ssl):
+        context = None
+        if use_ssl:
+            context = ssl.create_default_context()
+            context.set_alpn_protocols(["http/1.1"])
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context), CONNECT_TIMEOUT)
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    def release(self, host, port, use_ssl, connection, reusable):
+        """Return a connection whose response was fully read, or close it."""
+        connection.idle_since = time.monotonic()
+        if reusable and connection.usable():
+            connection.reused = False
+            self._idle.setdefault((host, port, use_ssl), []).append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def close(self):
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
+
+
+class _Response:
+    """Status, headers and an incrementally read body of one HTTP response.
+
+    The connection goes back to the pool once the body has been read to
+    the end, and is closed if the response is abandoned part way.
+    """
+
+    def __init__(self, client, target, connection, status, headers):
+        self._client = client
+        self._target = target
+        self._connection = connection
+        self.status = status
+        self.headers = headers
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        length = headers.get("content-length")
+        self._remaining = int(length) if length is not None and not self._chunked else None
+        if status in (204, 304):
+            # These never have a body, whatever the headers say
+            self._chunked = False
+            self._remaining = 0
+        self._keep_alive = (headers.get("connection", "").lower() != "close"
+                            and (self._chunked or self._remaining is not None))
+        self._done = False
+
+    async def iter_chunks(self):
+        reader = self._connection.reader
+        try:
+            while True:
+                if self._chunked:
+                    size_line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+                    size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                    if size == 0:
+                        # Trailer fields end with an empty line
+                        while (await asyncio.wait_for(reader.readline(), READ_TIMEOUT)).strip():
+                            pass
+                        break
+                    data = await asyncio.wait_for(reader.readexactly(size + 2), READ_TIMEOUT)
+                    yield data[:-2]
+                elif self._remaining is not None:
+                    if self._remaining == 0:
+                        break
+                    data = await asyncio.wait_for(reader.read(min(self._remaining, 65536)), READ_TIMEOUT)
+                    if not data:
+                        raise APIError("Connection closed before the response was complete", transient=True)
+                    self._remaining -= len(data)
+                    yield data
+                else:
+                    data = await asyncio.wait_for(reader.read(65536), READ_TIMEOUT)
+                    if not data:
+                        break
+                    yield data
+            self._done = True
+        finally:
+            self.release()
+
+    async def read(self):
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    def release(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._client._pool.release(*self._target, connection, self._done and self._keep_alive)
+
+
+class AsyncNanoGPTClient:
+    """NanoGPT API client in pure Python, for when ``nanogpt_core`` is unavailable.
+
+    Requests run on one shared asyncio event loop over a pool of keep-alive
+    connections, so many streams can be in flight at once without a thread
+    each. The coroutine API (``stream_chat``, ``chat``, ``models``) runs on
+    that loop; ``chat_completion_stream``, ``chat_completion_sync`` and
+    ``list_models`` mirror ``nanogpt_core.PyNanoGPTClient`` and may be called
+    from any other thread.
+    """
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.api_key = api_key
+        parts = urlsplit(base_url.rstrip("/"))
+        self._use_ssl = parts.scheme == "https"
+        self._host = parts.hostname
+        self._port = parts.port or (443 if self._use_ssl else 80)
+        self._path = parts.path
+        self._pool = ConnectionPool(max_connections)
+        self._loop = _EventLoopThread.get()
+
+    @property
+    def connections_opened(self):
+        return self._pool.opened
+
+    def set_api_key(self, api_key):
+        self.api_key = api_key
+
+    # Coroutine API, run on the client's event loop
+
+    async def stream_chat(self, model, messages, temperature=None, max_tokens=None, top_p=None,
+                          frequency_penalty=None, presence_penalty=None, on_first_byte=None,
+                          on_usage=None):
+        """Yield the content deltas of a streamed chat completion.
+
+        ``messages`` is a list of ``(role, content)`` pairs, or a string
+        holding them already encoded as a JSON array, which is sent as is.
+        ``on_usage`` is called with the token usage dict of the final chunk,
+        when the server reports it.
+        """
+        body = _chat_body(model, messages, temperature, max_tokens, top_p,
+                          frequency_penalty, presence_penalty, stream=True)
+        started = time.perf_counter()
+        response = await self._request("POST", "/chat/completions", body, accept="text/event-stream")
+        try:
+            await _raise_for_status(response)
+            decoder = SSEDecoder()
+            finished = False
+            async for data in response.iter_chunks():
+                if on_first_byte is not None:
+                    on_first_byte((time.perf_counter() - started) * 1000)
+                    on_first_byte = None
+                if finished:
+                    # Read to the end of the body so the connection can be reused
+                    continue
+                for event in decoder.feed(data):
+                    if event.data == "[DONE]":
+                        finished = True
+                        break
+                    content = _event_content(event, on_usage)
+                    if content:
+                        yield content
+            if not finished:
+                for event in decoder.finish():
+                    if event.data == "[DONE]":
+                        break
+                    content = _event_content(event, on_usage)
+                    if content:
+                        yield content
+        finally:
+            response.release()
+
+    async def chat(self, model, messages, temperature=None, max_tokens=None):
+        body = _chat_body(model, messages, temperature, max_tokens, stream=False)
+        response = await self._request("POST", "/chat/completions", body)
+        await _raise_for_status(response)
+        payload = json.loads(await response.read())
+        if payload.get("error"):
+            raise APIError(f"API Error: {payload['error'].get('message', payload['error'])}")
+        choices = payload.get("choices") or []
+        if not choices:
+            raise APIError("Empty choices - no response from API")
+        return choices[0]["message"]["content"]
+
+    async def models(self):
+        response = await self._request("GET", "/models")
+        await _raise_for_status(response)
+        payload = json.loads(await response.read())
+        return [model["id"] for model in payload.get("data", [])]
+
+    async def models_if_changed(self, etag=None, last_modified=None):
+        """The models with their details, unless unchanged since the response with these validators.
+
+        Returns ``(models, etag, last_modified)``. ``models`` is the list of
+        model dicts as the API describes them (id, name, owner, context
+        length, capabilities, pricing), or None when the server answers 304
+        Not Modified.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = await self._request("GET", "/models?detailed=true", extra_headers=headers)
+        if response.status == 304:
+            await response.read()
+            return None, response.headers.get("etag", etag), response.headers.get("last-modified", last_modified)
+        await _raise_for_status(response)
+        payload = json.loads(await response.read())
+        models = [model for model in payload.get("data", []) if isinstance(model, dict) and "id" in model]
+        return models, response.headers.get("etag"), response.headers.get("last-modified")
+
+    async def _request(self, method, path, body=None, accept="application/json", extra_headers=None):
+        target = (self._host, self._port, self._use_ssl)
+        if isinstance(body, str):
+            payload = body.encode()
+        else:
+            payload = json.dumps(body).encode() if body is not None else b""
+        head = (f"{method} {self._path}{path} HTTP/1.1\r\n"
+                f"Host: {self._host}\r\n"
+                f"Authorization: Bearer {self.api_key}\r\n"
+                f"Accept: {accept}\r\n"
+                f"User-Agent: {USER_AGENT}\r\n"
+                f"Connection: keep-alive\r\n")
+        for name, value in (extra_headers or {}).items():
+            head += f"{name}: {value}\r\n"
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+        request = (head + "\r\n").encode() + payload
+
+        while True:
+            connection = await self._pool.acquire(*target)
+            try:
+                connection.writer.write(request)
+                await connection.writer.drain()
+                status, headers = await _read_head(connection.reader)
+            except (ConnectionError, asyncio.IncompleteReadError, EOFError) as e:
+                self._pool.release(*target, connection, False)
+                if connection.reused:
+                    # The server closed the idle connection; retry on a new one
+                    continue
+                raise APIError(f"Connection failed: {e}", transient=True) from e
+            except BaseException:
+                self._pool.release(*target, connection, False)
+                raise
+            return _Response(self, target, connection, status, headers)
+
+    async def aclose(self):
+        self._pool.close()
+
+    # Blocking API with the same surface as nanogpt_core.PyNanoGPTClient
+
+    def chat_completion_stream(self, model, messages, temperature=None, max_tokens=None,
+                               top_p=None, frequency_penalty=None, presence_penalty=None):
+        return ChunkStream(self, model, messages, temperature, max_tokens, top_p,
+                           frequency_penalty, presence_penalty)
+
+    def chat_completion_stream_raw(self, model, messages_json, temperature=None, max_tokens=None,
+                                   top_p=None, frequency_penalty=None, presence_penalty=None):
+        """Like ``chat_completion_stream``, with the messages already encoded as a JSON array."""
+        return ChunkStream(self, model, messages_json, temperature, max_tokens, top_p,
+                           frequency_penalty, presence_penalty)
+
+    def chat_completion_sync(self, model, messages, temperature=None, max_tokens=None):
+        return self._run(self.chat(model, messages, temperature, max_tokens))
+
+    def list_models(self):
+        return self._run(self.models())
+
+    def list_models_if_changed(self, etag=None, last_modified=None):
+        return self._run(self.models_if_changed(etag, last_modified))
+
+    def close(self):
+        self._run(self.aclose())
+
+    def _run(self, coroutine):
+        self._check_thread()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _check_thread(self):
+        if threading.current_thread().name == "api-loop":
+            raise RuntimeError("Blocking client calls cannot be made from the client's event loop")
+
+
+class ChunkStream:
+    """Iterator over a streamed completion, fed from the client's event loop.
+
+    ``ttfb_ms`` is the time from sending the request to the first byte of
+    the response body. ``usage`` is the token usage dict reported by the
+    final chunk, or None if there was none. Closing the iterator, or
+    dropping it, cancels the request.
+    """
+
+    def __init__(self, client, *args):
+        client._check_thread()
+        self.ttfb_ms = None
+        self.usage = None
+        self._closed = False
+        self._queue = queue.Queue()
+        self._future = asyncio.run_coroutine_threadsafe(self._pump(client, args), client._loop)
+
+    async def _pump(self, client, args):
+        chunks = client.stream_chat(*args, on_first_byte=self._on_first_byte, on_usage=self._on_usage)
+        try:
+            async for content in chunks:
+                # asyncio.wait_for can swallow a cancellation that lands as its
+                # read completes (before Python 3.12), so closing is checked too
+                if self._closed:
+                    break
+                self._queue.put(content)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not isinstance(e, APIError):
+                transient = isinstance(e, (OSError, TimeoutError, asyncio.TimeoutError))
+                e = APIError(str(e) or type(e).__name__, transient=transient)
+            self._queue.put(e)
+        finally:
+            # Releases the connection now, closing it if the body was not read to the end
+            await chunks.aclose()
+            self._queue.put(_END)
+
+    def _on_first_byte(self, elapsed_ms):
+        self.ttfb_ms = elapsed_ms
+
+    def _on_usage(self, usage):
+        self.usage = usage
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = self._queue.get()
+        if item is _END or self._closed:
+            self._queue.put(_END)
+            raise StopIteration
+        if isinstance(item, Exception):
+            self._queue.put(_END)
+            raise item
+        return item
+
+    def close(self):
+        """Abort the request; chunks not yet read are discarded. Safe from any thread."""
+        self._closed = True
+        self._future.cancel()
+        # A request cancelled before it started never reaches _pump's finally
+        self._queue.put(_END)
+
+    def __del__(self):
+        # __init__ may have failed before the request was scheduled
+        if getattr(self, "_future", None) is not None:
+            self.close()
+
+
+def _chat_body(model, messages, temperature=None, max_tokens=None, top_p=None,
+               frequency_penalty=None, presence_penalty=None, stream=False):
+    """The request body: a dict, or a JSON string when ``messages`` is already encoded."""
+    body = {"model": model, "stream": stream}
+    if stream:
+        # The last chunk then reports the tokens used
+        body["stream_options"] = {"include_usage": True}
+    for key, value in (("temperature", temperature), ("max_tokens", max_tokens), ("top_p", top_p),
+                       ("frequency_penalty", frequency_penalty),
+                       ("presence_penalty", presence_penalty)):
+        if value is not None:
+            body[key] = value
+    if isinstance(messages, str):
+        # Splice the encoded messages in rather than decoding and encoding them again
+        return "".join((json.dumps(body)[:-1], ',"messages":', messages, "}"))
+    body["messages"] = [{"role": role, "content": content} for role, content in messages]
+    return body
+
+
+async def _read_head(reader):
+    status_line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+    if not status_line:
+        raise EOFError("connection closed")
+    try:
+        status = int(status_line.split(None, 2)[1])
+    except (IndexError, ValueError):
+        raise APIError(f"Malformed response: {status_line[:80]!r}") from None
+    headers = {}
+    while True:
+        line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+        if line in (b"\r\n", b"\n", b""):
+            return status, headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def _raise_for_status(response):
+    if response.status < 400:
+        return
+    body = (await response.read()).decode("utf-8", "replace")
+    try:
+        message = json.loads(body)["error"]["message"]
+    except (ValueError, KeyError, TypeError):
+        message = body.strip() or "no details"
+    raise APIError(f"API Error ({response.status}): {message}", status=response.status,
+                   retry_after=parse_retry_after(response.headers.get("retry-after")))
+
+
+def _event_content(event, on_usage=None):
+    """Content delta of one streamed completion chunk, or None.
+
+    A usage report in the chunk is passed to ``on_usage``.
+    """
+    try:
+        chunk = json.loads(event.data)
+    except ValueError:
+        return None
+    if not isinstance(chunk, dict):
+        return None
+    if on_usage is not None and isinstance(chunk.get("usage"), dict):
+        on_usage(chunk["usage"])
+    choices = chunk.get("choices") or []
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content")
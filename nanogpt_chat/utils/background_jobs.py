@@ -0,0 +1,282 @@
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from nanogpt_chat.utils.database_service import PRIORITY_BACKGROUND
+from nanogpt_chat.utils.request_scheduler import PRIORITY_BACKGROUND as REQUEST_PRIORITY_BACKGROUND
+
+JOB_TITLE = "title"
+JOB_SUMMARY = "summary"
+
+DEFAULT_MODEL = "gpt-4o-mini"
+JOB_TEMPERATURE = 0.3
+# Failed jobs are tried again on later launches, this many times in all
+MAX_ATTEMPTS = 3
+
+# A title is made from the start of the conversation
+TITLE_MESSAGES = 4
+TITLE_MAX_TOKENS = 24
+TITLE_MAX_CHARS = 60
+TITLE_PROMPT = ("Write a short title, at most six words, for the conversation below. "
+                "Reply with the title alone, without quotes or a trailing full stop.")
+
+# A summary covers the newest messages, and is redone once this many more arrive
+SUMMARY_MESSAGES = 100
+SUMMARY_MIN_MESSAGES = 6
+SUMMARY_EVERY = 10
+SUMMARY_MAX_TOKENS = 300
+SUMMARY_PROMPT = ("Summarise the conversation below in two or three sentences, "
+                  "naming the topics discussed and any conclusions reached.")
+
+# Each message is cut to this many characters in the transcript sent
+MESSAGE_CHARS = 2000
+
+
+def _pending_jobs(db):
+    if not hasattr(db, "get_jobs"):
+        return []
+    return [(job.session_id, job.kind, job.attempts) for job in db.get_jobs()]
+
+
+def _enqueue_job(db, session_id, kind):
+    if hasattr(db, "enqueue_job"):
+        db.enqueue_job(session_id, kind)
+
+
+def _finish_job(db, session_id, kind):
+    if hasattr(db, "finish_job"):
+        db.finish_job(session_id, kind)
+
+
+def _record_attempt(db, session_id, kind, max_attempts):
+    # Kept for a later launch until it has failed max_attempts times
+    if not hasattr(db, "record_job_attempt"):
+        return
+    if db.record_job_attempt(session_id, kind) >= max_attempts:
+        db.finish_job(session_id, kind)
+
+
+def _title_messages(db, session_id):
+    return db.get_messages_paginated(session_id, TITLE_MESSAGES, 0)
+
+
+def _summary_messages(db, session_id):
+    """The newest messages and the session's message count, or None if the summary is current."""
+    count = db.count_messages(session_id)
+    previous = db.get_session_summary(session_id) if hasattr(db, "get_session_summary") else None
+    if count < SUMMARY_MIN_MESSAGES or (previous is not None and count - previous[1] < SUMMARY_EVERY):
+        return None
+    messages, _ = db.get_messages_before(session_id, SUMMARY_MESSAGES)
+    return messages, count
+
+
+def _save_summary(db, session_id, summary, count):
+    if hasattr(db, "set_session_summary"):
+        db.set_session_summary(session_id, summary, count)
+
+
+def transcript(messages):
+    """The messages as plain text to quote in a request, each cut to ``MESSAGE_CHARS``."""
+    lines = []
+    for message in messages:
+        content = message.content.strip()
+        if len(content) > MESSAGE_CHARS:
+            content = content[:MESSAGE_CHARS] + "…"
+        lines.append(f"{message.role.capitalize()}: {content}")
+    return "\n\n".join(lines)
+
+
+def clean_title(reply):
+    """The title in a model's reply: its first line without quotes, labels or a full stop."""
+    lines = [line.strip() for line in (reply or "").splitlines() if line.strip()]
+    if not lines:
+        return ""
+    title = lines[0]
+    if title.lower().startswith("title:"):
+        title = title[len("title:"):].strip()
+    title = title.strip("\"'“”*# ").rstrip(".")
+    if len(title) > TITLE_MAX_CHARS:
+        title = title[:TITLE_MAX_CHARS].rsplit(" ", 1)[0] + "…"
+    return title
+
+
+class BackgroundJobQueue(QObject):
+    """Runs auxiliary model requests for sessions, such as naming them, one at a time.
+
+    Jobs are a session and a kind, ``JOB_TITLE`` or ``JOB_SUMMARY``; a
+    session has at most one queued job of each kind, so queueing it again
+    does nothing. Jobs are stored in the database and the ones left when
+    the application stopped run after the next launch. Each job reads the
+    session when it runs, so it always works from the latest messages.
+
+    Requests go to the cheap ``model`` at background priority, so the
+    request scheduler holds them back while an interactive stream is in
+    flight. A job that fails is dropped until the next launch and given up
+    after ``MAX_ATTEMPTS`` failed runs. ``job_done`` and ``job_failed`` are
+    delivered on the GUI thread; a title or summary has already been saved
+    when ``job_done`` is emitted.
+    """
+
+    job_done = pyqtSignal(str, str, str)     # kind, session id, title or summary
+    job_failed = pyqtSignal(str, str, str)   # kind, session id, error
+
+    def __init__(self, db_service, api_client, model=DEFAULT_MODEL, max_attempts=MAX_ATTEMPTS,
+                 parent=None):
+        super().__init__(parent)
+        self._db_service = db_service
+        self.max_attempts = max_attempts
+        self._cond = threading.Condition()
+        # (session id, kind) of queued jobs, oldest first
+        self._pending = {}
+        self._running = None
+        self._running_cancelled = False
+        self._stopped = False
+        self.set_client(api_client, model)
+        self._thread = threading.Thread(target=self._run, name="background-jobs", daemon=True)
+        self._thread.start()
+
+    def set_client(self, api_client, model=DEFAULT_MODEL):
+        """Send later jobs through ``api_client`` to ``model``."""
+        if api_client is not None and hasattr(api_client, "with_priority"):
+            api_client = api_client.with_priority(REQUEST_PRIORITY_BACKGROUND)
+        with self._cond:
+            self._client = api_client
+            self.model = model
+            self._cond.notify_all()
+
+    @property
+    def pending(self):
+        """(session id, kind) of the queued jobs, oldest first."""
+        with self._cond:
+            return list(self._pending)
+
+    @property
+    def busy(self):
+        with self._cond:
+            return self._running is not None or bool(self._pending)
+
+    def enqueue(self, session_id, kind):
+        """Queue a job unless the session already has one of this kind waiting."""
+        key = (session_id, kind)
+        with self._cond:
+            if self._stopped or key in self._pending:
+                return False
+            self._pending[key] = None
+            # Submitted under the lock, so it is written before the job can finish
+            self._db_service.submit(_enqueue_job, session_id, kind, priority=PRIORITY_BACKGROUND)
+            self._cond.notify_all()
+        return True
+
+    def cancel(self, session_id, kind=None):
+        """Drop a session's jobs of ``kind``, or all of them; a running one is not saved."""
+        with self._cond:
+            kinds = [kind] if kind is not None else [k for s, k in self._pending if s == session_id]
+            for k in kinds:
+                if (session_id, k) in self._pending:
+                    del self._pending[(session_id, k)]
+                    self._db_service.submit(_finish_job, session_id, k, priority=PRIORITY_BACKGROUND)
+            running = self._running
+            if running is not None and running[0] == session_id and kind in (None, running[1]):
+                self._running_cancelled = True
+
+    def shutdown(self, timeout=None):
+        """Stop taking jobs; queued ones stay stored for the next launch."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        self._load()
+        while True:
+            with self._cond:
+                while not self._stopped and (not self._pending or self._client is None):
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                key = next(iter(self._pending))
+                del self._pending[key]
+                self._running = key
+                self._running_cancelled = False
+                client, model = self._client, self.model
+            session_id, kind = key
+            try:
+                result = self._run_job(client, model, session_id, kind)
+            except Exception as e:
+                self._failed(session_id, kind, e)
+            else:
+                if result is not None:
+                    self.job_done.emit(kind, session_id, result)
+            finally:
+                with self._cond:
+                    self._running = None
+
+    def _load(self):
+        try:
+            jobs = self._db_service.call(_pending_jobs, priority=PRIORITY_BACKGROUND)
+        except Exception as e:
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Could not load background jobs: {e}")
+            return
+        with self._cond:
+            for session_id, kind, _ in jobs:
+                self._pending.setdefault((session_id, kind), None)
+        if jobs:
+            from nanogpt_chat.utils.logger import logger
+            logger.info(f"Resuming {len(jobs)} background jobs")
+
+    def _run_job(self, client, model, session_id, kind):
+        # Returns the title or summary saved, or None if there was nothing to do
+        db = self._db_service
+        result = None
+        if kind == JOB_TITLE:
+            messages = db.call(_title_messages, session_id, priority=PRIORITY_BACKGROUND)
+            if messages and self._still_wanted():
+                reply = client.chat_completion_sync(
+                    model, [("system", TITLE_PROMPT), ("user", transcript(messages))],
+                    JOB_TEMPERATURE, TITLE_MAX_TOKENS)
+                title = clean_title(reply)
+                if title and self._still_wanted():
+                    db.call("update_session_title", session_id, title, priority=PRIORITY_BACKGROUND)
+                    result = title
+        elif kind == JOB_SUMMARY:
+            found = db.call(_summary_messages, session_id, priority=PRIORITY_BACKGROUND)
+            if found is not None and self._still_wanted():
+                messages, count = found
+                reply = client.chat_completion_sync(
+                    model, [("system", SUMMARY_PROMPT), ("user", transcript(messages))],
+                    JOB_TEMPERATURE, SUMMARY_MAX_TOKENS)
+                summary = (reply or "").strip()
+                if summary and self._still_wanted():
+                    db.call(_save_summary, session_id, summary, count, priority=PRIORITY_BACKGROUND)
+                    result = summary
+        else:
+            raise ValueError(f"Unknown background job kind: {kind}")
+        self._finished(session_id, kind)
+        return result
+
+    def _still_wanted(self):
+        # False once the running job was cancelled, e.g. by the user renaming
+        # the session, or the queue shut down
+        with self._cond:
+            return not self._running_cancelled and not self._stopped
+
+    def _finished(self, session_id, kind):
+        with self._cond:
+            # Queued again while it ran: the stored job stands for the new one
+            if (session_id, kind) in self._pending or self._stopped:
+                return
+            self._db_service.submit(_finish_job, session_id, kind, priority=PRIORITY_BACKGROUND)
+
+    def _failed(self, session_id, kind, error):
+        from nanogpt_chat.utils.logger import logger
+        logger.warning(f"Background {kind} job for session {session_id} failed: {error}")
+        with self._cond:
+            if (session_id, kind) in self._pending or self._stopped:
+                pass
+            elif self._running_cancelled:
+                self._db_service.submit(_finish_job, session_id, kind, priority=PRIORITY_BACKGROUND)
+            else:
+                self._db_service.submit(_record_attempt, session_id, kind, self.max_attempts,
+                                        priority=PRIORITY_BACKGROUND)
+        self.job_failed.emit(kind, session_id, str(error))
@@ -0,0 +1,43 @@
+import threading
+
+
+class CancellationToken:
+    """Cancels work running on another thread, from any thread.
+
+    Work polls ``cancelled`` between steps, and registers callbacks with
+    ``add_callback`` to interrupt a step that blocks, such as closing the
+    stream it is reading. Callbacks run once, on the thread that calls
+    ``cancel()``; one added after cancellation runs straight away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run(callback)
+
+    def add_callback(self, callback):
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        self._run(callback)
+
+    def _run(self, callback):
+        try:
+            callback()
+        except Exception as e:
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Cancellation callback failed: {e}")
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+
+DEFAULT_CONTEXT_LENGTH = 8192
+# Room left for the reply when the request sets no max_tokens
+DEFAULT_REPLY_TOKENS = 1024
+# Estimates are rough, so part of the window is never filled
+SAFETY_MARGIN = 0.05
+# Role, separators and framing the API adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+# A typical image part, at the provider's default detail level
+IMAGE_TOKENS = 765
+CHARS_PER_TOKEN = 4
+DEFAULT_CACHE_SIZE = 8192
+
+# Context lengths by model id prefix; the longest matching prefix wins
+MODEL_CONTEXT_LENGTHS = {
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+    "chatgpt-4o": 128000,
+    "claude": 200000,
+    "gemini-1.5": 1048576,
+    "gemini-2": 1048576,
+    "deepseek": 65536,
+    "mistral-large": 128000,
+    "llama-3.1": 131072,
+    "llama-3.2": 131072,
+    "llama-3.3": 131072,
+    "llama-3": 8192,
+    "qwen": 32768,
+}
+
+
+def context_length_for(model, overrides=None):
+    """Context length of ``model`` in tokens, from ``overrides`` or the known models."""
+    if overrides and model in overrides:
+        return overrides[model]
+    # Provider prefixes such as "openai/gpt-4o" do not change the model
+    name = model.lower().rsplit("/", 1)[-1]
+    best = None
+    for prefix in MODEL_CONTEXT_LENGTHS:
+        if name.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return MODEL_CONTEXT_LENGTHS[best] if best is not None else DEFAULT_CONTEXT_LENGTH
+
+
+class ContextWindow:
+    """The messages chosen for one request and what was left out."""
+
+    __slots__ = ("messages", "tokens", "budget", "dropped")
+
+    def __init__(self, messages, tokens, budget, dropped):
+        # (role, content) pairs, system prompt first
+        self.messages = messages
+        self.tokens = tokens
+        self.budget = budget
+        # Older messages left out to fit the budget
+        self.dropped = dropped
+
+
+class ContextBuilder:
+    """Chooses which messages of a conversation to send with a request.
+
+    The system prompt is always sent, then as many of the newest messages
+    as fit in the model's context length, less the ``max_tokens`` reserved
+    for the reply and a safety margin. The newest message is sent even if
+    it alone is over the budget, so the API reports the error.
+
+    Token counts are estimated from message length and cached by content,
+    so a long conversation is not re-measured on every turn.
+    """
+
+    def __init__(self, context_lengths=None, cache_size=DEFAULT_CACHE_SIZE):
+        # Per-model context lengths that take precedence over the known models
+        self.context_lengths = dict(context_lengths or {})
+        self.cache_size = cache_size
+        self._estimates = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def set_context_length(self, model, tokens):
+        self.context_lengths[model] = tokens
+
+    def budget_for(self, model, max_tokens=None, context_length=None):
+        """Tokens available for the prompt of a request to ``model``.
+
+        ``context_length`` overrides the model's own, e.g. from settings.
+        """
+        context_length = context_length or context_length_for(model, self.context_lengths)
+        reply = max_tokens or min(DEFAULT_REPLY_TOKENS, context_length // 4)
+        return max(0, int(context_length * (1 - SAFETY_MARGIN)) - reply)
+
+    def build(self, messages, model, system_prompt=None, max_tokens=None, context_length=None):
+        """Choose the messages to send; ``messages`` are dicts with role and content."""
+        budget = self.budget_for(model, max_tokens, context_length)
+        head = []
+        used = 0
+        if system_prompt:
+            head.append(("system", system_prompt))
+            used = self.estimate(system_prompt)
+
+        tail = []
+        for message in reversed(messages):
+            tokens = self.estimate(message["content"])
+            if used + tokens > budget and tail:
+                break
+            tail.append((message["role"], message["content"]))
+            used += tokens
+        tail.reverse()
+        return ContextWindow(head + tail, used, budget, len(messages) - len(tail))
+
+    def estimate(self, content):
+        """Estimated tokens of one message's content, overhead included."""
+        if not isinstance(content, str):
+            # Multimodal parts are counted directly; their text is short
+            return MESSAGE_OVERHEAD_TOKENS + _estimate_parts(content)
+        tokens = self._estimates.get(content)
+        if tokens is not None:
+            self.cache_hits += 1
+            self._estimates.move_to_end(content)
+            return tokens
+        self.cache_misses += 1
+        tokens = MESSAGE_OVERHEAD_TOKENS + _estimate_text(content)
+        self._estimates[content] = tokens
+        if len(self._estimates) > self.cache_size:
+            self._estimates.popitem(last=False)
+        return tokens
+
+
+def _estimate_text(text):
+    if text.isascii():
+        return -(-len(text) // CHARS_PER_TOKEN)
+    # Non-Latin scripts take about a token per character
+    wide = sum(1 for ch in text if ord(ch) > 0x2FF)
+    return -(-(len(text) - wide) // CHARS_PER_TOKEN) + wide
+
+
+def _estimate_parts(parts):
+    tokens = 0
+    for part in parts or ():
+        if not isinstance(part, dict):
+            continue
+        if part.get("type") == "text":
+            tokens += _estimate_text(part.get("text", ""))
+        else:
+            tokens += IMAGE_TOKENS
+    return tokens
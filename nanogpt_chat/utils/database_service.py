@@ -0,0 +1,153 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from nanogpt_chat.exceptions import DatabaseError
+
+# Lower runs first. Within a priority, jobs run in submission order.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+_STOP = object()
+
+
+class DatabaseJob:
+    __slots__ = ("fn", "args", "future", "callback", "errback", "key", "quiet")
+
+    def __init__(self, fn, args, future, callback, errback, key, quiet=False):
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.callback = callback
+        self.errback = errback
+        self.key = key
+        self.quiet = quiet
+
+
+class DatabaseService(QObject):
+    """Owns the database on a dedicated thread and runs queued operations on it.
+
+    ``submit`` takes either the name of a database method or a callable that
+    receives the database as its first argument, and returns a
+    ``concurrent.futures.Future``. ``callback`` and ``errback`` are invoked
+    on the thread that owns the service (the GUI thread), so they may touch
+    widgets.
+
+    Jobs are ordered by priority: interactive reads overtake queued
+    background writes, so a read may not yet see a write that is still
+    waiting. Submitting a job with the same ``key`` as one that has not
+    started yet cancels the older one, which keeps bursts of writes such as
+    spinbox ticks down to the last value. Failures of jobs without an
+    ``errback`` are logged.
+
+    The database is opened on the worker thread by ``db_factory``; if it
+    returns None, every job fails with ``DatabaseError``.
+    """
+
+    _job_done = pyqtSignal(object, object, object)   # job, result, error
+
+    def __init__(self, db_factory, parent=None):
+        super().__init__(parent)
+        self._db_factory = db_factory
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._keyed = {}
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._job_done.connect(self._on_job_done)
+        self._thread = threading.Thread(target=self._run, name="database", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, priority=PRIORITY_INTERACTIVE, callback=None, errback=None,
+               key=None):
+        return self._submit(DatabaseJob(fn, args, Future(), callback, errback, key), priority)
+
+    def call(self, fn, *args, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """Run a job and wait for its result; failures are raised, not logged.
+
+        Never call this from a database job: the worker would wait on itself.
+        """
+        job = DatabaseJob(fn, args, Future(), None, None, None, quiet=True)
+        return self._submit(job, priority).result(timeout)
+
+    def _submit(self, job, priority):
+        with self._lock:
+            if self._stopped:
+                raise DatabaseError("Database service has been shut down")
+            if job.key is not None:
+                previous = self._keyed.get(job.key)
+                if previous is not None:
+                    previous.future.cancel()
+                self._keyed[job.key] = job
+            self._queue.put((priority, next(self._order), job))
+        return job.future
+
+    @property
+    def pending_count(self):
+        return self._queue.qsize()
+
+    def shutdown(self, wait=True, timeout=None):
+        """Stop accepting jobs; queued jobs still run before the thread exits."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put((PRIORITY_BACKGROUND + 1, next(self._order), _STOP))
+        if wait:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            db = self._db_factory()
+        except Exception as e:
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Failed to open database: {e}")
+            db = None
+
+        while True:
+            _, _, job = self._queue.get()
+            if job is _STOP:
+                return
+            with self._lock:
+                if job.key is not None and self._keyed.get(job.key) is job:
+                    del self._keyed[job.key]
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                if db is None:
+                    raise DatabaseError("Database is not available")
+                fn = getattr(db, job.fn) if isinstance(job.fn, str) else job.fn
+                result = fn(*job.args) if isinstance(job.fn, str) else fn(db, *job.args)
+            except Exception as e:
+                job.future.set_exception(e)
+                if not job.quiet:
+                    self._job_done.emit(job, None, e)
+                continue
+            job.future.set_result(result)
+            if job.callback is not None:
+                self._job_done.emit(job, result, None)
+
+    def _on_job_done(self, job, result, error):
+        if error is None:
+            job.callback(result)
+        elif job.errback is not None:
+            job.errback(error)
+        else:
+            from nanogpt_chat.utils.logger import logger
+            name = job.fn if isinstance(job.fn, str) else getattr(job.fn, "__name__", "job")
+            logger.error(f"Database {name} failed: {error}")
+
+
+_database_service = None
+
+
+def get_database_service():
+    global _database_service
+    if _database_service is None:
+        from nanogpt_chat.utils import get_database
+        _database_service = DatabaseService(get_database)
+    return _database_service
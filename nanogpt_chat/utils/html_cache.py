@@ -0,0 +1,171 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MEMORY_LIMIT = 16 * 1024 * 1024
+DEFAULT_DISK_LIMIT = 128 * 1024 * 1024
+# Disk eviction trims down to this fraction of the limit to avoid evicting on every put
+_DISK_LOW_WATERMARK = 0.9
+
+
+def make_cache_key(content, theme, text_color, font_px, renderer_signature=""):
+    """Content-addressed key for a rendered message.
+
+    ``renderer_signature`` identifies the markdown extensions and stylesheet
+    so that changing either invalidates old entries automatically.
+    """
+    digest = hashlib.sha256()
+    for part in (renderer_signature, theme or "", text_color, str(font_px), content):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RenderedHtmlCache:
+    """Two-level cache of rendered message HTML.
+
+    An in-memory LRU sits in front of an SQLite file on disk. Both layers
+    are bounded by the total size of the HTML they hold and evict least
+    recently used entries first. All methods are thread-safe.
+    """
+
+    def __init__(self, path=None, memory_limit=DEFAULT_MEMORY_LIMIT, disk_limit=DEFAULT_DISK_LIMIT):
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        self._disk_size = 0
+        if path is not None:
+            self._open_disk(path)
+
+    def _open_disk(self, path):
+        try:
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rendered_html ("
+                " key TEXT PRIMARY KEY,"
+                " html TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_rendered_html_last_used ON rendered_html(last_used)"
+            )
+            self._db.commit()
+            row = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM rendered_html").fetchone()
+            self._disk_size = row[0]
+        except sqlite3.Error as e:
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Render cache unavailable, continuing in memory only: {e}")
+            self._db = None
+
+    def get_memory(self, key):
+        """Look up only the in-memory layer. Cheap enough for the GUI thread."""
+        with self._lock:
+            html = self._memory.get(key)
+            if html is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return html
+
+    def get(self, key):
+        """Look up memory, then disk. Disk hits are promoted into memory."""
+        html = self.get_memory(key)
+        if html is not None:
+            return html
+
+        with self._lock:
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT html FROM rendered_html WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        self._db.execute(
+                            "UPDATE rendered_html SET last_used = ? WHERE key = ?", (time.time(), key)
+                        )
+                        self._db.commit()
+                        self.disk_hits += 1
+                        self._remember(key, row[0])
+                        return row[0]
+                except sqlite3.Error:
+                    pass
+            self.misses += 1
+            return None
+
+    def put(self, key, html):
+        with self._lock:
+            self._remember(key, html)
+            if self._db is None:
+                return
+            size = len(html)
+            try:
+                old = self._db.execute("SELECT size FROM rendered_html WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO rendered_html (key, html, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, html, size, time.time()),
+                )
+                self._disk_size += size - (old[0] if old else 0)
+                if self._disk_size > self.disk_limit:
+                    self._evict_disk()
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM rendered_html")
+                self._db.commit()
+                self._disk_size = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key, html):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = html
+        self._memory_size += len(html)
+        while self._memory_size > self.memory_limit and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self):
+        target = int(self.disk_limit * _DISK_LOW_WATERMARK)
+        rows = self._db.execute("SELECT key, size FROM rendered_html ORDER BY last_used ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._disk_size <= target:
+                break
+            doomed.append((key,))
+            self._disk_size -= size
+        self._db.executemany("DELETE FROM rendered_html WHERE key = ?", doomed)
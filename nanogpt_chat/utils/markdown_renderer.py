@@ -0,0 +1,153 @@
+import re
+import threading
+
+try:
+    import markdown
+    from markdown.postprocessors import Postprocessor
+except ImportError:
+    markdown = None
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'codehilite', 'tables', 'nl2br']
+
+# Mirrors the opening-fence rule of Python-Markdown's fenced_code extension
+_FENCE_RE = re.compile(
+    r'^(?P<fence>~{3,}|`{3,})[ ]*'
+    r'(\{[^\n]*\}|\.?[\w#.+-]*[ ]*(hl_lines=(?P<quot>"|\').*?(?P=quot)[ ]*)?)$'
+)
+# Lines that may continue the previous block even after a blank line
+# (indented content, list items, blockquotes)
+_CONTINUATION_RE = re.compile(r'^([ \t]|[*+-]([ \t]|$)|\d+[.)]([ \t]|$)|>)')
+# Constructs that make a block's HTML depend on the rest of the document
+# (reference definitions, raw HTML blocks) or on whitespace normalisation
+_NON_LOCAL_RE = re.compile(r'^ {0,3}(<|\[[^\]]+\]:)|\r')
+
+_local = threading.local()
+
+if markdown is not None:
+    class _CaptureOutput(Postprocessor):
+        """Keeps the serialized output before Markdown.convert() strips it."""
+
+        def run(self, text):
+            self.md.unstripped_output = text
+            return text
+
+
+def _get_markdown():
+    md = getattr(_local, "md", None)
+    if md is None:
+        md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        md.postprocessors.register(_CaptureOutput(md), 'capture_output', 0)
+        _local.md = md
+    return md
+
+
+def _render_unstripped(text):
+    md = _get_markdown()
+    md.reset()
+    md.convert(text)
+    return md.unstripped_output
+
+
+def render_markdown(text):
+    """Render a full message to HTML with the chat's markdown extensions."""
+    if markdown is None:
+        return text.replace("\n", "<br>")
+    return _get_markdown().reset().convert(text)
+
+
+class IncrementalMarkdownRenderer:
+    """Renders a growing markdown document one top-level block at a time.
+
+    The document is split at blank lines outside fenced code. A block is
+    only committed once the first line of the following block is complete
+    and cannot continue it, after which its HTML is cached and never
+    rendered again. Each call to ``html()`` re-renders only the trailing
+    open block, and the result always equals ``render_markdown`` over the
+    whole source. Documents with reference definitions or raw HTML blocks
+    fall back to full renders.
+    """
+
+    def __init__(self, text=""):
+        self.reset(text)
+
+    def reset(self, text=""):
+        self._committed_source = []
+        self._committed_html = []
+        self._tail = ""
+        self._pending = [text] if text else []
+        self._full_render = markdown is None
+
+    def append(self, delta):
+        if delta:
+            self._pending.append(delta)
+
+    @property
+    def source(self):
+        self._absorb_pending()
+        return "".join(self._committed_source) + self._tail
+
+    @property
+    def committed_blocks(self):
+        return len(self._committed_html)
+
+    def html(self):
+        self._absorb_pending()
+        if self._full_render:
+            return render_markdown(self.source)
+
+        self._commit_complete_blocks()
+        if self._full_render:
+            return render_markdown(self.source)
+
+        parts = list(self._committed_html)
+        if self._tail.strip(" \t\n"):
+            parts.append(_render_unstripped(self._tail))
+        return "\n".join(parts).strip()
+
+    def _absorb_pending(self):
+        if self._pending:
+            self._tail += "".join(self._pending)
+            self._pending.clear()
+
+    def _commit_complete_blocks(self):
+        tail = self._tail
+        block_start = 0
+        pos = 0
+        fence = None
+        seen_content = False
+        after_blank = False
+
+        while True:
+            newline = tail.find("\n", pos)
+            if newline < 0:
+                break  # the last line is incomplete and cannot be classified
+            line = tail[pos:newline]
+
+            if _NON_LOCAL_RE.search(line):
+                self._full_render = True
+                break
+
+            if fence is not None:
+                if line.rstrip(" ") == fence:
+                    fence = None
+            elif not line.strip(" \t"):
+                after_blank = seen_content
+            else:
+                if after_blank and not _CONTINUATION_RE.match(line):
+                    self._commit(tail[block_start:pos])
+                    block_start = pos
+                after_blank = False
+                seen_content = True
+                match = _FENCE_RE.match(line)
+                if match:
+                    fence = match.group('fence')
+            pos = newline + 1
+
+        if _NON_LOCAL_RE.search(tail[pos:]):
+            self._full_render = True
+        if block_start:
+            self._tail = tail[block_start:]
+
+    def _commit(self, block):
+        self._committed_source.append(block)
+        self._committed_html.append(_render_unstripped(block))
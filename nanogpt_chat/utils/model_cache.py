@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+
+from nanogpt_chat.utils.model_catalog import ModelCatalog
+
+# How long a fetched catalog is used before it is revalidated
+DEFAULT_TTL = 6 * 60 * 60
+CACHE_VERSION = 2
+
+
+class ModelCatalogCache:
+    """The API's model list, kept in a JSON file between launches.
+
+    The cached list is served straight away, fresh or not; once it is older
+    than ``ttl`` seconds ``refresh`` revalidates it against the API. The
+    ``ETag`` and ``Last-Modified`` of the last response are sent back, so a
+    server that supports conditional requests answers 304 instead of the
+    whole list. Each model is kept as the API described it, and
+    ``catalog()`` indexes them for the picker. All methods are thread-safe.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # API entries: dicts of details, or bare ids from older clients
+        self._models = None
+        self._catalog = None
+        self._fetched_at = None
+        self._etag = None
+        self._last_modified = None
+        if path is not None:
+            self._load()
+
+    @property
+    def models(self):
+        """The cached model ids, or None if the catalog was never fetched."""
+        with self._lock:
+            if self._models is None:
+                return None
+            return [model if isinstance(model, str) else model["id"] for model in self._models]
+
+    def catalog(self):
+        """The cached models indexed for searching, built once per change."""
+        with self._lock:
+            if self._catalog is None:
+                self._catalog = ModelCatalog(self._models or ())
+            return self._catalog
+
+    @property
+    def age(self):
+        """Seconds since the catalog was last fetched or revalidated."""
+        with self._lock:
+            if self._fetched_at is None:
+                return None
+            return max(0.0, self._clock() - self._fetched_at)
+
+    @property
+    def is_fresh(self):
+        age = self.age
+        return age is not None and age < self.ttl
+
+    def lookup(self):
+        """The cached model ids for display, logging whether they were a hit."""
+        from nanogpt_chat.utils.logger import logger
+        models, age = self.models, self.age
+        if models is None:
+            logger.info("Model catalog cache miss")
+            return None
+        state = "fresh" if age < self.ttl else "stale"
+        logger.info(f"Model catalog cache hit: {len(models)} models, {state}, {age / 60:.0f} min old")
+        return models
+
+    def store(self, models, etag=None, last_modified=None):
+        with self._lock:
+            self._models = list(models)
+            self._catalog = None
+            self._fetched_at = self._clock()
+            self._etag = etag
+            self._last_modified = last_modified
+            self._save()
+
+    def refresh(self, client, force=False):
+        """Revalidate the catalog against the API if it is stale or ``force`` is set.
+
+        Returns the current model ids, which are the cached ones when the
+        server reports no change or the catalog is still fresh. Clients
+        without ``list_models_if_changed`` fetch the ids alone.
+        """
+        from nanogpt_chat.utils.logger import logger
+        if not force and self.is_fresh:
+            return self.models
+        with self._lock:
+            etag, last_modified = self._etag, self._last_modified
+            # Without a cached list a 304 would leave nothing to show
+            if self._models is None:
+                etag = last_modified = None
+
+        started = time.perf_counter()
+        if hasattr(client, "list_models_if_changed"):
+            models, etag, last_modified = client.list_models_if_changed(etag, last_modified)
+        else:
+            models, etag, last_modified = client.list_models(), None, None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if models is None:
+            logger.info(f"Model catalog not modified, revalidated in {elapsed_ms:.0f} ms")
+            with self._lock:
+                self._fetched_at = self._clock()
+                self._etag, self._last_modified = etag, last_modified
+                self._save()
+            return self.models
+        logger.info(f"Model catalog refreshed in {elapsed_ms:.0f} ms: {len(models)} models")
+        self.store(models, etag, last_modified)
+        return self.models
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            version = data.get("version")
+            if version not in (1, CACHE_VERSION) or not isinstance(data.get("models"), list):
+                return
+            self._models = [model if isinstance(model, dict) and "id" in model else str(model)
+                            for model in data["models"]]
+            if version == 1:
+                # Ids without details: shown at once, but refetched in full
+                self._fetched_at = 0.0
+                return
+            self._fetched_at = float(data.get("fetched_at") or 0)
+            self._etag = data.get("etag")
+            self._last_modified = data.get("last_modified")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            from nanogpt_chat.utils.logger import logger
+            logger.warning(f"Ignoring unreadable model catalog cache: {e}")
+
+    def _save(self):
+        if self.path is None:
+            return
+        data = {"version": CACHE_VERSION, "models": self._models, "fetched_at": self._fetched_at,
+                "etag": self._etag, "last_modified": self._last_modified}
+        # Written beside the cache and renamed over it, so a crash never leaves half a file
+        temp = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(str(self.path)) or ".", exist_ok=True)
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp, self.path)
+        except OSError as e:
+            from nanogpt_chat.utils.logger import logger
+            logger.error(f"Could not save the model catalog cache: {e}")
+
+
+_model_catalog = None
+
+
+def get_model_catalog():
+    global _model_catalog
+    if _model_catalog is None:
+        from nanogpt_chat.utils import get_data_dir, get_settings
+        ttl = get_settings().get("api", "model_cache_ttl", DEFAULT_TTL)
+        _model_catalog = ModelCatalogCache(get_data_dir() / "model_catalog.json", ttl)
+    return _model_catalog
@@ -0,0 +1,228 @@
+from array import array
+
+# Substrings of up to this many characters are indexed; longer terms are
+# looked up by their trigrams and then checked
+GRAM_SIZE = 3
+_EMPTY = array("I")
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ModelInfo:
+    """What the API reports about one model.
+
+    Built from an entry of the ``/models`` list, or from a bare id when the
+    client does not return details. Fields the API leaves out are None.
+    """
+
+    __slots__ = ("id", "name", "owned_by", "description", "context_length", "capabilities",
+                 "prompt_price", "completion_price", "currency", "search_key")
+
+    def __init__(self, model_id, name=None, owned_by=None, description=None, context_length=None,
+                 capabilities=(), prompt_price=None, completion_price=None, currency=None):
+        self.id = model_id
+        self.name = name or model_id
+        self.owned_by = owned_by
+        self.description = description
+        self.context_length = context_length
+        self.capabilities = frozenset(capabilities)
+        # Per million tokens, in ``currency``
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.currency = currency
+        # Lowercased text the picker matches against
+        self.search_key = " ".join(part for part in (model_id, name, owned_by) if part).lower()
+
+    @property
+    def vision(self):
+        return "vision" in self.capabilities
+
+    def __eq__(self, other):
+        if not isinstance(other, ModelInfo):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return f"ModelInfo({self.id!r})"
+
+    @classmethod
+    def from_entry(cls, entry):
+        """A model from an API entry: a bare id or a dict of details."""
+        if isinstance(entry, ModelInfo):
+            return entry
+        if isinstance(entry, str):
+            return cls(entry)
+        context_length = entry.get("context_length") or entry.get("context_window") \
+            or (entry.get("top_provider") or {}).get("context_length")
+        pricing = entry.get("pricing") or {}
+        return cls(
+            str(entry["id"]),
+            name=entry.get("name"),
+            owned_by=entry.get("owned_by") or entry.get("provider"),
+            description=entry.get("description"),
+            context_length=int(_number(context_length)) if _number(context_length) else None,
+            capabilities=_capabilities(entry),
+            prompt_price=_number(pricing.get("prompt")),
+            completion_price=_number(pricing.get("completion")),
+            currency=pricing.get("currency") or ("USD" if pricing else None),
+        )
+
+    def describe(self):
+        """The name and a line of details, for tooltips."""
+        parts = [self.owned_by] if self.owned_by else []
+        if self.context_length:
+            parts.append(f"{self.context_length:,} tokens")
+        if self.vision:
+            parts.append("vision")
+        if self.prompt_price is not None and self.completion_price is not None:
+            parts.append(f"{self.prompt_price:g} / {self.completion_price:g} {self.currency} per 1M tokens")
+        summary = " · ".join(parts)
+        return f"{self.name}\n{summary}" if summary else self.name
+
+
+def _capabilities(entry):
+    capabilities = entry.get("capabilities") or {}
+    if isinstance(capabilities, dict):
+        found = {name for name, enabled in capabilities.items() if enabled}
+    else:
+        found = {str(name) for name in capabilities}
+    # OpenRouter-style listings describe inputs instead
+    architecture = entry.get("architecture") or {}
+    modalities = architecture.get("input_modalities") or []
+    if "image" in modalities or "image" in str(architecture.get("modality", "")).split("->")[0]:
+        found.add("vision")
+    return found
+
+
+class ModelCatalog:
+    """Models from the API, sorted by id and indexed for the picker.
+
+    Every substring of up to three characters of a model's id, name and
+    owner maps to the rows that contain it. ``search`` starts from the
+    shortest of those row lists that a query term selects and checks only
+    those rows, instead of scanning every model. While the user types on,
+    each query extends the last one, so its matches narrow the last
+    result. Building the index is the slow part; do it off the GUI thread
+    when the catalog is large.
+    """
+
+    def __init__(self, entries=()):
+        models = {}
+        for entry in entries:
+            model = ModelInfo.from_entry(entry)
+            models[model.id] = model
+        self.models = sorted(models.values(), key=lambda model: model.id.lower())
+        self._keys = [model.search_key for model in self.models]
+        self._rows = {model.id: row for row, model in enumerate(self.models)}
+        self._all = range(len(self.models))
+        # The last query, its capabilities and its rows
+        self._last = ("", (), self._all)
+
+        postings = {}
+        capabilities = {}
+        for row, model in enumerate(self.models):
+            key = model.search_key
+            grams = set()
+            for size in range(1, GRAM_SIZE + 1):
+                grams.update(key[i:i + size] for i in range(len(key) - size + 1))
+            for gram in grams:
+                rows = postings.get(gram)
+                if rows is None:
+                    postings[gram] = rows = []
+                rows.append(row)
+            for capability in model.capabilities:
+                capabilities.setdefault(capability, set()).add(row)
+        self._postings = {gram: array("I", rows) for gram, rows in postings.items()}
+        self._capabilities = {name: frozenset(rows) for name, rows in capabilities.items()}
+
+    def __len__(self):
+        return len(self.models)
+
+    def __iter__(self):
+        return iter(self.models)
+
+    def __eq__(self, other):
+        if not isinstance(other, ModelCatalog):
+            return NotImplemented
+        return self.models == other.models
+
+    @property
+    def ids(self):
+        return [model.id for model in self.models]
+
+    def get(self, model_id):
+        row = self._rows.get(model_id)
+        return self.models[row] if row is not None else None
+
+    def row_of(self, model_id):
+        return self._rows.get(model_id, -1)
+
+    def capabilities(self):
+        return sorted(self._capabilities)
+
+    def context_lengths(self):
+        """Context lengths in tokens by model id, for the models whose entry reports one."""
+        return {model.id: model.context_length for model in self.models if model.context_length}
+
+    def search(self, query="", capabilities=()):
+        """Rows of the models matching every term of ``query`` and capability, in order.
+
+        A term matches anywhere in a model's id, name or owner, ignoring
+        case. The rows are a sequence to read, not to modify.
+        """
+        query = query.lower()
+        terms = query.split()
+        capabilities = tuple(sorted(capabilities))
+        if not terms and not capabilities:
+            return self._all
+
+        last_query, last_capabilities, last_rows = self._last
+        if terms and last_query and capabilities == last_capabilities and query.startswith(last_query):
+            # Every row matching this query matched the last one; only the
+            # terms typed since need checking
+            previous = last_query.split()
+            rows = last_rows
+            checks = [term for term in terms if term not in previous]
+            required = ()
+        else:
+            rows, checks = self._candidates(terms)
+            required = [self._capabilities.get(name, frozenset()) for name in capabilities]
+            if rows is None:
+                required.sort(key=len)
+                rows = sorted(required.pop(0)) if required else self._all
+
+        keys = self._keys
+        for term in checks:
+            rows = [row for row in rows if term in keys[row]]
+        for allowed in required:
+            rows = [row for row in rows if row in allowed]
+        if terms:
+            self._last = (query, capabilities, rows)
+        return rows
+
+    def _candidates(self, terms):
+        """The shortest row list some term selects, and the terms still to check.
+
+        Terms of up to three characters select exactly the rows containing
+        them; a longer term selects the rows containing its rarest trigram,
+        which must then be checked for the whole term.
+        """
+        best = None
+        best_term = None
+        exact = False
+        for term in terms:
+            if len(term) <= GRAM_SIZE:
+                rows, term_exact = self._postings.get(term, _EMPTY), True
+            else:
+                rows = min((self._postings.get(term[i:i + GRAM_SIZE], _EMPTY)
+                            for i in range(len(term) - GRAM_SIZE + 1)), key=len)
+                term_exact = False
+            if best is None or len(rows) < len(best):
+                best, best_term, exact = rows, term, term_exact
+        checks = [term for term in terms if not (exact and term == best_term)]
+        return best, checks
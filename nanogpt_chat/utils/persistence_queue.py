@@ -0,0 +1,71 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from nanogpt_chat.utils.database_service import PRIORITY_INTERACTIVE
+
+DEFAULT_FLUSH_INTERVAL_MS = 500
+DEFAULT_MAX_BATCH = 32
+
+
+class MessagePersistenceQueue(QObject):
+    """Buffers chat messages and writes them to the database in batches.
+
+    Messages are written through ``create_messages_batch`` on the database
+    service, so each batch is a single transaction. A batch is written
+    ``flush_interval_ms`` after the first message is queued, or as soon as
+    ``max_batch`` messages are waiting, whichever comes first.
+
+    Batches are submitted at interactive priority, in order, so a session
+    read submitted after ``flush()`` sees every message queued before it.
+    ``flush(wait=True)`` blocks until the batch is committed; use it when
+    the window closes or the application quits.
+    """
+
+    flushed = pyqtSignal(list)          # ids of the messages written
+    flush_failed = pyqtSignal(str)      # error
+
+    def __init__(self, db_service, flush_interval_ms=DEFAULT_FLUSH_INTERVAL_MS,
+                 max_batch=DEFAULT_MAX_BATCH, parent=None):
+        super().__init__(parent)
+        self._db_service = db_service
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(flush_interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def enqueue(self, session_id, role, content, tokens=None):
+        self._pending.append((session_id, role, content, tokens))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self, wait=False):
+        """Write everything queued so far. Returns the batch's future, or None."""
+        self._timer.stop()
+        if not self._pending:
+            return None
+        batch, self._pending = self._pending, []
+        if wait:
+            try:
+                ids = self._db_service.call("create_messages_batch", batch,
+                                            priority=PRIORITY_INTERACTIVE)
+            except Exception as e:
+                self._on_failed(e)
+                return None
+            self.flushed.emit(list(ids))
+            return None
+        return self._db_service.submit("create_messages_batch", batch,
+                                       priority=PRIORITY_INTERACTIVE,
+                                       callback=lambda ids: self.flushed.emit(list(ids)),
+                                       errback=self._on_failed)
+
+    def _on_failed(self, error):
+        from nanogpt_chat.utils.logger import logger
+        logger.error(f"Failed to save messages: {error}")
+        self.flush_failed.emit(str(error))
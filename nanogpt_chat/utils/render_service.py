@@ -0,0 +1,178 @@
+import hashlib
+import html
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from nanogpt_chat.utils.html_cache import make_cache_key
+from nanogpt_chat.utils.markdown_renderer import MARKDOWN_EXTENSIONS, render_markdown
+
+MESSAGE_FONT_PX = 13
+
+MESSAGE_STYLE = """
+        <style>
+            * {{ color: {text_color}; font-size: {font_px}px; line-height: 1.5; }}
+            code {{ background-color: rgba(0,0,0,0.2); padding: 2px 4px; border-radius: 3px; font-family: 'Cascadia Code', 'Consolas', monospace; }}
+            pre {{ background-color: rgba(0,0,0,0.3); padding: 10px; border-radius: 6px; position: relative; }}
+            pre code {{ background-color: transparent; padding: 0; }}
+            a {{ color: #4fc3f7; }}
+            p {{ margin: 0; padding: 0; }}
+            ul, ol {{ margin-left: 20px; }}
+            table {{ border-collapse: collapse; width: 100%; margin: 10px 0; border: 1px solid #444; }}
+            th, td {{ border: 1px solid #444; padding: 8px; text-align: left; }}
+            th {{ background-color: rgba(255,255,255,0.1); font-weight: bold; }}
+        </style>
+        """
+
+# Changes whenever the stylesheet or markdown pipeline does, invalidating cached HTML
+RENDERER_SIGNATURE = hashlib.sha256(
+    (MESSAGE_STYLE + ",".join(MARKDOWN_EXTENSIONS)).encode("utf-8")
+).hexdigest()[:16]
+
+
+def style_message_html(body_html, text_color, font_px=MESSAGE_FONT_PX):
+    """Wrap rendered message HTML in the chat bubble stylesheet."""
+    return f"{MESSAGE_STYLE.format(text_color=text_color, font_px=font_px)}{body_html}\n        "
+
+
+def render_message_html(content, text_color, theme=None, font_px=MESSAGE_FONT_PX):
+    """Render a message's markdown to styled HTML. Safe to call off the GUI thread."""
+    try:
+        body = render_markdown(content)
+    except Exception:
+        body = content.replace("\n", "<br>")
+    return style_message_html(body, text_color, font_px)
+
+
+def placeholder_message_html(content, text_color, font_px=MESSAGE_FONT_PX):
+    """Cheap plain-text HTML shown until the real render arrives."""
+    return style_message_html(html.escape(content).replace("\n", "<br>"), text_color, font_px)
+
+
+class RenderJob:
+    def __init__(self, key, content, text_color, theme=None, font_px=MESSAGE_FONT_PX):
+        self.key = key
+        self.content = content
+        self.text_color = text_color
+        self.theme = theme
+        self.font_px = font_px
+        self.generation = 0
+
+    @property
+    def cache_key(self):
+        return make_cache_key(self.content, self.theme, self.text_color, self.font_px,
+                              RENDERER_SIGNATURE)
+
+
+class RenderService(QObject):
+    """Renders message HTML on a thread pool and delivers it via ``rendered``.
+
+    Jobs are identified by a caller-chosen key (one per message widget).
+    Submitting a job for a key that is still queued replaces it in place,
+    and results of superseded or cancelled jobs are discarded. At most
+    ``max_queue`` jobs wait for a worker; beyond that the oldest waiting
+    job is dropped and reported through ``job_dropped``.
+
+    With a ``cache``, finished HTML is stored by content hash, theme and
+    font size. ``lookup()`` answers from memory on the calling thread and
+    workers consult the disk layer before rendering.
+    """
+
+    rendered = pyqtSignal(object, str)   # key, html
+    job_dropped = pyqtSignal(object)     # key
+    _job_done = pyqtSignal(object, int, str)
+
+    def __init__(self, max_workers=2, max_queue=256, render_fn=render_message_html,
+                 cache=None, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._render_fn = render_fn
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="render")
+        self._queue = OrderedDict()
+        self._generations = {}
+        self._next_generation = 0
+        self._in_flight = 0
+        # Emitted from pool threads; Qt queues it onto this object's thread
+        self._job_done.connect(self._on_job_done)
+
+    def lookup(self, content, text_color, theme=None, font_px=MESSAGE_FONT_PX):
+        """Return cached HTML from the memory layer, or None."""
+        if self.cache is None:
+            return None
+        return self.cache.get_memory(RenderJob(None, content, text_color, theme, font_px).cache_key)
+
+    def submit(self, key, content, text_color, theme=None, font_px=MESSAGE_FONT_PX):
+        self._next_generation += 1
+        job = RenderJob(key, content, text_color, theme, font_px)
+        job.generation = self._next_generation
+        self._generations[key] = job.generation
+
+        if key in self._queue:
+            self._queue[key] = job  # supersede, keeping its place in line
+        else:
+            self._queue[key] = job
+            if len(self._queue) > self.max_queue:
+                dropped_key, _ = self._queue.popitem(last=False)
+                self._generations.pop(dropped_key, None)
+                self.job_dropped.emit(dropped_key)
+        self._dispatch()
+
+    def cancel(self, key):
+        self._queue.pop(key, None)
+        self._generations.pop(key, None)
+
+    @property
+    def pending_count(self):
+        return len(self._queue)
+
+    @property
+    def in_flight_count(self):
+        return self._in_flight
+
+    def shutdown(self):
+        self._queue.clear()
+        self._generations.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self):
+        while self._queue and self._in_flight < self.max_workers:
+            _, job = self._queue.popitem(last=False)
+            self._in_flight += 1
+            self._executor.submit(self._run, job)
+
+    def _run(self, job):
+        cache_key = job.cache_key if self.cache is not None else None
+        result = self.cache.get(cache_key) if cache_key else None
+        if result is None:
+            try:
+                result = self._render_fn(job.content, job.text_color, job.theme, job.font_px)
+                if cache_key:
+                    self.cache.put(cache_key, result)
+            except Exception:
+                result = placeholder_message_html(job.content, job.text_color, job.font_px)
+        self._job_done.emit(job.key, job.generation, result)
+
+    def _on_job_done(self, key, generation, result):
+        self._in_flight -= 1
+        if self._generations.get(key) == generation:
+            del self._generations[key]
+            self.rendered.emit(key, result)
+        self._dispatch()
+
+
+_render_service = None
+
+
+def get_render_service():
+    global _render_service
+    if _render_service is None:
+        from nanogpt_chat.utils import get_data_dir
+        from nanogpt_chat.utils.html_cache import RenderedHtmlCache
+        get_data_dir().mkdir(parents=True, exist_ok=True)
+        cache = RenderedHtmlCache(get_data_dir() / "render_cache.db")
+        _render_service = RenderService(cache=cache)
+    return _render_service
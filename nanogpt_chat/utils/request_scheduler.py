@@ -0,0 +1,441 @@
+import bisect
+import itertools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Lower goes first. Within a priority, requests go in the order they were made.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+ENDPOINT_CHAT = "chat"
+ENDPOINT_MODELS = "models"
+
+# Requests in flight at once per endpoint
+DEFAULT_LIMITS = {ENDPOINT_CHAT: 6, ENDPOINT_MODELS: 2}
+DEFAULT_LIMIT = 4
+# Requests started per second on average, and how many may start at once
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 10
+DEFAULT_MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+# A server asking for a longer wait than this gets an error instead
+RETRY_AFTER_MAX = 120.0
+# Waits longer than this are logged with the queue depth
+SLOW_WAIT = 1.0
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a ``Retry-After`` value: delay-seconds or an HTTP date."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        seconds = float(value)
+        return seconds if seconds >= 0 else None
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+def is_retryable(error):
+    """Whether sending a failed request again may succeed.
+
+    Reads ``status`` and ``transient`` from the ``APIError`` of either
+    client; errors without them count if they are connection failures.
+    """
+    status = getattr(error, "status", None)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return bool(getattr(error, "transient", False)) or isinstance(error, (ConnectionError, TimeoutError))
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average, in bursts of up to ``burst``.
+
+    A ``rate`` of 0 or None allows everything. Not thread-safe on its own.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+
+    def take(self):
+        """Take a token if one is available; otherwise return the seconds until one is."""
+        if not self.rate:
+            return 0.0
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class EndpointMetrics:
+    __slots__ = ("queued", "max_queued", "active", "started", "finished", "retries",
+                 "rate_limited", "failed", "wait_total", "wait_max")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        stats = {name: getattr(self, name) for name in self.__slots__}
+        stats["wait_avg"] = self.wait_total / self.started if self.started else 0.0
+        return stats
+
+
+class RequestScheduler:
+    """Decides when each API request may go out.
+
+    A request first waits for a turn: one of its endpoint's ``limits``
+    concurrent slots, and a token from a bucket shared by every endpoint.
+    Waiting requests get their turn by priority, then in order, and
+    background requests also wait while any interactive request is in
+    flight, so auxiliary work never competes with a reply being streamed.
+    A request that fails with 429, a 5xx or a connection error is retried
+    up to ``max_retries`` times, after the server's ``Retry-After`` if it
+    sent one and otherwise after an exponential backoff with full jitter. A 429
+    holds back the whole endpoint until its ``Retry-After`` has passed, so
+    queued requests do not run into the same limit. ``stats`` reports the
+    queue depth, slot use, retries and waiting time of each endpoint.
+    All methods are thread-safe.
+    """
+
+    def __init__(self, limits=None, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, clock=time.monotonic, rng=None):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._bucket = TokenBucket(rate, burst, clock)
+        self._cond = threading.Condition()
+        self._order = itertools.count()
+        # (priority, order, endpoint) of every waiting request, in the order they go
+        self._waiting = []
+        self._active = {}
+        # Interactive requests holding a slot; background requests wait for none
+        self._interactive = 0
+        self._held_until = {}
+        self._metrics = {}
+
+    def limit(self, endpoint):
+        return max(1, self.limits.get(endpoint, DEFAULT_LIMIT))
+
+    def acquire(self, endpoint, priority=PRIORITY_INTERACTIVE, cancelled=None):
+        """Wait for a turn to send a request to ``endpoint``.
+
+        Returns True once the request holds a slot, which ``release`` gives
+        back, or False if ``cancelled()`` became true first; call ``wake``
+        after cancelling so the wait notices.
+        """
+        entry = (priority, next(self._order), endpoint)
+        started = self._clock()
+        with self._cond:
+            metrics = self._metrics_for(endpoint)
+            bisect.insort(self._waiting, entry)
+            metrics.queued += 1
+            metrics.max_queued = max(metrics.max_queued, metrics.queued)
+            try:
+                while True:
+                    if cancelled is not None and cancelled():
+                        return False
+                    wait = self._turn(entry)
+                    if wait == 0:
+                        break
+                    self._cond.wait(wait)
+                self._active[endpoint] = self._active.get(endpoint, 0) + 1
+                if priority == PRIORITY_INTERACTIVE:
+                    self._interactive += 1
+                waited = self._clock() - started
+                metrics.active += 1
+                metrics.started += 1
+                metrics.wait_total += waited
+                metrics.wait_max = max(metrics.wait_max, waited)
+                depth = len(self._waiting) - 1
+            finally:
+                self._waiting.remove(entry)
+                metrics.queued -= 1
+                self._cond.notify_all()
+        if waited >= SLOW_WAIT:
+            from nanogpt_chat.utils.logger import logger
+            logger.info(f"{endpoint} request waited {waited:.1f} s for its turn "
+                        f"({depth} still queued, {metrics.active} in flight)")
+        return True
+
+    def release(self, endpoint, priority=PRIORITY_INTERACTIVE):
+        """Give back the slot of a request that ended; ``priority`` is the one it was acquired at."""
+        with self._cond:
+            self._active[endpoint] -= 1
+            if priority == PRIORITY_INTERACTIVE:
+                self._interactive -= 1
+            metrics = self._metrics_for(endpoint)
+            metrics.active -= 1
+            metrics.finished += 1
+            self._cond.notify_all()
+
+    def wake(self):
+        """Make waiting requests check whether they were cancelled."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def retry_delay(self, endpoint, error, attempt):
+        """Seconds to wait before retrying after ``error``, or None to give up.
+
+        ``attempt`` counts the retries already made.
+        """
+        with self._cond:
+            metrics = self._metrics_for(endpoint)
+            if not is_retryable(error) or attempt >= self.max_retries:
+                metrics.failed += 1
+                return None
+            retry_after = getattr(error, "retry_after", None)
+            if retry_after is not None:
+                if retry_after > RETRY_AFTER_MAX:
+                    metrics.failed += 1
+                    return None
+                # A little jitter, so clients told the same time do not return together
+                delay = retry_after + self._rng.uniform(0, min(1.0, retry_after / 10))
+            else:
+                delay = self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            metrics.retries += 1
+            if getattr(error, "status", None) == 429:
+                metrics.rate_limited += 1
+                self._held_until[endpoint] = max(self._held_until.get(endpoint, 0), self._clock() + delay)
+                self._cond.notify_all()
+        from nanogpt_chat.utils.logger import logger
+        logger.warning(f"Retrying {endpoint} request in {delay:.1f} s "
+                       f"({attempt + 1}/{self.max_retries}): {error}")
+        return delay
+
+    def call(self, endpoint, fn, *args, priority=PRIORITY_INTERACTIVE, **kwargs):
+        """Run the blocking request ``fn(*args, **kwargs)`` in turn, retrying failures."""
+        attempt = 0
+        while True:
+            self.acquire(endpoint, priority)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                delay = self.retry_delay(endpoint, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.release(endpoint, priority)
+            attempt += 1
+            time.sleep(delay)
+
+    def stream(self, endpoint, open_stream, priority=PRIORITY_INTERACTIVE):
+        """A ``ScheduledStream`` over the iterator ``open_stream()`` returns."""
+        return ScheduledStream(self, endpoint, open_stream, priority)
+
+    def stats(self):
+        with self._cond:
+            return {endpoint: metrics.as_dict() for endpoint, metrics in self._metrics.items()}
+
+    def _metrics_for(self, endpoint):
+        metrics = self._metrics.get(endpoint)
+        if metrics is None:
+            metrics = self._metrics[endpoint] = EndpointMetrics()
+        return metrics
+
+    def _turn(self, entry):
+        # 0 when ``entry`` may go now, having taken a token; otherwise the
+        # seconds to wait, or None to wait until something changes
+        now = self._clock()
+        for waiting in self._waiting:
+            if waiting[0] >= PRIORITY_BACKGROUND and self._interactive:
+                # Background requests wait for the interactive ones to end
+                if waiting is entry:
+                    return None
+                continue
+            endpoint = waiting[2]
+            held = self._held_until.get(endpoint, 0) - now
+            if held > 0 or self._active.get(endpoint, 0) >= self.limit(endpoint):
+                if waiting is entry:
+                    # Held back after a 429, or every slot is in use
+                    return held if held > 0 else None
+                continue
+            if waiting is not entry:
+                # The first request that could go takes the next token
+                return None
+            return self._bucket.take()
+        return None
+
+
+class ScheduledStream:
+    """A streamed completion sent once its scheduler gives it a turn.
+
+    The request is made on the first ``next()`` and holds one of its
+    endpoint's slots until the stream ends or is closed. A failure before
+    any content arrived is retried; after that it is raised, since part of
+    the reply has been read. ``close()``, from any thread, also gives up a
+    place in the queue or a pending retry. ``ttfb_ms`` and ``usage`` come
+    from the underlying stream.
+    """
+
+    def __init__(self, scheduler, endpoint, open_stream, priority=PRIORITY_INTERACTIVE):
+        self._scheduler = scheduler
+        self._endpoint = endpoint
+        self._open_stream = open_stream
+        self.priority = priority
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._stream = None
+        self._holds_slot = False
+        self._receiving = False
+
+    @property
+    def ttfb_ms(self):
+        return getattr(self._stream, "ttfb_ms", None)
+
+    @property
+    def usage(self):
+        return getattr(self._stream, "usage", None)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._receiving:
+            return self._first_chunk()
+        try:
+            return next(self._stream)
+        except BaseException:
+            self._release()
+            raise
+
+    def _first_chunk(self):
+        attempt = 0
+        while True:
+            if not self._scheduler.acquire(self._endpoint, self.priority, self._closed.is_set):
+                raise StopIteration
+            with self._lock:
+                self._holds_slot = True
+                if self._closed.is_set():
+                    self._release_locked()
+                    raise StopIteration
+            try:
+                with self._lock:
+                    self._stream = self._open_stream()
+                chunk = next(self._stream)
+            except StopIteration:
+                self._release()
+                raise
+            except Exception as e:
+                self._release()
+                self._close_stream()
+                if self._closed.is_set():
+                    raise StopIteration
+                delay = self._scheduler.retry_delay(self._endpoint, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                if self._closed.wait(delay):
+                    raise StopIteration
+                continue
+            self._receiving = True
+            return chunk
+
+    def close(self):
+        """Abort the request, or give up its place in the queue. Safe from any thread."""
+        self._closed.set()
+        self._scheduler.wake()
+        self._close_stream()
+        self._release()
+
+    def _close_stream(self):
+        with self._lock:
+            stream = self._stream
+        if stream is not None and hasattr(stream, "close"):
+            stream.close()
+
+    def _release(self):
+        with self._lock:
+            self._release_locked()
+
+    def _release_locked(self):
+        if self._holds_slot:
+            self._holds_slot = False
+            self._scheduler.release(self._endpoint, self.priority)
+
+    def __del__(self):
+        self.close()
+
+
+class ScheduledClient:
+    """An API client whose requests all go through a ``RequestScheduler``.
+
+    Wraps ``nanogpt_core.PyNanoGPTClient`` or ``AsyncNanoGPTClient`` and
+    offers the same methods. Streams are ``ScheduledStream``s; blocking
+    calls wait for their turn and retry like any other request. Requests
+    are sent at the client's ``priority``; ``with_priority`` returns a
+    client for the same connections at another one.
+    """
+
+    _STREAMS = {"chat_completion_stream": ENDPOINT_CHAT, "chat_completion_stream_raw": ENDPOINT_CHAT}
+    _CALLS = {"chat_completion_sync": ENDPOINT_CHAT, "list_models": ENDPOINT_MODELS,
+              "list_models_if_changed": ENDPOINT_MODELS}
+
+    def __init__(self, client, scheduler, priority=PRIORITY_INTERACTIVE):
+        self.client = client
+        self.scheduler = scheduler
+        self.priority = priority
+
+    def with_priority(self, priority):
+        return ScheduledClient(self.client, self.scheduler, priority)
+
+    def __getattr__(self, name):
+        # Only reached for names not set on the wrapper; missing methods stay missing
+        attr = getattr(self.client, name)
+        if name in self._STREAMS:
+            endpoint = self._STREAMS[name]
+
+            def stream(*args, **kwargs):
+                return self.scheduler.stream(endpoint, lambda: attr(*args, **kwargs), self.priority)
+            return stream
+        if name in self._CALLS:
+            endpoint = self._CALLS[name]
+
+            def call(*args, **kwargs):
+                return self.scheduler.call(endpoint, attr, *args, priority=self.priority, **kwargs)
+            return call
+        return attr
+
+
+_scheduler = None
+
+
+def get_request_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        from nanogpt_chat.utils import get_settings
+        settings = get_settings()
+        _scheduler = RequestScheduler(
+            limits={
+                ENDPOINT_CHAT: settings.get("api", "max_concurrent_chat", DEFAULT_LIMITS[ENDPOINT_CHAT]),
+                ENDPOINT_MODELS: settings.get("api", "max_concurrent_models", DEFAULT_LIMITS[ENDPOINT_MODELS]),
+            },
+            rate=settings.get("api", "requests_per_second", DEFAULT_RATE),
+            burst=settings.get("api", "request_burst", DEFAULT_BURST),
+            max_retries=settings.get("api", "max_retries", DEFAULT_MAX_RETRIES),
+        )
+    return _scheduler
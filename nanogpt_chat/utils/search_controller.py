@@ -0,0 +1,139 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+DEFAULT_DEBOUNCE_MS = 150
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_RESULT_LIMIT = 50
+
+
+class SearchController(QObject):
+    """Runs sidebar searches off the GUI thread as the user types.
+
+    ``set_query`` restarts a debounce timer; only the text present when it
+    fires is searched. Queries run one at a time on a worker thread: a query
+    that is still waiting when a newer one arrives is replaced, and results
+    of a query that was superseded while running are discarded. Results are
+    delivered in batches of ``batch_size``, one per event loop turn, through
+    ``results_ready``; the first batch of a search has ``first`` set.
+
+    ``search_finished`` reports the query latency, measured from the moment
+    the debounce fired. An empty query cancels any search and emits
+    ``cleared`` straight away.
+    """
+
+    results_ready = pyqtSignal(list, bool)           # hits, first
+    search_finished = pyqtSignal(str, int, float)    # query, hit count, latency in ms
+    search_failed = pyqtSignal(str, str)             # query, error
+    cleared = pyqtSignal()
+    _search_done = pyqtSignal(int, object, object)   # generation, hits, error
+
+    def __init__(self, search_fn, debounce_ms=DEFAULT_DEBOUNCE_MS,
+                 batch_size=DEFAULT_BATCH_SIZE, limit=DEFAULT_RESULT_LIMIT, parent=None):
+        super().__init__(parent)
+        self._search_fn = search_fn
+        self.batch_size = batch_size
+        self.limit = limit
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        self._generation = 0
+        self._query = ""
+        self._active_query = ""
+        self._started_at = 0.0
+        self._pending = None
+        self._in_flight = False
+        self._batches = []
+        self._delivered = 0
+        self.last_latency_ms = None
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(debounce_ms)
+        self._debounce.timeout.connect(self._start)
+        self._batch_timer = QTimer(self)
+        self._batch_timer.setInterval(0)
+        self._batch_timer.timeout.connect(self._deliver_batch)
+        # Emitted from the worker thread; Qt queues it onto this object's thread
+        self._search_done.connect(self._on_search_done)
+
+    @property
+    def query(self):
+        return self._query
+
+    @property
+    def is_searching(self):
+        return self._debounce.isActive() or self._pending is not None or self._in_flight
+
+    def set_query(self, text):
+        text = text.strip()
+        if not text:
+            self.cancel()
+            self._query = ""
+            self.cleared.emit()
+            return
+        self._query = text
+        self._debounce.start()
+
+    def cancel(self):
+        """Forget the current search; late results are ignored."""
+        self._generation += 1
+        self._debounce.stop()
+        self._pending = None
+        self._batch_timer.stop()
+        self._batches = []
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self):
+        self._generation += 1
+        self._batch_timer.stop()
+        self._batches = []
+        self._started_at = time.perf_counter()
+        self._active_query = self._query
+        self._pending = (self._generation, self._query)
+        self._dispatch()
+
+    def _dispatch(self):
+        if self._in_flight or self._pending is None:
+            return
+        generation, query = self._pending
+        self._pending = None
+        self._in_flight = True
+        self._executor.submit(self._run, generation, query)
+
+    def _run(self, generation, query):
+        try:
+            hits = list(self._search_fn(query, self.limit))
+        except Exception as e:
+            self._search_done.emit(generation, None, str(e))
+            return
+        self._search_done.emit(generation, hits, None)
+
+    def _on_search_done(self, generation, hits, error):
+        self._in_flight = False
+        if generation == self._generation:
+            self.last_latency_ms = (time.perf_counter() - self._started_at) * 1000
+            if error is not None:
+                self.search_failed.emit(self._active_query, error)
+            else:
+                self._batches = [hits[i:i + self.batch_size]
+                                 for i in range(0, len(hits), self.batch_size)] or [[]]
+                self._delivered = 0
+                self._deliver_batch()
+                if self._batches:
+                    self._batch_timer.start()
+        self._dispatch()
+
+    def _deliver_batch(self):
+        if not self._batches:
+            self._batch_timer.stop()
+            return
+        batch = self._batches.pop(0)
+        first = self._delivered == 0
+        self._delivered += len(batch)
+        self.results_ready.emit(batch, first)
+        if not self._batches:
+            self._batch_timer.stop()
+            self.search_finished.emit(self._active_query, self._delivered, self.last_latency_ms)
@@ -0,0 +1,62 @@
+import json
+from collections import OrderedDict
+
+DEFAULT_MAX_SEGMENTS = 8192
+
+
+def encode_message(role, content):
+    """One chat message as compact JSON, ready to go on the wire.
+
+    Non-ASCII text is escaped, so joined segments stay one byte per
+    character however many scripts or emoji the history holds.
+    """
+    return json.dumps({"role": role, "content": content}, separators=(",", ":"))
+
+
+class MessageSegments:
+    """Caches the wire-ready JSON of chat messages.
+
+    A message is encoded the first time it is sent; later requests join the
+    cached segments instead of serializing the history again. Text content
+    is keyed by value. Multimodal content (a list of parts, often with
+    base64 images) is keyed by the identity of the list, which stays the
+    same while the message is in the conversation.
+    """
+
+    def __init__(self, max_segments=DEFAULT_MAX_SEGMENTS):
+        self.max_segments = max_segments
+        self._segments = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def segment(self, role, content):
+        if isinstance(content, str):
+            key = (role, content)
+        else:
+            key = (role, id(content))
+        entry = self._segments.get(key)
+        # An id can be reused once its list is gone; the cached list must be the same one
+        if entry is not None and (isinstance(content, str) or entry[0] is content):
+            self.hits += 1
+            self._segments.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        segment = encode_message(role, content)
+        # Holding the content keeps a list alive, so its id is not reused
+        self._segments[key] = (None if isinstance(content, str) else content, segment)
+        self._segments.move_to_end(key)
+        if len(self._segments) > self.max_segments:
+            self._segments.popitem(last=False)
+        return segment
+
+    def join(self, messages):
+        """The JSON array of ``(role, content)`` pairs, from cached segments."""
+        parts = ["["]
+        for role, content in messages:
+            parts.append(self.segment(role, content))
+            parts.append(",")
+        if len(parts) > 1:
+            parts.pop()
+        parts.append("]")
+        # One join, so a long history is copied once
+        return "".join(parts)
@@ -8,7 +8,21 @@ DEFAULT_SETTINGS = {
         "default_system_prompt": "You are a helpful assistant.",
         "temperature": 0.7,
         "max_tokens": 4096,
-        "cached_models": [],
+        # Tokens of history a request may carry; 0 uses the model's context length
+        "context_length": 0,
+        # Seconds the model catalog cached on disk is used before it is revalidated
+        "model_cache_ttl": 21600,
+        "backend": "auto",
+        # Requests in flight at once, per endpoint
+        "max_concurrent_chat": 6,
+        "max_concurrent_models": 2,
+        # Requests started per second on average, and in a burst
+        "requests_per_second": 2.0,
+        "request_burst": 10,
+        # Retries of a request failing with 429, a 5xx or a connection error
+        "max_retries": 3,
+        # Cheap model that writes session titles and summaries; empty turns them off
+        "background_model": "gpt-4o-mini",
     },
     "ui": {
         "dark_mode": True,
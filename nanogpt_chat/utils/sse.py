@@ -0,0 +1,131 @@
+import re
+
+_LINE_END = re.compile(rb"\r\n|\r|\n")
+_BOM = b"\xef\xbb\xbf"
+
+
+class SSEEvent:
+    """One dispatched server-sent event."""
+
+    __slots__ = ("event", "data", "id")
+
+    def __init__(self, data, event=None, id=None):
+        self.data = data
+        # None for the default "message" type
+        self.event = event
+        # The last event id seen on the stream
+        self.id = id
+
+    def __eq__(self, other):
+        if not isinstance(other, SSEEvent):
+            return NotImplemented
+        return (self.event, self.data, self.id) == (other.event, other.data, other.id)
+
+    def __repr__(self):
+        return f"SSEEvent(data={self.data!r}, event={self.event!r}, id={self.id!r})"
+
+
+class SSEDecoder:
+    """Turns the chunks of a ``text/event-stream`` body into events.
+
+    Network reads split the body at arbitrary byte offsets, through a line,
+    a ``\\r\\n`` pair or a multibyte UTF-8 character. The bytes of an
+    unfinished line are carried over to the next ``feed`` and only complete
+    lines are decoded, so the events are the same however the body was
+    split. Lines, fields and multi-line ``data`` follow the HTML
+    event-stream format.
+
+    Call ``finish()`` when the body ends: a last line without a terminator
+    is still read, and an event missing its closing blank line is
+    dispatched rather than lost.
+    """
+
+    def __init__(self):
+        self._pending = []      # pieces of the unfinished line
+        self._skip_lf = False   # the last chunk ended with "\r"
+        self._started = False
+        self._data = []
+        self._event = None
+        self.last_event_id = None
+        self.retry_ms = None
+
+    def feed(self, chunk):
+        """Decode ``chunk`` and return the events it completes."""
+        events = []
+        if not self._started:
+            # A byte order mark may itself be split across chunks
+            chunk = b"".join(self._pending) + chunk
+            self._pending = []
+            if len(chunk) < 3 and _BOM.startswith(chunk):
+                if chunk:
+                    self._pending.append(chunk)
+                return events
+            self._started = True
+            if chunk.startswith(_BOM):
+                chunk = chunk[3:]
+        if self._skip_lf and chunk:
+            self._skip_lf = False
+            if chunk[:1] == b"\n":
+                chunk = chunk[1:]
+        if b"\n" not in chunk and b"\r" not in chunk:
+            if chunk:
+                self._pending.append(chunk)
+            return events
+        if self._pending:
+            self._pending.append(chunk)
+            chunk = b"".join(self._pending)
+            self._pending = []
+        # Most servers end lines with "\n" alone, which splits much faster
+        lines = _LINE_END.split(chunk) if b"\r" in chunk else chunk.split(b"\n")
+        rest = lines.pop()
+        if rest:
+            self._pending.append(rest)
+        elif chunk.endswith(b"\r"):
+            self._skip_lf = True
+        for line in lines:
+            self._process_line(line, events)
+        return events
+
+    def finish(self):
+        """End the stream and return any events still held back."""
+        events = []
+        line = b"".join(self._pending)
+        self._pending = []
+        if not self._started and line.startswith(_BOM):
+            line = line[3:]
+        self._started = True
+        if line:
+            self._process_line(line, events)
+        self._dispatch(events)
+        self._skip_lf = False
+        return events
+
+    def _process_line(self, line, events):
+        if not line:
+            self._dispatch(events)
+            return
+        if line.startswith(b"data: "):
+            self._data.append(line[6:].decode("utf-8", "replace"))
+            return
+        if line[:1] == b":":
+            return
+        field, colon, value = line.partition(b":")
+        if colon and value[:1] == b" ":
+            value = value[1:]
+        if field == b"data":
+            self._data.append(value.decode("utf-8", "replace"))
+        elif field == b"event":
+            self._event = value.decode("utf-8", "replace")
+        elif field == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8", "replace")
+        elif field == b"retry":
+            if value.isdigit():
+                self.retry_ms = int(value)
+
+    def _dispatch(self, events):
+        event, self._event = self._event, None
+        if not self._data:
+            return
+        data, self._data = "\n".join(self._data), []
+        events.append(SSEEvent(data, event or None, self.last_event_id))
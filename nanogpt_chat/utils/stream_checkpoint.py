@@ -0,0 +1,210 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from nanogpt_chat.utils.database_service import PRIORITY_INTERACTIVE
+
+DEFAULT_CHECKPOINT_INTERVAL_MS = 2000
+DEFAULT_CHECKPOINT_CHARS = 4096
+
+
+class _Stream:
+    """State of one streamed message, shared with the database jobs that write it."""
+
+    __slots__ = ("session_id", "role", "message_id", "parts", "on_interrupted")
+
+    def __init__(self, session_id, role, message_id, content):
+        self.session_id = session_id
+        self.role = role
+        # Set on the database thread once the row exists; None if it could not be created
+        self.message_id = message_id
+        self.parts = [content] if content else []
+        # Called with the message id once the row exists, if interrupted before that
+        self.on_interrupted = None
+
+
+def _create(db, stream):
+    if not hasattr(db, "create_partial_message"):
+        return None
+    stream.message_id = db.create_partial_message(stream.session_id, stream.role, "")
+    return stream.message_id
+
+
+def _append(db, stream, text):
+    if stream.message_id is not None:
+        db.append_message_content(stream.message_id, text)
+
+
+def _complete(db, stream, text, tokens):
+    if stream.message_id is not None:
+        db.complete_message(stream.message_id, text, tokens)
+        return stream.message_id
+    # No partial row to finish: save the whole message in one go
+    return db.create_message(stream.session_id, stream.role, "".join(stream.parts), tokens)
+
+
+def _delete(db, stream):
+    if stream.message_id is not None:
+        db.delete_message(stream.message_id)
+
+
+class StreamCheckpointer(QObject):
+    """Saves a streamed reply while it arrives, so a crash loses little of it.
+
+    ``start`` creates a partial message row. ``append`` buffers deltas and
+    writes them ``interval_ms`` after the first one is buffered, or as soon as
+    ``max_chars`` are waiting; each checkpoint appends only the new text.
+    ``finish`` writes the rest and marks the message complete, which is when
+    it enters the search index. A message that is never finished stays
+    partial and is shown as interrupted the next time it is loaded.
+
+    Writes go through the database service at interactive priority, so they
+    run in order and after any messages already submitted. ``start`` can
+    also resume an existing partial message to continue it.
+    """
+
+    started = pyqtSignal(str)       # message id
+    completed = pyqtSignal(str)     # message id
+    failed = pyqtSignal(str)        # error
+
+    def __init__(self, db_service, interval_ms=DEFAULT_CHECKPOINT_INTERVAL_MS,
+                 max_chars=DEFAULT_CHECKPOINT_CHARS, parent=None):
+        super().__init__(parent)
+        self._db_service = db_service
+        self.max_chars = max_chars
+        self._stream = None
+        self._message_id = None
+        self._buffer = []
+        self._buffered_chars = 0
+        self.checkpoint_count = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.checkpoint)
+
+    @property
+    def active(self):
+        return self._stream is not None
+
+    @property
+    def message_id(self):
+        """Id of the message being streamed, once its row exists."""
+        return self._message_id
+
+    @property
+    def has_content(self):
+        return self._stream is not None and bool(self._stream.parts)
+
+    @property
+    def content(self):
+        """Everything received for the current message, including resumed content."""
+        return "".join(self._stream.parts) if self._stream is not None else ""
+
+    def start(self, session_id, role="assistant", message_id=None, content=""):
+        """Begin saving a new message, or resume the partial message ``message_id``."""
+        self._reset()
+        self._stream = _Stream(session_id, role, message_id, content)
+        self._message_id = message_id
+        self.checkpoint_count = 0
+        if message_id is None:
+            stream = self._stream
+            self._submit(_create, stream,
+                         callback=lambda created: self._on_created(stream, created))
+
+    def append(self, delta):
+        if self._stream is None or not delta:
+            return
+        self._stream.parts.append(delta)
+        self._buffer.append(delta)
+        self._buffered_chars += len(delta)
+        if self._buffered_chars >= self.max_chars:
+            self.checkpoint()
+        elif not self._timer.isActive():
+            self._timer.start()
+
+    def checkpoint(self, wait=False):
+        """Write the text buffered since the last checkpoint."""
+        self._timer.stop()
+        if self._stream is None or not self._buffer:
+            return
+        text = self._take_buffer()
+        self.checkpoint_count += 1
+        self._submit(_append, self._stream, text, wait=wait)
+
+    def finish(self, tokens=None, wait=False):
+        """Write the remaining text and mark the message complete."""
+        if self._stream is None:
+            return
+        self._timer.stop()
+        stream, text = self._stream, self._take_buffer()
+        self._stream = None
+        self._submit(_complete, stream, text, tokens, callback=self._on_completed, wait=wait)
+
+    def interrupt(self, wait=False, on_saved=None):
+        """Write what has arrived and leave the message partial.
+
+        ``on_saved`` is called with the id of the message left partial: at
+        once, or when its row is created if that has not happened yet.
+        """
+        stream, message_id = self._stream, self._message_id
+        self.checkpoint(wait=wait)
+        self._stream = None
+        # Nothing streams into the message any more; it reloads as interrupted
+        self._message_id = None
+        if stream is None or on_saved is None:
+            return
+        if message_id is not None:
+            on_saved(message_id)
+        else:
+            stream.on_interrupted = on_saved
+
+    def abandon(self):
+        """Drop the message; for a stream that failed before producing anything."""
+        if self._stream is None:
+            return
+        stream = self._stream
+        self._reset()
+        self._submit(_delete, stream)
+
+    def _reset(self):
+        self._timer.stop()
+        self._stream = None
+        self._message_id = None
+        self._buffer = []
+        self._buffered_chars = 0
+
+    def _take_buffer(self):
+        text = "".join(self._buffer)
+        self._buffer = []
+        self._buffered_chars = 0
+        return text
+
+    def _submit(self, fn, *args, callback=None, wait=False):
+        if wait:
+            try:
+                result = self._db_service.call(fn, *args, priority=PRIORITY_INTERACTIVE)
+            except Exception as e:
+                self._on_failed(e)
+                return
+            if callback is not None:
+                callback(result)
+            return
+        self._db_service.submit(fn, *args, priority=PRIORITY_INTERACTIVE,
+                                callback=callback, errback=self._on_failed)
+
+    def _on_created(self, stream, message_id):
+        # The row may land after this stream was finished, interrupted or replaced
+        if message_id is None:
+            return
+        if stream is self._stream:
+            self._message_id = message_id
+            self.started.emit(message_id)
+        elif stream.on_interrupted is not None:
+            stream.on_interrupted(message_id)
+
+    def _on_completed(self, message_id):
+        if message_id is not None:
+            self.completed.emit(message_id)
+
+    def _on_failed(self, error):
+        from nanogpt_chat.utils.logger import logger
+        logger.error(f"Failed to save streamed message: {error}")
+        self.failed.emit(str(error))
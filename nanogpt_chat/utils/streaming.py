@@ -0,0 +1,195 @@
+import queue
+import threading
+import time
+
+
+# One display frame at 60 Hz.
+DEFAULT_FRAME_INTERVAL = 1.0 / 60
+DEFAULT_MAX_BUFFER_CHARS = 16 * 1024
+
+# Yielded by read_with_deadline when no chunk arrived before the deadline
+FRAME_DUE = object()
+_END = object()
+
+
+class DeltaCoalescer:
+    """Coalesces streamed chunks into deltas flushed at most once per frame.
+
+    Chunks pushed between two flushes are joined and handed to ``emit`` as a
+    single delta, so the receiver only ever sees new text. The buffer is
+    bounded: once it holds ``max_buffer_chars`` characters it is flushed
+    immediately, regardless of the frame interval.
+
+    Text pushed less than a frame after the previous flush waits for the
+    next chunk, so a reader that can stall calls ``flush_due`` once
+    ``due_in`` seconds have passed without one; ``read_with_deadline``
+    does the waiting.
+    """
+
+    def __init__(self, emit, frame_interval=DEFAULT_FRAME_INTERVAL,
+                 max_buffer_chars=DEFAULT_MAX_BUFFER_CHARS, clock=time.monotonic):
+        self._emit = emit
+        self.frame_interval = frame_interval
+        self.max_buffer_chars = max_buffer_chars
+        self._clock = clock
+        self._buffer = []
+        self._buffered_chars = 0
+        self._last_flush = None
+        self.emitted_chars = 0
+        self.flush_count = 0
+
+    def push(self, chunk):
+        """Buffer a chunk, flushing if a frame has elapsed or the buffer is full."""
+        if not chunk:
+            return
+        self._buffer.append(chunk)
+        self._buffered_chars += len(chunk)
+
+        now = self._clock()
+        if (self._last_flush is None
+                or now - self._last_flush >= self.frame_interval
+                or self._buffered_chars >= self.max_buffer_chars):
+            self._flush(now)
+
+    def flush(self):
+        """Emit whatever is buffered. Call once the stream has ended."""
+        self._flush(self._clock())
+
+    def due_in(self):
+        """Seconds until the buffered text is due on screen, or None if none is buffered."""
+        if not self._buffer or self._last_flush is None:
+            return None
+        return max(0.0, self._last_flush + self.frame_interval - self._clock())
+
+    def flush_due(self):
+        """Emit the buffered text if it has waited a full frame."""
+        now = self._clock()
+        if self._last_flush is None or now - self._last_flush >= self.frame_interval:
+            self._flush(now)
+
+    @property
+    def pending_chars(self):
+        return self._buffered_chars
+
+    def _flush(self, now):
+        if not self._buffer:
+            return
+        delta = self._buffer[0] if len(self._buffer) == 1 else "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered_chars = 0
+        self._last_flush = now
+        self.emitted_chars += len(delta)
+        self.flush_count += 1
+        self._emit(delta)
+
+
+def read_with_deadline(stream, timeout):
+    """Iterate ``stream``, yielding ``FRAME_DUE`` whenever a deadline passes first.
+
+    ``timeout()`` gives the seconds to wait for the next chunk, or None to
+    wait as long as it takes. The stream is read on a daemon thread, so a
+    stalled read never holds back the caller; errors from the stream are
+    raised here. Closing the stream ends the reading thread with it.
+    """
+    chunks = queue.Queue()
+
+    def read():
+        try:
+            for chunk in stream:
+                chunks.put(chunk)
+        except Exception as e:
+            chunks.put(e)
+        chunks.put(_END)
+
+    threading.Thread(target=read, name="stream-reader", daemon=True).start()
+    while True:
+        try:
+            item = chunks.get(timeout=timeout())
+        except queue.Empty:
+            yield FRAME_DUE
+            continue
+        if item is _END:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+class StreamStats:
+    """Timings of one streamed reply.
+
+    ``start`` is called as the request is sent, ``chunk`` for each piece of
+    text received and ``finish`` once the stream ends, with the usage the
+    server reported if any. Tokens are the reported completion tokens;
+    without a report each chunk counts as one, which is what most servers
+    send.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self.started_at = None
+        self.first_token_at = None
+        self.finished_at = None
+        self.chunks = 0
+        self.chars = 0
+        self.completion_tokens = None
+
+    def start(self):
+        self.started_at = self._clock()
+
+    def chunk(self, text):
+        if not text:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = self._clock()
+        self.chunks += 1
+        self.chars += len(text)
+
+    def finish(self, usage=None):
+        self.finished_at = self._clock()
+        if usage and usage.get("completion_tokens") is not None:
+            self.completion_tokens = usage["completion_tokens"]
+
+    @property
+    def ttft_ms(self):
+        """Milliseconds from the request to the first text."""
+        if self.started_at is None or self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started_at) * 1000
+
+    @property
+    def latency_ms(self):
+        """Milliseconds from the request to the end of the stream."""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at) * 1000
+
+    @property
+    def tokens(self):
+        return self.completion_tokens if self.completion_tokens is not None else self.chunks
+
+    @property
+    def estimated(self):
+        """True when ``tokens`` counts chunks rather than reported tokens."""
+        return self.completion_tokens is None
+
+    @property
+    def tokens_per_second(self):
+        """Tokens per second while text was arriving, after the first token."""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        if elapsed <= 0:
+            elapsed = self.finished_at - self.started_at
+        return self.tokens / elapsed if elapsed > 0 else None
+
+    def summary(self):
+        parts = []
+        if self.ttft_ms is not None:
+            parts.append(f"TTFT {self.ttft_ms:,.0f} ms")
+        if self.tokens_per_second is not None:
+            approx = "~" if self.estimated else ""
+            parts.append(f"{approx}{self.tokens_per_second:,.1f} tok/s")
+        if self.latency_ms is not None:
+            parts.append(f"total {self.latency_ms / 1000:,.2f} s")
+        return " · ".join(parts)
@@ -3,10 +3,12 @@ use serde::{Deserialize, Serialize};
 use std::sync::Arc;
 use std::time::Duration;
 use tokio::sync::Mutex;
-use tokio::time::sleep;
 
 const BASE_URL: &str = "https://nano-gpt.com/api/v1";
-const MAX_RETRIES: u32 = 3;
+// Idle connections are kept this long, so consecutive prompts reuse them
+const POOL_IDLE_TIMEOUT: Duration = Duration::from_secs(90);
+const CONNECT_TIMEOUT: Duration = Duration::from_secs(15);
+const KEEP_ALIVE_INTERVAL: Duration = Duration::from_secs(30);
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub enum ErrorCategory {
@@ -30,7 +32,78 @@ impl ErrorCategory {
     }
 }
 
-// ... rest of the structs ...
+/// A failed request, with what a caller needs to decide whether to retry.
+///
+/// Retries are left to the caller's scheduler, which also rate limits and
+/// queues requests; the client sends each request once.
+#[derive(Debug, Clone)]
+pub struct RequestError {
+    pub message: String,
+    /// The HTTP status, if a response arrived
+    pub status: Option<u16>,
+    /// Seconds the server asked to wait, from `Retry-After`
+    pub retry_after: Option<f64>,
+    /// The connection failed or timed out; the request may succeed if sent again
+    pub transient: bool,
+}
+
+impl RequestError {
+    /// The error a non-success response stands for; reads the body for its message.
+    pub async fn from_response(response: reqwest::Response) -> Self {
+        let status = response.status();
+        let retry_after = header_value(&response, reqwest::header::RETRY_AFTER)
+            .and_then(|value| parse_retry_after(&value));
+        let body = response.text().await.unwrap_or_default();
+        let message = serde_json::from_str::<serde_json::Value>(&body)
+            .ok()
+            .and_then(|value| value["error"]["message"].as_str().map(str::to_owned))
+            .unwrap_or_else(|| if body.trim().is_empty() { "no details".to_string() } else { body.trim().to_string() });
+        Self {
+            message: format!("API Error ({}): {}", status.as_u16(), message),
+            status: Some(status.as_u16()),
+            retry_after,
+            transient: false,
+        }
+    }
+
+    pub fn category(&self) -> ErrorCategory {
+        match self.status.and_then(|status| StatusCode::from_u16(status).ok()) {
+            Some(status) => ErrorCategory::from_status(status),
+            None if self.transient => ErrorCategory::Network,
+            None => ErrorCategory::Unknown,
+        }
+    }
+}
+
+impl From<Error> for RequestError {
+    fn from(e: Error) -> Self {
+        Self {
+            message: e.to_string(),
+            status: e.status().map(|status| status.as_u16()),
+            retry_after: None,
+            transient: e.is_timeout() || e.is_connect(),
+        }
+    }
+}
+
+impl std::fmt::Display for RequestError {
+    fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
+        f.write_str(&self.message)
+    }
+}
+
+impl std::error::Error for RequestError {}
+
+/// Seconds to wait from a `Retry-After` value: delay-seconds or an HTTP date.
+pub fn parse_retry_after(value: &str) -> Option<f64> {
+    let value = value.trim();
+    if let Ok(seconds) = value.parse::<f64>() {
+        return (seconds >= 0.0).then_some(seconds);
+    }
+    let when = chrono::DateTime::parse_from_rfc2822(value).ok()?;
+    let wait = when.signed_duration_since(chrono::Utc::now()).num_milliseconds();
+    Some(wait.max(0) as f64 / 1000.0)
+}
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct Message {
@@ -54,6 +127,36 @@ pub struct ChatRequest {
     pub frequency_penalty: Option<f32>,
     pub presence_penalty: Option<f32>,
     pub stream: Option<bool>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub stream_options: Option<StreamOptions>,
+}
+
+/// A chat request whose messages are already encoded as a JSON array, as
+/// cached per message by the caller; they are copied into the body as is.
+#[derive(Debug, Serialize)]
+pub struct RawChatRequest {
+    pub model: String,
+    pub messages: Box<serde_json::value::RawValue>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub temperature: Option<f32>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub max_tokens: Option<u32>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub top_p: Option<f32>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub frequency_penalty: Option<f32>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub presence_penalty: Option<f32>,
+    pub stream: bool,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub stream_options: Option<StreamOptions>,
+}
+
+/// Options for a streamed request; `include_usage` asks for a final chunk
+/// carrying the token usage of the whole request.
+#[derive(Debug, Clone, Serialize, Deserialize)]
+pub struct StreamOptions {
+    pub include_usage: bool,
 }
 
 #[derive(Debug, Clone, Deserialize)]
@@ -84,8 +187,11 @@ pub struct Choice {
 
 #[derive(Debug, Clone, Deserialize)]
 pub struct Usage {
+    #[serde(default)]
     pub prompt_tokens: u32,
+    #[serde(default)]
     pub completion_tokens: u32,
+    #[serde(default)]
     pub total_tokens: u32,
 }
 
@@ -95,7 +201,10 @@ pub struct StreamChunk {
     pub object: Option<String>,
     pub created: Option<u64>,
     pub model: Option<String>,
+    // The usage chunk may carry no choices at all
+    #[serde(default)]
     pub choices: Vec<StreamChoice>,
+    pub usage: Option<Usage>,
 }
 
 #[derive(Debug, Clone, Deserialize)]
@@ -120,9 +229,26 @@ pub struct ModelListResponse {
     pub data: Vec<ModelInfo>,
 }
 
+#[derive(Debug, Clone, Deserialize)]
+pub struct DetailedModelListResponse {
+    pub data: Vec<serde_json::Value>,
+}
+
+/// A conditionally fetched model list with the validators to revalidate it.
+/// Each model is kept as the API described it, with the name, owner,
+/// context length, capabilities and pricing the detailed listing adds.
+/// `models` is `None` when the server answered 304 Not Modified.
+#[derive(Debug, Clone)]
+pub struct ModelCatalog {
+    pub models: Option<Vec<serde_json::Value>>,
+    pub etag: Option<String>,
+    pub last_modified: Option<String>,
+}
+
 pub struct NanoGPTClient {
     pub client: Client,
     pub api_key: Arc<Mutex<String>>,
+    pub base_url: String,
 }
 
 impl Clone for NanoGPTClient {
@@ -130,83 +256,146 @@ impl Clone for NanoGPTClient {
         Self {
             client: self.client.clone(),
             api_key: self.api_key.clone(),
+            base_url: self.base_url.clone(),
         }
     }
 }
 
+/// Build the HTTP client shared by every request of a `NanoGPTClient`.
+///
+/// Connections are pooled and kept alive between requests, and HTTP/2 is
+/// negotiated over TLS where the server offers it, so only the first
+/// request pays for DNS, TCP and TLS.
+fn build_http_client() -> Client {
+    Client::builder()
+        .pool_idle_timeout(POOL_IDLE_TIMEOUT)
+        .tcp_keepalive(KEEP_ALIVE_INTERVAL)
+        .tcp_nodelay(true)
+        .connect_timeout(CONNECT_TIMEOUT)
+        .http2_keep_alive_interval(KEEP_ALIVE_INTERVAL)
+        .http2_keep_alive_while_idle(true)
+        .http2_adaptive_window(true)
+        .build()
+        .unwrap_or_else(|_| Client::new())
+}
+
 impl NanoGPTClient {
     pub fn new(api_key: String) -> Self {
+        Self::with_base_url(api_key, BASE_URL.to_string())
+    }
+
+    /// Create a client for another endpoint, such as a local test server.
+    pub fn with_base_url(api_key: String, base_url: String) -> Self {
         Self {
-            client: Client::new(),
+            client: build_http_client(),
             api_key: Arc::new(Mutex::new(api_key)),
+            base_url: base_url.trim_end_matches('/').to_string(),
         }
     }
 
+    /// Replace the API key; pooled connections are kept.
+    pub async fn set_api_key(&self, api_key: String) {
+        *self.api_key.lock().await = api_key;
+    }
+
     async fn auth_headers(&self) -> Result<String, Error> {
         let key = self.api_key.lock().await;
         Ok(format!("Bearer {}", key))
     }
 
+    /// Send a chat completion request once; a failure status is an error
+    /// carrying the status and any `Retry-After`.
     pub async fn chat_completion(
         &self,
         request: ChatRequest,
-    ) -> Result<ChatResponse, Error> {
+    ) -> Result<ChatResponse, RequestError> {
         let auth = self.auth_headers().await?;
-        let mut retries = 0;
-        
-        loop {
-            let response = self.client
-                .post(format!("{}/chat/completions", BASE_URL))
-                .header("Authorization", &auth)
-                .header("Content-Type", "application/json")
-                .json(&request)
-                .send()
-                .await;
-
-            match response {
-                Ok(resp) => {
-                    let status = resp.status();
-                    if status.is_success() {
-                        return resp.json().await;
-                    }
-                    
-                    if status == StatusCode::TOO_MANY_REQUESTS || status.is_server_error() {
-                        if retries < MAX_RETRIES {
-                            retries += 1;
-                            let delay = Duration::from_millis(1000 * 2u64.pow(retries - 1));
-                            sleep(delay).await;
-                            continue;
-                        }
-                    }
-                    
-                    return resp.json().await;
-                }
-                Err(e) => {
-                    if e.is_timeout() || e.is_connect() {
-                        if retries < MAX_RETRIES {
-                            retries += 1;
-                            let delay = Duration::from_millis(1000 * 2u64.pow(retries - 1));
-                            sleep(delay).await;
-                            continue;
-                        }
-                    }
-                    return Err(e);
-                }
-            }
+        let response = self.client
+            .post(format!("{}/chat/completions", self.base_url))
+            .header("Authorization", &auth)
+            .header("Content-Type", "application/json")
+            .json(&request)
+            .send()
+            .await?;
+        if !response.status().is_success() {
+            return Err(RequestError::from_response(response).await);
         }
+        Ok(response.json().await?)
     }
 
-    pub async fn list_models(&self) -> Result<Vec<ModelInfo>, Error> {
+    /// Send a streaming chat completion request and return the response
+    /// once its headers arrive; the body is the server-sent event stream.
+    pub async fn chat_completion_stream<T: Serialize + ?Sized>(&self, request: &T) -> Result<reqwest::Response, Error> {
+        let auth = self.auth_headers().await?;
+
+        self.client
+            .post(format!("{}/chat/completions", self.base_url))
+            .header("Authorization", auth)
+            .header("Accept", "text/event-stream")
+            .json(request)
+            .send()
+            .await
+    }
+
+    pub async fn list_models(&self) -> Result<Vec<ModelInfo>, RequestError> {
         let auth = self.auth_headers().await?;
         
-        let response: ModelListResponse = self.client
-            .get(format!("{}/models", BASE_URL))
+        let response = self.client
+            .get(format!("{}/models", self.base_url))
             .header("Authorization", auth)
             .send()
-            .await?
-            .json()
             .await?;
-            
-        Ok(response.data)
+        if !response.status().is_success() {
+            return Err(RequestError::from_response(response).await);
+        }
+        let list: ModelListResponse = response.json().await?;
+        Ok(list.data)
+    }
+
+    /// Fetch the model list unless it is unchanged since the response that
+    /// carried `etag` and `last_modified`. Servers that do not support
+    /// conditional requests send the whole list every time.
+    pub async fn list_models_if_changed(
+        &self,
+        etag: Option<&str>,
+        last_modified: Option<&str>,
+    ) -> Result<ModelCatalog, RequestError> {
+        let auth = self.auth_headers().await?;
+
+        let mut request = self.client
+            .get(format!("{}/models", self.base_url))
+            .query(&[("detailed", "true")])
+            .header("Authorization", auth);
+        if let Some(etag) = etag {
+            request = request.header(reqwest::header::IF_NONE_MATCH, etag);
+        }
+        if let Some(last_modified) = last_modified {
+            request = request.header(reqwest::header::IF_MODIFIED_SINCE, last_modified);
+        }
+        let response = request.send().await?;
+        let new_etag = header_value(&response, reqwest::header::ETAG);
+        let new_last_modified = header_value(&response, reqwest::header::LAST_MODIFIED);
+
+        if response.status() == StatusCode::NOT_MODIFIED {
+            return Ok(ModelCatalog {
+                models: None,
+                etag: new_etag.or_else(|| etag.map(str::to_owned)),
+                last_modified: new_last_modified.or_else(|| last_modified.map(str::to_owned)),
+            });
+        }
+        if !response.status().is_success() {
+            return Err(RequestError::from_response(response).await);
+        }
+        let list: DetailedModelListResponse = response.json().await?;
+        let models = list.data.into_iter().filter(|model| model.get("id").is_some()).collect();
+        Ok(ModelCatalog {
+            models: Some(models),
+            etag: new_etag,
+            last_modified: new_last_modified,
+        })
     }
 }
+
+fn header_value(response: &reqwest::Response, name: reqwest::header::HeaderName) -> Option<String> {
+    response.headers().get(name).and_then(|value| value.to_str().ok()).map(str::to_owned)
+}
@@ -1 +1,4 @@
 pub mod client;
+pub mod sse;
+#[cfg(test)]
+mod tests;
@@ -0,0 +1,172 @@
+//! Incremental decoder for `text/event-stream` response bodies.
+//!
+//! Network reads split the body at arbitrary byte offsets: through the
+//! middle of a line, a `\r\n` pair or a multibyte UTF-8 character. The
+//! decoder keeps the bytes of an unfinished line between reads and only
+//! decodes complete lines, so events come out the same however the body
+//! was split.
+
+/// One dispatched server-sent event.
+#[derive(Debug, Clone, PartialEq, Eq, Default)]
+pub struct SseEvent {
+    /// The `event:` field; `None` for the default `message` type.
+    pub event: Option<String>,
+    /// The `data:` lines of the event, joined with `\n`.
+    pub data: String,
+    /// The last event id seen on the stream, if any.
+    pub id: Option<String>,
+}
+
+/// Turns chunks of an event stream into events, following the parsing
+/// rules of the HTML event-stream format.
+///
+/// Feed each network read to [`SseDecoder::push`], then call
+/// [`SseDecoder::finish`] when the body ends.
+#[derive(Debug, Default)]
+pub struct SseDecoder {
+    /// Bytes of the line being read, carried over between pushes
+    line: Vec<u8>,
+    /// The previous chunk ended with `\r`; a leading `\n` belongs to it
+    skip_lf: bool,
+    /// Whether the byte order mark check has been done
+    started: bool,
+    data: String,
+    has_data: bool,
+    event: Option<String>,
+    last_id: Option<String>,
+    retry_ms: Option<u64>,
+}
+
+impl SseDecoder {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Reconnection time requested by the server with a `retry:` field.
+    pub fn retry_ms(&self) -> Option<u64> {
+        self.retry_ms
+    }
+
+    /// Decode `chunk` and return the events it completes.
+    pub fn push(&mut self, chunk: &[u8]) -> Vec<SseEvent> {
+        let mut events = Vec::new();
+        let mut bytes = chunk;
+        if !self.started {
+            // A byte order mark may itself be split across chunks
+            let wanted = 3 - self.line.len().min(3);
+            let take = wanted.min(bytes.len());
+            self.line.extend_from_slice(&bytes[..take]);
+            bytes = &bytes[take..];
+            if self.line.len() < 3 && b"\xEF\xBB\xBF".starts_with(&self.line) {
+                return events;
+            }
+            self.started = true;
+            let pending = std::mem::take(&mut self.line);
+            let pending = pending.strip_prefix(b"\xEF\xBB\xBF").unwrap_or(&pending);
+            self.scan(pending, &mut events);
+        }
+        self.scan(bytes, &mut events);
+        events
+    }
+
+    /// End the stream: a last line without a terminator is still read, and
+    /// an event missing its closing blank line is dispatched rather than lost.
+    pub fn finish(&mut self) -> Vec<SseEvent> {
+        let mut events = Vec::new();
+        if !self.started {
+            self.started = true;
+            let pending = std::mem::take(&mut self.line);
+            let pending = pending.strip_prefix(b"\xEF\xBB\xBF").unwrap_or(&pending);
+            self.line.extend_from_slice(pending);
+        }
+        if !self.line.is_empty() {
+            let line = std::mem::take(&mut self.line);
+            self.process_line(&line, &mut events);
+        }
+        self.dispatch(&mut events);
+        self.skip_lf = false;
+        events
+    }
+
+    fn scan(&mut self, mut bytes: &[u8], events: &mut Vec<SseEvent>) {
+        if self.skip_lf {
+            if let Some(rest) = bytes.strip_prefix(b"\n") {
+                bytes = rest;
+            }
+            if !bytes.is_empty() {
+                self.skip_lf = false;
+            }
+        }
+        while let Some(end) = bytes.iter().position(|&b| b == b'\n' || b == b'\r') {
+            if self.line.is_empty() {
+                self.process_line(&bytes[..end], events);
+            } else {
+                self.line.extend_from_slice(&bytes[..end]);
+                let line = std::mem::take(&mut self.line);
+                self.process_line(&line, events);
+            }
+            let crlf = bytes[end] == b'\r';
+            bytes = &bytes[end + 1..];
+            if crlf {
+                match bytes.first() {
+                    Some(b'\n') => bytes = &bytes[1..],
+                    Some(_) => {}
+                    None => self.skip_lf = true,
+                }
+            }
+        }
+        self.line.extend_from_slice(bytes);
+    }
+
+    fn process_line(&mut self, line: &[u8], events: &mut Vec<SseEvent>) {
+        if line.is_empty() {
+            self.dispatch(events);
+            return;
+        }
+        if line[0] == b':' {
+            return;
+        }
+        let (field, value) = match line.iter().position(|&b| b == b':') {
+            Some(colon) => {
+                let value = &line[colon + 1..];
+                (&line[..colon], value.strip_prefix(b" ").unwrap_or(value))
+            }
+            None => (line, &line[line.len()..]),
+        };
+        let value = String::from_utf8_lossy(value);
+        match field {
+            b"data" => {
+                if self.has_data {
+                    self.data.push('\n');
+                }
+                self.data.push_str(&value);
+                self.has_data = true;
+            }
+            b"event" => self.event = Some(value.into_owned()),
+            b"id" => {
+                if !value.contains('\0') {
+                    self.last_id = Some(value.into_owned());
+                }
+            }
+            b"retry" => {
+                if !value.is_empty() && value.bytes().all(|b| b.is_ascii_digit()) {
+                    self.retry_ms = value.parse().ok();
+                }
+            }
+            _ => {}
+        }
+    }
+
+    fn dispatch(&mut self, events: &mut Vec<SseEvent>) {
+        let event = self.event.take();
+        if !self.has_data {
+            return;
+        }
+        self.has_data = false;
+        events.push(SseEvent {
+            event: event.filter(|e| !e.is_empty()),
+            data: std::mem::take(&mut self.data),
+            id: self.last_id.clone(),
+        });
+    }
+}
@@ -0,0 +1,145 @@
+use crate::api::client::{parse_retry_after, ChatRequest, ChatResponse, Message, StreamChunk};
+use crate::api::sse::{SseDecoder, SseEvent};
+
+const CHAT_STREAM: &[u8] = include_bytes!("../../tests/fixtures/chat_stream.sse");
+const CHAT_STREAM_CRLF: &[u8] = include_bytes!("../../tests/fixtures/chat_stream_crlf.sse");
+
+/// Small deterministic generator, so a failing split can be reproduced from its seed.
+struct XorShift(u64);
+
+impl XorShift {
+    fn below(&mut self, n: usize) -> usize {
+        self.0 ^= self.0 << 13;
+        self.0 ^= self.0 >> 7;
+        self.0 ^= self.0 << 17;
+        (self.0 % n as u64) as usize
+    }
+}
+
+fn decode_split(body: &[u8], splits: &[usize]) -> Vec<SseEvent> {
+    let mut decoder = SseDecoder::new();
+    let mut events = Vec::new();
+    let mut start = 0;
+    for &end in splits.iter().chain(std::iter::once(&body.len())) {
+        events.extend(decoder.push(&body[start..end]));
+        start = end;
+    }
+    events.extend(decoder.finish());
+    events
+}
+
+fn content_of(events: &[SseEvent]) -> String {
+    events
+        .iter()
+        .take_while(|e| e.data != "[DONE]")
+        .filter_map(|e| serde_json::from_str::<StreamChunk>(&e.data).ok())
+        .filter_map(|chunk| chunk.choices.into_iter().next())
+        .filter_map(|choice| choice.delta.content)
+        .collect()
+}
+
+#[test]
+fn test_sse_decodes_recorded_stream() {
+    let events = decode_split(CHAT_STREAM, &[]);
+    assert_eq!(events.last().unwrap().data, "[DONE]");
+    assert_eq!(
+        content_of(&events),
+        "Voilà — the café in 東京 serves ☕ and 🥐.\n\n```python\nprint(\"naïve\")\n```"
+    );
+}
+
+#[test]
+fn test_sse_fields_and_multiline_data() {
+    let mut decoder = SseDecoder::new();
+    let events = decode_split(CHAT_STREAM_CRLF, &[]);
+    assert_eq!(content_of(&events), "Zwölf Boxkämpfer jagen 🐉 Eva");
+    let notice = events.iter().find(|e| e.event.as_deref() == Some("notice")).unwrap();
+    assert_eq!(notice.data, "first line\nsecond line\n");
+    assert_eq!(notice.id.as_deref(), Some("2"));
+    assert_eq!(events[0].event.as_deref(), Some("message"));
+    // An event type without data is not dispatched
+    assert!(events.iter().all(|e| e.event.as_deref() != Some("empty")));
+
+    decoder.push(CHAT_STREAM_CRLF);
+    assert_eq!(decoder.retry_ms(), Some(3000));
+}
+
+#[test]
+fn test_sse_carries_split_character_and_line_end() {
+    let mut decoder = SseDecoder::new();
+    let body = "data: caf\u{e9}\r\n\r\n".as_bytes();
+    // Split inside the two-byte "é" and between "\r" and "\n"
+    assert!(decoder.push(&body[..9]).is_empty());
+    assert!(decoder.push(&body[9..12]).is_empty());
+    let events = decoder.push(&body[12..13]);
+    assert!(events.is_empty());
+    let events = decoder.push(&body[13..]);
+    assert_eq!(events.len(), 1);
+    assert_eq!(events[0].data, "café");
+}
+
+#[test]
+fn test_sse_finish_dispatches_unterminated_event() {
+    let mut decoder = SseDecoder::new();
+    assert_eq!(decoder.push(b"data: one\n\ndata: two").len(), 1);
+    let events = decoder.finish();
+    assert_eq!(events.len(), 1);
+    assert_eq!(events[0].data, "two");
+}
+
+#[test]
+fn test_sse_random_splits_match_whole_body() {
+    for body in [CHAT_STREAM, CHAT_STREAM_CRLF] {
+        let expected = decode_split(body, &[]);
+        for seed in 1..=500u64 {
+            let mut rng = XorShift(seed.wrapping_mul(0x9E37_79B9_7F4A_7C15) | 1);
+            let mut splits: Vec<usize> = (0..rng.below(40) + 1).map(|_| rng.below(body.len())).collect();
+            splits.sort_unstable();
+            assert_eq!(decode_split(body, &splits), expected, "seed {}", seed);
+        }
+        // One byte per read
+        let every_byte: Vec<usize> = (1..body.len()).collect();
+        assert_eq!(decode_split(body, &every_byte), expected);
+    }
+}
+
+#[test]
+fn test_retry_after_seconds_and_dates() {
+    assert_eq!(parse_retry_after("120"), Some(120.0));
+    assert_eq!(parse_retry_after(" 1.5 "), Some(1.5));
+    assert_eq!(parse_retry_after("-3"), None);
+    assert_eq!(parse_retry_after("soon"), None);
+    // A date in the past means retry now
+    assert_eq!(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), Some(0.0));
+    let later = (chrono::Utc::now() + chrono::Duration::seconds(30)).to_rfc2822();
+    let wait = parse_retry_after(&later).unwrap();
+    assert!(wait > 25.0 && wait <= 30.0, "{}", wait);
+}
+
+#[test]
+fn test_blocking_request_and_reply_carry_text_content() {
+    let request = ChatRequest {
+        model: "gpt-4o-mini".to_string(),
+        messages: vec![Message {
+            role: "user".to_string(),
+            content: serde_json::Value::String("hi".to_string()),
+        }],
+        temperature: None,
+        max_tokens: Some(24),
+        top_p: None,
+        frequency_penalty: None,
+        presence_penalty: None,
+        stream: Some(false),
+        stream_options: None,
+    };
+    let body = serde_json::to_value(&request).unwrap();
+    assert_eq!(body["messages"][0]["content"], "hi");
+    assert!(body.get("stream_options").is_none());
+
+    let response: ChatResponse = serde_json::from_str(
+        r#"{"choices": [{"index": 0, "message": {"role": "assistant", "content": "Hello"}}]}"#,
+    )
+    .unwrap();
+    let choice = &response.choices.unwrap()[0];
+    assert_eq!(choice.message.content.as_str(), Some("Hello"));
+}
@@ -1,4 +1,4 @@
-use rusqlite::{Connection, Result, Row, params};
+use rusqlite::{Connection, OptionalExtension, Result, Row, params};
 use serde::{Deserialize, Serialize};
 use uuid::Uuid;
 use chrono::{DateTime, Utc};
@@ -23,6 +23,40 @@ pub struct ChatMessage {
     pub content: String,
     pub created_at: DateTime<Utc>,
     pub tokens: Option<u32>,
+    /// Set while the content is still arriving, e.g. a reply being streamed.
+    /// A partial message found after a restart was interrupted.
+    pub partial: bool,
+}
+
+/// Tokens used by the requests of a session or a model.
+#[derive(Debug, Clone, Default, PartialEq, Eq, Serialize, Deserialize)]
+pub struct TokenUsage {
+    pub prompt_tokens: u64,
+    pub completion_tokens: u64,
+    pub requests: u64,
+}
+
+/// A session matched by a full-text search.
+///
+/// `snippet` is an excerpt of the best matching message, or empty when only
+/// the title matched. `rank` is the BM25 score; lower is a better match.
+#[derive(Debug, Clone, Serialize, Deserialize)]
+pub struct SearchHit {
+    pub session: ChatSession,
+    pub snippet: String,
+    pub rank: f64,
+}
+
+/// An auxiliary task queued for a session, such as generating its title.
+///
+/// A session has at most one job of each kind. `attempts` counts the runs
+/// that failed.
+#[derive(Debug, Clone, Serialize, Deserialize)]
+pub struct BackgroundJob {
+    pub session_id: String,
+    pub kind: String,
+    pub attempts: u32,
+    pub created_at: DateTime<Utc>,
 }
 
 pub struct Database {
@@ -72,19 +106,224 @@ impl Database {
                 content TEXT NOT NULL,
                 created_at INTEGER NOT NULL,
                 tokens INTEGER,
+                partial INTEGER NOT NULL DEFAULT 0,
                 FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
             )",
             [],
         )?;
 
+        // Streamed replies are checkpointed as partial rows until they finish
+        {
+            let mut stmt = connection.prepare("PRAGMA table_info(chat_messages)")?;
+            let columns: Vec<String> = stmt.query_map([], |row| row.get(1))?
+                .filter_map(|r| r.ok())
+                .collect();
+
+            if !columns.contains(&"partial".to_string()) {
+                connection.execute("ALTER TABLE chat_messages ADD COLUMN partial INTEGER NOT NULL DEFAULT 0", [])?;
+                // Recreated by create_search_index to skip partial rows
+                connection.execute_batch(
+                    "DROP TRIGGER IF EXISTS trg_messages_fts_insert;
+                     DROP TRIGGER IF EXISTS trg_messages_fts_delete;
+                     DROP TRIGGER IF EXISTS trg_messages_fts_update;",
+                )?;
+            }
+        }
+
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_partial ON chat_messages(partial) WHERE partial = 1",
+            [],
+        )?;
+
         connection.execute(
             "CREATE INDEX IF NOT EXISTS idx_messages_session ON chat_messages(session_id)",
             [],
         )?;
 
+        // Text streamed into a partial message, one row per checkpoint, so
+        // appending never rewrites what is already stored; joined into
+        // chat_messages.content when the message completes
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS message_chunks (
+                message_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (message_id, seq),
+                FOREIGN KEY (message_id) REFERENCES chat_messages(id) ON DELETE CASCADE
+            ) WITHOUT ROWID",
+            [],
+        )?;
+
+        // Supports keyset pagination of the session list
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_updated ON chat_sessions(updated_at DESC, id DESC)",
+            [],
+        )?;
+
+        // Supports reading a session's messages newest-first; the implicit
+        // rowid orders messages created within the same second
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_session_created ON chat_messages(session_id, created_at)",
+            [],
+        )?;
+
+        // Denormalized message count so opening a session never counts its rows
+        {
+            let mut stmt = connection.prepare("PRAGMA table_info(chat_sessions)")?;
+            let columns: Vec<String> = stmt.query_map([], |row| row.get(1))?
+                .filter_map(|r| r.ok())
+                .collect();
+
+            if !columns.contains(&"message_count".to_string()) {
+                connection.execute("ALTER TABLE chat_sessions ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0", [])?;
+                connection.execute(
+                    "UPDATE chat_sessions SET message_count =
+                     (SELECT COUNT(*) FROM chat_messages WHERE chat_messages.session_id = chat_sessions.id)",
+                    [],
+                )?;
+            }
+        }
+
+        connection.execute(
+            "CREATE TRIGGER IF NOT EXISTS trg_messages_count_insert AFTER INSERT ON chat_messages BEGIN
+                UPDATE chat_sessions SET message_count = message_count + 1 WHERE id = NEW.session_id;
+             END",
+            [],
+        )?;
+
+        connection.execute(
+            "CREATE TRIGGER IF NOT EXISTS trg_messages_count_delete AFTER DELETE ON chat_messages BEGIN
+                UPDATE chat_sessions SET message_count = message_count - 1 WHERE id = OLD.session_id;
+             END",
+            [],
+        )?;
+
+        // Token usage totals, added to as each reply reports its usage, so
+        // they are read without summing the history
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS session_usage (
+                session_id TEXT PRIMARY KEY,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                requests INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
+            )",
+            [],
+        )?;
+
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS model_usage (
+                model TEXT PRIMARY KEY,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                requests INTEGER NOT NULL DEFAULT 0
+            )",
+            [],
+        )?;
+
+        // Queued auxiliary tasks, kept so they survive a restart; the key
+        // makes enqueueing a job the session already has a no-op
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS background_jobs (
+                session_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at INTEGER NOT NULL,
+                PRIMARY KEY (session_id, kind),
+                FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
+            )",
+            [],
+        )?;
+
+        // Generated summaries of the newest messages, with the session's message
+        // count when each was written
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS session_summaries (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                message_count INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL,
+                FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
+            )",
+            [],
+        )?;
+
+        Self::create_search_index(&connection)?;
+
         Ok(Self { connection })
     }
 
+    /// Create the FTS5 indexes over message content and session titles.
+    ///
+    /// Both are external-content tables keyed by the source row's rowid, so
+    /// the text is stored once; triggers keep them in sync. Databases created
+    /// before the index existed are backfilled once. Partial messages are
+    /// indexed when they are completed, so checkpoints of a streamed reply
+    /// do not rewrite the index each time.
+    fn create_search_index(connection: &Connection) -> Result<()> {
+        let exists = |name: &str| -> Result<bool> {
+            connection.query_row(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?",
+                [name],
+                |row| row.get::<_, i64>(0),
+            ).map(|count| count > 0)
+        };
+        let backfill_messages = !exists("messages_fts")?;
+        let backfill_sessions = !exists("sessions_fts")?;
+
+        connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                content, content='chat_messages', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+            )",
+            [],
+        )?;
+        connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+                title, content='chat_sessions', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+            )",
+            [],
+        )?;
+
+        connection.execute_batch(
+            "CREATE TRIGGER IF NOT EXISTS trg_messages_fts_insert AFTER INSERT ON chat_messages
+             WHEN NEW.partial = 0 BEGIN
+                INSERT INTO messages_fts(rowid, content) VALUES (NEW.rowid, NEW.content);
+             END;
+             CREATE TRIGGER IF NOT EXISTS trg_messages_fts_delete AFTER DELETE ON chat_messages
+             WHEN OLD.partial = 0 BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', OLD.rowid, OLD.content);
+             END;
+             CREATE TRIGGER IF NOT EXISTS trg_messages_fts_update AFTER UPDATE OF content, partial ON chat_messages
+             WHEN OLD.partial = 0 OR NEW.partial = 0 BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, content)
+                    SELECT 'delete', OLD.rowid, OLD.content WHERE OLD.partial = 0;
+                INSERT INTO messages_fts(rowid, content)
+                    SELECT NEW.rowid, NEW.content WHERE NEW.partial = 0;
+             END;
+             CREATE TRIGGER IF NOT EXISTS trg_sessions_fts_insert AFTER INSERT ON chat_sessions BEGIN
+                INSERT INTO sessions_fts(rowid, title) VALUES (NEW.rowid, NEW.title);
+             END;
+             CREATE TRIGGER IF NOT EXISTS trg_sessions_fts_delete AFTER DELETE ON chat_sessions BEGIN
+                INSERT INTO sessions_fts(sessions_fts, rowid, title) VALUES ('delete', OLD.rowid, OLD.title);
+             END;
+             CREATE TRIGGER IF NOT EXISTS trg_sessions_fts_update AFTER UPDATE OF title ON chat_sessions BEGIN
+                INSERT INTO sessions_fts(sessions_fts, rowid, title) VALUES ('delete', OLD.rowid, OLD.title);
+                INSERT INTO sessions_fts(rowid, title) VALUES (NEW.rowid, NEW.title);
+             END;",
+        )?;
+
+        if backfill_messages {
+            connection.execute(
+                "INSERT INTO messages_fts(rowid, content) SELECT rowid, content FROM chat_messages WHERE partial = 0",
+                [],
+            )?;
+        }
+        if backfill_sessions {
+            connection.execute("INSERT INTO sessions_fts(sessions_fts) VALUES ('rebuild')", [])?;
+        }
+        Ok(())
+    }
+
     pub fn create_session(&self, title: &str, model: &str, system_prompt: &str, temperature: f32) -> Result<ChatSession> {
         let id = Uuid::new_v4().to_string();
         let now = Utc::now().timestamp();
@@ -142,6 +381,55 @@ impl Database {
         Ok(sessions)
     }
 
+    /// Get one page of sessions, most recently updated first.
+    ///
+    /// Pages are keyed on `(updated_at, id)` rather than an offset, so each
+    /// page is a single index seek and sessions that are updated while the
+    /// list is being scrolled are never returned twice. Pass the returned
+    /// cursor to fetch the next page; it is `None` once the list is exhausted.
+    pub fn get_sessions_page(&self, limit: usize, cursor: Option<&str>) -> Result<(Vec<ChatSession>, Option<String>)> {
+        let after = match cursor {
+            Some(cursor) => Some(decode_session_cursor(cursor).ok_or_else(|| {
+                rusqlite::Error::InvalidParameterName(format!("invalid session cursor: {}", cursor))
+            })?),
+            None => None,
+        };
+
+        // One extra row tells whether another page exists
+        let fetch = limit as i64 + 1;
+        let mut sessions: Vec<ChatSession> = match after {
+            Some((updated_at, id)) => {
+                let mut stmt = self.connection.prepare_cached(
+                    "SELECT id, title, model, system_prompt, temperature, created_at, updated_at FROM chat_sessions
+                     WHERE (updated_at, id) < (?, ?)
+                     ORDER BY updated_at DESC, id DESC LIMIT ?",
+                )?;
+                let rows: Vec<ChatSession> = stmt.query_map(params![updated_at, id, fetch], row_to_session)?
+                    .filter_map(|r| r.ok())
+                    .collect();
+                rows
+            }
+            None => {
+                let mut stmt = self.connection.prepare_cached(
+                    "SELECT id, title, model, system_prompt, temperature, created_at, updated_at FROM chat_sessions
+                     ORDER BY updated_at DESC, id DESC LIMIT ?",
+                )?;
+                let rows: Vec<ChatSession> = stmt.query_map(params![fetch], row_to_session)?
+                    .filter_map(|r| r.ok())
+                    .collect();
+                rows
+            }
+        };
+
+        let next_cursor = if sessions.len() > limit {
+            sessions.truncate(limit);
+            sessions.last().map(encode_session_cursor)
+        } else {
+            None
+        };
+        Ok((sessions, next_cursor))
+    }
+
     pub fn update_session_title(&self, id: &str, title: &str) -> Result<()> {
         let now = Utc::now().timestamp();
         
@@ -212,6 +500,7 @@ impl Database {
             content: content.to_string(),
             created_at: Utc::now(),
             tokens,
+            partial: false,
         })
     }
 
@@ -219,7 +508,8 @@ impl Database {
         &self,
         messages: &[(&str, &str, &str, Option<u32>)], // session_id, role, content, tokens
     ) -> Result<Vec<ChatMessage>> {
-        let transaction = self.connection.transaction()?;
+        // The connection is shared behind &self; nothing else runs on it mid-batch
+        let transaction = self.connection.unchecked_transaction()?;
         let now = Utc::now().timestamp();
         let mut created_messages = Vec::with_capacity(messages.len());
         let mut session_ids_updated = std::collections::HashSet::new();
@@ -240,6 +530,7 @@ impl Database {
                 content: (*content).to_string(),
                 created_at: Utc::now(),
                 tokens: *tokens,
+                partial: false,
             });
             
             session_ids_updated.insert(*session_id);
@@ -257,10 +548,254 @@ impl Database {
         Ok(created_messages)
     }
 
+    /// Start a message whose content arrives in pieces, such as a streamed reply.
+    ///
+    /// The row is flagged partial until `complete_message`; content is added
+    /// with `append_message_content`. A partial row that is never completed
+    /// survives a crash and is reported by `get_partial_messages`.
+    pub fn create_partial_message(&self, session_id: &str, role: &str, content: &str) -> Result<ChatMessage> {
+        let id = Uuid::new_v4().to_string();
+        let now = Utc::now().timestamp();
+
+        self.connection.execute(
+            "INSERT INTO chat_messages (id, session_id, role, content, created_at, tokens, partial)
+             VALUES (?, ?, ?, ?, ?, NULL, 1)",
+            params![id, session_id, role, content, now],
+        )?;
+
+        Ok(ChatMessage {
+            id,
+            session_id: session_id.to_string(),
+            role: role.to_string(),
+            content: content.to_string(),
+            created_at: Utc::now(),
+            tokens: None,
+            partial: true,
+        })
+    }
+
+    /// Append text to a partial message. Completed messages are left untouched.
+    ///
+    /// The text is stored as the message's next chunk; the row itself is
+    /// not rewritten, so each checkpoint costs the same however long the
+    /// reply has grown.
+    pub fn append_message_content(&self, id: &str, content: &str) -> Result<()> {
+        self.connection.prepare_cached(
+            "INSERT INTO message_chunks (message_id, seq, text)
+             SELECT id, (SELECT COALESCE(MAX(seq), -1) + 1 FROM message_chunks WHERE message_id = ?1), ?2
+             FROM chat_messages WHERE id = ?1 AND partial = 1",
+        )?
+        .execute(params![id, content])?;
+
+        Ok(())
+    }
+
+    /// Append the last of a partial message's content and mark it complete.
+    ///
+    /// Its chunks are joined into its content and dropped. The message is
+    /// added to the search index and its session's `updated_at` is bumped,
+    /// as `create_message` does for a whole message.
+    pub fn complete_message(&self, id: &str, content: &str, tokens: Option<u32>) -> Result<()> {
+        // The connection is shared behind &self; nothing else runs on it mid-transaction
+        let transaction = self.connection.unchecked_transaction()?;
+        let now = Utc::now().timestamp();
+
+        transaction.execute(
+            &format!(
+                "UPDATE chat_messages SET content = {} || ?, tokens = COALESCE(?, tokens), partial = 0
+                 WHERE id = ? AND partial = 1",
+                MESSAGE_CONTENT
+            ),
+            params![content, tokens, id],
+        )?;
+        transaction.execute("DELETE FROM message_chunks WHERE message_id = ?", [id])?;
+        transaction.execute(
+            "UPDATE chat_sessions SET updated_at = ?
+             WHERE id = (SELECT session_id FROM chat_messages WHERE id = ?)",
+            params![now, id],
+        )?;
+
+        transaction.commit()
+    }
+
+    /// Add one request's token usage to its session's and model's totals.
+    ///
+    /// Returns the session's new totals.
+    pub fn record_usage(&self, session_id: &str, model: &str, prompt_tokens: u32, completion_tokens: u32) -> Result<TokenUsage> {
+        // The connection is shared behind &self; nothing else runs on it mid-transaction
+        let transaction = self.connection.unchecked_transaction()?;
+
+        transaction.execute(
+            "INSERT INTO session_usage (session_id, prompt_tokens, completion_tokens, requests)
+             VALUES (?, ?, ?, 1)
+             ON CONFLICT(session_id) DO UPDATE SET
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = completion_tokens + excluded.completion_tokens,
+                requests = requests + 1",
+            params![session_id, prompt_tokens, completion_tokens],
+        )?;
+        transaction.execute(
+            "INSERT INTO model_usage (model, prompt_tokens, completion_tokens, requests)
+             VALUES (?, ?, ?, 1)
+             ON CONFLICT(model) DO UPDATE SET
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = completion_tokens + excluded.completion_tokens,
+                requests = requests + 1",
+            params![model, prompt_tokens, completion_tokens],
+        )?;
+        let usage = transaction.query_row(
+            "SELECT prompt_tokens, completion_tokens, requests FROM session_usage WHERE session_id = ?",
+            [session_id],
+            row_to_usage,
+        )?;
+
+        transaction.commit()?;
+        Ok(usage)
+    }
+
+    /// Token totals of a session; zero if none of its replies reported usage.
+    pub fn get_session_usage(&self, session_id: &str) -> Result<TokenUsage> {
+        self.connection
+            .query_row(
+                "SELECT prompt_tokens, completion_tokens, requests FROM session_usage WHERE session_id = ?",
+                [session_id],
+                row_to_usage,
+            )
+            .optional()
+            .map(Option::unwrap_or_default)
+    }
+
+    /// Token totals of every model used, most tokens first.
+    pub fn get_model_usage(&self) -> Result<Vec<(String, TokenUsage)>> {
+        let mut stmt = self.connection.prepare(
+            "SELECT prompt_tokens, completion_tokens, requests, model FROM model_usage
+             ORDER BY prompt_tokens + completion_tokens DESC, model",
+        )?;
+        let usage = stmt.query_map([], |row| Ok((row.get(3)?, row_to_usage(row)?)))?;
+        usage.collect()
+    }
+
+    /// Queue a job for a session unless it already has one of that kind.
+    ///
+    /// Returns whether the job was added.
+    pub fn enqueue_job(&self, session_id: &str, kind: &str) -> Result<bool> {
+        let now = Utc::now().timestamp();
+        let added = self.connection.execute(
+            "INSERT INTO background_jobs (session_id, kind, created_at) VALUES (?, ?, ?)
+             ON CONFLICT(session_id, kind) DO NOTHING",
+            params![session_id, kind, now],
+        )?;
+        Ok(added == 1)
+    }
+
+    /// Every queued job, oldest first.
+    pub fn get_jobs(&self) -> Result<Vec<BackgroundJob>> {
+        let mut stmt = self.connection.prepare(
+            "SELECT session_id, kind, attempts, created_at FROM background_jobs ORDER BY created_at, rowid",
+        )?;
+        let jobs = stmt.query_map([], |row| {
+            let created_at: i64 = row.get(3)?;
+            Ok(BackgroundJob {
+                session_id: row.get(0)?,
+                kind: row.get(1)?,
+                attempts: row.get(2)?,
+                created_at: DateTime::from_timestamp(created_at, 0).unwrap_or_else(Utc::now),
+            })
+        })?;
+        jobs.collect()
+    }
+
+    /// Count a failed run of a job. Returns its attempts so far, or 0 if it is not queued.
+    pub fn record_job_attempt(&self, session_id: &str, kind: &str) -> Result<u32> {
+        self.connection.execute(
+            "UPDATE background_jobs SET attempts = attempts + 1 WHERE session_id = ? AND kind = ?",
+            params![session_id, kind],
+        )?;
+        self.connection
+            .query_row(
+                "SELECT attempts FROM background_jobs WHERE session_id = ? AND kind = ?",
+                params![session_id, kind],
+                |row| row.get(0),
+            )
+            .optional()
+            .map(Option::unwrap_or_default)
+    }
+
+    /// Remove a job that is done or no longer wanted.
+    pub fn finish_job(&self, session_id: &str, kind: &str) -> Result<()> {
+        self.connection.execute(
+            "DELETE FROM background_jobs WHERE session_id = ? AND kind = ?",
+            params![session_id, kind],
+        )?;
+
+        Ok(())
+    }
+
+    /// Store a session's summary of its newest messages.
+    ///
+    /// `message_count` is the session's message count when the summary was
+    /// written, kept to tell when enough new messages have arrived to
+    /// write it again, not how many messages it covers.
+    pub fn set_session_summary(&self, session_id: &str, summary: &str, message_count: usize) -> Result<()> {
+        let now = Utc::now().timestamp();
+        self.connection.execute(
+            "INSERT INTO session_summaries (session_id, summary, message_count, updated_at)
+             VALUES (?, ?, ?, ?)
+             ON CONFLICT(session_id) DO UPDATE SET
+                summary = excluded.summary,
+                message_count = excluded.message_count,
+                updated_at = excluded.updated_at",
+            params![session_id, summary, message_count as i64, now],
+        )?;
+
+        Ok(())
+    }
+
+    /// A session's summary and its message count when it was written, if it has one.
+    pub fn get_session_summary(&self, session_id: &str) -> Result<Option<(String, usize)>> {
+        self.connection
+            .query_row(
+                "SELECT summary, message_count FROM session_summaries WHERE session_id = ?",
+                [session_id],
+                |row| Ok((row.get(0)?, row.get::<_, i64>(1)? as usize)),
+            )
+            .optional()
+    }
+
+    /// Messages left partial, newest first: replies whose stream was cut off.
+    pub fn get_partial_messages(&self) -> Result<Vec<ChatMessage>> {
+        let mut stmt = self.connection.prepare(
+            &format!(
+                "SELECT id, session_id, role, {}, created_at, tokens, partial, rowid FROM chat_messages
+                 WHERE partial = 1 ORDER BY created_at DESC, rowid DESC",
+                MESSAGE_CONTENT
+            ),
+        )?;
+
+        let messages = stmt.query_map([], row_to_keyed_message)?
+            .filter_map(|r| r.ok())
+            .map(|(_, message)| message)
+            .collect();
+
+        Ok(messages)
+    }
+
+    pub fn delete_message(&self, id: &str) -> Result<()> {
+        self.connection.execute(
+            "DELETE FROM chat_messages WHERE id = ?",
+            [id],
+        )?;
+
+        Ok(())
+    }
+
     pub fn get_messages(&self, session_id: &str) -> Result<Vec<ChatMessage>> {
         let mut stmt = self.connection.prepare(
-            "SELECT id, session_id, role, content, created_at, tokens 
-             FROM chat_messages WHERE session_id = ? ORDER BY created_at ASC",
+            &format!(
+                "SELECT id, session_id, role, {}, created_at, tokens, partial
+                 FROM chat_messages WHERE session_id = ? ORDER BY created_at ASC",
+                MESSAGE_CONTENT
+            ),
         )?;
         
         let messages = stmt.query_map(params![session_id], |row| {
@@ -272,6 +807,7 @@ impl Database {
                 content: row.get(3)?,
                 created_at: DateTime::from_timestamp(timestamp, 0).unwrap_or_else(Utc::now),
                 tokens: row.get(5)?,
+                partial: row.get(6)?,
             })
         })?
         .filter_map(|r| r.ok())
@@ -282,8 +818,11 @@ impl Database {
 
     pub fn get_messages_paginated(&self, session_id: &str, limit: usize, offset: usize) -> Result<Vec<ChatMessage>> {
         let mut stmt = self.connection.prepare(
-            "SELECT id, session_id, role, content, created_at, tokens 
-             FROM chat_messages WHERE session_id = ? ORDER BY created_at ASC LIMIT ? OFFSET ?",
+            &format!(
+                "SELECT id, session_id, role, {}, created_at, tokens, partial
+                 FROM chat_messages WHERE session_id = ? ORDER BY created_at ASC LIMIT ? OFFSET ?",
+                MESSAGE_CONTENT
+            ),
         )?;
         
         let messages = stmt.query_map(params![session_id, limit as u32, offset as u32], |row| {
@@ -295,6 +834,7 @@ impl Database {
                 content: row.get(3)?,
                 created_at: DateTime::from_timestamp(timestamp, 0).unwrap_or_else(Utc::now),
                 tokens: row.get(5)?,
+                partial: row.get(6)?,
             })
         })?
         .filter_map(|r| r.ok())
@@ -303,6 +843,74 @@ impl Database {
         Ok(messages)
     }
 
+    /// Get the newest messages of a session that come before `cursor`.
+    ///
+    /// Messages are returned oldest first, ready to be shown above whatever
+    /// is already on screen. Without a cursor this is the tail of the
+    /// conversation. Each page is a reverse seek on `(created_at, rowid)`,
+    /// so opening or scrolling a long session costs the same as a short one.
+    /// The returned cursor points at older history; it is `None` once the
+    /// first message of the session has been returned.
+    pub fn get_messages_before(&self, session_id: &str, limit: usize, cursor: Option<&str>) -> Result<(Vec<ChatMessage>, Option<String>)> {
+        let before = match cursor {
+            Some(cursor) => Some(decode_message_cursor(cursor).ok_or_else(|| {
+                rusqlite::Error::InvalidParameterName(format!("invalid message cursor: {}", cursor))
+            })?),
+            None => None,
+        };
+
+        // One extra row tells whether older messages exist
+        let fetch = limit as i64 + 1;
+        let mut rows: Vec<(i64, ChatMessage)> = match before {
+            Some((created_at, rowid)) => {
+                let mut stmt = self.connection.prepare_cached(&format!(
+                    "SELECT id, session_id, role, {}, created_at, tokens, partial, rowid FROM chat_messages
+                     WHERE session_id = ? AND (created_at, rowid) < (?, ?)
+                     ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                    MESSAGE_CONTENT
+                ))?;
+                let rows: Vec<(i64, ChatMessage)> = stmt.query_map(params![session_id, created_at, rowid, fetch], row_to_keyed_message)?
+                    .filter_map(|r| r.ok())
+                    .collect();
+                rows
+            }
+            None => {
+                let mut stmt = self.connection.prepare_cached(&format!(
+                    "SELECT id, session_id, role, {}, created_at, tokens, partial, rowid FROM chat_messages
+                     WHERE session_id = ?
+                     ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                    MESSAGE_CONTENT
+                ))?;
+                let rows: Vec<(i64, ChatMessage)> = stmt.query_map(params![session_id, fetch], row_to_keyed_message)?
+                    .filter_map(|r| r.ok())
+                    .collect();
+                rows
+            }
+        };
+
+        let next_cursor = if rows.len() > limit {
+            rows.truncate(limit);
+            rows.last().map(|(rowid, message)| encode_message_cursor(message, *rowid))
+        } else {
+            None
+        };
+        let messages = rows.into_iter().rev().map(|(_, message)| message).collect();
+        Ok((messages, next_cursor))
+    }
+
+    /// Number of messages in a session, read from the counter kept by triggers.
+    pub fn count_messages(&self, session_id: &str) -> Result<usize> {
+        match self.connection.query_row(
+            "SELECT message_count FROM chat_sessions WHERE id = ?",
+            [session_id],
+            |row| row.get::<_, i64>(0),
+        ) {
+            Ok(count) => Ok(count.max(0) as usize),
+            Err(rusqlite::Error::QueryReturnedNoRows) => Ok(0),
+            Err(e) => Err(e),
+        }
+    }
+
     pub fn delete_messages(&self, session_id: &str) -> Result<()> {
         self.connection.execute(
             "DELETE FROM chat_messages WHERE session_id = ?",
@@ -313,21 +921,142 @@ impl Database {
     }
 
     pub fn search_sessions(&self, query: &str) -> Result<Vec<ChatSession>> {
-        let pattern = format!("%{}%", query);
-        let mut stmt = self.connection.prepare(
-            "SELECT DISTINCT s.id, s.title, s.model, s.system_prompt, s.temperature, s.created_at, s.updated_at 
-             FROM chat_sessions s
-             LEFT JOIN chat_messages m ON s.id = m.session_id
-             WHERE s.title LIKE ? OR m.content LIKE ?
-             ORDER BY s.updated_at DESC",
+        Ok(self.search(query, DEFAULT_SEARCH_LIMIT)?
+            .into_iter()
+            .map(|hit| hit.session)
+            .collect())
+    }
+
+    /// Full-text search over session titles and message content.
+    ///
+    /// Every word of `query` must match; the last one also matches as a
+    /// prefix so results follow the user while they type. Sessions are
+    /// ranked by their best BM25 score across title and messages, and at
+    /// most `limit` are returned.
+    ///
+    /// Only the newest `SEARCH_CANDIDATES` matching messages are scored, so
+    /// a word that appears in most of a large history costs no more than a
+    /// rare one. Below that many matches the ranking is exact.
+    pub fn search(&self, query: &str, limit: usize) -> Result<Vec<SearchHit>> {
+        let expression = match fts_match_expression(query) {
+            Some(expression) => expression,
+            None => return Ok(Vec::new()),
+        };
+
+        // The best hit per session: MIN() makes SQLite take message_rowid
+        // from the same row as the lowest rank
+        let mut stmt = self.connection.prepare_cached(
+            "WITH candidates AS (
+                 SELECT rowid AS message_rowid, rank FROM messages_fts
+                 WHERE messages_fts MATCH ?1
+                 ORDER BY rowid DESC LIMIT ?3
+             ),
+             hits AS (
+                 SELECT m.session_id AS session_id, c.message_rowid AS message_rowid, c.rank AS rank
+                 FROM candidates c JOIN chat_messages m ON m.rowid = c.message_rowid
+                 UNION ALL
+                 SELECT s.id, NULL, sessions_fts.rank
+                 FROM sessions_fts JOIN chat_sessions s ON s.rowid = sessions_fts.rowid
+                 WHERE sessions_fts MATCH ?1
+             ),
+             best AS (
+                 SELECT session_id, message_rowid, MIN(rank) AS rank FROM hits GROUP BY session_id
+             )
+             SELECT s.id, s.title, s.model, s.system_prompt, s.temperature, s.created_at, s.updated_at,
+                    best.message_rowid, best.rank
+             FROM best JOIN chat_sessions s ON s.id = best.session_id
+             ORDER BY best.rank LIMIT ?2",
         )?;
-        
-        let sessions = stmt.query_map(params![pattern, pattern], row_to_session)?
+        let rows: Vec<(ChatSession, Option<i64>, f64)> = stmt
+            .query_map(params![expression, limit as i64, SEARCH_CANDIDATES as i64], |row| {
+                Ok((row_to_session(row)?, row.get(7)?, row.get(8)?))
+            })?
             .filter_map(|r| r.ok())
             .collect();
-        
-        Ok(sessions)
+
+        // Snippets are only worth computing for the hits that are returned
+        let mut snippet_stmt = self.connection.prepare_cached(
+            "SELECT snippet(messages_fts, 0, '', '', '…', 12) FROM messages_fts
+             WHERE messages_fts MATCH ?1 AND rowid = ?2",
+        )?;
+        let mut hits = Vec::with_capacity(rows.len());
+        for (session, message_rowid, rank) in rows {
+            let snippet = match message_rowid {
+                Some(rowid) => snippet_stmt
+                    .query_row(params![expression, rowid], |row| row.get(0))
+                    .unwrap_or_default(),
+                None => String::new(),
+            };
+            hits.push(SearchHit { session, snippet, rank });
+        }
+        Ok(hits)
+    }
+}
+
+/// A message's content as read back: a partial message's chunks follow
+/// what its row holds, in the order they were appended. Completing the
+/// message stores the same text in the row.
+const MESSAGE_CONTENT: &str = "CASE WHEN partial = 1 THEN content || COALESCE((
+         SELECT group_concat(text, '') FROM (
+             SELECT text FROM message_chunks WHERE message_id = chat_messages.id ORDER BY seq
+         )
+     ), '') ELSE content END";
+
+const DEFAULT_SEARCH_LIMIT: usize = 100;
+const SEARCH_CANDIDATES: usize = 2000;
+
+/// Turn free text into an FTS5 query: every word quoted, the last as a prefix.
+fn fts_match_expression(query: &str) -> Option<String> {
+    let terms: Vec<String> = query
+        .split_whitespace()
+        .map(|term| format!("\"{}\"", term.replace('"', "\"\"")))
+        .collect();
+    if terms.is_empty() {
+        return None;
     }
+    Some(format!("{}*", terms.join(" ")))
+}
+
+fn encode_session_cursor(session: &ChatSession) -> String {
+    format!("{}:{}", session.updated_at.timestamp(), session.id)
+}
+
+fn decode_session_cursor(cursor: &str) -> Option<(i64, String)> {
+    let (updated_at, id) = cursor.split_once(':')?;
+    Some((updated_at.parse().ok()?, id.to_string()))
+}
+
+fn encode_message_cursor(message: &ChatMessage, rowid: i64) -> String {
+    format!("{}:{}", message.created_at.timestamp(), rowid)
+}
+
+fn decode_message_cursor(cursor: &str) -> Option<(i64, i64)> {
+    let (created_at, rowid) = cursor.split_once(':')?;
+    Some((created_at.parse().ok()?, rowid.parse().ok()?))
+}
+
+fn row_to_keyed_message(row: &Row) -> Result<(i64, ChatMessage)> {
+    let timestamp: i64 = row.get(4)?;
+    Ok((
+        row.get(7)?,
+        ChatMessage {
+            id: row.get(0)?,
+            session_id: row.get(1)?,
+            role: row.get(2)?,
+            content: row.get(3)?,
+            created_at: DateTime::from_timestamp(timestamp, 0).unwrap_or_else(Utc::now),
+            tokens: row.get(5)?,
+            partial: row.get(6)?,
+        },
+    ))
+}
+
+fn row_to_usage(row: &Row) -> Result<TokenUsage> {
+    Ok(TokenUsage {
+        prompt_tokens: row.get::<_, i64>(0)? as u64,
+        completion_tokens: row.get::<_, i64>(1)? as u64,
+        requests: row.get::<_, i64>(2)? as u64,
+    })
 }
 
 fn row_to_session(row: &Row) -> Result<ChatSession> {
@@ -1,4 +1,4 @@
-use crate::database::sqlite::Database;
+use crate::database::sqlite::{Database, TokenUsage};
 use tempfile::NamedTempFile;
 
 #[test]
@@ -9,3 +9,280 @@ fn test_database_creation() {
     let sessions = db.get_all_sessions().unwrap();
     assert_eq!(sessions.len(), 0);
 }
+
+#[test]
+fn test_sessions_page_walks_every_session_once() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    // Sessions created within the same second share updated_at, so the id breaks ties
+    for i in 0..25 {
+        db.create_session(&format!("Chat {}", i), "gpt-4o", "", 0.7).unwrap();
+    }
+
+    let mut seen = Vec::new();
+    let mut cursor: Option<String> = None;
+    loop {
+        let (page, next) = db.get_sessions_page(10, cursor.as_deref()).unwrap();
+        assert!(page.len() <= 10);
+        seen.extend(page.into_iter().map(|s| s.id));
+        match next {
+            Some(next) => cursor = Some(next),
+            None => break,
+        }
+    }
+
+    let mut expected: Vec<String> = db.get_all_sessions().unwrap().into_iter().map(|s| s.id).collect();
+    expected.sort();
+    let mut sorted = seen.clone();
+    sorted.sort();
+    assert_eq!(seen.len(), 25);
+    assert_eq!(sorted, expected);
+}
+
+#[test]
+fn test_sessions_page_rejects_malformed_cursor() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    assert!(db.get_sessions_page(10, Some("not-a-cursor")).is_err());
+}
+
+#[test]
+fn test_messages_before_pages_backwards_from_the_tail() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    let session = db.create_session("Chat", "gpt-4o", "", 0.7).unwrap();
+    // Messages created within the same second are ordered by insertion
+    for i in 0..25 {
+        db.create_message(&session.id, "user", &format!("message {}", i), None).unwrap();
+    }
+
+    let (tail, cursor) = db.get_messages_before(&session.id, 10, None).unwrap();
+    let contents: Vec<String> = tail.iter().map(|m| m.content.clone()).collect();
+    assert_eq!(contents.first().unwrap(), "message 15");
+    assert_eq!(contents.last().unwrap(), "message 24");
+
+    let mut seen = contents;
+    let mut cursor = cursor;
+    while let Some(before) = cursor {
+        let (page, next) = db.get_messages_before(&session.id, 10, Some(&before)).unwrap();
+        let mut older: Vec<String> = page.into_iter().map(|m| m.content).collect();
+        older.extend(seen);
+        seen = older;
+        cursor = next;
+    }
+
+    let expected: Vec<String> = (0..25).map(|i| format!("message {}", i)).collect();
+    assert_eq!(seen, expected);
+}
+
+#[test]
+fn test_message_count_follows_inserts_and_deletes() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    let session = db.create_session("Chat", "gpt-4o", "", 0.7).unwrap();
+
+    db.create_message(&session.id, "user", "hello", None).unwrap();
+    db.create_message(&session.id, "assistant", "hi", None).unwrap();
+    db.create_message(&session.id, "user", "how are you?", None).unwrap();
+    assert_eq!(db.count_messages(&session.id).unwrap(), 3);
+
+    db.delete_messages(&session.id).unwrap();
+    assert_eq!(db.count_messages(&session.id).unwrap(), 0);
+    assert_eq!(db.count_messages("missing").unwrap(), 0);
+}
+
+#[test]
+fn test_search_ranks_sessions_and_follows_edits() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    let rust = db.create_session("Rust lifetimes", "gpt-4o", "", 0.7).unwrap();
+    let cooking = db.create_session("Cooking", "gpt-4o", "", 0.7).unwrap();
+    db.create_message(&rust.id, "user", "What does the borrow checker do?", None).unwrap();
+    db.create_message(&cooking.id, "user", "How long should I boil an egg?", None).unwrap();
+
+    let hits = db.search("boil", 10).unwrap();
+    assert_eq!(hits.len(), 1);
+    assert_eq!(hits[0].session.id, cooking.id);
+    assert!(hits[0].snippet.contains("boil an egg"));
+
+    // Titles match too, and the last word matches as a prefix
+    let hits = db.search("lifeti", 10).unwrap();
+    assert_eq!(hits.len(), 1);
+    assert_eq!(hits[0].session.id, rust.id);
+    assert!(hits[0].snippet.is_empty());
+
+    db.update_session_title(&cooking.id, "Breakfast").unwrap();
+    assert!(db.search("cooking", 10).unwrap().is_empty());
+    assert_eq!(db.search("breakfast", 10).unwrap().len(), 1);
+
+    db.delete_session(&cooking.id).unwrap();
+    assert!(db.search("egg", 10).unwrap().is_empty());
+    assert!(db.search("\" * (", 10).unwrap().is_empty());
+}
+
+#[test]
+fn test_messages_batch_keeps_order_in_one_transaction() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    let session = db.create_session("Chat", "gpt-4o", "", 0.7).unwrap();
+
+    let batch: Vec<(&str, &str, &str, Option<u32>)> = vec![
+        (session.id.as_str(), "user", "first", None),
+        (session.id.as_str(), "assistant", "second", Some(12)),
+        (session.id.as_str(), "user", "third", None),
+    ];
+    db.create_messages_batch(&batch).unwrap();
+
+    let (messages, _) = db.get_messages_before(&session.id, 10, None).unwrap();
+    let contents: Vec<&str> = messages.iter().map(|m| m.content.as_str()).collect();
+    assert_eq!(contents, vec!["first", "second", "third"]);
+    assert_eq!(db.count_messages(&session.id).unwrap(), 3);
+}
+
+#[test]
+fn test_partial_message_is_checkpointed_then_completed() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    let session = db.create_session("Chat", "gpt-4o", "", 0.7).unwrap();
+    db.create_message(&session.id, "user", "Tell me about volcanoes", None).unwrap();
+
+    let reply = db.create_partial_message(&session.id, "assistant", "").unwrap();
+    db.append_message_content(&reply.id, "Magma rises ").unwrap();
+    db.append_message_content(&reply.id, "through the crust").unwrap();
+
+    // Checkpoints are readable but stay out of the search index
+    let (messages, _) = db.get_messages_before(&session.id, 10, None).unwrap();
+    assert_eq!(messages[1].content, "Magma rises through the crust");
+    assert!(messages[1].partial);
+    assert!(db.search("magma", 10).unwrap().is_empty());
+    let partial: Vec<String> = db.get_partial_messages().unwrap().into_iter().map(|m| m.id).collect();
+    assert_eq!(partial, vec![reply.id.clone()]);
+    assert_eq!(db.get_messages(&session.id).unwrap()[1].content, "Magma rises through the crust");
+
+    db.complete_message(&reply.id, " and erupts.", Some(9)).unwrap();
+    let (messages, _) = db.get_messages_before(&session.id, 10, None).unwrap();
+    assert_eq!(messages[1].content, "Magma rises through the crust and erupts.");
+    assert_eq!(messages[1].tokens, Some(9));
+    assert!(!messages[1].partial);
+    assert!(db.get_partial_messages().unwrap().is_empty());
+    assert_eq!(db.search("magma", 10).unwrap().len(), 1);
+
+    // A completed message no longer takes appends
+    db.append_message_content(&reply.id, "!").unwrap();
+    db.delete_message(&reply.id).unwrap();
+    assert!(db.search("magma", 10).unwrap().is_empty());
+    assert_eq!(db.count_messages(&session.id).unwrap(), 1);
+}
+
+#[test]
+fn test_interrupted_message_is_recovered_from_its_chunks() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let path = tmp_file.path().to_path_buf();
+    let expected: String = (0..500).map(|i| format!("{} ", i)).collect();
+    let (session_id, reply_id) = {
+        let db = Database::new(path.clone()).unwrap();
+        let session = db.create_session("Chat", "gpt-4o", "", 0.7).unwrap();
+        // Continuing an interrupted reply starts from its saved text
+        let reply = db.create_partial_message(&session.id, "assistant", "0 ").unwrap();
+        for i in 1..500 {
+            db.append_message_content(&reply.id, &format!("{} ", i)).unwrap();
+        }
+        (session.id, reply.id)
+    };
+
+    // After a restart the chunks are read back in order, by every reader
+    let db = Database::new(path).unwrap();
+    let partial = db.get_partial_messages().unwrap();
+    assert_eq!(partial.len(), 1);
+    assert_eq!(partial[0].content, expected);
+    assert_eq!(db.get_messages(&session_id).unwrap()[0].content, expected);
+    assert_eq!(db.get_messages_paginated(&session_id, 10, 0).unwrap()[0].content, expected);
+    assert_eq!(db.get_messages_before(&session_id, 10, None).unwrap().0[0].content, expected);
+
+    db.append_message_content(&reply_id, "500").unwrap();
+    db.complete_message(&reply_id, ".", None).unwrap();
+    let complete = format!("{}500.", expected);
+    assert_eq!(db.get_messages(&session_id).unwrap()[0].content, complete);
+    assert_eq!(db.search("499", 10).unwrap().len(), 1);
+
+    // Completing again adds nothing, and deleting takes any chunks with it
+    db.complete_message(&reply_id, "!", None).unwrap();
+    assert_eq!(db.get_messages(&session_id).unwrap()[0].content, complete);
+    let other = db.create_partial_message(&session_id, "assistant", "").unwrap();
+    db.append_message_content(&other.id, "cut off").unwrap();
+    db.delete_message(&other.id).unwrap();
+    assert!(db.get_partial_messages().unwrap().is_empty());
+    db.delete_session(&session_id).unwrap();
+}
+
+#[test]
+fn test_usage_totals_add_up_per_session_and_model() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    let first = db.create_session("First", "gpt-4o", "", 0.7).unwrap();
+    let second = db.create_session("Second", "gpt-4o", "", 0.7).unwrap();
+    assert_eq!(db.get_session_usage(&first.id).unwrap(), TokenUsage::default());
+
+    db.record_usage(&first.id, "gpt-4o", 120, 40).unwrap();
+    let totals = db.record_usage(&first.id, "claude-3-haiku", 200, 10).unwrap();
+    db.record_usage(&second.id, "gpt-4o", 30, 5).unwrap();
+
+    let expected = TokenUsage { prompt_tokens: 320, completion_tokens: 50, requests: 2 };
+    assert_eq!(totals, expected);
+    assert_eq!(db.get_session_usage(&first.id).unwrap(), expected);
+    let models = db.get_model_usage().unwrap();
+    assert_eq!(models[0], ("claude-3-haiku".to_string(), TokenUsage { prompt_tokens: 200, completion_tokens: 10, requests: 1 }));
+    assert_eq!(models[1], ("gpt-4o".to_string(), TokenUsage { prompt_tokens: 150, completion_tokens: 45, requests: 2 }));
+
+    // Session totals go with the session; model totals are kept
+    db.delete_session(&first.id).unwrap();
+    assert_eq!(db.get_session_usage(&first.id).unwrap(), TokenUsage::default());
+    assert_eq!(db.get_model_usage().unwrap().len(), 2);
+}
+
+#[test]
+fn test_background_jobs_are_kept_once_per_session_and_kind() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    let first = db.create_session("First", "gpt-4o", "", 0.7).unwrap();
+    let second = db.create_session("Second", "gpt-4o", "", 0.7).unwrap();
+
+    assert!(db.enqueue_job(&first.id, "title").unwrap());
+    assert!(db.enqueue_job(&second.id, "title").unwrap());
+    assert!(db.enqueue_job(&first.id, "summary").unwrap());
+    assert!(!db.enqueue_job(&first.id, "title").unwrap());
+
+    let jobs: Vec<(String, String)> = db.get_jobs().unwrap().into_iter().map(|job| (job.session_id, job.kind)).collect();
+    assert_eq!(jobs, vec![
+        (first.id.clone(), "title".to_string()),
+        (second.id.clone(), "title".to_string()),
+        (first.id.clone(), "summary".to_string()),
+    ]);
+    assert_eq!(db.record_job_attempt(&second.id, "title").unwrap(), 1);
+    assert_eq!(db.record_job_attempt(&second.id, "title").unwrap(), 2);
+    assert_eq!(db.record_job_attempt(&second.id, "summary").unwrap(), 0);
+
+    db.finish_job(&first.id, "title").unwrap();
+    // Jobs go with their session
+    db.delete_session(&second.id).unwrap();
+    let jobs = db.get_jobs().unwrap();
+    assert_eq!(jobs.len(), 1);
+    assert_eq!((jobs[0].kind.as_str(), jobs[0].attempts), ("summary", 0));
+}
+
+#[test]
+fn test_session_summary_is_replaced_and_deleted_with_the_session() {
+    let tmp_file = NamedTempFile::new().unwrap();
+    let db = Database::new(tmp_file.path().to_path_buf()).unwrap();
+    let session = db.create_session("Chat", "gpt-4o", "", 0.7).unwrap();
+    assert_eq!(db.get_session_summary(&session.id).unwrap(), None);
+
+    db.set_session_summary(&session.id, "Planning a trip", 10).unwrap();
+    db.set_session_summary(&session.id, "Planning a trip to Lisbon", 20).unwrap();
+    assert_eq!(db.get_session_summary(&session.id).unwrap(), Some(("Planning a trip to Lisbon".to_string(), 20)));
+
+    db.delete_session(&session.id).unwrap();
+    assert_eq!(db.get_session_summary(&session.id).unwrap(), None);
+    // A summary needs its session
+    assert!(db.set_session_summary(&session.id, "Orphan", 1).is_err());
+}
@@ -1,6 +1,6 @@
 use once_cell::sync::Lazy;
 use pyo3::create_exception;
-use pyo3::exceptions::PyRuntimeError;
+use pyo3::exceptions::{PyRuntimeError, PyValueError};
 use pyo3::prelude::*;
 use tokio::runtime::Runtime;
 
@@ -20,15 +20,44 @@ static RUNTIME: Lazy<Runtime> =
 create_exception!(nanogpt_core, APIError, PyRuntimeError);
 create_exception!(nanogpt_core, DatabaseError, PyRuntimeError);
 
+/// An `APIError` carrying the failure's `status`, `retry_after` and
+/// `transient` attributes, which the request scheduler reads to decide
+/// whether and when to retry.
+fn api_error(error: api::client::RequestError) -> PyErr {
+    let err = APIError::new_err(error.message);
+    Python::with_gil(|py| {
+        let value = err.value(py);
+        let _ = value.setattr("status", error.status);
+        let _ = value.setattr("retry_after", error.retry_after);
+        let _ = value.setattr("transient", error.transient);
+    });
+    err
+}
+
 /// A Python-compatible wrapper for the NanoGPT API client.
 #[pyclass]
 struct PyNanoGPTClient {
     client: NanoGPTClient,
 }
 
+/// Marks a stream whose first byte has not arrived yet.
+const NO_TTFB: u64 = u64::MAX;
+/// How long to wait for the rest of a body after `[DONE]` before dropping it.
+const DRAIN_TIMEOUT: std::time::Duration = std::time::Duration::from_secs(5);
+
+/// Iterates over the content chunks of a streamed chat completion.
+///
+/// The request runs on the shared Tokio runtime; waiting for the next chunk
+/// releases the GIL. A failed request raises `APIError` from `__next__`.
+/// `close()`, from any thread, aborts the request at once: the response is
+/// dropped, which closes its connection, and a waiting `__next__` returns.
+/// Dropping the iterator does the same.
 #[pyclass]
 struct PyChunkIterator {
-    rx: std::sync::mpsc::Receiver<String>,
+    rx: std::sync::Mutex<std::sync::mpsc::Receiver<Result<String, api::client::RequestError>>>,
+    ttfb_us: std::sync::Arc<std::sync::atomic::AtomicU64>,
+    usage: std::sync::Arc<std::sync::Mutex<Option<api::client::Usage>>>,
+    task: tokio::task::JoinHandle<()>,
 }
 
 #[pymethods]
@@ -37,24 +66,162 @@ impl PyChunkIterator {
         slf
     }
 
-    fn __next__(mut slf: PyRefMut<'_, Self>) -> Option<String> {
-        slf.rx.recv().ok()
+    // Borrows shared, so `close()` can be called while another thread waits here
+    fn __next__(slf: PyRef<'_, Self>, py: Python<'_>) -> PyResult<Option<String>> {
+        let rx = &slf.rx;
+        let next = py.allow_threads(|| match rx.lock() {
+            Ok(rx) => rx.recv().ok(),
+            Err(_) => None,
+        });
+        match next {
+            Some(Ok(chunk)) => Ok(Some(chunk)),
+            Some(Err(error)) => Err(api_error(error)),
+            None => Ok(None),
+        }
+    }
+
+    /// Abort the request; chunks not yet read are discarded.
+    fn close(&self) {
+        self.task.abort();
+    }
+
+    /// Milliseconds from sending the request to the first byte of the
+    /// response body, or `None` while it has not arrived.
+    #[getter]
+    fn ttfb_ms(&self) -> Option<f64> {
+        match self.ttfb_us.load(std::sync::atomic::Ordering::Acquire) {
+            NO_TTFB => None,
+            us => Some(us as f64 / 1000.0),
+        }
+    }
+
+    /// Token usage reported by the final chunk, as a dict with
+    /// `prompt_tokens`, `completion_tokens` and `total_tokens`; `None` until
+    /// it arrives, or if the server does not report it.
+    #[getter]
+    fn usage(&self) -> Option<std::collections::HashMap<&'static str, u32>> {
+        let usage = self.usage.lock().ok()?.clone()?;
+        Some(std::collections::HashMap::from([
+            ("prompt_tokens", usage.prompt_tokens),
+            ("completion_tokens", usage.completion_tokens),
+            ("total_tokens", usage.total_tokens),
+        ]))
+    }
+}
+
+impl Drop for PyChunkIterator {
+    fn drop(&mut self) {
+        self.task.abort();
+    }
+}
+
+impl PyNanoGPTClient {
+    /// Send a streaming request on the shared runtime and return the
+    /// iterator its chunks are delivered to.
+    fn start_stream<T>(&self, request: T) -> PyChunkIterator
+    where
+        T: serde::Serialize + Send + Sync + 'static,
+    {
+        let client = self.client.clone();
+        let (tx, rx) = std::sync::mpsc::channel::<Result<String, api::client::RequestError>>();
+        let ttfb_us = std::sync::Arc::new(std::sync::atomic::AtomicU64::new(NO_TTFB));
+        let first_byte = ttfb_us.clone();
+        let reported_usage = std::sync::Arc::new(std::sync::Mutex::new(None));
+        let usage = reported_usage.clone();
+
+        // Runs on the shared runtime with the client's connection pool, so a
+        // new prompt reuses a warm connection instead of a fresh handshake
+        let task = RUNTIME.spawn(async move {
+            use futures_util::StreamExt;
+            let started = std::time::Instant::now();
+            let response = match client.chat_completion_stream(&request).await {
+                Ok(response) => response,
+                Err(e) => {
+                    let _ = tx.send(Err(e.into()));
+                    return;
+                }
+            };
+            if !response.status().is_success() {
+                let _ = tx.send(Err(api::client::RequestError::from_response(response).await));
+                return;
+            }
+
+            // Reads split events and UTF-8 characters anywhere; the decoder
+            // carries the unfinished line over to the next read
+            let mut body = response.bytes_stream();
+            let mut decoder = api::sse::SseDecoder::new();
+            let mut ended = false;
+            while !ended {
+                let events = match body.next().await {
+                    Some(Ok(bytes)) => {
+                        if first_byte.load(std::sync::atomic::Ordering::Relaxed) == NO_TTFB {
+                            let elapsed = started.elapsed().as_micros().min(NO_TTFB as u128 - 1) as u64;
+                            first_byte.store(elapsed, std::sync::atomic::Ordering::Release);
+                        }
+                        decoder.push(&bytes)
+                    }
+                    Some(Err(e)) => {
+                        let _ = tx.send(Err(e.into()));
+                        return;
+                    }
+                    None => {
+                        ended = true;
+                        decoder.finish()
+                    }
+                };
+                for event in events {
+                    if event.data == "[DONE]" {
+                        // End the iterator now, then read the rest of the body
+                        // so the connection goes back to the pool
+                        drop(tx);
+                        let drain = async { while let Some(Ok(_)) = body.next().await {} };
+                        let _ = tokio::time::timeout(DRAIN_TIMEOUT, drain).await;
+                        return;
+                    }
+                    let chunk = match serde_json::from_str::<api::client::StreamChunk>(&event.data) {
+                        Ok(chunk) => chunk,
+                        Err(_) => continue,
+                    };
+                    if let Some(reported) = chunk.usage {
+                        if let Ok(mut usage) = usage.lock() {
+                            *usage = Some(reported);
+                        }
+                    }
+                    let content = chunk.choices.into_iter().next().and_then(|choice| choice.delta.content);
+                    if let Some(content) = content {
+                        if tx.send(Ok(content)).is_err() {
+                            // The iterator was dropped; closing the body aborts the request
+                            return;
+                        }
+                    }
+                }
+            }
+        });
+
+        let rx = std::sync::Mutex::new(rx);
+        PyChunkIterator { rx, ttfb_us, usage: reported_usage, task }
     }
 }
 
 #[pymethods]
 impl PyNanoGPTClient {
     /// Create a new NanoGPT client with the given API key.
+    ///
+    /// `base_url` points the client at another endpoint, such as a local
+    /// test server. All requests share one pooled HTTP client.
     #[new]
-    fn new(api_key: String) -> Self {
-        Self {
-            client: NanoGPTClient::new(api_key),
-        }
+    #[pyo3(signature = (api_key, base_url=None))]
+    fn new(api_key: String, base_url: Option<String>) -> Self {
+        let client = match base_url {
+            Some(base_url) => NanoGPTClient::with_base_url(api_key, base_url),
+            None => NanoGPTClient::new(api_key),
+        };
+        Self { client }
     }
 
-    /// Update the API key used by the client.
-    fn set_api_key(&mut self, api_key: String) {
-        self.client = NanoGPTClient::new(api_key);
+    /// Update the API key used by the client, keeping its open connections.
+    fn set_api_key(&self, api_key: String) {
+        RUNTIME.block_on(self.client.set_api_key(api_key));
     }
 
     /// Perform a synchronous chat completion request.
@@ -68,7 +235,10 @@ impl PyNanoGPTClient {
     ) -> PyResult<String> {
         let messages: Vec<api::client::Message> = messages
             .into_iter()
-            .map(|(role, content)| api::client::Message { role, content })
+            .map(|(role, content)| api::client::Message {
+                role,
+                content: serde_json::Value::String(content),
+            })
             .collect();
 
         let request = api::client::ChatRequest {
@@ -77,7 +247,10 @@ impl PyNanoGPTClient {
             temperature,
             max_tokens,
             top_p: None,
+            frequency_penalty: None,
+            presence_penalty: None,
             stream: Some(false),
+            stream_options: None,
         };
 
         RUNTIME
@@ -85,7 +258,7 @@ impl PyNanoGPTClient {
                 self.client
                     .chat_completion(request)
                     .await
-                    .map_err(|e| APIError::new_err(e.to_string()))
+                    .map_err(api_error)
             })
             .and_then(|response| {
                 if let Some(ref error) = response.error {
@@ -93,7 +266,13 @@ impl PyNanoGPTClient {
                 }
                 match response.choices {
                     Some(ref choices) if !choices.is_empty() => match choices.first() {
-                        Some(choice) => Ok(choice.message.content.clone()),
+                        // Replies to text prompts carry their content as a string
+                        Some(choice) => choice
+                            .message
+                            .content
+                            .as_str()
+                            .map(str::to_owned)
+                            .ok_or_else(|| APIError::new_err("Reply content is not text")),
                         None => Err(APIError::new_err("Failed to extract message content")),
                     },
                     _ => Err(APIError::new_err("Empty choices - no response from API")),
@@ -113,24 +292,23 @@ impl PyNanoGPTClient {
         frequency_penalty: Option<f32>,
         presence_penalty: Option<f32>,
     ) -> PyResult<PyObject> {
-        let client = self.client.clone();
-        let messages: Vec<api::client::Message> = messages
-            .into_iter()
-            .map(|(role, content)| {
-                let content_value = Python::with_gil(|py| {
-                    if let Ok(s) = content.extract::<String>(py) {
+        let messages = Python::with_gil(|py| {
+            messages
+                .into_iter()
+                .map(|(role, content)| {
+                    let content_value = if let Ok(s) = content.extract::<String>(py) {
                         serde_json::Value::String(s)
                     } else {
                         // For vision models, content is a list of objects
                         // We convert it to a JSON string in Python then parse it in Rust
-                        let json = py.import("json").unwrap();
-                        let json_str: String = json.call_method1("dumps", (content,)).unwrap().extract().unwrap();
+                        let json_str: String =
+                            py.import("json")?.call_method1("dumps", (content,))?.extract()?;
                         serde_json::from_str(&json_str).unwrap_or(serde_json::Value::Null)
-                    }
-                });
-                api::client::Message { role, content: content_value }
-            })
-            .collect();
+                    };
+                    Ok(api::client::Message { role, content: content_value })
+                })
+                .collect::<PyResult<Vec<api::client::Message>>>()
+        })?;
 
         let request = api::client::ChatRequest {
             model,
@@ -141,56 +319,41 @@ impl PyNanoGPTClient {
             frequency_penalty,
             presence_penalty,
             stream: Some(true),
+            // The last chunk reports the tokens used, read through `usage`
+            stream_options: Some(api::client::StreamOptions { include_usage: true }),
         };
 
-        Python::with_gil(|py| {
-            let (tx, rx) = std::sync::mpsc::channel();
-
-            // Run the streaming in background
-            std::thread::spawn(move || {
-                let rt = Runtime::new().expect("Failed to create thread local runtime");
-                rt.block_on(async {
-                    use futures_util::StreamExt;
-                    let auth = format!("Bearer {}", client.api_key.lock().await);
-                    let mut response = reqwest::Client::new()
-                        .post("https://nano-gpt.com/api/v1/chat/completions")
-                        .header("Authorization", auth)
-                        .json(&request)
-                        .send()
-                        .await
-                        .expect("Request failed")
-                        .bytes_stream();
-
-                    while let Some(item) = response.next().await {
-                        if let Ok(bytes) = item {
-                            let text = String::from_utf8_lossy(&bytes);
-                            for line in text.lines() {
-                                if line.starts_with("data: ") {
-                                    let data = &line[6..];
-                                    if data == "[DONE]" {
-                                        break;
-                                    }
-                                    if let Ok(chunk) = serde_json::from_str::<api::client::StreamChunk>(data) {
-                                        // Check if this is the final chunk with usage info
-                                        if let Some(choice) = chunk.choices.first() {
-                                            if let Some(ref content) = choice.delta.content {
-                                                if tx.send(content.clone()).is_err() {
-                                                    return;
-                                                }
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
-                });
-            });
+        Python::with_gil(|py| Ok(self.start_stream(request).into_py(py)))
+    }
 
-            // Create a Python iterator
-            let py_iter = PyChunkIterator { rx };
-            Ok(py_iter.into_py(py))
-        })
+    /// Stream a chat completion whose messages are already encoded as a
+    /// JSON array, e.g. from segments cached per message. The array is
+    /// copied into the request body without being parsed into values.
+    fn chat_completion_stream_raw(
+        &self,
+        model: String,
+        messages_json: String,
+        temperature: Option<f32>,
+        max_tokens: Option<u32>,
+        top_p: Option<f32>,
+        frequency_penalty: Option<f32>,
+        presence_penalty: Option<f32>,
+    ) -> PyResult<PyObject> {
+        let messages = serde_json::value::RawValue::from_string(messages_json)
+            .map_err(|e| PyValueError::new_err(format!("Invalid messages JSON: {}", e)))?;
+        let request = api::client::RawChatRequest {
+            model,
+            messages,
+            temperature,
+            max_tokens,
+            top_p,
+            frequency_penalty,
+            presence_penalty,
+            stream: true,
+            stream_options: Some(api::client::StreamOptions { include_usage: true }),
+        };
+
+        Python::with_gil(|py| Ok(self.start_stream(request).into_py(py)))
     }
 
     /// Retrieve a list of available models from the API.
@@ -200,25 +363,79 @@ impl PyNanoGPTClient {
                 self.client
                     .list_models()
                     .await
-                    .map_err(|e| APIError::new_err(e.to_string()))
+                    .map_err(api_error)
             })
             .map(|models| models.into_iter().map(|m| m.id).collect())
     }
+
+    /// Retrieve the models with their details unless they are unchanged
+    /// since the response that carried `etag` and `last_modified`.
+    ///
+    /// Returns `(models, etag, last_modified)`. `models` is a list of dicts
+    /// as the API describes each model, or None when the server answered
+    /// 304 Not Modified. The GIL is released while waiting.
+    #[pyo3(signature = (etag=None, last_modified=None))]
+    fn list_models_if_changed(
+        &self,
+        py: Python<'_>,
+        etag: Option<String>,
+        last_modified: Option<String>,
+    ) -> PyResult<(Option<PyObject>, Option<String>, Option<String>)> {
+        let catalog = py
+            .allow_threads(|| {
+                RUNTIME.block_on(
+                    self.client.list_models_if_changed(etag.as_deref(), last_modified.as_deref()),
+                )
+            })
+            .map_err(api_error)?;
+        // Arbitrary JSON becomes Python objects most simply through the json module
+        let models = match catalog.models {
+            Some(models) => {
+                let text = serde_json::to_string(&models)
+                    .map_err(|e| APIError::new_err(e.to_string()))?;
+                Some(py.import("json")?.call_method1("loads", (text,))?.into_py(py))
+            }
+            None => None,
+        };
+        Ok((models, catalog.etag, catalog.last_modified))
+    }
 }
 
 /// A Python-compatible wrapper for the SQLite database.
+///
+/// Every method releases the GIL while it waits for the connection and runs
+/// its query, so a database thread never holds up Python code elsewhere.
 #[pyclass]
 struct PyDatabase {
     db: std::sync::Mutex<Database>,
 }
 
+impl PyDatabase {
+    /// Run `f` against the database with the GIL released.
+    fn with_db<T, F>(&self, py: Python<'_>, f: F) -> PyResult<T>
+    where
+        T: Send,
+        F: FnOnce(&Database) -> rusqlite::Result<T> + Send,
+    {
+        py.allow_threads(|| {
+            let db = self
+                .db
+                .lock()
+                .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
+            f(&db).map_err(|e| DatabaseError::new_err(e.to_string()))
+        })
+    }
+}
+
 #[pymethods]
 impl PyDatabase {
     /// Open or create a new database at the specified path.
     #[new]
-    fn new(db_path: String) -> PyResult<Self> {
+    fn new(py: Python<'_>, db_path: String) -> PyResult<Self> {
         let path = std::path::PathBuf::from(db_path);
-        let db = Database::new(path).map_err(|e| DatabaseError::new_err(e.to_string()))?;
+        let db = py
+            .allow_threads(|| Database::new(path))
+            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
 
         Ok(Self {
             db: std::sync::Mutex::new(db),
@@ -226,187 +443,222 @@ impl PyDatabase {
     }
 
     /// Create a new chat session.
-    fn create_session(&self, title: String, model: String, system_prompt: String, temperature: f32) -> PyResult<PySession> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        let session = db
-            .create_session(&title, &model, &system_prompt, temperature)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
+    fn create_session(&self, py: Python<'_>, title: String, model: String, system_prompt: String, temperature: f32) -> PyResult<PySession> {
+        let session = self.with_db(py, |db| db.create_session(&title, &model, &system_prompt, temperature))?;
         Ok(PySession::from(session))
     }
 
     /// Retrieve a session by its unique ID.
-    fn get_session(&self, session_id: String) -> PyResult<Option<PySession>> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        let session = db
-            .get_session(&session_id)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
-
+    fn get_session(&self, py: Python<'_>, session_id: String) -> PyResult<Option<PySession>> {
+        let session = self.with_db(py, |db| db.get_session(&session_id))?;
         Ok(session.map(PySession::from))
     }
 
     /// Get all chat sessions, ordered by most recently updated.
-    fn get_all_sessions(&self) -> PyResult<Vec<PySession>> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        let sessions = db
-            .get_all_sessions()
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
-
+    fn get_all_sessions(&self, py: Python<'_>) -> PyResult<Vec<PySession>> {
+        let sessions = self.with_db(py, |db| db.get_all_sessions())?;
         Ok(sessions.into_iter().map(PySession::from).collect())
     }
 
     /// Get paginated chat sessions, ordered by most recently updated.
-    fn get_sessions_paginated(&self, limit: usize, offset: usize) -> PyResult<Vec<PySession>> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        let sessions = db
-            .get_sessions_paginated(limit, offset)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
-
+    fn get_sessions_paginated(&self, py: Python<'_>, limit: usize, offset: usize) -> PyResult<Vec<PySession>> {
+        let sessions = self.with_db(py, |db| db.get_sessions_paginated(limit, offset))?;
         Ok(sessions.into_iter().map(PySession::from).collect())
     }
 
+    /// Get one page of sessions, ordered by most recently updated.
+    ///
+    /// Returns the sessions and an opaque cursor for the next page, or
+    /// `None` when there are no more sessions.
+    #[pyo3(signature = (limit, cursor=None))]
+    fn get_sessions_page(&self, py: Python<'_>, limit: usize, cursor: Option<String>) -> PyResult<(Vec<PySession>, Option<String>)> {
+        let (sessions, next_cursor) = self.with_db(py, |db| db.get_sessions_page(limit, cursor.as_deref()))?;
+        Ok((sessions.into_iter().map(PySession::from).collect(), next_cursor))
+    }
+
     /// Add a new message to an existing session.
     fn create_message(
         &self,
+        py: Python<'_>,
         session_id: String,
         role: String,
         content: String,
         tokens: Option<u32>,
     ) -> PyResult<String> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        let message = db
-            .create_message(&session_id, &role, &content, tokens)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
+        let message = self.with_db(py, |db| db.create_message(&session_id, &role, &content, tokens))?;
         Ok(message.id)
     }
 
     /// Create multiple chat messages in a batch.
     fn create_messages_batch(
         &self,
+        py: Python<'_>,
         messages: Vec<(String, String, String, Option<u32>)>, // session_id, role, content, tokens
     ) -> PyResult<Vec<String>> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        
         // Convert to references for the Rust method
         let message_refs: Vec<(&str, &str, &str, Option<u32>)> = messages
             .iter()
             .map(|(sid, r, c, t)| (sid.as_str(), r.as_str(), c.as_str(), *t))
             .collect();
-            
-        let messages_result = db
-            .create_messages_batch(&message_refs)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
+
+        let messages_result = self.with_db(py, |db| db.create_messages_batch(&message_refs))?;
         Ok(messages_result.into_iter().map(|m| m.id).collect())
     }
 
-    /// Get all messages for a specific session.
-    fn get_messages(&self, session_id: String) -> PyResult<Vec<PyMessage>> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        let messages = db
-            .get_messages(&session_id)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
+    /// Start a message whose content will be appended as it arrives.
+    ///
+    /// The message stays partial until `complete_message` is called; one
+    /// that is still partial after a restart was interrupted.
+    fn create_partial_message(&self, py: Python<'_>, session_id: String, role: String, content: String) -> PyResult<String> {
+        let message = self.with_db(py, |db| db.create_partial_message(&session_id, &role, &content))?;
+        Ok(message.id)
+    }
 
+    /// Append text to a partial message.
+    fn append_message_content(&self, py: Python<'_>, message_id: String, content: String) -> PyResult<()> {
+        self.with_db(py, |db| db.append_message_content(&message_id, &content))
+    }
+
+    /// Append the remaining text of a partial message and mark it complete.
+    #[pyo3(signature = (message_id, content, tokens=None))]
+    fn complete_message(&self, py: Python<'_>, message_id: String, content: String, tokens: Option<u32>) -> PyResult<()> {
+        self.with_db(py, |db| db.complete_message(&message_id, &content, tokens))
+    }
+
+    /// Get every message left partial, newest first.
+    fn get_partial_messages(&self, py: Python<'_>) -> PyResult<Vec<PyMessage>> {
+        let messages = self.with_db(py, |db| db.get_partial_messages())?;
         Ok(messages.into_iter().map(PyMessage::from).collect())
     }
 
-    /// Get paginated messages for a specific session.
-    fn get_messages_paginated(&self, session_id: String, limit: usize, offset: usize) -> PyResult<Vec<PyMessage>> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        let messages = db
-            .get_messages_paginated(&session_id, limit, offset)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
+    /// Delete a single message.
+    fn delete_message(&self, py: Python<'_>, message_id: String) -> PyResult<()> {
+        self.with_db(py, |db| db.delete_message(&message_id))
+    }
+
+    /// Add one request's token usage to its session's and model's totals.
+    ///
+    /// Returns the session's new totals.
+    fn record_usage(&self, py: Python<'_>, session_id: String, model: String, prompt_tokens: u32, completion_tokens: u32) -> PyResult<PyTokenUsage> {
+        let usage = self.with_db(py, |db| db.record_usage(&session_id, &model, prompt_tokens, completion_tokens))?;
+        Ok(PyTokenUsage::from(usage))
+    }
+
+    /// Get the token totals of a session.
+    fn get_session_usage(&self, py: Python<'_>, session_id: String) -> PyResult<PyTokenUsage> {
+        let usage = self.with_db(py, |db| db.get_session_usage(&session_id))?;
+        Ok(PyTokenUsage::from(usage))
+    }
+
+    /// Get the token totals of every model used, most tokens first.
+    fn get_model_usage(&self, py: Python<'_>) -> PyResult<Vec<(String, PyTokenUsage)>> {
+        let usage = self.with_db(py, |db| db.get_model_usage())?;
+        Ok(usage.into_iter().map(|(model, usage)| (model, PyTokenUsage::from(usage))).collect())
+    }
+
+    /// Queue a job for a session unless it already has one of that kind.
+    ///
+    /// Returns whether the job was added.
+    fn enqueue_job(&self, py: Python<'_>, session_id: String, kind: String) -> PyResult<bool> {
+        self.with_db(py, |db| db.enqueue_job(&session_id, &kind))
+    }
+
+    /// Get every queued job, oldest first.
+    fn get_jobs(&self, py: Python<'_>) -> PyResult<Vec<PyBackgroundJob>> {
+        let jobs = self.with_db(py, |db| db.get_jobs())?;
+        Ok(jobs.into_iter().map(PyBackgroundJob::from).collect())
+    }
+
+    /// Count a failed run of a job and return its attempts so far.
+    fn record_job_attempt(&self, py: Python<'_>, session_id: String, kind: String) -> PyResult<u32> {
+        self.with_db(py, |db| db.record_job_attempt(&session_id, &kind))
+    }
+
+    /// Remove a job that is done or no longer wanted.
+    fn finish_job(&self, py: Python<'_>, session_id: String, kind: String) -> PyResult<()> {
+        self.with_db(py, |db| db.finish_job(&session_id, &kind))
+    }
+
+    /// Store a session's summary and its message count when it was written.
+    ///
+    /// The summary covers the newest messages; the count only tells when
+    /// enough new ones have arrived to write it again.
+    fn set_session_summary(&self, py: Python<'_>, session_id: String, summary: String, message_count: usize) -> PyResult<()> {
+        self.with_db(py, |db| db.set_session_summary(&session_id, &summary, message_count))
+    }
+
+    /// Get a session's summary and its message count when it was written, or `None`.
+    fn get_session_summary(&self, py: Python<'_>, session_id: String) -> PyResult<Option<(String, usize)>> {
+        self.with_db(py, |db| db.get_session_summary(&session_id))
+    }
 
+    /// Get all messages for a specific session.
+    fn get_messages(&self, py: Python<'_>, session_id: String) -> PyResult<Vec<PyMessage>> {
+        let messages = self.with_db(py, |db| db.get_messages(&session_id))?;
         Ok(messages.into_iter().map(PyMessage::from).collect())
     }
 
+    /// Get paginated messages for a specific session.
+    fn get_messages_paginated(&self, py: Python<'_>, session_id: String, limit: usize, offset: usize) -> PyResult<Vec<PyMessage>> {
+        let messages = self.with_db(py, |db| db.get_messages_paginated(&session_id, limit, offset))?;
+        Ok(messages.into_iter().map(PyMessage::from).collect())
+    }
+
+    /// Get the newest messages of a session before an optional cursor.
+    ///
+    /// Returns the messages oldest first and an opaque cursor for the older
+    /// history, or `None` when the start of the session has been reached.
+    #[pyo3(signature = (session_id, limit, cursor=None))]
+    fn get_messages_before(&self, py: Python<'_>, session_id: String, limit: usize, cursor: Option<String>) -> PyResult<(Vec<PyMessage>, Option<String>)> {
+        let (messages, next_cursor) = self.with_db(py, |db| db.get_messages_before(&session_id, limit, cursor.as_deref()))?;
+        Ok((messages.into_iter().map(PyMessage::from).collect(), next_cursor))
+    }
+
+    /// Get the number of messages in a session without loading them.
+    fn count_messages(&self, py: Python<'_>, session_id: String) -> PyResult<usize> {
+        self.with_db(py, |db| db.count_messages(&session_id))
+    }
+
     /// Delete a session and all its messages.
-    fn delete_session(&self, session_id: String) -> PyResult<()> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        db.delete_session(&session_id)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
-        Ok(())
+    fn delete_session(&self, py: Python<'_>, session_id: String) -> PyResult<()> {
+        self.with_db(py, |db| db.delete_session(&session_id))
     }
 
     /// Delete all messages in a specific session.
-    fn delete_messages(&self, session_id: String) -> PyResult<()> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        db.delete_messages(&session_id)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
-        Ok(())
+    fn delete_messages(&self, py: Python<'_>, session_id: String) -> PyResult<()> {
+        self.with_db(py, |db| db.delete_messages(&session_id))
     }
 
     /// Update the model for a specific session.
-    fn update_session_model(&self, session_id: String, model: String) -> PyResult<()> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        db.update_session_model(&session_id, &model)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
-        Ok(())
+    fn update_session_model(&self, py: Python<'_>, session_id: String, model: String) -> PyResult<()> {
+        self.with_db(py, |db| db.update_session_model(&session_id, &model))
     }
 
     /// Update parameters for a specific session.
-    fn update_session_params(&self, session_id: String, system_prompt: String, temperature: f32) -> PyResult<()> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        db.update_session_params(&session_id, &system_prompt, temperature)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
-        Ok(())
+    fn update_session_params(&self, py: Python<'_>, session_id: String, system_prompt: String, temperature: f32) -> PyResult<()> {
+        self.with_db(py, |db| db.update_session_params(&session_id, &system_prompt, temperature))
     }
-    
+
     /// Update the title for a specific session.
-    fn update_session_title(&self, session_id: String, title: String) -> PyResult<()> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        db.update_session_title(&session_id, &title)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
-        Ok(())
+    fn update_session_title(&self, py: Python<'_>, session_id: String, title: String) -> PyResult<()> {
+        self.with_db(py, |db| db.update_session_title(&session_id, &title))
     }
 
     /// Search for sessions matching a query in title or message content.
-    fn search_sessions(&self, query: String) -> PyResult<Vec<PySession>> {
-        let db = self
-            .db
-            .lock()
-            .map_err(|e| PyRuntimeError::new_err(e.to_string()))?;
-        let sessions = db.search_sessions(&query)
-            .map_err(|e| DatabaseError::new_err(e.to_string()))?;
+    fn search_sessions(&self, py: Python<'_>, query: String) -> PyResult<Vec<PySession>> {
+        let sessions = self.with_db(py, |db| db.search_sessions(&query))?;
         Ok(sessions.into_iter().map(PySession::from).collect())
     }
+
+    /// Full-text search over session titles and message content.
+    ///
+    /// Returns at most `limit` hits, best match first, each with the session
+    /// and a snippet of its best matching message.
+    #[pyo3(signature = (query, limit=50))]
+    fn search(&self, py: Python<'_>, query: String, limit: usize) -> PyResult<Vec<PySearchHit>> {
+        let hits = self.with_db(py, |db| db.search(&query, limit))?;
+        Ok(hits.into_iter().map(PySearchHit::from).collect())
+    }
 }
 
 /// A Python-compatible wrapper for a chat session.
@@ -459,6 +711,8 @@ struct PyMessage {
     created_at: i64,
     #[pyo3(get)]
     tokens: Option<u32>,
+    #[pyo3(get)]
+    partial: bool,
 }
 
 impl PyMessage {
@@ -470,6 +724,84 @@ impl PyMessage {
             content: message.content,
             created_at: message.created_at.timestamp(),
             tokens: message.tokens,
+            partial: message.partial,
+        }
+    }
+}
+
+/// A Python-compatible wrapper for the token totals of a session or model.
+#[pyclass]
+#[derive(Clone)]
+struct PyTokenUsage {
+    #[pyo3(get)]
+    prompt_tokens: u64,
+    #[pyo3(get)]
+    completion_tokens: u64,
+    #[pyo3(get)]
+    requests: u64,
+}
+
+#[pymethods]
+impl PyTokenUsage {
+    #[getter]
+    fn total_tokens(&self) -> u64 {
+        self.prompt_tokens + self.completion_tokens
+    }
+}
+
+impl PyTokenUsage {
+    fn from(usage: database::sqlite::TokenUsage) -> Self {
+        Self {
+            prompt_tokens: usage.prompt_tokens,
+            completion_tokens: usage.completion_tokens,
+            requests: usage.requests,
+        }
+    }
+}
+
+/// A Python-compatible wrapper for a queued background job.
+#[pyclass]
+#[derive(Clone)]
+struct PyBackgroundJob {
+    #[pyo3(get)]
+    session_id: String,
+    #[pyo3(get)]
+    kind: String,
+    #[pyo3(get)]
+    attempts: u32,
+    #[pyo3(get)]
+    created_at: i64,
+}
+
+impl PyBackgroundJob {
+    fn from(job: database::sqlite::BackgroundJob) -> Self {
+        Self {
+            session_id: job.session_id,
+            kind: job.kind,
+            attempts: job.attempts,
+            created_at: job.created_at.timestamp(),
+        }
+    }
+}
+
+/// A Python-compatible wrapper for a full-text search hit.
+#[pyclass]
+#[derive(Clone)]
+struct PySearchHit {
+    #[pyo3(get)]
+    session: PySession,
+    #[pyo3(get)]
+    snippet: String,
+    #[pyo3(get)]
+    rank: f64,
+}
+
+impl PySearchHit {
+    fn from(hit: database::sqlite::SearchHit) -> Self {
+        Self {
+            session: PySession::from(hit.session),
+            snippet: hit.snippet,
+            rank: hit.rank,
         }
     }
 }
@@ -523,6 +855,9 @@ fn nanogpt_core(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PyDatabase>()?;
     m.add_class::<PySession>()?;
     m.add_class::<PyMessage>()?;
+    m.add_class::<PySearchHit>()?;
+    m.add_class::<PyTokenUsage>()?;
+    m.add_class::<PyBackgroundJob>()?;
     m.add_class::<PyCredentialManager>()?;
     Ok(())
 }
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    yield app
+
+
+@pytest.fixture
+def store_service(qapp, store):
+    """The module's in-memory ``store`` behind a running DatabaseService."""
+    from nanogpt_chat.utils.database_service import DatabaseService
+    service = DatabaseService(lambda: store)
+    yield store, service
+    service.shutdown()
+
+
+class FakeClock:
+    """A clock for code that takes ``clock=``; tests move it by setting ``now``."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def wait_until(app, predicate, timeout=5.0):
+    """Process Qt events until ``predicate()`` is true or ``timeout`` expires.
+
+    ``app`` is None in tests that run no Qt event loop; they only poll.
+    """
+    import time
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        if app is not None:
+            app.processEvents()
+        time.sleep(0.001)
+    return True
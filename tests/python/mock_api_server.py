@@ -0,0 +1,166 @@
+"""A local stand-in for the OpenAI-compatible NanoGPT API, for tests."""
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockAPIServer:
+    """Serves ``/chat/completions`` (streamed or not) and ``/models`` on localhost.
+
+    Streams are sent as chunked server-sent events, one ``tokens`` entry per
+    event, ``chunk_delay`` seconds apart, followed by a usage chunk when the
+    request asks for one. Setting ``status`` makes every
+    request fail with that status; statuses put in ``fail_next`` fail that
+    many requests, one each, sending ``retry_after`` as a ``Retry-After``
+    header when it is set. ``connections`` counts accepted TCP
+    connections, ``aborted`` counts streams the client hung up on and
+    ``requests`` keeps every decoded request body.
+    Setting ``body_chunks`` to a list of bytes streams them verbatim instead,
+    one HTTP chunk each, to replay a recorded stream split at chosen points.
+    ``/models`` sends an ``ETag`` and answers a matching ``If-None-Match``
+    with 304 unless ``conditional`` is False; ``model_requests`` counts
+    the requests and ``not_modified`` the 304 answers.
+    """
+
+    def __init__(self, tokens=("Hello", ", ", "world"), chunk_delay=0.0):
+        self.tokens = list(tokens)
+        self.chunk_delay = chunk_delay
+        self.status = 200
+        self.fail_next = []
+        self.retry_after = None
+        self.body_chunks = None
+        self.models = ["gpt-4o", "gpt-4o-mini"]
+        self.conditional = True
+        self.model_requests = 0
+        self.not_modified = 0
+        self.requests = []
+        self.connections = 0
+        self.aborted = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def usage_for(self, body):
+        """Usage reported for a request: a token per word sent and per token streamed."""
+        prompt = sum(len(str(m["content"]).split()) for m in body.get("messages", []))
+        completion = len(self.tokens)
+        return {"prompt_tokens": prompt, "completion_tokens": completion,
+                "total_tokens": prompt + completion}
+
+    def model_list(self):
+        """The ``/models`` response; ``models`` holds ids or dicts of details."""
+        return {"object": "list",
+                "data": [m if isinstance(m, dict) else {"id": m, "object": "model"} for m in self.models]}
+
+    @property
+    def models_etag(self):
+        return '"%08x"' % zlib.crc32(json.dumps(self.models).encode())
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/api/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                with server._lock:
+                    server.model_requests += 1
+                if self._failing():
+                    return self._error()
+                if not server.conditional:
+                    return self._json(server.model_list())
+                etag = server.models_etag
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    return self.end_headers()
+                self._json(server.model_list(),
+                           headers={"ETag": etag})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests.append(body)
+                if self._failing():
+                    return self._error()
+                if not body.get("stream"):
+                    content = "".join(server.tokens)
+                    return self._json({"choices": [{"index": 0, "finish_reason": "stop",
+                                                    "message": {"role": "assistant", "content": content}}]})
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    if server.body_chunks is not None:
+                        for data in server.body_chunks:
+                            self._chunk(data)
+                        self.wfile.write(b"0\r\n\r\n")
+                        self.wfile.flush()
+                        return
+                    for token in server.tokens:
+                        event = {"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                        self._chunk(f"data: {json.dumps(event)}\n\n")
+                        if server.chunk_delay:
+                            time.sleep(server.chunk_delay)
+                    if (body.get("stream_options") or {}).get("include_usage"):
+                        self._chunk(f"data: {json.dumps({'choices': [], 'usage': server.usage_for(body)})}\n\n")
+                    self._chunk("data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+                    with server._lock:
+                        server.aborted += 1
+
+            def _chunk(self, data):
+                if isinstance(data, str):
+                    data = data.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _json(self, payload, status=200, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _failing(self):
+                with server._lock:
+                    self._status = server.fail_next.pop(0) if server.fail_next else server.status
+                return self._status != 200
+
+            def _error(self):
+                headers = {"Retry-After": str(server.retry_after)} if server.retry_after is not None else None
+                self._json({"error": {"message": "mock failure"}}, self._status, headers)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,91 @@
+import asyncio
+import gc
+
+import pytest
+
+from mock_api_server import MockAPIServer
+from nanogpt_chat.exceptions import APIError
+from nanogpt_chat.utils.async_client import AsyncNanoGPTClient, ChunkStream
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer() as server:
+        yield server
+
+
+def test_stream_yields_deltas_and_reports_ttfb(server):
+    client = AsyncNanoGPTClient("sk-test", server.base_url)
+    stream = client.chat_completion_stream("gpt-4o", [("user", "hi")], 0.5, 100)
+
+    assert list(stream) == ["Hello", ", ", "world"]
+    assert stream.ttfb_ms is not None and stream.ttfb_ms >= 0
+    request = server.requests[0]
+    assert request["stream"] is True
+    assert request["messages"] == [{"role": "user", "content": "hi"}]
+    assert request["temperature"] == 0.5 and request["max_tokens"] == 100
+    assert "top_p" not in request
+
+
+def test_requests_reuse_one_pooled_connection(server):
+    client = AsyncNanoGPTClient("sk-test", server.base_url)
+    for _ in range(5):
+        assert "".join(client.chat_completion_stream("gpt-4o", [("user", "hi")])) == "Hello, world"
+    assert client.chat_completion_sync("gpt-4o", [("user", "hi")]) == "Hello, world"
+    assert client.list_models() == ["gpt-4o", "gpt-4o-mini"]
+
+    assert server.connections == 1
+    assert client.connections_opened == 1
+
+
+def test_many_concurrent_streams_share_one_loop(server):
+    server.chunk_delay = 0.01
+    client = AsyncNanoGPTClient("sk-test", server.base_url, max_connections=8)
+
+    async def collect():
+        return "".join([delta async for delta in client.stream_chat("gpt-4o", [("user", "hi")])])
+
+    async def fan_out():
+        return await asyncio.gather(*(collect() for _ in range(32)))
+
+    results = asyncio.run_coroutine_threadsafe(fan_out(), client._loop).result(timeout=30)
+    assert results == ["Hello, world"] * 32
+    assert client.connections_opened <= 8
+
+
+def test_error_status_raises_api_error(server):
+    server.status = 429
+    client = AsyncNanoGPTClient("sk-test", server.base_url)
+
+    with pytest.raises(APIError, match="429.*mock failure"):
+        list(client.chat_completion_stream("gpt-4o", [("user", "hi")]))
+    with pytest.raises(APIError, match="429"):
+        client.list_models()
+
+    # The failed requests leave the pool usable
+    server.status = 200
+    assert client.list_models() == ["gpt-4o", "gpt-4o-mini"]
+
+
+def test_closed_idle_connection_is_replaced(server):
+    client = AsyncNanoGPTClient("sk-test", server.base_url)
+    assert client.list_models()
+
+    # Drop the pooled connection behind the client's back, as an idle timeout would
+    for connections in client._pool._idle.values():
+        for connection in connections:
+            connection.writer.transport.abort()
+    assert client.list_models() == ["gpt-4o", "gpt-4o-mini"]
+
+
+@pytest.mark.filterwarnings("error::pytest.PytestUnraisableExceptionWarning")
+def test_stream_refused_on_the_loop_thread_is_dropped_quietly(server):
+    client = AsyncNanoGPTClient("sk-test", server.base_url)
+
+    async def open_stream():
+        with pytest.raises(RuntimeError):
+            ChunkStream(client, "gpt-4o", [("user", "hi")])
+
+    asyncio.run_coroutine_threadsafe(open_stream(), client._loop).result(timeout=5)
+    # The half-built stream is collected without __del__ failing
+    gc.collect()
@@ -0,0 +1,191 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from conftest import wait_until
+from mock_api_server import MockAPIServer
+from nanogpt_chat.utils.async_client import AsyncNanoGPTClient
+from nanogpt_chat.utils.background_jobs import (
+    JOB_SUMMARY, JOB_TITLE, SUMMARY_EVERY, BackgroundJobQueue, clean_title
+)
+from nanogpt_chat.utils.request_scheduler import RequestScheduler, ScheduledClient
+
+
+class SessionStore:
+    """Sessions, messages and queued jobs kept in memory, like the database keeps them."""
+
+    def __init__(self):
+        self.titles = {}
+        self.messages = {}
+        self.summaries = {}
+        self.jobs = {}
+
+    def add_session(self, session_id, *contents):
+        self.titles[session_id] = "New Chat"
+        self.messages[session_id] = [
+            SimpleNamespace(role="user" if i % 2 == 0 else "assistant", content=content)
+            for i, content in enumerate(contents)]
+
+    def enqueue_job(self, session_id, kind):
+        if (session_id, kind) in self.jobs:
+            return False
+        self.jobs[(session_id, kind)] = 0
+        return True
+
+    def get_jobs(self):
+        return [SimpleNamespace(session_id=s, kind=k, attempts=a) for (s, k), a in self.jobs.items()]
+
+    def record_job_attempt(self, session_id, kind):
+        if (session_id, kind) not in self.jobs:
+            return 0
+        self.jobs[(session_id, kind)] += 1
+        return self.jobs[(session_id, kind)]
+
+    def finish_job(self, session_id, kind):
+        self.jobs.pop((session_id, kind), None)
+
+    def update_session_title(self, session_id, title):
+        self.titles[session_id] = title
+
+    def get_messages_paginated(self, session_id, limit, offset):
+        return self.messages[session_id][offset:offset + limit]
+
+    def get_messages_before(self, session_id, limit, cursor=None):
+        return self.messages[session_id][-limit:], None
+
+    def count_messages(self, session_id):
+        return len(self.messages[session_id])
+
+    def get_session_summary(self, session_id):
+        return self.summaries.get(session_id)
+
+    def set_session_summary(self, session_id, summary, message_count):
+        self.summaries[session_id] = (summary, message_count)
+
+
+@pytest.fixture
+def store():
+    return SessionStore()
+
+
+def completions(server):
+    return [request for request in server.requests if not request.get("stream")]
+
+
+def test_clean_title():
+    assert clean_title('"Trip to Lisbon."') == "Trip to Lisbon"
+    assert clean_title("\nTitle: **Fixing a flaky test**\nMore text") == "Fixing a flaky test"
+    assert clean_title("  ") == ""
+    long = clean_title("word " * 30)
+    assert len(long) <= 61 and long.endswith("word…")
+
+
+def test_title_is_generated_on_the_cheap_model(store_service, qapp):
+    store, service = store_service
+    store.add_session("s1", "How long is the flight to Lisbon?", "About two hours.")
+    with MockAPIServer(tokens=['"Flights to Lisbon."']) as server:
+        jobs = BackgroundJobQueue(service, AsyncNanoGPTClient("sk-test", server.base_url), "gpt-4o-mini")
+        done = []
+        jobs.job_done.connect(lambda *args: done.append(args))
+        assert jobs.enqueue("s1", JOB_TITLE)
+
+        assert wait_until(qapp, lambda: done)
+        assert done == [(JOB_TITLE, "s1", "Flights to Lisbon")]
+        assert store.titles["s1"] == "Flights to Lisbon"
+        assert wait_until(qapp, lambda: not store.jobs)
+        request = completions(server)[0]
+        assert request["model"] == "gpt-4o-mini"
+        assert "How long is the flight to Lisbon?" in request["messages"][1]["content"]
+        jobs.shutdown()
+
+
+def test_jobs_are_deduplicated_and_survive_a_restart(store_service, qapp):
+    store, service = store_service
+    store.add_session("s1", "hello", "hi")
+    store.add_session("s2", "bonjour", "salut")
+    # No client yet, so nothing runs
+    jobs = BackgroundJobQueue(service, None)
+    assert jobs.enqueue("s1", JOB_TITLE)
+    assert not jobs.enqueue("s1", JOB_TITLE)
+    assert jobs.enqueue("s2", JOB_TITLE)
+    assert jobs.enqueue("s1", JOB_SUMMARY)
+    jobs.cancel("s1", JOB_SUMMARY)
+    assert jobs.pending == [("s1", JOB_TITLE), ("s2", JOB_TITLE)]
+    jobs.shutdown()
+    service.call(lambda db: None)
+    assert list(store.jobs) == [("s1", JOB_TITLE), ("s2", JOB_TITLE)]
+
+    with MockAPIServer(tokens=["Greetings"]) as server:
+        restarted = BackgroundJobQueue(service, AsyncNanoGPTClient("sk-test", server.base_url))
+        assert wait_until(qapp, lambda: not store.jobs)
+        assert store.titles == {"s1": "Greetings", "s2": "Greetings"}
+        assert len(completions(server)) == 2
+        restarted.shutdown()
+
+
+def test_jobs_wait_while_an_interactive_stream_is_in_flight(store_service, qapp):
+    store, service = store_service
+    store.add_session("s1", "hello", "hi")
+    with MockAPIServer(tokens=["tick "] * 20, chunk_delay=0.02) as server:
+        client = ScheduledClient(AsyncNanoGPTClient("sk-test", server.base_url), RequestScheduler())
+        jobs = BackgroundJobQueue(service, client)
+        stream = client.chat_completion_stream("gpt-4o", [("user", "count")])
+        assert next(stream) == "tick "
+        jobs.enqueue("s1", JOB_TITLE)
+        time.sleep(0.1)
+        assert completions(server) == []
+
+        assert "".join(stream) == "tick " * 19
+        assert wait_until(qapp, lambda: store.titles["s1"] != "New Chat")
+        assert len(completions(server)) == 1
+        jobs.shutdown()
+
+
+def test_summary_is_redone_only_after_enough_new_messages(store_service, qapp):
+    store, service = store_service
+    store.add_session("s1", *[f"message {i}" for i in range(8)])
+    with MockAPIServer(tokens=["They counted messages."]) as server:
+        jobs = BackgroundJobQueue(service, AsyncNanoGPTClient("sk-test", server.base_url))
+        done = []
+        jobs.job_done.connect(lambda *args: done.append(args))
+        jobs.enqueue("s1", JOB_SUMMARY)
+        assert wait_until(qapp, lambda: done)
+        assert store.summaries["s1"] == ("They counted messages.", 8)
+
+        # Too few new messages: the job ends without a request
+        store.messages["s1"].append(SimpleNamespace(role="user", content="one more"))
+        jobs.enqueue("s1", JOB_SUMMARY)
+        assert wait_until(qapp, lambda: not jobs.busy and not store.jobs)
+        assert len(completions(server)) == 1
+
+        store.add_session("s1", *[f"message {i}" for i in range(8 + SUMMARY_EVERY)])
+        jobs.enqueue("s1", JOB_SUMMARY)
+        assert wait_until(qapp, lambda: len(done) == 2)
+        assert store.summaries["s1"][1] == 8 + SUMMARY_EVERY
+        jobs.shutdown()
+
+
+def test_failed_jobs_are_kept_for_a_later_launch_then_given_up(store_service, qapp):
+    store, service = store_service
+    store.add_session("s1", "hello", "hi")
+    with MockAPIServer() as server:
+        server.status = 400
+        jobs = BackgroundJobQueue(service, AsyncNanoGPTClient("sk-test", server.base_url), max_attempts=2)
+        failed = []
+        jobs.job_failed.connect(lambda *args: failed.append(args))
+        jobs.enqueue("s1", JOB_TITLE)
+        assert wait_until(qapp, lambda: failed)
+        assert failed[0][:2] == (JOB_TITLE, "s1")
+        assert wait_until(qapp, lambda: store.jobs == {("s1", JOB_TITLE): 1})
+        # Not retried in this run
+        assert jobs.pending == []
+        jobs.shutdown()
+
+        relaunched = BackgroundJobQueue(service, AsyncNanoGPTClient("sk-test", server.base_url),
+                                        max_attempts=2)
+        assert wait_until(qapp, lambda: not store.jobs)
+        assert store.titles["s1"] == "New Chat"
+        relaunched.shutdown()
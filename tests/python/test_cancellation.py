@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from conftest import wait_until
+from mock_api_server import MockAPIServer
+from nanogpt_chat.utils.async_client import AsyncNanoGPTClient
+from nanogpt_chat.utils.cancellation import CancellationToken
+
+# Far longer than any cancellation may take
+SLOW_STREAM = ["token "] * 100
+CHUNK_DELAY = 0.25
+CANCEL_BOUND = 0.2
+
+
+@pytest.fixture
+def slow_server():
+    with MockAPIServer(SLOW_STREAM, chunk_delay=CHUNK_DELAY) as server:
+        yield server
+
+
+def test_token_runs_callbacks_once():
+    token = CancellationToken()
+    calls = []
+    token.add_callback(lambda: calls.append("early"))
+    token.cancel()
+    token.cancel()
+    token.add_callback(lambda: calls.append("late"))
+
+    assert token.cancelled
+    assert calls == ["early", "late"]
+
+
+def test_closing_stream_wakes_reader_and_aborts_request(slow_server):
+    client = AsyncNanoGPTClient("sk-test", slow_server.base_url, max_connections=1)
+    stream = client.chat_completion_stream("gpt-4o", [("user", "hi")])
+    assert next(stream) == "token "
+
+    # The reader is blocked waiting for the next chunk when the stream is closed
+    ended = threading.Event()
+    reader = threading.Thread(target=lambda: (list(stream), ended.set()))
+    reader.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    stream.close()
+    assert ended.wait(CANCEL_BOUND)
+    assert time.monotonic() - started < CANCEL_BOUND
+    reader.join()
+
+    # The connection was closed, so the server stops sending, and the only
+    # pool slot is free for the next request
+    assert wait_until(None, lambda: slow_server.aborted == 1, CHUNK_DELAY * 4)
+    assert client.list_models() == ["gpt-4o", "gpt-4o-mini"]
+    assert client.connections_opened == 2
+
+
+def test_closing_before_the_response_arrives(slow_server):
+    client = AsyncNanoGPTClient("sk-test", slow_server.base_url)
+    stream = client.chat_completion_stream("gpt-4o", [("user", "hi")])
+    stream.close()
+    assert list(stream) == []
+
+
+def test_cancelled_worker_stops_within_bound(qapp, slow_server):
+    from nanogpt_chat.ui.main_window import ChatWorker
+
+    client = AsyncNanoGPTClient("sk-test", slow_server.base_url)
+    worker = ChatWorker(client, [("user", "hi")], "gpt-4o", 0.7, 100)
+    deltas, outcomes = [], []
+    worker.delta_received.connect(deltas.append)
+    worker.finished.connect(outcomes.append)
+    worker.error.connect(outcomes.append)
+    worker.start()
+    assert wait_until(qapp, lambda: deltas)
+
+    started = time.monotonic()
+    worker.cancel()
+    assert worker.wait(int(CANCEL_BOUND * 1000))
+    assert time.monotonic() - started < CANCEL_BOUND
+    qapp.processEvents()
+
+    # Only what arrived before the cancel was emitted, and no outcome
+    assert set("".join(deltas).split()) == {"token"}
+    assert outcomes == []
+    assert wait_until(None, lambda: slow_server.aborted == 1, CHUNK_DELAY * 4)
@@ -0,0 +1,123 @@
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from conftest import wait_until
+from nanogpt_chat.ui import chat_widget
+from nanogpt_chat.ui.chat_widget import ChatTranscriptModel, ChatWidget, TranscriptMessage
+from nanogpt_chat.utils.render_service import RenderService
+
+
+@pytest.fixture
+def widget(qapp, monkeypatch):
+    service = RenderService(render_fn=lambda content, text_color, theme, font_px: f"<p>{content}</p>")
+    monkeypatch.setattr(chat_widget, "get_render_service", lambda: service)
+    widget = ChatWidget()
+    widget.resize(800, 600)
+    yield widget
+    service.shutdown()
+
+
+def test_model_rows_track_appends_and_prepends(qapp):
+    model = ChatTranscriptModel()
+    first = TranscriptMessage("user", "hi")
+    second = TranscriptMessage("assistant", "hello")
+    model.append_message(first)
+    model.append_message(second)
+    older = [TranscriptMessage("user", "a"), TranscriptMessage("assistant", "b")]
+    model.prepend_messages(older)
+
+    assert model.rowCount() == 4
+    assert [model.row_of(m) for m in older + [first, second]] == [0, 1, 2, 3]
+    assert model.index(3).data() == "hello"
+    assert model.index(0).data(ChatTranscriptModel.MessageRole) is older[0]
+
+
+def test_message_changed_bumps_revision_and_emits_for_its_row(qapp):
+    model = ChatTranscriptModel()
+    messages = [TranscriptMessage("user", str(i)) for i in range(3)]
+    for message in messages:
+        model.append_message(message)
+    changed = []
+    model.dataChanged.connect(lambda top_left, bottom_right: changed.append(top_left.row()))
+
+    model.message_changed(messages[1])
+    model.message_changed(TranscriptMessage("user", "not in the model"))
+
+    assert changed == [1]
+    assert messages[1].revision == 1
+
+
+def test_static_messages_are_rendered_once_painted(qapp, widget):
+    message = widget.add_message("assistant", "**bold**")
+    assert "**bold**" in message.html
+    assert message.needs_render
+
+    widget.show()
+    assert wait_until(qapp, lambda: "<p>**bold**</p>" in message.html)
+    assert not message.needs_render
+    widget.hide()
+
+
+def test_only_visible_rows_are_rendered(qapp, widget):
+    messages = [widget.add_message("user", f"message {i}") for i in range(500)]
+    widget.show()
+    assert wait_until(qapp, lambda: not messages[-1].needs_render and not widget._pending_renders)
+
+    assert messages[0].needs_render
+    assert sum(not m.needs_render for m in messages) < 50
+    widget.hide()
+
+
+def test_streamed_deltas_update_a_single_row(qapp, widget):
+    widget.add_message("user", "question")
+    widget.append_stream_delta("Hello")
+    widget.append_stream_delta(", world")
+    widget.finish_stream()
+
+    assert widget.message_count() == 2
+    message = widget.model.message_at(1)
+    assert message.role == "assistant"
+    assert message.content == "Hello, world"
+    assert "Hello, world" in message.html
+
+
+def test_interrupted_reply_resumes_streaming_in_place(qapp, widget):
+    widget.add_message("user", "question")
+    message = widget.add_message("assistant", "Half an ans", interrupted=True)
+    continued = []
+    widget.continue_requested.connect(continued.append)
+    widget.delegate.continue_requested.emit(message)
+    assert continued == [message]
+
+    widget.resume_stream(message)
+    widget.append_stream_delta("wer.")
+    assert widget.finish_stream() is message
+
+    assert widget.message_count() == 2
+    assert message.content == "Half an answer."
+    assert not message.interrupted
+    assert widget.last_message() is message
+
+
+def test_clear_drops_rows_and_pending_renders(qapp, widget):
+    for i in range(10):
+        widget.add_message("user", f"message {i}")
+    widget.clear()
+
+    assert widget.message_count() == 0
+    assert widget._pending_renders == {}
+
+
+def test_row_heights_follow_the_painted_layout(qapp, widget):
+    widget.show()
+    short = widget.add_message("user", "short")
+    long = widget.add_message("assistant", "\n\n".join(f"paragraph {i}" for i in range(30)))
+    assert wait_until(qapp, lambda: not widget._pending_renders)
+    widget.list_view.viewport().repaint()
+    qapp.processEvents()
+
+    short_height = widget.list_view.visualRect(widget.model.index(widget.model.row_of(short))).height()
+    long_height = widget.list_view.visualRect(widget.model.index(widget.model.row_of(long))).height()
+    assert 0 < short_height < long_height
+    widget.hide()
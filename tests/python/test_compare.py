@@ -0,0 +1,150 @@
+from conftest import FakeClock, wait_until
+from mock_api_server import MockAPIServer
+from nanogpt_chat.utils.async_client import AsyncNanoGPTClient
+from nanogpt_chat.utils.model_catalog import ModelCatalog
+from nanogpt_chat.utils.streaming import StreamStats
+
+
+def test_stream_stats_from_reported_usage():
+    clock = FakeClock()
+    stats = StreamStats(clock)
+    stats.start()
+    clock.now = 0.25
+    stats.chunk("Hello")
+    stats.chunk("")
+    clock.now = 1.25
+    stats.chunk(" world")
+    stats.finish({"completion_tokens": 40})
+
+    assert stats.ttft_ms == 250
+    assert stats.latency_ms == 1250
+    assert (stats.chunks, stats.chars, stats.tokens, stats.estimated) == (2, 11, 40, False)
+    assert stats.tokens_per_second == 40
+    assert stats.summary() == "TTFT 250 ms · 40.0 tok/s · total 1.25 s"
+
+
+def test_stream_stats_count_chunks_without_usage():
+    clock = FakeClock()
+    stats = StreamStats(clock)
+    stats.start()
+    assert stats.ttft_ms is None and stats.tokens_per_second is None
+    clock.now = 0.5
+    stats.chunk("one")
+    stats.finish()
+
+    # A single chunk: the rate is over the whole request
+    assert (stats.tokens, stats.estimated) == (1, True)
+    assert stats.tokens_per_second == 2
+    assert "~2.0 tok/s" in stats.summary()
+
+
+def test_worker_records_stream_stats(qapp):
+    from nanogpt_chat.ui.main_window import ChatWorker
+
+    with MockAPIServer(chunk_delay=0.01) as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        worker = ChatWorker(client, [("user", "hi")], "gpt-4o", 0.7, 100)
+        done = []
+        worker.finished.connect(done.append)
+        worker.start()
+        assert wait_until(qapp, lambda: done)
+        worker.wait()
+
+    stats = worker.stats
+    assert stats.tokens == 3 and not stats.estimated
+    assert 0 < stats.ttft_ms <= stats.latency_ms
+    assert stats.tokens_per_second > 0
+
+
+def make_dialog(client, models):
+    from nanogpt_chat.ui.compare_view import CompareDialog
+    from nanogpt_chat.ui.main_window import ChatWorker
+
+    def start_worker(model, prompt):
+        return ChatWorker(client, [("user", prompt)], model, 0.7, 100)
+
+    dialog = CompareDialog(ModelCatalog(models), start_worker)
+    for model in models:
+        dialog.add_model(model)
+    return dialog
+
+
+def test_compare_streams_every_model_at_once_and_keeps_one(qapp):
+    with MockAPIServer(chunk_delay=0.05) as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        dialog = make_dialog(client, ["gpt-4o", "gpt-4o-mini", "deepseek-r1"])
+        chosen = []
+        dialog.answer_chosen.connect(lambda *args: chosen.append(args))
+        dialog.set_prompt("  hi there ")
+        dialog.run()
+        columns = list(dialog.columns.values())
+        assert wait_until(qapp, lambda: all(column.content for column in columns))
+
+        assert sorted(request["model"] for request in server.requests) == ["deepseek-r1", "gpt-4o", "gpt-4o-mini"]
+        stats = [column.worker.stats for column in columns]
+        # Every stream was under way before any of them finished
+        assert max(s.first_token_at for s in stats) < min(s.finished_at for s in stats)
+        for column in columns:
+            assert column.content == "Hello, world"
+            assert column.keep_button.isEnabled()
+            assert "TTFT" in column.metrics.text()
+            assert [m.content for m in column.transcript.model.messages()] == ["hi there", "Hello, world"]
+
+        dialog.columns["gpt-4o-mini"].keep_button.click()
+        assert chosen == [("hi there", "gpt-4o-mini", "Hello, world")]
+        assert not dialog.isVisible()
+        for column in columns:
+            column.worker.wait()
+
+
+def test_closing_cancels_the_streams(qapp):
+    with MockAPIServer(tokens=["tick "] * 200, chunk_delay=0.02) as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        dialog = make_dialog(client, ["gpt-4o", "gpt-4o-mini"])
+        dialog.set_prompt("count")
+        dialog.run()
+        assert wait_until(qapp, lambda: len(server.requests) == 2)
+        assert dialog.running
+        workers = [column.worker for column in dialog.columns.values()]
+
+        dialog.reject()
+        assert not dialog.running
+        for worker in workers:
+            assert worker.cancel_token.cancelled
+            assert worker.wait(2000)
+        assert all(column.content is None for column in dialog.columns.values())
+        assert wait_until(qapp, lambda: server.aborted == 2)
+
+
+def test_removing_a_model_drops_its_column(qapp):
+    dialog = make_dialog(None, ["gpt-4o", "gpt-4o-mini"])
+    assert dialog.add_model("gpt-4o") is None
+    dialog.columns["gpt-4o"].remove_button.click()
+    assert list(dialog.columns) == ["gpt-4o-mini"]
+    assert dialog.splitter.count() == 1
+
+
+def test_a_finished_worker_queued_signals_do_not_reach_the_next_run(qapp):
+    from nanogpt_chat.ui.compare_view import CompareColumn
+    from nanogpt_chat.ui.main_window import ChatWorker
+
+    with MockAPIServer(tokens=["old reply"]) as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        column = CompareColumn("gpt-4o")
+        first = ChatWorker(client, [("user", "one")], "gpt-4o", 0.7, 100)
+        column.begin("one", first)
+        first.start()
+        # Finished, with its signals still waiting in the event queue
+        first.wait()
+
+        server.tokens = ["new reply"]
+        second = ChatWorker(client, [("user", "two")], "gpt-4o", 0.7, 100)
+        column.begin("two", second)
+        qapp.processEvents()
+        assert column.content is None
+        assert not column.keep_button.isEnabled()
+
+        second.start()
+        assert wait_until(qapp, lambda: column.content)
+        assert column.content == "new reply"
+        second.wait()
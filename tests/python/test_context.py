@@ -0,0 +1,127 @@
+from nanogpt_chat.utils.context import (
+    DEFAULT_CONTEXT_LENGTH, ContextBuilder, context_length_for
+)
+from nanogpt_chat.utils.model_catalog import ModelCatalog
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+def long_session(n_messages, chars=400):
+    """Alternating user and assistant messages, each ``chars`` long and numbered."""
+    messages = []
+    for i in range(n_messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        text = f"message {i} "
+        messages.append({"role": role, "content": text + "x" * (chars - len(text))})
+    return messages
+
+
+def test_short_session_is_sent_whole_after_the_system_prompt():
+    messages = long_session(6)
+    window = ContextBuilder().build(messages, "gpt-4o", SYSTEM_PROMPT, 4096)
+
+    assert window.messages[0] == ("system", SYSTEM_PROMPT)
+    assert window.messages[1:] == [(m["role"], m["content"]) for m in messages]
+    assert window.dropped == 0
+
+
+def test_long_session_keeps_the_newest_messages_within_budget():
+    builder = ContextBuilder()
+    messages = long_session(5000)
+    window = builder.build(messages, "gpt-4", SYSTEM_PROMPT, 1024)
+
+    assert window.tokens <= window.budget
+    assert window.budget == int(8192 * 0.95) - 1024
+    sent = window.messages[1:]
+    assert window.dropped == len(messages) - len(sent) > 0
+    # A contiguous run ending at the newest message
+    assert sent == [(m["role"], m["content"]) for m in messages[-len(sent):]]
+    # The next older message would not have fit
+    next_older = builder.estimate(messages[-len(sent) - 1]["content"])
+    assert window.tokens + next_older > window.budget
+
+
+def test_reply_reservation_and_context_length_shrink_the_window():
+    builder = ContextBuilder()
+    messages = long_session(2000)
+
+    roomy = builder.build(messages, "gpt-4o", SYSTEM_PROMPT, 1024)
+    reserved = builder.build(messages, "gpt-4o", SYSTEM_PROMPT, 64000)
+    capped = builder.build(messages, "gpt-4o", SYSTEM_PROMPT, 1024, context_length=4096)
+
+    assert len(capped.messages) < len(reserved.messages) < len(roomy.messages)
+    assert capped.budget == int(4096 * 0.95) - 1024
+
+
+def test_newest_message_is_sent_even_when_over_budget():
+    messages = long_session(4) + [{"role": "user", "content": "y" * 100_000}]
+    window = ContextBuilder().build(messages, "gpt-4", SYSTEM_PROMPT, 1024)
+
+    assert window.messages == [("system", SYSTEM_PROMPT), ("user", "y" * 100_000)]
+    assert window.tokens > window.budget
+
+
+def test_no_system_message_without_a_prompt():
+    window = ContextBuilder().build(long_session(2), "gpt-4o", "", 1024)
+    assert [role for role, _ in window.messages] == ["user", "assistant"]
+
+
+def test_estimates_are_cached_across_turns():
+    builder = ContextBuilder()
+    messages = long_session(300)
+    builder.build(messages, "gpt-4o", SYSTEM_PROMPT, 1024)
+    misses = builder.cache_misses
+
+    # The next turn only measures the new message
+    messages.append({"role": "user", "content": "one more question"})
+    builder.build(messages, "gpt-4o", SYSTEM_PROMPT, 1024)
+    assert builder.cache_misses == misses + 1
+    assert builder.cache_hits >= 301
+
+
+def test_cache_is_bounded():
+    builder = ContextBuilder(cache_size=10)
+    builder.build(long_session(50), "gpt-4o", SYSTEM_PROMPT, 1024)
+    assert len(builder._estimates) == 10
+
+
+def test_estimates_scale_with_script_and_images():
+    builder = ContextBuilder()
+    latin = builder.estimate("a" * 400)
+    cjk = builder.estimate("字" * 400)
+    image = builder.estimate([{"type": "text", "text": "What is this?"},
+                              {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}}])
+
+    assert latin == 4 + 100
+    assert cjk == 4 + 400
+    assert image > 700
+
+
+def test_context_lengths_by_model():
+    assert context_length_for("gpt-4o-mini") == 128000
+    assert context_length_for("gpt-4") == 8192
+    assert context_length_for("openai/gpt-4-turbo") == 128000
+    assert context_length_for("claude-3-5-sonnet-20241022") == 200000
+    assert context_length_for("some-new-model") == DEFAULT_CONTEXT_LENGTH
+    assert context_length_for("some-new-model", {"some-new-model": 32000}) == 32000
+
+    builder = ContextBuilder()
+    builder.set_context_length("gpt-4o", 16000)
+    assert builder.budget_for("gpt-4o", 1000) == int(16000 * 0.95) - 1000
+
+
+def test_catalog_context_lengths_win_over_known_prefixes():
+    catalog = ModelCatalog([
+        {"id": "gpt-4o", "context_length": 64000},
+        {"id": "new-model", "context_window": 32000},
+        {"id": "gpt-4"},
+    ])
+    assert catalog.context_lengths() == {"gpt-4o": 64000, "new-model": 32000}
+
+    builder = ContextBuilder()
+    for model_id, tokens in catalog.context_lengths().items():
+        builder.set_context_length(model_id, tokens)
+    assert builder.budget_for("gpt-4o", 1000) == int(64000 * 0.95) - 1000
+    assert builder.budget_for("new-model", 1000) == int(32000 * 0.95) - 1000
+    # Models the catalog gives no length for fall back to the prefix table
+    assert builder.budget_for("gpt-4", 1000) == int(8192 * 0.95) - 1000
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from conftest import wait_until
+from nanogpt_chat.exceptions import DatabaseError
+from nanogpt_chat.utils.database_service import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, DatabaseService
+)
+
+
+class FakeDatabase:
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.calls = []
+        self.thread = None
+
+    def block(self):
+        self.gate.wait(5)
+
+    def get_session(self, session_id):
+        self.thread = threading.current_thread()
+        self.calls.append(("get_session", session_id))
+        return {"id": session_id}
+
+    def update_session_params(self, session_id, system_prompt, temperature):
+        self.calls.append(("update_session_params", session_id, temperature))
+
+    def fail(self):
+        raise ValueError("disk I/O error")
+
+
+def test_callbacks_run_on_the_gui_thread_and_queries_do_not(qapp):
+    db = FakeDatabase()
+    service = DatabaseService(lambda: db)
+    results = []
+    callback_threads = []
+
+    def done(result):
+        callback_threads.append(threading.current_thread())
+        results.append(result)
+
+    future = service.submit("get_session", "s1", callback=done)
+    assert future.result(5) == {"id": "s1"}
+    assert wait_until(qapp, lambda: results)
+    assert results == [{"id": "s1"}]
+    assert callback_threads == [threading.main_thread()]
+    assert db.thread is not threading.main_thread()
+    service.shutdown()
+
+
+def test_interactive_reads_overtake_background_writes(qapp):
+    gate = threading.Event()
+    db = FakeDatabase(gate)
+    service = DatabaseService(lambda: db)
+
+    service.submit("block")
+    service.submit("update_session_params", "s1", "", 0.5, priority=PRIORITY_BACKGROUND)
+    read = service.submit("get_session", "s1", priority=PRIORITY_INTERACTIVE)
+    gate.set()
+    read.result(5)
+    service.shutdown()
+
+    assert db.calls == [("get_session", "s1"), ("update_session_params", "s1", 0.5)]
+
+
+def test_keyed_jobs_keep_only_the_latest_pending_write(qapp):
+    gate = threading.Event()
+    db = FakeDatabase(gate)
+    service = DatabaseService(lambda: db)
+
+    service.submit("block")
+    futures = [service.submit("update_session_params", "s1", "", t / 10,
+                              priority=PRIORITY_BACKGROUND, key=("params", "s1"))
+               for t in range(5)]
+    gate.set()
+    service.shutdown()
+
+    assert [f.cancelled() for f in futures] == [True, True, True, True, False]
+    assert db.calls == [("update_session_params", "s1", 0.4)]
+
+
+def test_callables_receive_the_database(qapp):
+    db = FakeDatabase()
+    service = DatabaseService(lambda: db)
+
+    assert service.call(lambda d, sid: d.get_session(sid)["id"] + "!", "s2") == "s2!"
+    service.shutdown()
+
+
+def test_failures_reach_the_errback_and_the_future(qapp):
+    service = DatabaseService(FakeDatabase)
+    errors = []
+
+    future = service.submit("fail", errback=errors.append)
+    assert wait_until(qapp, lambda: errors)
+    assert isinstance(errors[0], ValueError)
+    assert isinstance(future.exception(5), ValueError)
+    with pytest.raises(ValueError):
+        service.call("fail")
+    service.shutdown()
+
+
+def test_missing_database_fails_every_job(qapp):
+    service = DatabaseService(lambda: None)
+
+    with pytest.raises(DatabaseError):
+        service.call("get_session", "s1")
+    service.shutdown()
+    with pytest.raises(DatabaseError):
+        service.submit("get_session", "s1")
+
+
+def test_shutdown_runs_queued_jobs_first(qapp):
+    gate = threading.Event()
+    db = FakeDatabase(gate)
+    service = DatabaseService(lambda: db)
+
+    service.submit("block")
+    service.submit("update_session_params", "s1", "", 0.9, priority=PRIORITY_BACKGROUND)
+    gate.set()
+    service.shutdown()
+
+    assert db.calls == [("update_session_params", "s1", 0.9)]
@@ -0,0 +1,52 @@
+from nanogpt_chat.utils.html_cache import RenderedHtmlCache, make_cache_key
+
+
+def test_key_depends_on_theme_colour_and_font():
+    base = make_cache_key("hello", "dark", "#fff", 13)
+    assert base == make_cache_key("hello", "dark", "#fff", 13)
+    assert base != make_cache_key("hello", "light", "#fff", 13)
+    assert base != make_cache_key("hello", "dark", "#000", 13)
+    assert base != make_cache_key("hello", "dark", "#fff", 14)
+    assert base != make_cache_key("hello", "dark", "#fff", 13, "v2")
+
+
+def test_memory_layer_evicts_least_recently_used_by_size():
+    cache = RenderedHtmlCache(memory_limit=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get_memory("a") == "aaaa"   # a is now most recent
+    cache.put("c", "cccc")                   # 12 bytes: evict b
+
+    assert cache.get_memory("b") is None
+    assert cache.get_memory("a") == "aaaa"
+    assert cache.get_memory("c") == "cccc"
+    assert cache.stats()["memory_bytes"] == 8
+
+
+def test_disk_layer_survives_restarts_and_counts_hits(tmp_path):
+    path = tmp_path / "render_cache.db"
+    cache = RenderedHtmlCache(path)
+    cache.put("key", "<p>hi</p>")
+    cache.close()
+
+    reopened = RenderedHtmlCache(path)
+    assert reopened.get_memory("key") is None
+    assert reopened.get("key") == "<p>hi</p>"     # disk hit, promoted
+    assert reopened.get("key") == "<p>hi</p>"     # memory hit
+    assert reopened.get("missing") is None
+
+    stats = reopened.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_disk_layer_is_size_bounded(tmp_path):
+    cache = RenderedHtmlCache(tmp_path / "render_cache.db", disk_limit=100)
+    for i in range(20):
+        cache.put(f"k{i}", "x" * 10)
+
+    assert cache.stats()["disk_bytes"] <= 100
+    cache.close()
+    reopened = RenderedHtmlCache(tmp_path / "render_cache.db", disk_limit=100)
+    assert reopened.stats()["disk_bytes"] <= 100
+    assert reopened.get("k19") is not None
+    assert reopened.get("k0") is None
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+pytest.importorskip("markdown")
+
+from nanogpt_chat.utils.markdown_renderer import IncrementalMarkdownRenderer, render_markdown
+
+DOCUMENTS = [
+    "Hello **world**",
+    "# Title\n\nFirst paragraph\nwith a soft break.\n\nSecond paragraph.\n",
+    "Intro:\n\n```python\ndef f(x):\n\n    return x * 2\n```\n\nAfter the code.\n",
+    "- one\n- two\n\n- three (loose)\n\n  continued item\n\nParagraph after list.\n",
+    "1. first\n2. second\n\n3. third\n\nDone.",
+    "| a | b |\n|---|---|\n| 1 | 2 |\n\nText below the table.\n\n> quote\n\n> more quote\n\nEnd",
+    "Unterminated fence:\n\n```js\nconst a = 1;\n\nconsole.log(a);\n",
+    "~~~\nplain fence\n~~~\n\n````\nnested ``` fence\n````\n\n***\n\nTrailing",
+    "See [the docs][docs] for details.\n\n[docs]: https://example.com\n",
+    "<div>\n\nraw html\n\n</div>\n\nafter",
+    "    indented code\n\n    more code\n\nText",
+    "Setext\n======\n\nSub\n---\n\n---\n\nfin",
+]
+
+
+def stream(renderer, text, rng, check_prefixes):
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 12)
+        renderer.append(text[pos:pos + step])
+        pos += step
+        if check_prefixes and rng.random() < 0.3:
+            assert renderer.html() == render_markdown(text[:pos])
+
+
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_incremental_render_matches_full_render(text):
+    rng = random.Random(hash(text) & 0xFFFF)
+    for _ in range(5):
+        renderer = IncrementalMarkdownRenderer()
+        stream(renderer, text, rng, check_prefixes=True)
+        assert renderer.html() == render_markdown(text)
+        assert renderer.source == text
+
+
+def test_completed_blocks_are_cached():
+    renderer = IncrementalMarkdownRenderer()
+    renderer.append("# Title\n\nparagraph one\n\n```python\nx = 1\n\n")
+    renderer.html()
+    assert renderer.committed_blocks == 2  # the open fence stays in the tail
+
+    renderer.append("y = 2\n```\n\nafter\n")
+    renderer.html()
+    assert renderer.committed_blocks == 3
+
+
+def test_reset_replaces_the_document():
+    renderer = IncrementalMarkdownRenderer("old\n\ntext\n")
+    renderer.html()
+    renderer.reset("new")
+    assert renderer.html() == render_markdown("new")
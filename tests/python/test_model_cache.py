@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from conftest import FakeClock
+from mock_api_server import MockAPIServer
+from nanogpt_chat.exceptions import APIError
+from nanogpt_chat.utils.async_client import AsyncNanoGPTClient
+from nanogpt_chat.utils.model_cache import ModelCatalogCache
+
+
+def test_catalog_survives_a_restart(tmp_path):
+    path = tmp_path / "model_catalog.json"
+    clock = FakeClock(1_000_000.0)
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        cache = ModelCatalogCache(path, ttl=60, clock=clock)
+        assert cache.models is None
+        assert cache.refresh(client) == ["gpt-4o", "gpt-4o-mini"]
+
+    reopened = ModelCatalogCache(path, ttl=60, clock=clock)
+    assert reopened.lookup() == ["gpt-4o", "gpt-4o-mini"]
+    assert reopened.is_fresh
+    assert json.loads(path.read_text())["etag"] == server.models_etag
+
+
+def test_fresh_catalog_is_not_refetched(tmp_path):
+    clock = FakeClock(1_000_000.0)
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        cache = ModelCatalogCache(tmp_path / "models.json", ttl=60, clock=clock)
+        cache.refresh(client)
+        clock.now += 30
+        assert cache.refresh(client) == ["gpt-4o", "gpt-4o-mini"]
+        assert server.model_requests == 1
+
+
+def test_stale_catalog_is_revalidated_with_its_etag(tmp_path):
+    clock = FakeClock(1_000_000.0)
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        cache = ModelCatalogCache(tmp_path / "models.json", ttl=60, clock=clock)
+        cache.refresh(client)
+
+        clock.now += 120
+        assert not cache.is_fresh
+        assert cache.refresh(client) == ["gpt-4o", "gpt-4o-mini"]
+        assert server.not_modified == 1
+        # Revalidating renews the catalog
+        assert cache.is_fresh
+
+        server.models = ["gpt-4o", "claude-3-5-sonnet"]
+        assert cache.refresh(client, force=True) == ["gpt-4o", "claude-3-5-sonnet"]
+        assert server.not_modified == 1
+        assert ModelCatalogCache(tmp_path / "models.json").models == ["gpt-4o", "claude-3-5-sonnet"]
+
+
+def test_servers_without_validators_send_the_whole_list(tmp_path):
+    with MockAPIServer() as server:
+        server.conditional = False
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        cache = ModelCatalogCache(tmp_path / "models.json", ttl=0)
+        cache.refresh(client)
+        server.models = ["gpt-4o"]
+        assert cache.refresh(client) == ["gpt-4o"]
+        assert (server.model_requests, server.not_modified) == (2, 0)
+
+
+def test_304_keeps_the_connection_alive():
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        models, etag, _ = client.list_models_if_changed()
+        assert [model["id"] for model in models] == ["gpt-4o", "gpt-4o-mini"]
+        assert client.list_models_if_changed(etag) == (None, etag, None)
+        assert client.list_models() == ["gpt-4o", "gpt-4o-mini"]
+        assert server.connections == 1
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    path = tmp_path / "models.json"
+    path.write_text("{not json")
+    assert ModelCatalogCache(path).models is None
+    path.write_text(json.dumps({"version": 99, "models": ["old"]}))
+    assert ModelCatalogCache(path).models is None
+
+
+def test_failed_refresh_keeps_the_cached_catalog(tmp_path):
+    clock = FakeClock(1_000_000.0)
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        cache = ModelCatalogCache(tmp_path / "models.json", ttl=60, clock=clock)
+        cache.refresh(client)
+        server.status = 500
+        clock.now += 120
+        with pytest.raises(APIError, match="500"):
+            cache.refresh(client)
+        assert cache.models == ["gpt-4o", "gpt-4o-mini"]
+        assert not cache.is_fresh
+
+
+def test_catalog_keeps_model_details(tmp_path):
+    with MockAPIServer() as server:
+        server.models = ["gpt-4o-mini", {"id": "gpt-4o", "name": "GPT-4o", "owned_by": "openai",
+                                         "context_length": 128000, "capabilities": {"vision": True},
+                                         "pricing": {"prompt": 2.5, "completion": 10, "currency": "USD"}}]
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        cache = ModelCatalogCache(tmp_path / "models.json")
+        assert cache.refresh(client) == ["gpt-4o-mini", "gpt-4o"]
+
+    model = ModelCatalogCache(tmp_path / "models.json").catalog().get("gpt-4o")
+    assert (model.name, model.owned_by, model.context_length) == ("GPT-4o", "openai", 128000)
+    assert model.vision
+    assert (model.prompt_price, model.completion_price, model.currency) == (2.5, 10.0, "USD")
+
+
+def test_catalog_of_bare_ids_from_an_older_cache_is_refetched(tmp_path):
+    path = tmp_path / "models.json"
+    path.write_text(json.dumps({"version": 1, "models": ["gpt-4o"], "fetched_at": 1e12}))
+    cache = ModelCatalogCache(path)
+    assert cache.models == ["gpt-4o"]
+    assert cache.catalog().get("gpt-4o").name == "gpt-4o"
+    assert not cache.is_fresh
@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from nanogpt_chat.utils.model_catalog import ModelCatalog, ModelInfo
+
+DETAILED = [
+    {"id": "claude-3-5-sonnet-20241022", "name": "Claude 3.5 Sonnet", "owned_by": "anthropic",
+     "context_length": 200000, "capabilities": {"vision": True},
+     "pricing": {"prompt": "3", "completion": "15", "currency": "USD"}},
+    {"id": "gpt-4o", "name": "GPT-4o", "owned_by": "openai", "context_length": 128000,
+     "capabilities": {"vision": True, "tools": True}},
+    {"id": "gpt-4o-mini", "name": "GPT-4o mini", "owned_by": "openai"},
+    {"id": "deepseek-r1", "name": "DeepSeek R1", "owned_by": "deepseek",
+     "architecture": {"modality": "text->text"}},
+    {"id": "llama-3.2-90b-vision", "architecture": {"input_modalities": ["text", "image"]}},
+    "o3-mini",
+]
+
+
+def random_catalog(n, seed=7):
+    rng = random.Random(seed)
+    vendors = ["openai", "anthropic", "meta", "google", "mistral", "qwen", "deepseek"]
+    words = ["chat", "instruct", "turbo", "mini", "vision", "sonnet", "flash", "pro", "coder"]
+    entries = []
+    for i in range(n):
+        vendor = rng.choice(vendors)
+        name = f"{vendor}/{rng.choice(words)}-{rng.randint(1, 9)}.{rng.randint(0, 9)}-{i}"
+        entries.append({"id": name, "owned_by": vendor, "capabilities": {"vision": rng.random() < 0.3}})
+    return ModelCatalog(entries)
+
+
+def linear_search(catalog, query, capabilities=()):
+    terms = query.lower().split()
+    return [row for row, model in enumerate(catalog.models)
+            if all(term in model.search_key for term in terms)
+            and all(c in model.capabilities for c in capabilities)]
+
+
+def test_details_are_read_from_api_entries():
+    catalog = ModelCatalog(DETAILED)
+    sonnet = catalog.get("claude-3-5-sonnet-20241022")
+
+    assert (sonnet.name, sonnet.owned_by, sonnet.context_length) == ("Claude 3.5 Sonnet", "anthropic", 200000)
+    assert (sonnet.prompt_price, sonnet.completion_price, sonnet.currency) == (3.0, 15.0, "USD")
+    assert "200,000 tokens" in sonnet.describe()
+    assert catalog.get("gpt-4o").capabilities == {"vision", "tools"}
+    assert catalog.get("llama-3.2-90b-vision").vision
+    assert not catalog.get("deepseek-r1").vision
+    assert catalog.get("o3-mini") == ModelInfo("o3-mini")
+    assert catalog.capabilities() == ["tools", "vision"]
+
+
+def test_search_matches_every_term_anywhere():
+    catalog = ModelCatalog(DETAILED)
+
+    def ids(query, capabilities=()):
+        return [catalog.models[row].id for row in catalog.search(query, capabilities)]
+
+    assert ids("4o") == ["gpt-4o", "gpt-4o-mini"]
+    assert ids("GPT mini") == ["gpt-4o-mini"]
+    assert ids("sonnet") == ["claude-3-5-sonnet-20241022"]
+    # Names and owners count as well as ids
+    assert ids("anthropic") == ["claude-3-5-sonnet-20241022"]
+    assert ids("", ["vision"]) == ["claude-3-5-sonnet-20241022", "gpt-4o", "llama-3.2-90b-vision"]
+    assert ids("gpt", ["vision"]) == ["gpt-4o"]
+    assert ids("nothing-like-this") == []
+    assert list(catalog.search("")) == list(range(len(catalog)))
+
+
+@pytest.mark.parametrize("query", ["a", "4o", "pro", "chat 7", "sonnet-3", "openai turbo", "vision-9.9",
+                                   "qwen/coder", "zzz", "i", "-1"])
+def test_index_agrees_with_a_linear_scan(query):
+    catalog = random_catalog(2000)
+    assert list(catalog.search(query)) == linear_search(catalog, query)
+    assert list(catalog.search(query, ["vision"])) == linear_search(catalog, query, ["vision"])
+
+
+def test_typing_and_deleting_agree_with_a_linear_scan():
+    catalog = random_catalog(2000)
+    query = "openai chat 7.1"
+    typed = [query[:end] for end in range(1, len(query) + 1)]
+    for text in typed + typed[::-1] + ["anth", "anthropic sonnet", "anthropic", ""]:
+        assert list(catalog.search(text)) == linear_search(catalog, text), text
+        assert list(catalog.search(text, ["vision"])) == linear_search(catalog, text, ["vision"]), text
+
+
+def test_later_entries_replace_earlier_ones_with_the_same_id():
+    catalog = ModelCatalog(["gpt-4o", {"id": "gpt-4o", "name": "GPT-4o"}])
+    assert len(catalog) == 1
+    assert catalog.get("gpt-4o").name == "GPT-4o"
+
+
+def test_picker_filters_as_you_type(qapp):
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtWidgets import QComboBox
+    from nanogpt_chat.ui.model_picker import ModelPicker
+
+    combo = QComboBox()
+    combo.setEditable(True)
+    picker = ModelPicker(combo)
+    changes = []
+    combo.currentIndexChanged.connect(changes.append)
+    combo.setEditText("gpt-4o")
+    picker.set_catalog(ModelCatalog(DETAILED))
+
+    assert combo.count() == len(DETAILED)
+    assert combo.currentText() == "gpt-4o"
+    assert combo.itemText(combo.currentIndex()) == "gpt-4o"
+
+    picker.matches.set_query("4o")
+    assert [picker.matches.index(row).data() for row in range(picker.matches.rowCount())] == ["gpt-4o", "gpt-4o-mini"]
+
+    picker.set_capability("vision")
+    assert combo.count() == 3
+    assert picker.matches.rowCount() == 1
+    assert combo.currentText() == "gpt-4o"
+
+    # A model missing from the filtered list stays typed in the box
+    picker.select("deepseek-r1")
+    assert combo.currentIndex() == -1
+    assert combo.currentText() == "deepseek-r1"
+    picker.set_capability("vision", False)
+    assert combo.itemText(combo.currentIndex()) == "deepseek-r1"
+    # Refilling and filtering the list never reports a change of model
+    assert changes == []
+
+    index = picker.choices.index(0)
+    assert picker.choices.mapFromSource(picker.choices.mapToSource(index)) == index
+    assert "anthropic" in index.data(Qt.ItemDataRole.ToolTipRole)
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from conftest import wait_until
+from nanogpt_chat.utils.database_service import DatabaseService
+from nanogpt_chat.utils.persistence_queue import MessagePersistenceQueue
+
+
+class BatchRecorder:
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def create_messages_batch(self, batch):
+        with self.lock:
+            self.batches.append(list(batch))
+        return [f"id-{content}" for _, _, content, _ in batch]
+
+    def get_messages(self, session_id):
+        with self.lock:
+            return [content for batch in self.batches for sid, _, content, _ in batch
+                    if sid == session_id]
+
+
+@pytest.fixture
+def recorder_service(qapp):
+    recorder = BatchRecorder()
+    service = DatabaseService(lambda: recorder)
+    yield recorder, service
+    service.shutdown()
+
+
+def test_messages_are_written_together_after_the_interval(qapp, recorder_service):
+    recorder, service = recorder_service
+    queue = MessagePersistenceQueue(service, flush_interval_ms=20)
+    flushed = []
+    queue.flushed.connect(flushed.extend)
+
+    queue.enqueue("s1", "user", "hello")
+    queue.enqueue("s1", "assistant", "hi")
+    assert recorder.batches == []
+
+    assert wait_until(qapp, lambda: flushed)
+    assert recorder.batches == [[("s1", "user", "hello", None), ("s1", "assistant", "hi", None)]]
+    assert flushed == ["id-hello", "id-hi"]
+
+
+def test_a_full_batch_is_written_immediately(qapp, recorder_service):
+    recorder, service = recorder_service
+    queue = MessagePersistenceQueue(service, flush_interval_ms=10_000, max_batch=3)
+
+    for i in range(7):
+        queue.enqueue("s1", "user", str(i))
+
+    assert queue.pending_count == 1
+    queue.flush(wait=True)
+    assert [len(batch) for batch in recorder.batches] == [3, 3, 1]
+
+
+def test_reads_after_flush_see_queued_messages(qapp, recorder_service):
+    recorder, service = recorder_service
+    queue = MessagePersistenceQueue(service, flush_interval_ms=10_000)
+
+    queue.enqueue("s1", "user", "question")
+    queue.flush()
+    assert service.call("get_messages", "s1") == ["question"]
+
+
+def test_failed_writes_are_reported(qapp):
+    class Broken:
+        def create_messages_batch(self, batch):
+            raise RuntimeError("database is locked")
+
+    service = DatabaseService(Broken)
+    queue = MessagePersistenceQueue(service)
+    errors = []
+    queue.flush_failed.connect(errors.append)
+
+    queue.enqueue("s1", "user", "lost?")
+    queue.flush(wait=True)
+    assert errors == ["database is locked"]
+    service.shutdown()
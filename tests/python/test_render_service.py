@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from conftest import wait_until
+from nanogpt_chat.utils.render_service import RenderService, render_message_html
+
+
+def make_service(release=None, max_workers=1, max_queue=256):
+    def render(content, text_color, theme, font_px):
+        if release is not None:
+            release.wait(5)
+        return f"{theme}:{text_color}:{content}"
+    return RenderService(max_workers=max_workers, max_queue=max_queue, render_fn=render)
+
+
+def test_rendered_html_is_delivered_through_the_signal(qapp):
+    service = make_service()
+    results = {}
+    service.rendered.connect(lambda key, html: results.__setitem__(key, html))
+
+    service.submit("a", "hello", "#fff", "dark")
+    service.submit("b", "world", "#eee", "light")
+
+    assert wait_until(qapp, lambda: len(results) == 2)
+    assert results == {"a": "dark:#fff:hello", "b": "light:#eee:world"}
+    service.shutdown()
+
+
+def test_superseded_jobs_are_dropped(qapp):
+    release = threading.Event()
+    service = make_service(release)
+    results = []
+    service.rendered.connect(lambda key, html: results.append((key, html)))
+
+    service.submit("busy", "first", "#fff")     # occupies the only worker
+    service.submit("msg", "v1", "#fff")
+    service.submit("msg", "v2", "#fff")         # replaces the queued v1
+    assert service.pending_count == 1
+    service.submit("busy", "second", "#fff")    # in-flight result becomes stale
+    release.set()
+
+    assert wait_until(qapp, lambda: len(results) == 2)
+    assert ("msg", "None:#fff:v2") in results
+    assert ("busy", "None:#fff:second") in results
+    service.shutdown()
+
+
+def test_queue_is_bounded(qapp):
+    release = threading.Event()
+    service = make_service(release, max_queue=2)
+    dropped = []
+    service.job_dropped.connect(dropped.append)
+
+    for key in range(5):
+        service.submit(key, str(key), "#fff")
+
+    # job 0 is running, 1 and 2 were pushed out by 3 and 4
+    assert service.pending_count == 2
+    assert dropped == [1, 2]
+    release.set()
+    service.shutdown()
+
+
+def test_cancelled_jobs_never_report(qapp):
+    release = threading.Event()
+    service = make_service(release)
+    results = []
+    service.rendered.connect(lambda key, html: results.append(key))
+
+    service.submit("gone", "x", "#fff")
+    service.submit("kept", "y", "#fff")
+    service.cancel("gone")
+    release.set()
+
+    assert wait_until(qapp, lambda: results == ["kept"])
+    service.shutdown()
+
+
+def test_render_message_html_styles_markdown():
+    html = render_message_html("**bold**", "#123456")
+    assert "color: #123456" in html
+    assert "<strong>bold</strong>" in html
+
+
+def test_cached_html_skips_rendering(qapp):
+    from nanogpt_chat.utils.html_cache import RenderedHtmlCache
+
+    calls = []
+
+    def render(content, text_color, theme, font_px):
+        calls.append(content)
+        return f"<p>{content}</p>"
+
+    service = RenderService(render_fn=render, cache=RenderedHtmlCache())
+    results = []
+    service.rendered.connect(lambda key, html: results.append(html))
+
+    assert service.lookup("hi", "#fff", "dark") is None
+    service.submit(1, "hi", "#fff", "dark")
+    assert wait_until(qapp, lambda: results == ["<p>hi</p>"])
+
+    assert service.lookup("hi", "#fff", "dark") == "<p>hi</p>"
+    assert service.lookup("hi", "#fff", "light") is None
+    service.submit(2, "hi", "#fff", "dark")
+    assert wait_until(qapp, lambda: len(results) == 2)
+    assert calls == ["hi"]
+    service.shutdown()
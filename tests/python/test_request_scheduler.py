@@ -0,0 +1,222 @@
+import random
+import threading
+import time
+
+import pytest
+
+from conftest import wait_until
+from mock_api_server import MockAPIServer
+from nanogpt_chat.exceptions import APIError
+from nanogpt_chat.utils.async_client import AsyncNanoGPTClient
+from nanogpt_chat.utils.request_scheduler import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, RequestScheduler,
+    ScheduledClient, TokenBucket, parse_retry_after
+)
+
+
+def test_retry_after_seconds_and_dates():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after(" 0.5 ") == 0.5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("-1") is None
+    assert parse_retry_after("soon") is None
+    now = 1445412480.0  # Wed, 21 Oct 2015 07:28:00 GMT
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:30 GMT", now=now) == 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:27:00 GMT", now=now) == 0
+
+
+def test_token_bucket_allows_bursts_then_the_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, burst=3, clock=lambda: now[0])
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+    assert bucket.take() == pytest.approx(0.5)
+    now[0] = 0.5
+    assert bucket.take() == 0
+    now[0] = 100
+    # Refills only up to the burst
+    assert [bucket.take() for _ in range(4)] == [0, 0, 0, pytest.approx(0.5)]
+    assert TokenBucket(rate=0, burst=1).take() == 0
+
+
+def test_concurrency_is_limited_per_endpoint():
+    scheduler = RequestScheduler(limits={"chat": 2, "models": 1}, rate=0)
+    running = {"chat": 0, "models": 0}
+    peak = {"chat": 0, "models": 0}
+    lock = threading.Lock()
+
+    def request(endpoint):
+        with lock:
+            running[endpoint] += 1
+            peak[endpoint] = max(peak[endpoint], running[endpoint])
+        time.sleep(0.03)
+        with lock:
+            running[endpoint] -= 1
+
+    threads = [threading.Thread(target=scheduler.call, args=(endpoint, request, endpoint))
+               for endpoint in ["chat"] * 6 + ["models"] * 3]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == {"chat": 2, "models": 1}
+    stats = scheduler.stats()
+    assert (stats["chat"]["started"], stats["chat"]["finished"], stats["chat"]["queued"]) == (6, 6, 0)
+    assert stats["chat"]["max_queued"] >= 4
+    assert stats["chat"]["wait_max"] > 0
+
+
+def test_waiting_requests_go_by_priority_then_in_order():
+    scheduler = RequestScheduler(limits={"chat": 1}, rate=0)
+    assert scheduler.acquire("chat")
+    order = []
+
+    def request(name, priority):
+        scheduler.acquire("chat", priority)
+        order.append(name)
+        scheduler.release("chat", priority)
+
+    threads = []
+    for name, priority in [("title", PRIORITY_BACKGROUND), ("models", PRIORITY_NORMAL),
+                           ("first", PRIORITY_INTERACTIVE), ("second", PRIORITY_INTERACTIVE)]:
+        threads.append(threading.Thread(target=request, args=(name, priority)))
+        threads[-1].start()
+        assert wait_until(None, lambda: scheduler.stats()["chat"]["queued"] == len(threads))
+    scheduler.release("chat")
+    for thread in threads:
+        thread.join()
+
+    assert order == ["first", "second", "models", "title"]
+
+
+def test_background_requests_wait_for_interactive_ones_to_end():
+    scheduler = RequestScheduler(rate=0)
+    assert scheduler.acquire("models", PRIORITY_INTERACTIVE)
+    ran = []
+    background = threading.Thread(
+        target=lambda: scheduler.call("chat", ran.append, "title", priority=PRIORITY_BACKGROUND))
+    background.start()
+    assert wait_until(None, lambda: scheduler.stats()["chat"]["queued"] == 1)
+    # Other requests still go, even to the endpoint the background request waits for
+    scheduler.call("chat", ran.append, "models list", priority=PRIORITY_NORMAL)
+    time.sleep(0.05)
+    assert ran == ["models list"]
+
+    scheduler.release("models", PRIORITY_INTERACTIVE)
+    background.join(2)
+    assert ran == ["models list", "title"]
+
+
+def test_the_rate_limit_spaces_out_requests():
+    scheduler = RequestScheduler(rate=20, burst=2)
+    started = time.monotonic()
+    for _ in range(5):
+        scheduler.call("chat", lambda: None)
+    # Two from the burst, then one every 50 ms
+    assert time.monotonic() - started >= 0.14
+
+
+def test_backoff_is_jittered_and_bounded():
+    scheduler = RequestScheduler(backoff_base=1, backoff_max=4, max_retries=10, rng=random.Random(3))
+    error = APIError("busy", status=503)
+    delays = [scheduler.retry_delay("chat", error, attempt) for attempt in range(6)]
+    assert all(0 <= delay <= min(4, 2 ** attempt) for attempt, delay in enumerate(delays))
+    assert len(set(delays)) == len(delays)
+    assert scheduler.retry_delay("chat", APIError("bad", status=400), 0) is None
+    assert scheduler.retry_delay("chat", error, 10) is None
+    assert scheduler.stats()["chat"]["failed"] == 2
+
+
+def test_a_429_holds_back_the_endpoint_for_its_retry_after():
+    scheduler = RequestScheduler(rate=0)
+    delay = scheduler.retry_delay("chat", APIError("slow down", status=429, retry_after=0.2), 0)
+    assert 0.2 <= delay <= 0.22
+    started = time.monotonic()
+    scheduler.call("models", lambda: None)
+    assert time.monotonic() - started < 0.1
+    scheduler.call("chat", lambda: None)
+    assert time.monotonic() - started >= 0.2
+    assert scheduler.stats()["chat"]["rate_limited"] == 1
+
+
+def test_stream_retries_a_429_after_its_retry_after():
+    with MockAPIServer() as server:
+        server.fail_next = [429]
+        server.retry_after = "0.2"
+        scheduler = RequestScheduler()
+        client = ScheduledClient(AsyncNanoGPTClient("sk-test", server.base_url), scheduler)
+        started = time.monotonic()
+        stream = client.chat_completion_stream("gpt-4o", [("user", "hi")])
+
+        assert "".join(stream) == "Hello, world"
+        assert time.monotonic() - started >= 0.2
+        assert len(server.requests) == 2
+        assert stream.usage["completion_tokens"] == 3
+        stats = scheduler.stats()["chat"]
+        assert (stats["retries"], stats["rate_limited"], stats["active"], stats["finished"]) == (1, 1, 0, 2)
+
+
+def test_failures_that_cannot_succeed_are_raised_at_once():
+    with MockAPIServer() as server:
+        server.fail_next = [400]
+        client = ScheduledClient(AsyncNanoGPTClient("sk-test", server.base_url), RequestScheduler())
+        with pytest.raises(APIError) as raised:
+            list(client.chat_completion_stream("gpt-4o", [("user", "hi")]))
+        assert raised.value.status == 400
+        assert len(server.requests) == 1
+
+
+def test_retries_give_up_after_max_retries():
+    with MockAPIServer() as server:
+        server.status = 503
+        scheduler = RequestScheduler(max_retries=2, backoff_base=0.01)
+        client = ScheduledClient(AsyncNanoGPTClient("sk-test", server.base_url), scheduler)
+        with pytest.raises(APIError) as raised:
+            client.list_models_if_changed()
+        assert raised.value.status == 503
+        assert server.model_requests == 3
+        assert scheduler.stats()["models"]["failed"] == 1
+
+
+def test_blocking_calls_are_retried():
+    with MockAPIServer() as server:
+        server.fail_next = [502]
+        client = ScheduledClient(AsyncNanoGPTClient("sk-test", server.base_url),
+                                 RequestScheduler(backoff_base=0.01))
+        models, _, _ = client.list_models_if_changed()
+        assert [model["id"] for model in models] == ["gpt-4o", "gpt-4o-mini"]
+        assert server.model_requests == 2
+        # Methods the wrapped client lacks stay missing
+        assert not hasattr(client, "no_such_method")
+        assert client.with_priority(PRIORITY_BACKGROUND).priority == PRIORITY_BACKGROUND
+
+
+def test_closing_a_queued_stream_gives_up_its_place():
+    with MockAPIServer(chunk_delay=0.05) as server:
+        scheduler = RequestScheduler(limits={"chat": 1})
+        client = ScheduledClient(AsyncNanoGPTClient("sk-test", server.base_url), scheduler)
+        first = client.chat_completion_stream("gpt-4o", [("user", "one")])
+        assert next(first) == "Hello"
+        queued = client.chat_completion_stream("gpt-4o", [("user", "two")])
+        result = []
+        reader = threading.Thread(target=lambda: result.append(list(queued)))
+        reader.start()
+        assert wait_until(None, lambda: scheduler.stats()["chat"]["queued"] == 1)
+
+        queued.close()
+        reader.join(2)
+        assert result == [[]]
+        assert list(first) == [", ", "world"]
+        assert len(server.requests) == 1
+        assert scheduler.stats()["chat"]["active"] == 0
+
+
+def test_closing_a_stream_part_way_frees_its_slot():
+    with MockAPIServer(tokens=["tick "] * 100, chunk_delay=0.01) as server:
+        scheduler = RequestScheduler(limits={"chat": 1})
+        client = ScheduledClient(AsyncNanoGPTClient("sk-test", server.base_url), scheduler)
+        stream = client.chat_completion_stream("gpt-4o", [("user", "count")])
+        assert next(stream) == "tick "
+        stream.close()
+        assert scheduler.stats()["chat"]["active"] == 0
+        assert "".join(client.chat_completion_stream("gpt-4o", [("user", "again")])).startswith("tick")
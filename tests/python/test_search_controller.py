@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from conftest import wait_until
+from nanogpt_chat.utils.search_controller import SearchController
+
+
+def make_controller(search_fn, **kwargs):
+    kwargs.setdefault("debounce_ms", 10)
+    controller = SearchController(search_fn, **kwargs)
+    results, finished = [], []
+    controller.results_ready.connect(lambda hits, first: results.append((list(hits), first)))
+    controller.search_finished.connect(lambda query, count, ms: finished.append((query, count)))
+    return controller, results, finished
+
+
+def test_keystrokes_are_debounced_into_one_query(qapp):
+    queries = []
+
+    def search(query, limit):
+        queries.append(query)
+        return [f"{query}-{i}" for i in range(3)]
+
+    controller, results, finished = make_controller(search)
+    for text in ["e", "eg", "egg"]:
+        controller.set_query(text)
+
+    assert wait_until(qapp, lambda: finished)
+    assert queries == ["egg"]
+    assert results == [(["egg-0", "egg-1", "egg-2"], True)]
+    assert finished == [("egg", 3)]
+    assert controller.last_latency_ms is not None
+    controller.shutdown()
+
+
+def test_results_of_a_superseded_query_are_ignored(qapp):
+    release = threading.Event()
+    started = threading.Event()
+
+    def search(query, limit):
+        if query == "slow":
+            started.set()
+            release.wait(5)
+        return [query]
+
+    controller, results, finished = make_controller(search)
+    controller.set_query("slow")
+    assert wait_until(qapp, started.is_set)
+    controller.set_query("fast")
+    assert wait_until(qapp, lambda: controller._pending is not None)
+    release.set()
+
+    assert wait_until(qapp, lambda: finished)
+    assert results == [(["fast"], True)]
+    assert finished == [("fast", 1)]
+    controller.shutdown()
+
+
+def test_results_arrive_in_batches(qapp):
+    controller, results, finished = make_controller(
+        lambda query, limit: list(range(limit)), batch_size=4, limit=10)
+    controller.set_query("anything")
+
+    assert wait_until(qapp, lambda: finished)
+    assert [len(hits) for hits, _ in results] == [4, 4, 2]
+    assert [first for _, first in results] == [True, False, False]
+    assert finished == [("anything", 10)]
+    controller.shutdown()
+
+
+def test_empty_query_cancels_and_clears(qapp):
+    controller, results, finished = make_controller(lambda query, limit: [query], debounce_ms=50)
+    cleared = []
+    controller.cleared.connect(lambda: cleared.append(True))
+
+    controller.set_query("pending")
+    controller.set_query("   ")
+    assert cleared == [True]
+    assert not controller.is_searching
+    assert not wait_until(qapp, lambda: results, timeout=0.2)
+    controller.shutdown()
+
+
+def test_failures_are_reported(qapp):
+    def search(query, limit):
+        raise RuntimeError("database is locked")
+
+    controller, _, _ = make_controller(search)
+    failures = []
+    controller.search_failed.connect(lambda query, err: failures.append((query, err)))
+    controller.set_query("x")
+
+    assert wait_until(qapp, lambda: failures)
+    assert failures == [("x", "database is locked")]
+    controller.shutdown()
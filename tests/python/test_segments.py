@@ -0,0 +1,92 @@
+import json
+
+from conftest import wait_until
+from mock_api_server import MockAPIServer
+from nanogpt_chat.utils.async_client import AsyncNanoGPTClient, _chat_body
+from nanogpt_chat.utils.segments import MessageSegments, encode_message
+
+IMAGE_PARTS = [{"type": "text", "text": "What is this?"},
+               {"type": "image_url", "image_url": {"url": "data:image/png;base64,iVBORw0KGgo="}}]
+
+
+def test_segments_are_encoded_once():
+    segments = MessageSegments()
+    history = [("system", "Be brief."), ("user", "hi"), ("assistant", "Hello!")]
+    segments.join(history)
+    assert (segments.hits, segments.misses) == (0, 3)
+
+    segments.join(history + [("user", "and again")])
+    assert (segments.hits, segments.misses) == (3, 4)
+
+
+def test_joined_segments_are_the_messages_array():
+    segments = MessageSegments()
+    history = [("system", "Be brief."), ("user", "Voilà ☕ 東京 🥐"), ("user", IMAGE_PARTS),
+               ("assistant", 'Quotes " and \\ and\nnewlines')]
+
+    joined = segments.join(history)
+    assert json.loads(joined) == [{"role": role, "content": content} for role, content in history]
+    assert joined.isascii()
+    assert segments.join([]) == "[]"
+
+
+def test_list_content_is_keyed_by_identity():
+    segments = MessageSegments()
+    parts = list(IMAGE_PARTS)
+    first = segments.segment("user", parts)
+    assert segments.segment("user", parts) is first
+
+    # An equal list is a different message and is encoded on its own
+    copy = list(IMAGE_PARTS)
+    assert segments.segment("user", copy) == first
+    assert segments.misses == 2
+    # The role is part of the key
+    assert segments.segment("assistant", "hi") != segments.segment("user", "hi")
+
+
+def test_cache_is_bounded():
+    segments = MessageSegments(max_segments=4)
+    segments.join([("user", f"message {i}") for i in range(10)])
+    assert len(segments._segments) == 4
+    assert segments.segment("user", "message 9") == encode_message("user", "message 9")
+    assert segments.hits == 1
+
+
+def test_spliced_body_matches_the_encoded_body():
+    history = [("system", "Be brief."), ("user", "hi"), ("user", IMAGE_PARTS)]
+    body = _chat_body("gpt-4o", MessageSegments().join(history), 0.5, 64, stream=True)
+    assert json.loads(body) == _chat_body("gpt-4o", history, 0.5, 64, stream=True)
+
+
+def test_raw_stream_sends_the_segments():
+    history = [("system", "Be brief."), ("user", "hi there")]
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        stream = client.chat_completion_stream_raw("gpt-4o", MessageSegments().join(history), 0.2)
+
+        assert "".join(stream) == "Hello, world"
+        request = server.requests[0]
+        assert request["messages"] == [{"role": "system", "content": "Be brief."},
+                                       {"role": "user", "content": "hi there"}]
+        assert request["temperature"] == 0.2
+        assert request["stream"] is True
+        assert stream.usage["total_tokens"] == 7
+
+
+def test_worker_sends_the_pre_encoded_messages(qapp):
+    from nanogpt_chat.ui.main_window import ChatWorker
+
+    history = [("user", "hi")]
+    # The pairs are ignored when the client takes the encoded array
+    messages_json = MessageSegments().join([("user", "from segments")])
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        worker = ChatWorker(client, history, "gpt-4o", 0.7, 100, messages_json=messages_json)
+        replies = []
+        worker.finished.connect(replies.append)
+        worker.start()
+        assert wait_until(qapp, lambda: replies)
+        worker.wait()
+
+    assert replies == ["Hello, world"]
+    assert server.requests[0]["messages"] == [{"role": "user", "content": "from segments"}]
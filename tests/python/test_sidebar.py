@@ -0,0 +1,154 @@
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from PyQt6.QtCore import Qt
+
+from nanogpt_chat.ui.sidebar import SessionListModel, Sidebar
+
+
+class FakeSession:
+    def __init__(self, session_id, title, updated_at=0):
+        self.id = session_id
+        self.title = title
+        self.updated_at = updated_at
+
+
+def sessions(count, start=0):
+    return [FakeSession(f"s{i}", f"Chat {i}") for i in range(start, start + count)]
+
+
+def test_model_appends_without_duplicates(qapp):
+    model = SessionListModel()
+    model.set_sessions(sessions(3))
+    model.append_sessions(sessions(3, start=2))
+
+    assert model.session_ids() == ["s0", "s1", "s2", "s3", "s4"]
+    assert model.row_of("s4") == 4
+    assert model.index(1).data() == "Chat 1"
+
+
+def test_rename_updates_the_row_in_place(qapp):
+    model = SessionListModel()
+    model.set_sessions(sessions(3))
+    changed, edited, resets = [], [], []
+    model.dataChanged.connect(lambda top_left, bottom_right: changed.append(top_left.row()))
+    model.title_edited.connect(lambda session_id, title: edited.append((session_id, title)))
+    model.modelReset.connect(lambda: resets.append(True))
+
+    assert model.setData(model.index(1), "  Renamed  ")
+    assert not model.setData(model.index(1), "Renamed")
+    assert not model.setData(model.index(2), "   ")
+    model.update_title("s0", "Auto title")
+
+    assert changed == [1, 0]
+    assert edited == [("s1", "Renamed")]
+    assert model.index(0).data() == "Auto title"
+    assert resets == []
+
+
+def test_upsert_and_remove_keep_rows_consistent(qapp):
+    model = SessionListModel()
+    model.set_sessions(sessions(4))
+
+    assert model.upsert_session(FakeSession("new", "New Chat"))
+    assert not model.upsert_session(FakeSession("s2", "Moved"))
+    assert model.remove_session("s0")
+    assert not model.remove_session("missing")
+
+    assert model.session_ids() == ["s2", "new", "s1", "s3"]
+    assert [model.row_of(i) for i in model.session_ids()] == [0, 1, 2, 3]
+    assert model.index(0).data() == "Moved"
+
+
+def test_sidebar_keeps_the_cursor_of_the_last_page(qapp):
+    sidebar = Sidebar()
+    sidebar.update_sessions(sessions(50), "cursor-1")
+    assert sidebar.has_more_sessions
+
+    sidebar.append_sessions(sessions(10, start=50), None)
+    sidebar.select_session("s20")
+
+    assert sidebar.next_cursor is None
+    assert not sidebar.has_more_sessions
+    assert sidebar.session_list.currentIndex().row() == sidebar.session_model.row_of("s20")
+
+
+def test_scrolling_near_the_end_requests_the_next_page(qapp):
+    sidebar = Sidebar()
+    sidebar.resize(260, 400)
+    requests = []
+    sidebar.load_more_requested.connect(lambda: requests.append(True))
+    sidebar.update_sessions(sessions(50), "cursor-1")
+    sidebar.show()
+    qapp.processEvents()
+
+    scrollbar = sidebar.session_list.verticalScrollBar()
+    scrollbar.setValue(scrollbar.maximum())
+    assert requests
+
+    requests.clear()
+    sidebar.update_sessions(sessions(50), None)
+    qapp.processEvents()
+    scrollbar.setValue(0)
+    scrollbar.setValue(scrollbar.maximum())
+    assert not requests
+    sidebar.hide()
+
+
+def test_delete_button_does_not_select_the_session(qapp):
+    from conftest import wait_until
+    from PyQt6.QtCore import QPoint, Qt
+    from PyQt6.QtTest import QTest
+
+    sidebar = Sidebar()
+    sidebar.resize(260, 600)
+    sidebar.update_sessions(sessions(5))
+    sidebar.show()
+    selected, deleted = [], []
+    sidebar.session_selected.connect(selected.append)
+    sidebar.session_deleted.connect(deleted.append)
+
+    rect = sidebar.session_list.visualRect(sidebar.session_model.index(1))
+    QTest.mouseClick(sidebar.session_list.viewport(), Qt.MouseButton.LeftButton,
+                     pos=sidebar.session_delegate.delete_rect(rect).center())
+    QTest.mouseClick(sidebar.session_list.viewport(), Qt.MouseButton.LeftButton,
+                     pos=QPoint(rect.left() + 20, rect.center().y()))
+
+    assert wait_until(qapp, lambda: deleted == ["s1"])
+    assert selected == ["s1"]
+    sidebar.hide()
+
+
+class FakeSearchHit:
+    def __init__(self, session, snippet):
+        self.session = session
+        self.snippet = snippet
+        self.rank = -1.0
+
+
+def test_search_results_replace_the_list_and_show_snippets(qapp):
+    sidebar = Sidebar()
+    sidebar.update_sessions(sessions(50), "cursor-1")
+    sidebar.display_search_results([
+        FakeSearchHit(FakeSession("s7", "Chat 7"), "…boil an egg…"),
+        FakeSearchHit(FakeSession("s3", "Chat 3"), ""),
+    ])
+
+    model = sidebar.session_model
+    assert not sidebar.has_more_sessions
+    assert model.session_ids() == ["s7", "s3"]
+    assert model.index(0).data(Qt.ItemDataRole.ToolTipRole) == "Chat 7\n…boil an egg…"
+    assert model.index(1).data(Qt.ItemDataRole.ToolTipRole) == "Chat 3"
+
+
+def test_generated_summary_shows_in_the_tooltip(qapp):
+    sidebar = Sidebar()
+    sidebar.update_sessions(sessions(3))
+    sidebar.update_session_summary("s1", "Planning a trip to Lisbon.")
+
+    model = sidebar.session_model
+    assert model.index(1).data(Qt.ItemDataRole.ToolTipRole) == "Chat 1\nPlanning a trip to Lisbon."
+    # Moving the session to the top keeps its summary
+    sidebar.upsert_session(FakeSession("s1", "Lisbon trip"))
+    assert model.index(0).data(Qt.ItemDataRole.ToolTipRole) == "Lisbon trip\nPlanning a trip to Lisbon."
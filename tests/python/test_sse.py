@@ -0,0 +1,103 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from mock_api_server import MockAPIServer
+from nanogpt_chat.utils.async_client import AsyncNanoGPTClient
+from nanogpt_chat.utils.sse import SSEDecoder, SSEEvent
+
+FIXTURES = Path(__file__).parent.parent / "fixtures"
+CHAT_STREAM = (FIXTURES / "chat_stream.sse").read_bytes()
+CHAT_STREAM_CRLF = (FIXTURES / "chat_stream_crlf.sse").read_bytes()
+CHAT_STREAM_TEXT = "Voilà — the café in 東京 serves ☕ and 🥐.\n\n```python\nprint(\"naïve\")\n```"
+
+
+def decode(body, splits=()):
+    decoder = SSEDecoder()
+    events = []
+    start = 0
+    for end in [*splits, len(body)]:
+        events.extend(decoder.feed(body[start:end]))
+        start = end
+    events.extend(decoder.finish())
+    return events
+
+
+def content_of(events):
+    text = []
+    for event in events:
+        if event.data == "[DONE]":
+            break
+        try:
+            chunk = json.loads(event.data)
+        except ValueError:
+            continue
+        for choice in chunk.get("choices", [])[:1]:
+            text.append(choice["delta"].get("content") or "")
+    return "".join(text)
+
+
+def random_splits(rng, body):
+    """Distinct, sorted split points, so no piece is empty."""
+    count = rng.randint(1, min(40, len(body) - 1))
+    return sorted(rng.sample(range(1, len(body)), count))
+
+
+def test_recorded_stream_decodes():
+    events = decode(CHAT_STREAM)
+    assert events[-1].data == "[DONE]"
+    assert content_of(events) == CHAT_STREAM_TEXT
+
+
+def test_fields_and_multiline_data():
+    events = decode(CHAT_STREAM_CRLF)
+    assert content_of(events) == "Zwölf Boxkämpfer jagen 🐉 Eva"
+    assert events[0].event == "message" and events[0].id == "1"
+    assert SSEEvent("first line\nsecond line\n", "notice", "2") in events
+    # An event type without data is not dispatched
+    assert all(event.event != "empty" for event in events)
+
+    decoder = SSEDecoder()
+    decoder.feed(CHAT_STREAM_CRLF)
+    assert decoder.retry_ms == 3000
+
+
+def test_split_character_and_line_end_are_carried_over():
+    decoder = SSEDecoder()
+    body = "data: café\r\n\r\n".encode()
+    # Split inside the two-byte "é" and between "\r" and "\n"
+    assert decoder.feed(body[:9]) == []
+    assert decoder.feed(body[9:12]) == []
+    assert decoder.feed(body[12:13]) == []
+    assert decoder.feed(body[13:]) == [SSEEvent("café")]
+
+
+def test_finish_dispatches_unterminated_event():
+    decoder = SSEDecoder()
+    assert decoder.feed(b"data: one\n\ndata: two") == [SSEEvent("one")]
+    assert decoder.finish() == [SSEEvent("two")]
+
+
+@pytest.mark.parametrize("body", [CHAT_STREAM, CHAT_STREAM_CRLF], ids=["lf", "crlf"])
+def test_random_splits_match_whole_body(body):
+    expected = decode(body)
+    for seed in range(500):
+        splits = random_splits(random.Random(seed), body)
+        assert decode(body, splits) == expected, f"seed {seed}: {splits}"
+    assert decode(body, range(1, len(body))) == expected
+
+
+def test_client_streams_recorded_body_split_across_reads():
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        for seed in range(20):
+            splits = random_splits(random.Random(seed), CHAT_STREAM)
+            bounds = [0, *splits, len(CHAT_STREAM)]
+            server.body_chunks = [CHAT_STREAM[a:b] for a, b in zip(bounds, bounds[1:])]
+            stream = client.chat_completion_stream("gpt-4o", [("user", "hi")], None, None)
+            assert "".join(stream) == CHAT_STREAM_TEXT, f"seed {seed}"
+        # Every stream read its body to the end, so one connection served them all
+        assert server.connections == 1
+    client.close()
@@ -0,0 +1,147 @@
+import threading
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from conftest import wait_until
+from nanogpt_chat.utils.database_service import DatabaseService
+from nanogpt_chat.utils.stream_checkpoint import StreamCheckpointer
+
+
+class MessageStore:
+    """Keeps messages in memory and records every write."""
+
+    def __init__(self):
+        self.messages = {}
+        self.writes = []
+        self.lock = threading.Lock()
+
+    def create_partial_message(self, session_id, role, content):
+        with self.lock:
+            message_id = f"m{len(self.messages)}"
+            self.messages[message_id] = {"content": content, "partial": True, "tokens": None}
+            self.writes.append(("create", content))
+            return message_id
+
+    def append_message_content(self, message_id, content):
+        with self.lock:
+            self.messages[message_id]["content"] += content
+            self.writes.append(("append", content))
+
+    def complete_message(self, message_id, content, tokens):
+        with self.lock:
+            message = self.messages[message_id]
+            message.update(content=message["content"] + content, partial=False, tokens=tokens)
+            self.writes.append(("complete", content))
+
+    def delete_message(self, message_id):
+        with self.lock:
+            del self.messages[message_id]
+
+
+@pytest.fixture
+def store():
+    return MessageStore()
+
+
+def test_deltas_are_checkpointed_then_completed(qapp, store_service):
+    store, service = store_service
+    checkpoint = StreamCheckpointer(service, interval_ms=10_000, max_chars=10)
+    started = []
+    checkpoint.started.connect(started.append)
+
+    checkpoint.start("s1")
+    for delta in ["Hello", ", ", "world", "!"]:
+        checkpoint.append(delta)
+    assert checkpoint.checkpoint_count == 1
+    assert wait_until(qapp, lambda: started)
+    assert store.messages["m0"] == {"content": "Hello, world", "partial": True, "tokens": None}
+
+    checkpoint.finish(tokens=4, wait=True)
+    assert store.messages["m0"] == {"content": "Hello, world!", "partial": False, "tokens": 4}
+    assert store.writes == [("create", ""), ("append", "Hello, world"), ("complete", "!")]
+    assert not checkpoint.active
+
+
+def test_checkpoints_follow_the_interval(qapp, store_service):
+    store, service = store_service
+    checkpoint = StreamCheckpointer(service, interval_ms=20)
+
+    checkpoint.start("s1")
+    checkpoint.append("partial ")
+    checkpoint.append("reply")
+    assert wait_until(qapp, lambda: ("append", "partial reply") in store.writes)
+
+
+def test_interrupted_message_stays_partial_and_can_be_resumed(qapp, store_service):
+    store, service = store_service
+    checkpoint = StreamCheckpointer(service, interval_ms=10_000)
+
+    checkpoint.start("s1")
+    assert wait_until(qapp, lambda: checkpoint.message_id == "m0")
+    checkpoint.append("Cut o")
+    checkpoint.interrupt(wait=True)
+    assert store.messages["m0"]["partial"]
+    assert store.messages["m0"]["content"] == "Cut o"
+    # No longer the message streaming, so it is shown as interrupted
+    assert not checkpoint.active and checkpoint.message_id is None
+
+    checkpoint.start("s1", message_id="m0", content="Cut o")
+    checkpoint.append("ff no more")
+    assert checkpoint.content == "Cut off no more"
+    checkpoint.finish(wait=True)
+    assert store.messages["m0"] == {"content": "Cut off no more", "partial": False, "tokens": None}
+
+
+def test_stream_interrupted_before_its_row_exists_reports_the_id_later(qapp, store_service):
+    store, service = store_service
+    checkpoint = StreamCheckpointer(service, interval_ms=10_000)
+    release = threading.Event()
+    service.submit(lambda db: release.wait(5))
+
+    checkpoint.start("s1")
+    checkpoint.append("Stopped")
+    saved = []
+    checkpoint.interrupt(on_saved=saved.append)
+    assert saved == []
+    release.set()
+    assert wait_until(qapp, lambda: saved == ["m0"])
+    assert store.messages["m0"] == {"content": "Stopped", "partial": True, "tokens": None}
+    assert checkpoint.message_id is None
+
+    # A message whose row exists is reported at once
+    checkpoint.start("s1", message_id="m0", content="Stopped")
+    checkpoint.interrupt(on_saved=saved.append)
+    assert saved == ["m0", "m0"]
+
+
+def test_abandoned_stream_leaves_no_message(qapp, store_service):
+    store, service = store_service
+    checkpoint = StreamCheckpointer(service)
+
+    checkpoint.start("s1")
+    checkpoint.abandon()
+    service.call(lambda db: None)
+    assert store.messages == {}
+
+
+def test_databases_without_partial_messages_save_the_whole_reply(qapp):
+    class OldDatabase:
+        def __init__(self):
+            self.created = []
+
+        def create_message(self, session_id, role, content, tokens):
+            self.created.append((session_id, role, content, tokens))
+            return "id"
+
+    db = OldDatabase()
+    service = DatabaseService(lambda: db)
+    checkpoint = StreamCheckpointer(service, max_chars=1)
+
+    checkpoint.start("s1")
+    checkpoint.append("one ")
+    checkpoint.append("two")
+    checkpoint.finish(wait=True)
+    assert db.created == [("s1", "assistant", "one two", None)]
+    service.shutdown()
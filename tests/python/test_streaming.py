@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from conftest import FakeClock, wait_until
+from nanogpt_chat.utils.streaming import FRAME_DUE, DeltaCoalescer, read_with_deadline
+
+
+def test_coalescer_emits_deltas_at_most_once_per_frame():
+    clock = FakeClock()
+    emitted = []
+    coalescer = DeltaCoalescer(emitted.append, frame_interval=0.016, clock=clock)
+
+    coalescer.push("a")          # first chunk goes out immediately
+    for chunk in ["b", "c", "d"]:
+        clock.now += 0.004
+        coalescer.push(chunk)
+    clock.now += 0.005
+    coalescer.push("e")          # 17ms after the first flush
+    coalescer.push("f")
+    coalescer.flush()
+
+    assert emitted == ["a", "bcde", "f"]
+    assert coalescer.flush_count == 3
+    assert coalescer.emitted_chars == 6
+
+
+def test_coalescer_bounds_buffer_size():
+    clock = FakeClock()
+    emitted = []
+    coalescer = DeltaCoalescer(emitted.append, frame_interval=10.0,
+                               max_buffer_chars=8, clock=clock)
+
+    coalescer.push("x")
+    for _ in range(20):
+        coalescer.push("yy")
+        assert coalescer.pending_chars < 8
+    coalescer.flush()
+
+    assert "".join(emitted) == "x" + "yy" * 20
+    assert all(len(delta) <= 8 for delta in emitted)
+
+
+def test_coalescer_payload_is_linear_in_response_length():
+    clock = FakeClock()
+    emitted = []
+    coalescer = DeltaCoalescer(emitted.append, clock=clock)
+    chunks = [f"tok{i} " for i in range(5000)]
+
+    for chunk in chunks:
+        clock.now += 0.002
+        coalescer.push(chunk)
+    coalescer.flush()
+
+    assert "".join(emitted) == "".join(chunks)
+    assert coalescer.emitted_chars == sum(len(c) for c in chunks)
+
+
+def test_flush_without_pending_data_is_a_noop():
+    emitted = []
+    coalescer = DeltaCoalescer(emitted.append)
+    coalescer.flush()
+    coalescer.push("")
+    coalescer.flush()
+    assert emitted == []
+
+
+def test_buffered_text_is_due_one_frame_after_the_last_flush():
+    clock = FakeClock()
+    emitted = []
+    coalescer = DeltaCoalescer(emitted.append, frame_interval=0.016, clock=clock)
+    assert coalescer.due_in() is None
+
+    coalescer.push("a")
+    assert coalescer.due_in() is None
+    clock.now += 0.004
+    coalescer.push("b")
+    assert coalescer.due_in() == pytest.approx(0.012)
+    coalescer.flush_due()
+    assert emitted == ["a"]
+
+    clock.now += 0.012
+    assert coalescer.due_in() == 0
+    coalescer.flush_due()
+    assert emitted == ["a", "b"]
+    assert coalescer.due_in() is None
+
+
+def items_until_error(items):
+    try:
+        yield from items
+    except ValueError as e:
+        yield str(e)
+
+
+def test_read_with_deadline_yields_when_the_stream_stalls():
+    resume = threading.Event()
+
+    def stalled():
+        yield "a"
+        resume.wait(5)
+        yield "b"
+        raise ValueError("dropped")
+
+    items = read_with_deadline(stalled(), lambda: 0.01)
+    assert next(items) == "a"
+    assert next(items) is FRAME_DUE
+    resume.set()
+    assert [item for item in items_until_error(items) if item is not FRAME_DUE] == ["b", "dropped"]
+
+
+class StalledClient:
+    """Sends a burst of chunks, then stalls until ``resume`` is set."""
+
+    def __init__(self):
+        self.resume = threading.Event()
+
+    def chat_completion_stream(self, *args):
+        def chunks():
+            yield "Hello"
+            yield ", "
+            yield "world"
+            self.resume.wait(5)
+            yield "!"
+        return chunks()
+
+
+def test_worker_shows_held_back_text_during_a_stall(qapp):
+    from nanogpt_chat.ui.main_window import ChatWorker
+
+    client = StalledClient()
+    worker = ChatWorker(client, [("user", "hi")], "gpt-4o", 0.7, 100)
+    deltas, finished = [], []
+    worker.delta_received.connect(deltas.append)
+    worker.finished.connect(finished.append)
+    started = time.monotonic()
+    worker.start()
+
+    # The burst after the first chunk is shown while the stream is stalled
+    assert wait_until(qapp, lambda: "".join(deltas) == "Hello, world")
+    assert time.monotonic() - started < 0.5
+    assert finished == []
+
+    client.resume.set()
+    assert wait_until(qapp, lambda: finished)
+    assert finished == ["Hello, world!"]
+    assert "".join(deltas) == "Hello, world!"
+    worker.wait()
@@ -0,0 +1,41 @@
+from conftest import wait_until
+from mock_api_server import MockAPIServer
+from nanogpt_chat.utils.async_client import AsyncNanoGPTClient
+
+
+def test_stream_requests_and_reports_usage():
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        stream = client.chat_completion_stream("gpt-4o", [("system", "Be brief."), ("user", "hi there")])
+
+        assert "".join(stream) == "Hello, world"
+        assert server.requests[0]["stream_options"] == {"include_usage": True}
+        assert stream.usage == {"prompt_tokens": 4, "completion_tokens": 3, "total_tokens": 7}
+
+
+def test_stream_without_usage_report():
+    with MockAPIServer() as server:
+        server.body_chunks = [b'data: {"choices": [{"index": 0, "delta": {"content": "Hi"}}]}\n\n',
+                              b"data: [DONE]\n\n"]
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        stream = client.chat_completion_stream("gpt-4o", [("user", "hi")])
+
+        assert list(stream) == ["Hi"]
+        assert stream.usage is None
+
+
+def test_worker_emits_usage_before_the_reply(qapp):
+    from nanogpt_chat.ui.main_window import ChatWorker
+
+    with MockAPIServer() as server:
+        client = AsyncNanoGPTClient("sk-test", server.base_url)
+        worker = ChatWorker(client, [("user", "hi")], "gpt-4o", 0.7, 100)
+        events = []
+        worker.usage_received.connect(lambda usage: events.append(("usage", usage)))
+        worker.finished.connect(lambda content: events.append(("finished", content)))
+        worker.start()
+        assert wait_until(qapp, lambda: len(events) == 2)
+        worker.wait()
+
+    assert events == [("usage", {"prompt_tokens": 1, "completion_tokens": 3, "total_tokens": 4}),
+                      ("finished", "Hello, world")]